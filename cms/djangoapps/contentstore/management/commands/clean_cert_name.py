@@ -11,6 +11,7 @@ from django.core.management.base import BaseCommand
 
 from xmodule.modulestore import ModuleStoreEnum
 from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.split_mongo.mongo_connection import DELTA_BASE
 
 Result = namedtuple("Result", ["course_key", "cert_name_short", "cert_name_long", "should_clean"])
 
@@ -65,8 +66,9 @@ class Command(BaseCommand):
         # it's a one-time cleanup command.
         # pylint: disable=protected-access
         split_modulestore = modulestore()._get_modulestore_by_type(ModuleStoreEnum.Type.split)
-        active_version_collection = split_modulestore.db_connection.course_index
-        structure_collection = split_modulestore.db_connection.structures
+        db_connection = split_modulestore.db_connection
+        active_version_collection = db_connection.course_index
+        structure_collection = db_connection.structures
 
         branches = active_version_collection.aggregate([{
             '$group': {
@@ -81,27 +83,35 @@ class Command(BaseCommand):
             }
         }])['result'][0]['branches']
 
-        structures = list(
+        # Structures stored as deltas may inherit the course block from their base,
+        # so they are materialized before their course block is checked.
+        structures = db_connection._materialize_structure_documents(
             structure_collection.find({
                 '_id': {'$in': branches},
-                'blocks': {'$elemMatch': {
-                    '$and': [
-                        {"block_type": "course"},
-                        {'$or': [
-                            {'fields.cert_name_long': {'$exists': True}},
-                            {'fields.cert_name_short': {'$exists': True}}
-                        ]}
-                    ]
-                }}
-            }, {
-                '_id': True,
-                'blocks.fields.cert_name_long': True,
-                'blocks.fields.cert_name_short': True,
+                '$or': [
+                    {'blocks': {'$elemMatch': {
+                        '$and': [
+                            {"block_type": "course"},
+                            {'$or': [
+                                {'fields.cert_name_long': {'$exists': True}},
+                                {'fields.cert_name_short': {'$exists': True}}
+                            ]}
+                        ]
+                    }}},
+                    {DELTA_BASE: {'$exists': True}},
+                ]
             })
         )
 
-        structure_map = {struct['_id']: struct for struct in structures}
-        structure_ids = [struct['_id'] for struct in structures]
+        # {structure_id: fields of its course block}
+        structure_map = {}
+        for struct in structures:
+            fields = next(
+                (block.get('fields', {}) for block in struct['blocks'] if block['block_type'] == 'course'), {}
+            )
+            if 'cert_name_long' in fields or 'cert_name_short' in fields:
+                structure_map[struct['_id']] = fields
+        structure_ids = list(structure_map)
 
         split_mongo_courses = list(active_version_collection.find({
             '$or': [
@@ -118,13 +128,13 @@ class Command(BaseCommand):
         for course in split_mongo_courses:
             draft = course['versions'].get('draft-branch')
             if draft in structure_map:
-                draft_fields = structure_map[draft]['blocks'][0].get('fields', {})
+                draft_fields = structure_map[draft]
             else:
                 draft_fields = {}
 
             published = course['versions'].get('published')
             if published in structure_map:
-                published_fields = structure_map[published]['blocks'][0].get('fields', {})
+                published_fields = structure_map[published]
             else:
                 published_fields = {}
 
@@ -0,0 +1,98 @@
+"""
+Re-stores the existing split modulestore structures as deltas relative to a
+base structure, or back in full, and reports the storage and read time of the
+re-encoded structures.
+"""
+from __future__ import division
+
+from time import time
+
+from bson import BSON
+from django.core.management.base import BaseCommand, CommandError
+
+from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.django import modulestore
+
+# To run from command line: ./manage.py cms encode_structure_deltas --commit
+
+
+class Command(BaseCommand):
+    """Re-encode split modulestore structures as deltas"""
+    help = '''
+    Re-stores the split modulestore structures as deltas relative to a base
+    structure, oldest first.  Structures which other structures are based on
+    are kept in full.
+    --decode: re-store the structures stored as deltas in full instead
+    --limit: the maximum number of structures to re-encode
+    --commit: do the re-encoding
+
+    If you do not specify '--commit', the command will print out the changes which would be made.
+    '''
+
+    def add_arguments(self, parser):
+        parser.add_argument('--decode', action='store_true', help='Re-store the delta structures in full')
+        parser.add_argument('--limit', type=int, help='Maximum number of structures to re-encode')
+        parser.add_argument('--commit', action='store_true', help='Re-encode the structures')
+
+    def handle(self, *args, **options):
+        """Execute the command"""
+        split_store = modulestore()._get_modulestore_by_type(ModuleStoreEnum.Type.split)  # pylint: disable=protected-access
+        if split_store is None:
+            raise CommandError('The split modulestore is not configured.')
+        if options['limit'] is not None and options['limit'] < 1:
+            raise CommandError('--limit must be positive.')
+
+        db_connection = split_store.db_connection
+        if options['commit']:
+            db_connection.ensure_indexes()
+
+        # Structures are re-encoded oldest first, so that each one is encoded
+        # relative to the final storage of its previous versions.
+        structure_ids = [
+            document['_id']
+            for document in db_connection.structures.find({}, {'_id': True}).sort('_id', 1)
+        ]
+
+        num_reencoded = 0
+        bytes_before = 0
+        bytes_after = 0
+        read_time_before = 0
+        read_time_after = 0
+        for structure_id in structure_ids:
+            if options['limit'] is not None and num_reencoded >= options['limit']:
+                break
+
+            start = time()
+            db_connection.find_structures_by_id([structure_id])
+            read_time = time() - start
+
+            document, new_document = db_connection.reencode_structure(
+                structure_id, delta=not options['decode'], commit=options['commit']
+            )
+            if new_document is None:
+                continue
+
+            num_reencoded += 1
+            bytes_before += len(BSON.encode(document))
+            bytes_after += len(BSON.encode(new_document))
+            read_time_before += read_time
+            if options['commit']:
+                start = time()
+                db_connection.find_structures_by_id([structure_id])
+                read_time_after += time() - start
+
+        self.stdout.write('{} {} of {} structures.'.format(
+            'Re-encoded' if options['commit'] else 'Would re-encode',
+            num_reencoded,
+            len(structure_ids),
+        ))
+        if num_reencoded:
+            self.stdout.write('Stored bytes per structure: {:.0f} -> {:.0f}'.format(
+                bytes_before / num_reencoded,
+                bytes_after / num_reencoded,
+            ))
+            if options['commit']:
+                self.stdout.write('Mean read time (ms): {:.3f} -> {:.3f}'.format(
+                    read_time_before * 1000 / num_reencoded,
+                    read_time_after * 1000 / num_reencoded,
+                ))
@@ -0,0 +1,56 @@
+"""
+Tests for the encode_structure_deltas management command.
+"""
+from django.core.management import call_command
+from six import StringIO
+
+from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.split_mongo.mongo_connection import DELTA_BASE
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
+
+
+class TestEncodeStructureDeltas(ModuleStoreTestCase):
+    """
+    Tests for the encode_structure_deltas management command.
+    """
+    def setUp(self):
+        super(TestEncodeStructureDeltas, self).setUp()
+        self.course = CourseFactory.create(default_store=ModuleStoreEnum.Type.split)
+        with self.store.bulk_operations(self.course.id):
+            for index in range(4):
+                ItemFactory.create(parent=self.course, category='chapter', display_name='Chapter {}'.format(index))
+        self.chapter = self.store.get_item(self.course.location).get_children()[0]
+        self.chapter.display_name = 'Renamed'
+        self.structure_id = self.store.update_item(self.chapter, self.user.id).location.version_guid
+        self.split_store = self.store._get_modulestore_by_type(ModuleStoreEnum.Type.split)  # pylint: disable=protected-access
+
+    def _is_delta(self):
+        """
+        Returns whether the structure of the last update is stored as a delta.
+        """
+        document = self.split_store.db_connection.structures.find_one({'_id': self.structure_id})
+        return DELTA_BASE in document
+
+    def _call_command(self, *args):
+        """
+        Calls the command with the given arguments and returns its output.
+        """
+        out = StringIO()
+        call_command('encode_structure_deltas', *args, stdout=out)
+        return out.getvalue()
+
+    def test_no_commit(self):
+        output = self._call_command()
+        self.assertIn('Would re-encode', output)
+        self.assertFalse(self._is_delta())
+
+    def test_commit(self):
+        output = self._call_command('--commit')
+        self.assertIn('Re-encoded', output)
+        self.assertIn('Stored bytes per structure', output)
+        self.assertTrue(self._is_delta())
+        self.assertEqual(self.store.get_item(self.chapter.location).display_name, 'Renamed')
+
+        self._call_command('--decode', '--commit')
+        self.assertFalse(self._is_delta())
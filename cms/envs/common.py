@@ -583,6 +583,7 @@ MODULESTORE = {
                         'default_class': 'xmodule.hidden_module.HiddenDescriptor',
                         'fs_root': DATA_DIR,
                         'render_template': 'edxmako.shortcuts.render_to_string',
+                        'prefetch_definitions': True,
                     }
                 },
                 {
@@ -600,6 +601,21 @@ MODULESTORE = {
     }
 }
 
+# Maximum total size, in pickled bytes, of the deserialized split modulestore
+# structures cached in each process.  Set to 0 to disable the cache.
+COURSE_STRUCTURE_PROCESS_CACHE_SIZE = 50 * 1024 * 1024
+
+# Local disk cache of the course assets too large for the course_assets cache,
+# shared by the processes of a server.  Set DIRECTORY to enable it.
+CONTENTSERVER_DISK_CACHE = {
+    'DIRECTORY': None,
+    'MAX_SIZE': 1024 * 1024 * 1024,
+}
+
+# Maximum total size of the chunks of recently ranged course assets cached in
+# each process.  Set to 0 to disable the cache.
+CONTENTSERVER_RANGE_CACHE_SIZE = 32 * 1024 * 1024
+
 # Modulestore-level field override providers. These field override providers don't
 # require student context.
 MODULESTORE_FIELD_OVERRIDE_PROVIDERS = ()
@@ -617,6 +633,14 @@ CODE_JAIL = {
         # How many CPU seconds can jailed code use?
         'CPU': 1,
     },
+
+    # Pool of pre-started sandbox workers for safe_exec (see
+    # capa/safe_exec/pool.py).  A size of 0 disables it.  Each worker is
+    # replaced after max_executions executions.
+    'pool': {
+        'size': 0,
+        'max_executions': 100,
+    },
 }
 
 ############################ DJANGO_BUILTINS ################################
@@ -375,6 +375,11 @@ for name, database in DATABASES.items():
         })
 
 MODULESTORE = convert_module_store_setting_if_needed(AUTH_TOKENS.get('MODULESTORE', MODULESTORE))
+COURSE_STRUCTURE_PROCESS_CACHE_SIZE = ENV_TOKENS.get(
+    'COURSE_STRUCTURE_PROCESS_CACHE_SIZE', COURSE_STRUCTURE_PROCESS_CACHE_SIZE
+)
+CONTENTSERVER_DISK_CACHE = ENV_TOKENS.get('CONTENTSERVER_DISK_CACHE', CONTENTSERVER_DISK_CACHE)
+CONTENTSERVER_RANGE_CACHE_SIZE = ENV_TOKENS.get('CONTENTSERVER_RANGE_CACHE_SIZE', CONTENTSERVER_RANGE_CACHE_SIZE)
 
 MODULESTORE_FIELD_OVERRIDE_PROVIDERS = ENV_TOKENS.get(
     'MODULESTORE_FIELD_OVERRIDE_PROVIDERS',
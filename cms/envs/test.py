@@ -174,6 +174,8 @@ CACHES = {
     },
 }
 
+COURSE_STRUCTURE_PROCESS_CACHE_SIZE = 0
+
 ################################# CELERY ######################################
 
 CELERY_ALWAYS_EAGER = True
@@ -8,6 +8,7 @@ from django.db import models
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.utils.translation import ugettext_noop
+from edx_django_utils.cache import RequestCache
 from jsonfield.fields import JSONField
 from opaque_keys.edx.django.models import CourseKeyField
 from six import text_type
@@ -193,6 +194,18 @@ class ForumsConfig(ConfigurationModel):
         return u"ForumsConfig: timeout={}".format(self.connection_timeout)
 
 
+# The namespace of the request cache of the current ForumsConfig.
+FORUMS_CONFIG_CACHE_NAMESPACE = 'django_comment_common.forums_config'
+
+
+@receiver(post_save, sender=ForumsConfig)
+def clear_forums_config_request_cache(sender, **kwargs):  # pylint: disable=unused-argument
+    """
+    Makes the new ForumsConfig apply to the rest of the current request.
+    """
+    RequestCache(FORUMS_CONFIG_CACHE_NAMESPACE).clear()
+
+
 class CourseDiscussionSettings(models.Model):
     course_id = CourseKeyField(
         unique=True,
@@ -1,3 +1,4 @@
+import hashlib
 import logging
 import re
 
@@ -5,11 +6,14 @@ from django.contrib.staticfiles.storage import staticfiles_storage
 from django.contrib.staticfiles import finders
 from django.conf import settings
 
+from xmodule.assetstore.assetmgr import AssetManager
 from xmodule.contentstore.content import StaticContent
 
 from opaque_keys.edx.locator import AssetLocator
 from six import text_type
 
+from static_replace.rewrite_cache import get_rewrite_cache
+
 log = logging.getLogger(__name__)
 XBLOCK_STATIC_RESOURCE_PREFIX = '/static/xblock'
 
@@ -109,14 +113,7 @@ def process_static_urls(text, replacement_function, data_dir=None):
         quote = match.group('quote')
         rest = match.group('rest')
 
-        # Don't rewrite XBlock resource links.  Probably wasn't a good idea that /static
-        # works for actual static assets and for magical course asset URLs....
-        full_url = prefix + rest
-
-        starts_with_static_url = full_url.startswith(unicode(settings.STATIC_URL))
-        starts_with_prefix = full_url.startswith(XBLOCK_STATIC_RESOURCE_PREFIX)
-        contains_prefix = XBLOCK_STATIC_RESOURCE_PREFIX in full_url
-        if starts_with_prefix or (starts_with_static_url and contains_prefix):
+        if _is_xblock_resource_url(prefix + rest):
             return original
 
         return replacement_function(original, prefix, quote, rest)
@@ -131,6 +128,18 @@ def process_static_urls(text, replacement_function, data_dir=None):
     )
 
 
+def _is_xblock_resource_url(full_url):
+    """
+    Returns whether the static url is an XBlock resource link, which isn't rewritten.
+    """
+    # Probably wasn't a good idea that /static works for actual static assets and for
+    # magical course asset URLs....
+    starts_with_static_url = full_url.startswith(unicode(settings.STATIC_URL))
+    starts_with_prefix = full_url.startswith(XBLOCK_STATIC_RESOURCE_PREFIX)
+    contains_prefix = XBLOCK_STATIC_RESOURCE_PREFIX in full_url
+    return starts_with_prefix or (starts_with_static_url and contains_prefix)
+
+
 def make_static_urls_absolute(request, html):
     """
     Converts relative URLs referencing static assets to absolute URLs
@@ -167,23 +176,139 @@ def replace_static_urls(text, data_directory=None, course_id=None, static_asset_
     if static_paths_out is None:
         static_paths_out = []
 
+    rewriter = UrlRewriter(course_id=course_id, data_directory=data_directory, static_asset_path=static_asset_path)
+
     def replace_static_url(original, prefix, quote, rest):
         """
         Replace a single matched url.
         """
+        replacement, url = rewriter.replace_static_url(original, prefix, quote, rest)
+        static_paths_out.append(("".join([prefix, rest]), url))
+        return replacement
+
+    return process_static_urls(text, replace_static_url, data_dir=static_asset_path or data_directory)
+
+
+class UrlRewriter(object):
+    """
+    Replaces the /static/, /course/ and /jump_to_id/ urls of texts in a single pass over each text,
+    as replace_static_urls, replace_course_urls and replace_jump_to_id_urls do one after the other.
+
+    The settings and asset index of the course's assets are read for the first url of the course's
+    assets, and shared by the following ones, including those of later texts.  The rewritten texts
+    are kept in the process' RewriteCache, if any, keyed by the digest of the text, the arguments
+    and the version of the asset index of the course.
+
+    jump_to_id_base_url: The base url of the /jump_to_id/ urls, which aren't replaced if it's None
+    The other arguments are those of replace_static_urls.
+    """
+    def __init__(self, course_id=None, data_directory=None, static_asset_path='', jump_to_id_base_url=None):
+        self.course_id = course_id
+        self.data_directory = data_directory
+        self.static_asset_path = static_asset_path
+        self.jump_to_id_base_url = jump_to_id_base_url
+        self._course_assets = None
+        self._regex = None
+
+    def rewrite(self, text):
+        """
+        Returns the text with its urls replaced.
+        """
+        prefixes = [settings.STATIC_URL, u'/static/', u'/course/']
+        if self.jump_to_id_base_url is not None:
+            prefixes.append(u'/jump_to_id/')
+        if not any(prefix in text for prefix in prefixes):
+            return text
+
+        cache = get_rewrite_cache()
+        cache_key = self._cache_key(text) if cache else None
+        if cache_key is not None:
+            rewritten = cache.get(cache_key)
+            if rewritten is not None:
+                return rewritten
+
+        if self._regex is None:
+            static_prefix = u'(?:{static_url}|/static/)(?!{data_dir})'.format(
+                static_url=settings.STATIC_URL,
+                data_dir=self.static_asset_path or self.data_directory
+            )
+            self._regex = re.compile(_url_replace_regex(u'|'.join([static_prefix] + prefixes[2:])))
+        rewritten = self._regex.sub(self._replace_url, text)
+
+        if cache_key is not None:
+            cache.set(cache_key, rewritten)
+        return rewritten
+
+    def _cache_key(self, text):
+        """
+        Returns the key of the text in the RewriteCache, or None if the rewritten text can't be cached
+        because the contentstore doesn't have a versioned asset index.
+        """
+        key = (
+            text_type(self.course_id), self.data_directory, self.static_asset_path, self.jump_to_id_base_url,
+            settings.STATIC_URL,
+        )
+        if self.uses_course_assets():
+            assets = self.get_course_assets()
+            if assets['asset_index'] is None or assets['asset_index'].version is None:
+                return None
+            key += (assets['base_url'], tuple(assets['excluded_exts']), assets['asset_index'].version)
+        data = text.encode('utf-8') if isinstance(text, text_type) else text
+        return (hashlib.sha1(data).digest(),) + key
+
+    def get_course_assets(self):
+        """
+        Returns the base url, excluded extensions and asset index of the course's assets.
+        """
+        if self._course_assets is None:
+            # Import is placed here to avoid model import at project startup.
+            from static_replace.models import AssetBaseUrlConfig, AssetExcludedExtensionsConfig
+            self._course_assets = {
+                'base_url': AssetBaseUrlConfig.get_base_url(),
+                'excluded_exts': AssetExcludedExtensionsConfig.get_excluded_extensions(),
+                'asset_index': AssetManager.get_course_asset_index(self.course_id),
+            }
+        return self._course_assets
+
+    def uses_course_assets(self):
+        """
+        Returns whether the /static/ urls are replaced with the urls of the course's assets.
+        """
+        return bool(self.course_id and not self.static_asset_path)
+
+    def _replace_url(self, match):
+        """
+        Replaces a url matched by the regex of rewrite.
+        """
+        original = match.group(0)
+        prefix = match.group('prefix')
+        quote = match.group('quote')
+        rest = match.group('rest')
+        if prefix == u'/course/':
+            return "".join([quote, '/courses/' + text_type(self.course_id) + '/', rest, quote])
+        if prefix == u'/jump_to_id/':
+            return "".join([quote, self.jump_to_id_base_url + rest, quote])
+        if _is_xblock_resource_url(prefix + rest):
+            return original
+        return self.replace_static_url(original, prefix, quote, rest)[0]
+
+    def replace_static_url(self, original, prefix, quote, rest):
+        """
+        Replace a single matched /static/ url.
+
+        Returns the replacement of the original text, and the updated static URI.
+        """
         original_uri = "".join([prefix, rest])
         # Don't mess with things that end in '?raw'
         if rest.endswith('?raw'):
-            static_paths_out.append((original_uri, original_uri))
-            return original
+            return original, original_uri
 
         # In debug mode, if we can find the url as is,
         if settings.DEBUG and finders.find(rest, True):
-            static_paths_out.append((original_uri, original_uri))
-            return original
+            return original, original_uri
 
         # if we're running with a MongoBacked store course_namespace is not None, then use studio style urls
-        elif (not static_asset_path) and course_id:
+        elif self.uses_course_assets():
             # first look in the static file pipeline and see if we are trying to reference
             # a piece of static content which is in the edx-platform repo (e.g. JS associated with an xmodule)
 
@@ -198,19 +323,19 @@ def replace_static_urls(text, data_directory=None, course_id=None, static_asset_
                 url = staticfiles_storage.url(rest)
             else:
                 # if not, then assume it's courseware specific content and then look in the
-                # Mongo-backed database
-                # Import is placed here to avoid model import at project startup.
-                from static_replace.models import AssetBaseUrlConfig, AssetExcludedExtensionsConfig
-                base_url = AssetBaseUrlConfig.get_base_url()
-                excluded_exts = AssetExcludedExtensionsConfig.get_excluded_extensions()
-                url = StaticContent.get_canonicalized_asset_path(course_id, rest, base_url, excluded_exts)
+                # Mongo-backed database, through the course's asset index
+                assets = self.get_course_assets()
+                url = StaticContent.get_canonicalized_asset_path(
+                    self.course_id, rest, assets['base_url'], assets['excluded_exts'],
+                    asset_index=assets['asset_index']
+                )
 
                 if AssetLocator.CANONICAL_NAMESPACE in url:
                     url = url.replace('block@', 'block/', 1)
 
         # Otherwise, look the file up in staticfiles_storage, and append the data directory if needed
         else:
-            course_path = "/".join((static_asset_path or data_directory, rest))
+            course_path = "/".join((self.static_asset_path or self.data_directory, rest))
 
             try:
                 if staticfiles_storage.exists(rest):
@@ -223,7 +348,4 @@ def replace_static_urls(text, data_directory=None, course_id=None, static_asset_
                     rest, str(err)))
                 url = "".join([prefix, course_path])
 
-        static_paths_out.append((original_uri, url))
-        return "".join([quote, url, quote])
-
-    return process_static_urls(text, replace_static_url, data_dir=static_asset_path or data_directory)
+        return "".join([quote, url, quote]), url
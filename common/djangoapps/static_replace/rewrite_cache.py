@@ -0,0 +1,67 @@
+"""
+A process-local cache of the texts whose urls were rewritten by UrlRewriter.
+
+Most of the HTML of the XBlock fragments of a course is the same for all of
+the learners viewing it, so its urls don't need to be rewritten again on
+every page view.
+"""
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+class RewriteCache(object):
+    """
+    Caches rewritten texts, keyed by the digest of the original text and what
+    the rewriting depends on, and removes the least recently used texts when
+    their total size exceeds max_size.
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._texts = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Returns the rewritten text cached with the given key, or None.
+        """
+        with self._lock:
+            text = self._texts.pop(key, None)
+            if text is not None:
+                self._texts[key] = text
+            return text
+
+    def set(self, key, text):
+        """
+        Caches the rewritten text with the given key.
+        """
+        if len(text) > self.max_size:
+            return
+        with self._lock:
+            previous = self._texts.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._texts[key] = text
+            self._size += len(text)
+            while self._size > self.max_size:
+                __, evicted = self._texts.popitem(last=False)
+                self._size -= len(evicted)
+
+
+_REWRITE_CACHE = None
+
+
+def get_rewrite_cache():
+    """
+    Returns the RewriteCache of this process, sized by the URL_REWRITE_CACHE_SIZE
+    setting, or None if it's disabled.
+    """
+    global _REWRITE_CACHE  # pylint: disable=global-statement
+    max_size = getattr(settings, 'URL_REWRITE_CACHE_SIZE', 0)
+    if not max_size:
+        return None
+    if _REWRITE_CACHE is None or _REWRITE_CACHE.max_size != max_size:
+        _REWRITE_CACHE = RewriteCache(max_size)
+    return _REWRITE_CACHE
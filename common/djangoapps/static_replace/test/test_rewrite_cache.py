@@ -0,0 +1,38 @@
+"""
+Tests for the cache of rewritten texts
+"""
+import unittest
+
+from static_replace.rewrite_cache import RewriteCache
+
+
+class RewriteCacheTestCase(unittest.TestCase):
+    """
+    Tests for RewriteCache.
+    """
+
+    def setUp(self):
+        super(RewriteCacheTestCase, self).setUp()
+        self.cache = RewriteCache(max_size=10)
+
+    def test_get(self):
+        self.assertIsNone(self.cache.get('key'))
+        self.cache.set('key', 'text')
+        self.assertEqual(self.cache.get('key'), 'text')
+        self.cache.set('key', 'new text')
+        self.assertEqual(self.cache.get('key'), 'new text')
+
+    def test_evict_least_recently_used(self):
+        self.cache.set('key1', 'abcd')
+        self.cache.set('key2', 'efgh')
+        self.cache.get('key1')
+        self.cache.set('key3', 'ijkl')
+        self.assertEqual(self.cache.get('key1'), 'abcd')
+        self.assertIsNone(self.cache.get('key2'))
+        self.assertEqual(self.cache.get('key3'), 'ijkl')
+
+    def test_text_larger_than_cache(self):
+        self.cache.set('key1', 'abcd')
+        self.cache.set('key2', 'a' * 11)
+        self.assertIsNone(self.cache.get('key2'))
+        self.assertEqual(self.cache.get('key1'), 'abcd')
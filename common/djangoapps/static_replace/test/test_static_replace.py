@@ -15,10 +15,12 @@ from opaque_keys.edx.keys import CourseKey
 from PIL import Image
 
 from static_replace import (
+    UrlRewriter,
     _url_replace_regex,
     make_static_urls_absolute,
     process_static_urls,
     replace_course_urls,
+    replace_jump_to_id_urls,
     replace_static_urls
 )
 from xmodule.assetstore.assetmgr import AssetManager
@@ -111,11 +113,14 @@ def test_storage_url_not_exists(mock_storage):
     mock_storage.url.assert_called_once_with('data_dir/file.png')
 
 
+@patch('static_replace.AssetManager.get_course_asset_index')
 @patch('static_replace.StaticContent', autospec=True)
 @patch('xmodule.modulestore.django.modulestore', autospec=True)
 @patch('static_replace.models.AssetBaseUrlConfig.get_base_url')
 @patch('static_replace.models.AssetExcludedExtensionsConfig.get_excluded_extensions')
-def test_mongo_filestore(mock_get_excluded_extensions, mock_get_base_url, mock_modulestore, mock_static_content):
+def test_mongo_filestore(
+        mock_get_excluded_extensions, mock_get_base_url, mock_modulestore, mock_static_content, mock_get_asset_index
+):
 
     mock_modulestore.return_value = Mock(MongoModuleStore)
     mock_static_content.get_canonicalized_asset_path.return_value = "c4x://mock_url"
@@ -129,7 +134,10 @@ def test_mongo_filestore(mock_get_excluded_extensions, mock_get_base_url, mock_m
     assert '"' + mock_static_content.get_canonicalized_asset_path.return_value + '"' == \
         replace_static_urls(STATIC_SOURCE, DATA_DIRECTORY, course_id=COURSE_KEY)
 
-    mock_static_content.get_canonicalized_asset_path.assert_called_once_with(COURSE_KEY, 'file.png', u'', ['foobar'])
+    mock_static_content.get_canonicalized_asset_path.assert_called_once_with(
+        COURSE_KEY, 'file.png', u'', ['foobar'], asset_index=mock_get_asset_index.return_value
+    )
+    mock_get_asset_index.assert_called_once_with(COURSE_KEY)
 
 
 @patch('static_replace.settings', autospec=True)
@@ -199,6 +207,85 @@ def test_static_paths_out(mock_modulestore, mock_storage):
     assert static_paths == [(static_url, static_course_url), (raw_url, raw_url)]
 
 
+@pytest.mark.django_db
+@patch('static_replace.staticfiles_storage', autospec=True)
+@patch('xmodule.modulestore.django.modulestore', autospec=True)
+def test_url_rewriter(mock_modulestore, mock_storage):
+    """
+    UrlRewriter replaces the urls in a single pass as replace_static_urls, replace_course_urls and
+    replace_jump_to_id_urls do one after the other.
+    """
+    mock_storage.exists.return_value = False
+    mock_modulestore.return_value = Mock(MongoModuleStore)
+
+    jump_to_id_base_url = '/courses/org/course/run/jump_to_id/'
+    text = (
+        '<img src="/static/file.png?foo=/static/config.xml"/><img src="/static/xblock/resources/a.png"/>'
+        '<a href="/course/info">info</a><a href=\'/jump_to_id/block_id\'>block</a><a href="/static/file.png?raw">'
+    )
+    expected = replace_jump_to_id_urls(
+        replace_course_urls(replace_static_urls(text, DATA_DIRECTORY, COURSE_KEY), COURSE_KEY),
+        COURSE_KEY,
+        jump_to_id_base_url,
+    )
+    rewriter = UrlRewriter(
+        course_id=COURSE_KEY, data_directory=DATA_DIRECTORY, jump_to_id_base_url=jump_to_id_base_url
+    )
+    assert rewriter.rewrite(text) == expected
+    assert rewriter.rewrite('<a href="/jump_to_id/block_id">') == '<a href="{}block_id">'.format(jump_to_id_base_url)
+    assert UrlRewriter(course_id=COURSE_KEY).rewrite('<a href="/jump_to_id/block_id">') == \
+        '<a href="/jump_to_id/block_id">'
+
+
+@override_settings(URL_REWRITE_CACHE_SIZE=1000)
+@patch('static_replace.staticfiles_storage', autospec=True)
+def test_url_rewriter_cache(mock_storage):
+    """
+    UrlRewriter caches the rewritten texts, keyed by its arguments.
+    """
+    mock_storage.exists.return_value = True
+    mock_storage.url.side_effect = lambda path: '/static/hashed/' + path
+
+    text = '<img src="/static/url_rewriter_cache.png"/>'
+    for __ in range(2):
+        assert UrlRewriter(data_directory=DATA_DIRECTORY).rewrite(text) == \
+            '<img src="/static/hashed/url_rewriter_cache.png"/>'
+    assert mock_storage.url.call_count == 1
+
+    UrlRewriter(data_directory='other_data_dir').rewrite(text)
+    assert mock_storage.url.call_count == 2
+
+
+@override_settings(URL_REWRITE_CACHE_SIZE=1000)
+@patch('static_replace.AssetManager.get_course_asset_index')
+@patch('static_replace.StaticContent', autospec=True)
+@patch('static_replace.staticfiles_storage', autospec=True)
+@patch('static_replace.models.AssetBaseUrlConfig.get_base_url')
+@patch('static_replace.models.AssetExcludedExtensionsConfig.get_excluded_extensions')
+def test_url_rewriter_cache_asset_index_version(
+        mock_get_excluded_extensions, mock_get_base_url, mock_storage, mock_static_content, mock_get_asset_index
+):
+    """
+    The texts rewritten with the course's assets are cached for the version of the course's asset index.
+    """
+    mock_get_excluded_extensions.return_value = []
+    mock_get_base_url.return_value = u''
+    mock_storage.exists.return_value = False
+    mock_static_content.get_canonicalized_asset_path.return_value = '/c4x/mock_url'
+
+    text = '<img src="/static/url_rewriter_asset_index.png"/>'
+    for version in ['1', '1', '2']:
+        mock_get_asset_index.return_value = Mock(version=version)
+        assert UrlRewriter(course_id=COURSE_KEY).rewrite(text) == '<img src="/c4x/mock_url"/>'
+    assert mock_static_content.get_canonicalized_asset_path.call_count == 2
+
+    # The texts aren't cached without a versioned asset index.
+    mock_get_asset_index.return_value = None
+    UrlRewriter(course_id=COURSE_KEY).rewrite(text)
+    UrlRewriter(course_id=COURSE_KEY).rewrite(text)
+    assert mock_static_content.get_canonicalized_asset_path.call_count == 4
+
+
 def test_regex():
     yes = ('"/static/foo.png"',
            '"/static/foo.png"',
@@ -787,3 +874,35 @@ class CanonicalContentTest(SharedModuleStoreTestCase):
             print(expected)
             print(asset_path)
             self.assertIsNotNone(re.match(expected, asset_path))
+
+    @ddt.data(
+        (u'split', u'{prfx}_ünlöck.png'),
+        (u'split', u'special/{prfx}_lock.png'),
+        (u'split', u'{prfx}_excluded.html'),
+        (u'split', u'{prfx}_missing.png'),
+        (u'split', u'/asset-v1:a+b+{prfx}+type@thumbnail+block@{prfx}_lock-png-16x16.jpg'),
+        (u'split', u'/static/{prfx}_ünlöck.png?foo=/static/{prfx}_lock.png'),
+        (u'old', u'{prfx}_ünlöck.png'),
+        (u'old', u'/c4x/a/b/asset/{prfx}_lock.png'),
+        (u'old', u'/c4x/a/b/asset/{prfx}_not_excluded.htm'),
+    )
+    @ddt.unpack
+    def test_canonical_asset_path_with_asset_index(self, prefix, path):
+        exts = ['.html', '.tm']
+        course_key = self.courses[prefix].id
+        path = path.format(prfx=prefix)
+        expected = StaticContent.get_canonicalized_asset_path(course_key, path, u'dev', exts)
+
+        asset_index = AssetManager.get_course_asset_index(course_key)
+        with check_mongo_calls(0):
+            asset_path = StaticContent.get_canonicalized_asset_path(
+                course_key, path, u'dev', exts, asset_index=asset_index
+            )
+        self.assertEqual(asset_path, expected)
+
+    def test_replace_static_urls_reads_asset_index_once(self):
+        names = [u'split_ünlöck.png', u'split_lock.png', u'special/split_ünlöck.png', u'split_missing.png']
+        text = u''.join(u'<img src="/static/{}"/>'.format(name) for name in names)
+        with check_mongo_calls(1):
+            replaced = replace_static_urls(text, course_id=self.courses['split'].id)
+        self.assertEqual(replaced.count(u'asset-v1:a+b+split+type@asset+block/'), len(names))
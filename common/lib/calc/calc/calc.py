@@ -7,6 +7,8 @@ Uses pyparsing to parse. Main function as of now is evaluator().
 import math
 import numbers
 import operator
+import threading
+from collections import OrderedDict
 
 import numpy
 from pyparsing import (
@@ -80,6 +82,9 @@ SUFFIXES = {
     '%': 0.01,
 }
 
+# Maximum number of parsed expressions kept by `compile_expression`.
+COMPILED_EXPRESSION_CACHE_SIZE = 1024
+
 
 class UndefinedVariable(Exception):
     """
@@ -215,6 +220,65 @@ def eval_product(parse_result):
     return prod
 
 
+def eval_array_atom(parse_result):
+    """
+    Like `eval_atom`, but the values may be numpy arrays.
+    """
+    return next(k for k in parse_result if not isinstance(k, basestring))
+
+
+def eval_array_power(parse_result):
+    """
+    Like `eval_power`, but the values may be numpy arrays.
+    """
+    parse_result = reversed(
+        [k for k in parse_result if not isinstance(k, basestring)]
+    )
+    return reduce(lambda a, b: b ** a, parse_result)
+
+
+def eval_array_parallel(parse_result):
+    """
+    Like `eval_parallel`, but the values may be numpy arrays.
+
+    A zero among the inputs raises a floating point error instead of giving
+    NaN, when numpy is set to raise them.
+    """
+    if len(parse_result) == 1:
+        return parse_result[0]
+    reciprocals = [1. / e for e in parse_result
+                   if not isinstance(e, basestring)]
+    return 1. / sum(reciprocals)
+
+
+def eval_array_sum(parse_result):
+    """
+    Like `eval_sum`, but the values may be numpy arrays.
+    """
+    total = 0.0
+    current_op = operator.add
+    for token in parse_result:
+        if isinstance(token, basestring):
+            current_op = operator.sub if token == '-' else operator.add
+        else:
+            total = current_op(total, token)
+    return total
+
+
+def eval_array_product(parse_result):
+    """
+    Like `eval_product`, but the values may be numpy arrays.
+    """
+    prod = 1.0
+    current_op = operator.mul
+    for token in parse_result:
+        if isinstance(token, basestring):
+            current_op = operator.truediv if token == '/' else operator.mul
+        else:
+            prod = current_op(prod, token)
+    return prod
+
+
 def add_defaults(variables, functions, case_sensitive):
     """
     Create dictionaries with both the default and user-defined variables.
@@ -239,39 +303,141 @@ def evaluator(variables, functions, math_expr, case_sensitive=False):
      python numbers.
     -Unary functions are passed as a dictionary from string to function.
     """
-    # No need to go further.
-    if math_expr.strip() == "":
-        return float('nan')
+    return compile_expression(math_expr, case_sensitive).evaluate(variables, functions)
 
-    # Parse the tree.
-    check_parens(math_expr)
-    math_interpreter = ParseAugmenter(math_expr, case_sensitive)
-    math_interpreter.parse_algebra()
 
-    # Get our variables together.
-    all_variables, all_functions = add_defaults(variables, functions, case_sensitive)
+_compiled_expressions = OrderedDict()
+_compiled_expressions_lock = threading.Lock()
 
-    # ...and check them
-    math_interpreter.check_variables(all_variables, all_functions)
 
-    # Create a recursion to evaluate the tree.
-    if case_sensitive:
-        casify = lambda x: x
-    else:
-        casify = lambda x: x.lower()  # Lowercase for case insens.
-
-    evaluate_actions = {
-        'number': eval_number,
-        'variable': lambda x: all_variables[casify(x[0])],
-        'function': lambda x: all_functions[casify(x[0])](x[1]),
-        'atom': eval_atom,
-        'power': eval_power,
-        'parallel': eval_parallel,
-        'product': eval_product,
-        'sum': eval_sum
-    }
+def compile_expression(math_expr, case_sensitive=False):
+    """
+    Parse an expression once; return a `CompiledExpression` to evaluate it.
+
+    The most recently used expressions are cached by `math_expr` and
+    `case_sensitive`, so that answers which are evaluated many times are only
+    parsed once.
+    """
+    key = (math_expr, case_sensitive)
+    with _compiled_expressions_lock:
+        compiled = _compiled_expressions.pop(key, None)
+        if compiled is not None:
+            _compiled_expressions[key] = compiled
+            return compiled
+
+    compiled = CompiledExpression(math_expr, case_sensitive)
+    with _compiled_expressions_lock:
+        _compiled_expressions[key] = compiled
+        while len(_compiled_expressions) > COMPILED_EXPRESSION_CACHE_SIZE:
+            _compiled_expressions.popitem(last=False)
+    return compiled
+
+
+class CompiledExpression(object):
+    """
+    A parsed math expression, which can be evaluated with different values of
+    its variables.
+
+    Use `compile_expression` to get one from the cache.
+    """
+    def __init__(self, math_expr, case_sensitive=False):
+        """
+        Parse the expression; raise an exception if it isn't valid.
+        """
+        self.math_expr = math_expr
+        self.case_sensitive = case_sensitive
+        self.math_interpreter = None
+
+        # No need to go further.
+        if math_expr.strip() == "":
+            return
+
+        # Parse the tree.
+        check_parens(math_expr)
+        self.math_interpreter = ParseAugmenter(math_expr, case_sensitive)
+        self.math_interpreter.parse_algebra()
+
+    def evaluate(self, variables, functions):
+        """
+        Evaluate the expression with the given variables and functions.
+
+        -Variables are passed as a dictionary from string to value. They must be
+         python numbers.
+        -Unary functions are passed as a dictionary from string to function.
+        """
+        if self.math_interpreter is None:
+            return float('nan')
+
+        evaluate_actions = self._get_evaluate_actions(variables, functions)
+        evaluate_actions.update({
+            'atom': eval_atom,
+            'power': eval_power,
+            'parallel': eval_parallel,
+            'product': eval_product,
+            'sum': eval_sum
+        })
+        return self.math_interpreter.reduce_tree(evaluate_actions)
+
+    def evaluate_samples(self, samples, functions):
+        """
+        Evaluate the expression for each dictionary of variables in `samples`,
+        and return a numpy array of the results.
+
+        All the samples are evaluated at once, with numpy arrays of the values
+        of the variables.  If that fails, e.g. because a function doesn't take
+        arrays or because of a floating point error, the samples are evaluated
+        one by one, so that the results and errors are those of `evaluate`.
+        """
+        if not samples or self.math_interpreter is None:
+            return numpy.array([self.evaluate(sample, functions) for sample in samples])
+
+        names = set(samples[0])
+        if any(set(sample) != names for sample in samples):
+            return numpy.array([self.evaluate(sample, functions) for sample in samples])
+        variables = {
+            name: numpy.array([sample[name] for sample in samples])
+            for name in names
+        }
+
+        evaluate_actions = self._get_evaluate_actions(variables, functions)
+        evaluate_actions.update({
+            'atom': eval_array_atom,
+            'power': eval_array_power,
+            'parallel': eval_array_parallel,
+            'product': eval_array_product,
+            'sum': eval_array_sum
+        })
+        try:
+            with numpy.errstate(all='raise', under='ignore'):
+                result = self.math_interpreter.reduce_tree(evaluate_actions)
+                results = numpy.empty(len(samples), dtype=numpy.asarray(result).dtype)
+                results[:] = result
+        except (ArithmeticError, TypeError, ValueError):
+            return numpy.array([self.evaluate(sample, functions) for sample in samples])
+        return results
+
+    def _get_evaluate_actions(self, variables, functions):
+        """
+        Check the variables and functions used by the expression, and return
+        the evaluation actions of the variables, functions and numbers.
+        """
+        # Get our variables together.
+        all_variables, all_functions = add_defaults(variables, functions, self.case_sensitive)
+
+        # ...and check them
+        self.math_interpreter.check_variables(all_variables, all_functions)
+
+        # Create a recursion to evaluate the tree.
+        if self.case_sensitive:
+            casify = lambda x: x
+        else:
+            casify = lambda x: x.lower()  # Lowercase for case insens.
 
-    return math_interpreter.reduce_tree(evaluate_actions)
+        return {
+            'number': eval_number,
+            'variable': lambda x: all_variables[casify(x[0])],
+            'function': lambda x: all_functions[casify(x[0])](x[1]),
+        }
 
 
 def check_parens(formula):
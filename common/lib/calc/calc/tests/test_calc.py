@@ -554,3 +554,53 @@ class EvaluatorTest(unittest.TestCase):
             calc.evaluator({}, {}, "(1+2")
         with self.assertRaisesRegexp(calc.UnmatchedParenthesis, 'no matching opening parenthesis'):
             calc.evaluator({}, {}, "(1+2))")
+
+
+class CompiledExpressionTest(unittest.TestCase):
+    """
+    Run tests for calc.compile_expression and calc.CompiledExpression
+    """
+    SAMPLES = [{'x': 1.0, 'y': 2.0}, {'x': -3.5, 'y': 0.25}, {'x': 7.0, 'y': 10.0}]
+
+    def assert_samples_evaluated(self, math_expr, samples=None, case_sensitive=False):
+        """
+        Assert that evaluating all of the samples at once gives the same
+        results as evaluating them one by one.
+        """
+        samples = self.SAMPLES if samples is None else samples
+        compiled = calc.compile_expression(math_expr, case_sensitive)
+        results = compiled.evaluate_samples(samples, {})
+        self.assertEqual(len(results), len(samples))
+        for result, sample in zip(results, samples):
+            expected = calc.evaluator(sample, {}, math_expr, case_sensitive)
+            if numpy.isnan(expected):
+                self.assertTrue(numpy.isnan(result))
+            else:
+                self.assertAlmostEqual(result, expected)
+
+    def test_cached(self):
+        compiled = calc.compile_expression('x^2 + y')
+        self.assertIs(calc.compile_expression('x^2 + y'), compiled)
+        self.assertIsNot(calc.compile_expression('x^2 + y', case_sensitive=True), compiled)
+        self.assertEqual(compiled.evaluate({'x': 3.0, 'y': 1.0}, {}), 10.0)
+
+    def test_evaluate_samples(self):
+        for math_expr in ['x^2 + y', '-x*y/2', 'x || y', 'sin(x) + sqrt(y)', 'sqrt(x)', '2^y^x', '3', 'X + i*Y']:
+            self.assert_samples_evaluated(math_expr)
+
+    def test_evaluate_samples_fallback(self):
+        # Factorial doesn't take arrays, and the parallel of zero is NaN.
+        self.assert_samples_evaluated('fact(y)', [{'y': 2.0}, {'y': 3.0}])
+        self.assert_samples_evaluated('x || y', [{'x': 1.0, 'y': 2.0}, {'x': 0.0, 'y': 2.0}])
+        with self.assertRaises(ZeroDivisionError):
+            calc.compile_expression('1/x').evaluate_samples([{'x': 1.0}, {'x': 0.0}], {})
+        with self.assertRaises(ValueError):
+            calc.compile_expression('fact(y)').evaluate_samples([{'y': -1.0}], {})
+
+    def test_evaluate_samples_undefined_vars(self):
+        with self.assertRaisesRegexp(calc.UndefinedVariable, r'z'):
+            calc.compile_expression('x + z').evaluate_samples(self.SAMPLES, {})
+
+    def test_empty_expression(self):
+        results = calc.compile_expression(' ').evaluate_samples(self.SAMPLES, {})
+        self.assertTrue(all(numpy.isnan(results)))
@@ -13,10 +13,12 @@ Main module which shows problems (of "capa" type).
 This is used by capa_module.
 """
 
+import hashlib
 import logging
 import os.path
 import re
-from collections import OrderedDict
+import threading
+from collections import OrderedDict, namedtuple
 from copy import deepcopy
 from datetime import datetime
 from xml.sax.saxutils import unescape
@@ -29,7 +31,7 @@ import capa.inputtypes as inputtypes
 import capa.responsetypes as responsetypes
 import capa.xqueue_interface as xqueue_interface
 from capa.correctmap import CorrectMap
-from capa.safe_exec import safe_exec
+from capa.safe_exec import safe_exec, safe_exec_batch
 from capa.util import contextualize_text, convert_files_to_filenames
 from openedx.core.djangolib.markup import HTML
 from xmodule.stringify import stringify_children
@@ -71,6 +73,27 @@ html_problem_semantics = [
 
 log = logging.getLogger(__name__)
 
+# The number of problem templates kept in the template cache.
+PROBLEM_TEMPLATE_CACHE_SIZE = 256
+
+# The seed-independent parts of the parse of a problem, which are cached by
+# problem id and text: its XML tree, with includes processed and the IDs of its
+# responses and inputs assigned; the positions in the tree of each response
+# and of its inputs, as (response index, [input index]) pairs in the order of
+# tree.iter(); and its a11y data.
+ProblemTemplate = namedtuple('ProblemTemplate', ['tree', 'response_layout', 'problem_data'])
+
+_problem_templates = OrderedDict()
+_problem_templates_lock = threading.Lock()
+
+
+def clear_problem_templates():
+    """
+    Empty the template cache of LoncapaProblem.
+    """
+    with _problem_templates_lock:
+        _problem_templates.clear()
+
 #-----------------------------------------------------------------------------
 # main class for this module
 
@@ -178,13 +201,11 @@ class LoncapaProblem(object):
         problem_text = re.sub(r"endouttext\s*/", "/text", problem_text)
         self.problem_text = problem_text
 
-        # parse problem XML file into an element tree
-        self.tree = etree.XML(problem_text)
-
-        self.make_xml_compatible(self.tree)
-
-        # handle any <include file="foo"> tags
-        self._process_includes()
+        # parse problem XML file into an element tree, with ID's added to its
+        # responses and inputs, or copy it from the template cache
+        template = self._get_template(problem_text)
+        self.tree = deepcopy(template.tree)
+        self.problem_data = deepcopy(template.problem_data)
 
         # construct script processor context (eg for customresponse problems)
         if minimal_init:
@@ -192,11 +213,11 @@ class LoncapaProblem(object):
         else:
             self.context = self._extract_context(self.tree)
 
-        # Pre-parse the XML tree: modifies it to add ID's and perform some in-place
-        # transformations.  This also creates the dict (self.responders) of Response
-        # instances for each question in the problem. The dict has keys = xml subtree of
-        # Response, values = Response instance
-        self.problem_data = self._preprocess_problem(self.tree, minimal_init)
+        # Pre-parse the XML tree: perform some in-place transformations.  This
+        # also creates the dict (self.responders) of Response instances for each
+        # question in the problem. The dict has keys = xml subtree of Response,
+        # values = Response instance
+        self._preprocess_problem(self.tree, template.response_layout, minimal_init)
 
         if not minimal_init:
             if not self.student_answers:  # True when student_answers is an empty dict
@@ -746,6 +767,37 @@ class LoncapaProblem(object):
 
     # ======= Private Methods Below ========
 
+    def _get_template(self, problem_text):
+        """
+        Return the ProblemTemplate of the problem, from the template cache if
+        possible.  The templates of problems with <include> tags aren't cached,
+        since the included files can change.
+        """
+        text = problem_text.encode('utf-8') if isinstance(problem_text, unicode) else problem_text
+        key = (self.problem_id, hashlib.sha1(text).hexdigest())
+        with _problem_templates_lock:
+            template = _problem_templates.pop(key, None)
+            if template is not None:
+                _problem_templates[key] = template
+                return template
+
+        self.tree = etree.XML(problem_text)
+        has_includes = self.tree.find('.//include') is not None
+
+        self.make_xml_compatible(self.tree)
+
+        # handle any <include file="foo"> tags
+        self._process_includes()
+
+        response_layout, problem_data = self._assign_ids(self.tree)
+        template = ProblemTemplate(self.tree, response_layout, problem_data)
+        if not has_includes and PROBLEM_TEMPLATE_CACHE_SIZE:
+            with _problem_templates_lock:
+                _problem_templates[key] = template
+                while len(_problem_templates) > PROBLEM_TEMPLATE_CACHE_SIZE:
+                    _problem_templates.popitem(last=False)
+        return template
+
     def _process_includes(self):
         """
         Handle any <include file="foo"> tags by reading in the specified file and inserting it
@@ -841,6 +893,37 @@ class LoncapaProblem(object):
         context = {}
         context['seed'] = self.seed
         context['anonymous_student_id'] = self.capa_system.anonymous_student_id
+        all_code, python_path, extra_files = self._extract_script(tree)
+
+        if all_code:
+            try:
+                safe_exec(
+                    all_code,
+                    context,
+                    random_seed=self.seed,
+                    python_path=python_path,
+                    extra_files=extra_files,
+                    cache=self.capa_system.cache,
+                    slug=self.problem_id,
+                    unsafely=self.capa_system.can_execute_unsafe_code(),
+                )
+            except Exception as err:
+                log.exception("Error while execing script code: " + all_code)
+                msg = "Error while executing script code: %s" % str(err).replace('<', '&lt;')
+                raise responsetypes.LoncapaProblemError(msg)
+
+        # Store code source in context, along with the Python path needed to run it correctly.
+        context['script_code'] = all_code
+        context['python_path'] = python_path
+        context['extra_files'] = extra_files or None
+        return context
+
+    def _extract_script(self, tree):
+        """
+        Extract the code of the <script>...</script> tags of the problem.
+
+        Returns the code, and the Python path and extra files needed to run it.
+        """
         all_code = ''
 
         python_path = []
@@ -871,27 +954,35 @@ class LoncapaProblem(object):
                 extra_files.append(("python_lib.zip", zip_lib))
                 python_path.append("python_lib.zip")
 
-            try:
-                safe_exec(
-                    all_code,
-                    context,
-                    random_seed=self.seed,
-                    python_path=python_path,
-                    extra_files=extra_files,
-                    cache=self.capa_system.cache,
-                    slug=self.problem_id,
-                    unsafely=self.capa_system.can_execute_unsafe_code(),
-                )
-            except Exception as err:
-                log.exception("Error while execing script code: " + all_code)
-                msg = "Error while executing script code: %s" % str(err).replace('<', '&lt;')
-                raise responsetypes.LoncapaProblemError(msg)
+        return all_code, python_path, extra_files
 
-        # Store code source in context, along with the Python path needed to run it correctly.
-        context['script_code'] = all_code
-        context['python_path'] = python_path
-        context['extra_files'] = extra_files or None
-        return context
+    def prefetch_contexts(self, learners):
+        """
+        Execute the script code of the problem for many learners at once, with
+        safe_exec_batch, and store the results in the safe_exec cache, so that
+        the LoncapaProblems of these learners find their context there instead
+        of executing the code one at a time.
+
+        `learners` is a list of (seed, anonymous_student_id) pairs.  Errors are
+        cached, and raised when the learner's LoncapaProblem is created.
+        """
+        if not self.capa_system.cache:
+            return
+        all_code, python_path, extra_files = self._extract_script(self.tree)
+        if not all_code:
+            return
+        safe_exec_batch(
+            all_code,
+            [
+                (seed, {'seed': seed, 'anonymous_student_id': anonymous_student_id})
+                for seed, anonymous_student_id in learners
+            ],
+            python_path=python_path,
+            extra_files=extra_files,
+            cache=self.capa_system.cache,
+            slug=self.problem_id,
+            unsafely=self.capa_system.can_execute_unsafe_code(),
+        )
 
     def _extract_html(self, problemtree):  # private
         """
@@ -1009,20 +1100,18 @@ class LoncapaProblem(object):
 
         return tree
 
-    def _preprocess_problem(self, tree, minimal_init):  # private
+    def _assign_ids(self, tree):  # private
         """
         Assign IDs to all the responses
         Assign sub-IDs to all entries (textline, schematic, etc.)
-        Annoted correctness and value
         In-place transformation
 
-        Also create capa Response instances for each responsetype and save as self.responders
-
-        Obtain all responder answers and save as self.responder_answers dict (key = response)
+        Returns the response layout of the ProblemTemplate, and the a11y data
+        of the problem.
         """
         response_id = 1
         problem_data = {}
-        self.responders = {}
+        responses = []
         for response in tree.xpath('//' + "|//".join(responsetypes.registry.registered_tags())):
             responsetype_id = self.problem_id + "_" + str(response_id)
             # create and save ID for this response
@@ -1044,6 +1133,28 @@ class LoncapaProblem(object):
                 answer_id = answer_id + 1
 
             self.response_a11y_data(response, inputfields, responsetype_id, problem_data)
+            responses.append((response, inputfields))
+
+        # The a11y data removes some elements, so index the tree afterwards.
+        indexes = {element: index for index, element in enumerate(tree.iter())}
+        response_layout = [
+            (indexes[response], [indexes[entry] for entry in inputfields])
+            for response, inputfields in responses
+        ]
+        return response_layout, problem_data
+
+    def _preprocess_problem(self, tree, response_layout, minimal_init):  # private
+        """
+        Create capa Response instances for each responsetype of the response
+        layout of the problem's template, and save as self.responders
+
+        Obtain all responder answers and save as self.responder_answers dict (key = response)
+        """
+        elements = list(tree.iter())
+        self.responders = {}
+        for response_index, input_indexes in response_layout:
+            response = elements[response_index]
+            inputfields = [elements[index] for index in input_indexes]
 
             # instantiate capa Response
             responsetype_cls = responsetypes.registry.get_class_for_tag(response.tag)
@@ -1073,8 +1184,6 @@ class LoncapaProblem(object):
                 solution.attrib['id'] = "%s_solution_%i" % (self.problem_id, solution_id)
                 solution_id += 1
 
-        return problem_data
-
     def response_a11y_data(self, response, inputfields, responsetype_id, problem_data):
         """
         Construct data to be used for a11y.
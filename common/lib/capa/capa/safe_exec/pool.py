@@ -0,0 +1,302 @@
+"""
+An optional pool of pre-started sandboxed Python workers for safe_exec.
+
+codejail starts a new sandboxed Python process for each execution, which
+then has to import numpy and the other modules available to the code.  The
+workers of the pool are started once, with those modules already imported,
+and execute each code in a forked child process with the limits of codejail
+(see pool_worker.py).  A worker is replaced after `max_executions`
+executions, and after any failure.
+
+When all of the workers are busy, or a worker fails, the code is executed by
+codejail as usual.
+"""
+import base64
+import json
+import logging
+import os
+import select
+import subprocess
+import threading
+import time
+
+from codejail import jail_code
+from codejail.safe_exec import SafeExecException, json_safe
+from codejail.safe_exec import safe_exec as codejail_safe_exec
+
+from . import pool_worker
+
+log = logging.getLogger(__name__)
+
+# The modules imported by the workers before executing any code: those of
+# safe_exec.ASSUMED_IMPORTS.
+PRELOAD_MODULES = [
+    "numpy",
+    "math",
+    "scipy",
+    "calc",
+    "eia",
+    "chem.chemcalc",
+    "chem.chemtools",
+    "chem.miller",
+    "verifiers.draganddrop",
+]
+
+# How long to wait for a worker to start, in seconds.
+WORKER_START_TIMEOUT = 30
+
+# How long to wait for a worker beyond the real time limit of the code, in seconds.
+WORKER_RESPONSE_MARGIN = 5
+
+# How long to wait for a stopped worker to exit, in seconds.
+WORKER_EXIT_TIMEOUT = 5
+
+# The worker's source, which is run with `python -c`.
+pool_worker_py_file = pool_worker.__file__
+if pool_worker_py_file.endswith("c"):
+    pool_worker_py_file = pool_worker_py_file[:-1]
+
+WORKER_CODE = open(pool_worker_py_file).read()
+
+
+class WorkerError(Exception):
+    """
+    Raised when a worker can't execute a request.
+    """
+    pass
+
+
+class SandboxWorker(object):
+    """
+    A sandboxed Python process running pool_worker.py.
+    """
+    def __init__(self, python_bin, user=None):
+        argv = [python_bin, '-E', '-B', '-c', WORKER_CODE]
+        if user:
+            argv = ['sudo', '-u', user] + argv
+        self.process = subprocess.Popen(argv, stdin=subprocess.PIPE, stdout=subprocess.PIPE, close_fds=True)
+        self.executions = 0
+        self._buffer = ''
+        try:
+            self._send({'preload': PRELOAD_MODULES})
+            self._receive(time.time() + WORKER_START_TIMEOUT)
+        except WorkerError:
+            self.close()
+            raise
+
+    def execute(self, limits, request, timeout):
+        """
+        Execute the request with the given limits, and return the worker's
+        result.  The worker only reads the limits: the request is read by the
+        child process executing it.
+        """
+        self.executions += 1
+        self._send({'limits': limits})
+        self._send(request)
+        result = self._receive(time.time() + timeout)
+        if self._buffer:
+            raise WorkerError(u"The worker sent more than one result")
+        return result
+
+    def close(self):
+        """
+        Stop the worker, and wait for it to exit.  Closing its stdin ends it,
+        even when it can't be killed because it runs as another user.
+        """
+        try:
+            self.process.stdin.close()
+        except (IOError, OSError):
+            pass
+        try:
+            self.process.kill()
+        except OSError:
+            pass
+        deadline = time.time() + WORKER_EXIT_TIMEOUT
+        while self.process.poll() is None and time.time() < deadline:
+            time.sleep(0.01)
+        if self.process.returncode is None:
+            log.warning(u"The safe_exec worker %s didn't exit", self.process.pid)
+        self.process.stdout.close()
+
+    def _send(self, message):
+        """
+        Send a message to the worker.
+        """
+        data = json.dumps(message)
+        try:
+            self.process.stdin.write(pool_worker.HEADER.pack(len(data)) + data)
+            self.process.stdin.flush()
+        except (IOError, OSError) as exception:
+            raise WorkerError(u"Couldn't send the request: {}".format(exception))
+
+    def _receive(self, deadline):
+        """
+        Receive a message from the worker, waiting until `deadline` at most.
+        """
+        header = self._read(pool_worker.HEADER.size, deadline)
+        return json.loads(self._read(pool_worker.HEADER.unpack(header)[0], deadline))
+
+    def _read(self, size, deadline):
+        """
+        Read `size` bytes from the worker's stdout.
+        """
+        fd = self.process.stdout.fileno()
+        while len(self._buffer) < size:
+            timeout = deadline - time.time()
+            if timeout <= 0 or not select.select([fd], [], [], timeout)[0]:
+                raise WorkerError(u"The worker didn't respond in time")
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                raise WorkerError(u"The worker exited with status {}".format(self.process.poll()))
+            self._buffer += chunk
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+class SandboxPool(object):
+    """
+    A pool of at most `size` SandboxWorkers, started on demand.
+    """
+    def __init__(self, python_bin, user=None, size=4, max_executions=100):
+        self.python_bin = python_bin
+        self.user = user
+        self.size = size
+        self.max_executions = max_executions
+        self._idle_workers = []
+        self._num_workers = 0
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def safe_exec(self, code, globals_dict, python_path=None, extra_files=None, slug=None):
+        """
+        Execute code as codejail.safe_exec.safe_exec does, in a worker of the
+        pool if one is available.
+        """
+        worker = self._acquire_worker()
+        if worker is None:
+            return codejail_safe_exec(
+                code, globals_dict, python_path=python_path, extra_files=extra_files, slug=slug,
+            )
+
+        limits = dict(jail_code.LIMITS)
+        files, sandbox_python_path = sandbox_files(python_path or [], extra_files or [])
+        request = {
+            'code': code,
+            'globals': json_safe(globals_dict),
+            'files': files,
+            'python_path': sandbox_python_path,
+        }
+        try:
+            result = worker.execute(limits, request, (limits.get('REALTIME') or 0) + WORKER_RESPONSE_MARGIN)
+        except (WorkerError, ValueError) as exception:
+            log.warning(u"safe_exec worker failed for %s: %s", slug, exception)
+            self._release_worker(worker, failed=True)
+            return codejail_safe_exec(
+                code, globals_dict, python_path=python_path, extra_files=extra_files, slug=slug,
+            )
+
+        self._release_worker(worker, failed='error' in result)
+        if 'error' in result:
+            raise SafeExecException(
+                u"Couldn't execute jailed code: {}".format(result['error'])
+            )
+        globals_dict.update(result['globals'])
+
+    def close(self):
+        """
+        Stop the idle workers.
+        """
+        with self._lock:
+            workers, self._idle_workers = self._idle_workers, []
+            self._num_workers -= len(workers)
+        for worker in workers:
+            worker.close()
+
+    def _acquire_worker(self):
+        """
+        Return an idle worker, or a new one if the pool isn't full, or None.
+        """
+        with self._lock:
+            if os.getpid() != self._pid:
+                # The workers belong to the parent of this forked process.
+                self._idle_workers = []
+                self._num_workers = 0
+                self._pid = os.getpid()
+            if self._idle_workers:
+                return self._idle_workers.pop()
+            if self._num_workers >= self.size:
+                return None
+            self._num_workers += 1
+
+        try:
+            return SandboxWorker(self.python_bin, self.user)
+        except (WorkerError, ValueError, OSError) as exception:
+            log.warning(u"Couldn't start a safe_exec worker: %s", exception)
+            with self._lock:
+                self._num_workers -= 1
+            return None
+
+    def _release_worker(self, worker, failed=False):
+        """
+        Return the worker to the pool, or replace it if it failed or reached
+        `max_executions`.
+        """
+        if failed or worker.executions >= self.max_executions:
+            worker.close()
+            with self._lock:
+                self._num_workers -= 1
+        else:
+            with self._lock:
+                self._idle_workers.append(worker)
+
+
+def sandbox_files(python_path, extra_files):
+    """
+    Return the files to create in the sandbox, as a list of (name, base64
+    content) pairs, and the sandbox's python path.
+
+    As with codejail, the python path entries which aren't in `extra_files`
+    are copied into the sandbox, and the python path uses their base names.
+    """
+    files = [(name, base64.b64encode(content)) for name, content in extra_files]
+    extra_names = set(name for name, __ in extra_files)
+    sandbox_python_path = []
+    for path in python_path:
+        name = os.path.basename(path.rstrip('/'))
+        sandbox_python_path.append(name)
+        if name in extra_names:
+            continue
+        if os.path.isdir(path):
+            for dirpath, __, filenames in os.walk(path):
+                for filename in filenames:
+                    file_path = os.path.join(dirpath, filename)
+                    with open(file_path, 'rb') as python_file:
+                        files.append((
+                            os.path.join(name, os.path.relpath(file_path, path)),
+                            base64.b64encode(python_file.read()),
+                        ))
+        else:
+            with open(path, 'rb') as python_file:
+                files.append((name, base64.b64encode(python_file.read())))
+    return files, sandbox_python_path
+
+
+_POOL = None
+
+
+def configure_pool(python_bin, user=None, size=4, max_executions=100):
+    """
+    Execute the code of safe_exec in a SandboxPool of workers running
+    `python_bin` as `user`.  A size of 0 disables the pool.
+    """
+    global _POOL  # pylint: disable=global-statement
+    if _POOL is not None:
+        _POOL.close()
+    _POOL = SandboxPool(python_bin, user, size, max_executions) if size else None
+
+
+def get_pool():
+    """
+    Return the configured SandboxPool, or None.
+    """
+    return _POOL
@@ -0,0 +1,321 @@
+"""
+A sandboxed Python worker for the safe_exec worker pool.
+
+This file isn't imported: its source is run by the sandboxed Python with
+`python -c`, so it can only use the standard library.
+
+The worker imports the modules it's configured with once, then forks a child
+process for each request.  The worker only reads the limits of the request:
+the child reads the request itself, gets the resource limits of codejail,
+writes the result and is discarded, so executions don't share any state, but
+don't pay for starting Python and importing the modules.
+
+The child writes its result to a pipe of its own, which the worker checks
+before sending the result on: the code it runs can't reach the worker's
+stdout, so it can't forge the results of other requests.
+
+Messages are JSON documents prefixed with their length, read from stdin and
+written to stdout.  Each request is a message with its limits, followed by a
+message with its code, globals, files and python path.
+
+"""
+import base64
+import ctypes
+import errno
+import json
+import os
+import resource
+import select
+import shutil
+import signal
+import struct
+import sys
+import tempfile
+import time
+import traceback
+
+HEADER = struct.Struct('!I')
+
+# The types of the globals which are sent back.
+OK_TYPES = (type(None), int, long, float, str, unicode, list, tuple, dict)
+BAD_KEYS = ("__builtins__",)
+
+# The maximum size of the result written by a child, in bytes.
+MAX_RESULT_SIZE = 64 * 1024 * 1024
+
+# From <linux/prctl.h>.
+PR_SET_DUMPABLE = 4
+
+
+def read_exactly(fd, size):
+    """
+    Read `size` bytes from `fd`, or fewer at the end of the file.  The file
+    isn't buffered, so that the bytes after them are left to the next reader,
+    which can be another process.
+    """
+    data = ''
+    while len(data) < size:
+        chunk = os.read(fd, size - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+def read_message(fd):
+    """
+    Read a message from `fd`, or return None at the end of the file.
+    """
+    header = read_exactly(fd, HEADER.size)
+    if len(header) < HEADER.size:
+        return None
+    return json.loads(read_exactly(fd, HEADER.unpack(header)[0]))
+
+
+def write_message(fd, message):
+    """
+    Write a message to `fd`.
+    """
+    data = json.dumps(message)
+    data = HEADER.pack(len(data)) + data
+    while data:
+        data = data[os.write(fd, data):]
+
+
+def parse_result(data):
+    """
+    Return the result written by a child as `data`, or None unless it's
+    exactly one message with either globals or an error.
+    """
+    if len(data) < HEADER.size or HEADER.unpack(data[:HEADER.size])[0] != len(data) - HEADER.size:
+        return None
+    try:
+        result = json.loads(data[HEADER.size:])
+    except ValueError:
+        return None
+    if not isinstance(result, dict) or len(result) != 1:
+        return None
+    if not isinstance(result.get('globals'), dict) and not isinstance(result.get('error'), basestring):
+        return None
+    return result
+
+
+def set_non_dumpable():
+    """
+    Keep the children, which run as the same user, from tracing this process
+    or opening its pipes through /proc/<pid>/fd.
+    """
+    try:
+        ctypes.CDLL(None).prctl(PR_SET_DUMPABLE, 0, 0, 0, 0)
+    except (OSError, AttributeError):
+        pass
+
+
+def get_address_space_size():
+    """
+    Return the size of the virtual memory of this process, in bytes, or 0 if
+    it isn't known.
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[0]) * resource.getpagesize()
+    except (IOError, ValueError, IndexError):
+        return 0
+
+
+def set_process_limits(limits, preload_size):
+    """
+    Set the resource limits of the child process, as codejail does.  A limit
+    of zero means no limit, except for FSIZE.  The VMEM limit applies on top
+    of the `preload_size` bytes mapped by the preloaded modules, which the
+    processes of codejail only map when their code imports them.
+    """
+    if limits.get('CPU'):
+        resource.setrlimit(resource.RLIMIT_CPU, (limits['CPU'], limits['CPU'] + 1))
+    if limits.get('VMEM'):
+        vmem = limits['VMEM'] + preload_size
+        resource.setrlimit(resource.RLIMIT_AS, (vmem, vmem))
+    fsize = limits.get('FSIZE', 0)
+    resource.setrlimit(resource.RLIMIT_FSIZE, (fsize, fsize))
+    # No subprocesses.
+    resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+
+
+def jsonable(value):
+    """
+    Return whether `value` can be sent back as a global.
+    """
+    if not isinstance(value, OK_TYPES):
+        return False
+    try:
+        json.dumps(value)
+    except Exception:  # pylint: disable=broad-except
+        return False
+    return True
+
+
+def write_files(files, tmpdir):
+    """
+    Create the files of a request, as (name, base64 content) pairs, in `tmpdir`.
+    """
+    for name, content in files:
+        path = os.path.normpath(os.path.join(tmpdir, name))
+        if not path.startswith(tmpdir + os.sep):
+            raise ValueError('Invalid file name: {!r}'.format(name))
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'wb') as sandbox_file:
+            sandbox_file.write(base64.b64decode(content))
+
+
+def run_code(limits, preload_size, tmpdir, result_fd):
+    """
+    Read a request from stdin and run its code in this (child) process, in
+    `tmpdir`, then write the resulting globals or error to `result_fd`.
+    """
+    request = read_message(0)
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(devnull, fd)
+
+    try:
+        write_files(request['files'], tmpdir)
+    except ValueError as exception:
+        result = {'error': str(exception)}
+    else:
+        os.chdir(tmpdir)
+        sys.path[0:0] = request['python_path']
+        set_process_limits(limits, preload_size)
+
+        globals_dict = request['globals']
+        try:
+            exec request['code'] in globals_dict  # pylint: disable=exec-used
+        except BaseException:  # pylint: disable=broad-except
+            result = {'error': traceback.format_exc()}
+        else:
+            result = {'globals': {
+                name: value for name, value in globals_dict.iteritems()
+                if name not in BAD_KEYS and jsonable(value)
+            }}
+
+    write_message(result_fd, result)
+
+
+def read_result(fd, deadline):
+    """
+    Read what a child writes to `fd` until it's closed, or return None if it
+    isn't closed by `deadline` or more than MAX_RESULT_SIZE bytes are written.
+    """
+    chunks = []
+    size = 0
+    while True:
+        timeout = None if deadline is None else deadline - time.time()
+        if timeout is not None and timeout <= 0:
+            return None
+        try:
+            readable = select.select([fd], [], [], timeout)[0]
+        except select.error as exception:
+            if exception.args[0] == errno.EINTR:
+                continue
+            raise
+        if readable:
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                return ''.join(chunks)
+            size += len(chunk)
+            if size > MAX_RESULT_SIZE:
+                return None
+            chunks.append(chunk)
+
+
+def kill_child(pid):
+    """
+    Kill a child and its descendants.
+    """
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except OSError:
+        # The child hasn't started its own process group yet.
+        os.kill(pid, signal.SIGKILL)
+
+
+def wait_child(pid, deadline):
+    """
+    Wait for a child to exit, killing it at `deadline`, and return its status
+    and whether it was killed.
+    """
+    while True:
+        waited_pid, status = os.waitpid(pid, os.WNOHANG)
+        if waited_pid == pid:
+            return status, False
+        if deadline is not None and time.time() >= deadline:
+            kill_child(pid)
+            return os.waitpid(pid, 0)[1], True
+        time.sleep(0.01)
+
+
+def execute(limits, preload_size):
+    """
+    Execute the next request of stdin in a forked child process, in a new
+    temporary directory, and write its result to stdout, or an error if the
+    child doesn't write exactly one result and exit.
+    """
+    tmpdir = tempfile.mkdtemp(prefix='codejail-')
+    try:
+        result_read_fd, result_write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                # As codejail does, so that killing the child's process group
+                # also kills its descendants.
+                os.setsid()
+                os.close(result_read_fd)
+                run_code(limits, preload_size, tmpdir, result_write_fd)
+            finally:
+                os._exit(0)  # pylint: disable=protected-access
+
+        os.close(result_write_fd)
+        deadline = time.time() + limits['REALTIME'] if limits.get('REALTIME') else None
+        data = read_result(result_read_fd, deadline)
+        os.close(result_read_fd)
+        if data is None:
+            kill_child(pid)
+        status, timed_out = wait_child(pid, deadline)
+
+        result = parse_result(data) if data is not None and status == 0 else None
+        if result is None:
+            timed_out = timed_out or (deadline is not None and time.time() >= deadline)
+            result = {'error': 'The jailed code exited with status {}{}'.format(
+                status, ' after the time limit' if timed_out else ' without a valid result'
+            )}
+        write_message(1, result)
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def main():
+    """
+    Import the configured modules, then execute requests until the end of stdin.
+    """
+    config = read_message(0)
+    set_non_dumpable()
+    # As in safe_exec's CODE_PROLOG, before numpy is imported.  See TNL-6456.
+    os.environ["OPENBLAS_NUM_THREADS"] = "1"
+    size_before_preload = get_address_space_size()
+    for module_name in config['preload']:
+        try:
+            __import__(module_name)
+        except Exception:  # pylint: disable=broad-except
+            pass
+    preload_size = max(get_address_space_size() - size_before_preload, 0)
+    write_message(1, {'ready': True})
+
+    while True:
+        limits = read_message(0)
+        if limits is None:
+            break
+        execute(limits['limits'], preload_size)
+
+
+if __name__ == '__main__':
+    main()
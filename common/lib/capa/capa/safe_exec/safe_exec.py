@@ -4,6 +4,7 @@ from codejail.safe_exec import safe_exec as codejail_safe_exec
 from codejail.safe_exec import not_safe_exec as codejail_not_safe_exec
 from codejail.safe_exec import json_safe, SafeExecException
 from . import lazymod
+from . import pool
 from six import text_type
 
 import hashlib
@@ -49,6 +50,62 @@ for name, modname in ASSUMED_IMPORTS:
 
 LAZY_IMPORTS = "".join(LAZY_IMPORTS)
 
+# The maximum number of cases of safe_exec_batch executed in a single sandbox,
+# whose CPU and real time limits apply to all of them together.
+MAX_BATCH_CASES = 10
+
+# The code which executes the code of safe_exec_batch for each of its cases.
+# It runs in a single sandbox, with `batch_code`, `batch_prolog` and
+# `batch_cases` as globals, and leaves the result of each case in
+# `batch_results`, as a pair: the traceback of the exception, if any, else
+# None; and the resulting globals dictionary.
+BATCH_CODE = """\
+import __future__
+import json
+import sys
+import traceback
+
+def batch_json_safe(globals_dict):
+    safe_globals = {}
+    for name, value in globals_dict.items():
+        if name == "__builtins__":
+            continue
+        if not isinstance(value, (type(None), int, long, float, str, unicode, list, tuple, dict)):
+            continue
+        try:
+            safe_globals[name] = json.loads(json.dumps(value))
+        except Exception:
+            pass
+    return safe_globals
+
+def batch_restore_modules(modules, path):
+    for name in list(sys.modules):
+        if name not in modules:
+            del sys.modules[name]
+    sys.modules.update(modules)
+    sys.path[:] = path
+
+batch_code = compile(batch_code, "<string>", "exec", __future__.division.compiler_flag, True)
+batch_results = []
+# Each case imports its modules again, as it would in its own sandbox: the
+# prolog replaces the random module, and the modules of the python path bind
+# the random module of the case which imported them.
+batch_modules = dict(sys.modules)
+batch_path = list(sys.path)
+for batch_seed, batch_globals in batch_cases:
+    try:
+        exec batch_prolog % batch_seed in batch_globals
+        exec batch_code in batch_globals
+        # The docstring of LAZY_IMPORTS, which safe_exec doesn't run first.
+        batch_globals.pop("__doc__", None)
+    except Exception:
+        batch_results.append([traceback.format_exc(), {}])
+    else:
+        batch_results.append([None, batch_json_safe(batch_globals)])
+    batch_restore_modules(batch_modules, batch_path)
+del batch_code, batch_prolog, batch_cases, batch_globals, batch_modules, batch_path
+"""
+
 
 def update_hash(hasher, obj):
     """
@@ -73,6 +130,30 @@ def update_hash(hasher, obj):
         hasher.update(repr(obj))
 
 
+def cache_key(code, globals_dict, random_seed):
+    """
+    Return the key of the result of executing `code` with `globals_dict` and
+    `random_seed` in the cache of safe_exec.
+    """
+    safe_globals = json_safe(globals_dict)
+    md5er = hashlib.md5()
+    md5er.update(repr(code))
+    update_hash(md5er, safe_globals)
+    return "safe_exec.%r.%s" % (random_seed, md5er.hexdigest())
+
+
+def get_exec_fn(unsafely):
+    """
+    Return the function executing the code of safe_exec.
+    """
+    if unsafely:
+        return codejail_not_safe_exec
+    elif pool.get_pool() is not None:
+        return pool.get_pool().safe_exec
+    else:
+        return codejail_safe_exec
+
+
 def safe_exec(
     code,
     globals_dict,
@@ -107,15 +188,13 @@ def safe_exec(
     caller, that will be used in log messages.
 
     If `unsafely` is true, then the code will actually be executed without sandboxing.
+    Otherwise, it's executed by a worker of the sandbox pool if one is configured
+    (see pool.py).
 
     """
     # Check the cache for a previous result.
     if cache:
-        safe_globals = json_safe(globals_dict)
-        md5er = hashlib.md5()
-        md5er.update(repr(code))
-        update_hash(md5er, safe_globals)
-        key = "safe_exec.%r.%s" % (random_seed, md5er.hexdigest())
+        key = cache_key(code, globals_dict, random_seed)
         cached = cache.get(key)
         if cached is not None:
             # We have a cached result.  The result is a pair: the exception
@@ -130,10 +209,7 @@ def safe_exec(
     code_prolog = CODE_PROLOG % random_seed
 
     # Decide which code executor to use.
-    if unsafely:
-        exec_fn = codejail_not_safe_exec
-    else:
-        exec_fn = codejail_safe_exec
+    exec_fn = get_exec_fn(unsafely)
 
     # Run the code!  Results are side effects in globals_dict.
     try:
@@ -155,3 +231,102 @@ def safe_exec(
     # If an exception happened, raise it now.
     if emsg:
         raise e
+
+
+def safe_exec_batch(
+    code,
+    cases,
+    python_path=None,
+    extra_files=None,
+    cache=None,
+    slug=None,
+    unsafely=False,
+):
+    """
+    Execute python code safely, for many cases at once.
+
+    `cases` is a list of (random_seed, globals_dict) pairs.  The code is
+    executed for each case as `safe_exec(code, globals_dict, random_seed, ...)`
+    would, and any changes it makes to the globals of a case are visible in its
+    `globals_dict` when this function returns.  The other arguments are those
+    of `safe_exec`.
+
+    The cases which aren't in the cache are executed one after the other in
+    sandboxes of MAX_BATCH_CASES cases, and their results are cached as
+    `safe_exec` caches them.  Since the sandbox's limits apply to all of its
+    cases together, a batch which fails as a whole is split in two, down to
+    executing single cases with `safe_exec`.
+
+    Returns a list with the SafeExecException raised by the code for each
+    case, or None.
+
+    """
+    results = [None] * len(cases)
+    uncached_indexes = []
+    for index, (random_seed, globals_dict) in enumerate(cases):
+        if cache:
+            cached = cache.get(cache_key(code, globals_dict, random_seed))
+            if cached is not None:
+                emsg, cleaned_results = cached
+                globals_dict.update(cleaned_results)
+                if emsg:
+                    results[index] = SafeExecException(emsg)
+                continue
+        uncached_indexes.append(index)
+
+    for start in xrange(0, len(uncached_indexes), MAX_BATCH_CASES):
+        _exec_batch(
+            code, cases, uncached_indexes[start:start + MAX_BATCH_CASES], results,
+            python_path, extra_files, cache, slug, unsafely,
+        )
+    return results
+
+
+def _exec_batch(code, cases, indexes, results, python_path, extra_files, cache, slug, unsafely):
+    """
+    Execute the cases of safe_exec_batch with the given indexes in a single
+    sandbox, storing their exceptions in `results`.
+    """
+    if not indexes:
+        return
+    if len(indexes) == 1:
+        random_seed, globals_dict = cases[indexes[0]]
+        try:
+            safe_exec(
+                code, globals_dict, random_seed=random_seed, python_path=python_path,
+                extra_files=extra_files, cache=cache, slug=slug, unsafely=unsafely,
+            )
+        except SafeExecException as e:
+            results[indexes[0]] = e
+        return
+
+    batch_globals = {
+        'batch_code': LAZY_IMPORTS + code,
+        'batch_prolog': CODE_PROLOG,
+        'batch_cases': [[cases[index][0], json_safe(cases[index][1])] for index in indexes],
+    }
+    try:
+        get_exec_fn(unsafely)(
+            BATCH_CODE, batch_globals,
+            python_path=python_path, extra_files=extra_files, slug=slug,
+        )
+        batch_results = batch_globals['batch_results']
+    except (SafeExecException, KeyError):
+        middle = len(indexes) // 2
+        _exec_batch(code, cases, indexes[:middle], results, python_path, extra_files, cache, slug, unsafely)
+        _exec_batch(code, cases, indexes[middle:], results, python_path, extra_files, cache, slug, unsafely)
+        return
+
+    for index, (traceback, case_globals) in zip(indexes, batch_results):
+        random_seed, globals_dict = cases[index]
+        if cache:
+            # The key depends on the globals before the execution.
+            key = cache_key(code, globals_dict, random_seed)
+        if traceback:
+            emsg = u"Couldn't execute jailed code: {}".format(traceback)
+            results[index] = SafeExecException(emsg)
+        else:
+            emsg = None
+            globals_dict.update(case_globals)
+        if cache:
+            cache.set(key, (emsg, json_safe(globals_dict)))
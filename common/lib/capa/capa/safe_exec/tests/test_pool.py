@@ -0,0 +1,187 @@
+"""Test pool.py"""
+
+import importlib
+import os
+import os.path
+import resource
+import sys
+import textwrap
+import unittest
+
+from mock import patch
+from six import text_type
+
+from capa.safe_exec import pool, pool_worker
+from capa.safe_exec.safe_exec import ASSUMED_IMPORTS, safe_exec
+from codejail.safe_exec import SafeExecException
+
+
+class TestSandboxPool(unittest.TestCase):
+    """
+    Test the SandboxPool, with workers running this Python as the current user.
+    """
+    def setUp(self):
+        super(TestSandboxPool, self).setUp()
+        self.pool = pool.SandboxPool(sys.executable, size=1, max_executions=2)
+        self.addCleanup(self.pool.close)
+
+    def _worker_pid(self):
+        """
+        Return the pid of the idle worker of the pool.
+        """
+        self.assertEqual(len(self.pool._idle_workers), 1)  # pylint: disable=protected-access
+        return self.pool._idle_workers[0].process.pid  # pylint: disable=protected-access
+
+    def test_set_values(self):
+        g = {'b': 5}
+        self.pool.safe_exec("a = b + 12\nimport math\nc = math", g)
+        self.assertEqual(g['a'], 17)
+        self.assertNotIn('c', g)
+
+    def test_raising_exceptions(self):
+        g = {}
+        with self.assertRaises(SafeExecException) as cm:
+            self.pool.safe_exec("1/0", g)
+        self.assertIn("ZeroDivisionError", text_type(cm.exception))
+
+    def test_executions_are_isolated(self):
+        self.pool.safe_exec("import sys; sys.modules['math'].leaked = 1", {})
+        g = {}
+        self.pool.safe_exec("import math; a = hasattr(math, 'leaked')", g)
+        self.assertFalse(g['a'])
+
+    def test_python_path(self):
+        pylib = os.path.dirname(__file__) + "/test_files/pylib"
+        g = {}
+        self.pool.safe_exec("import constant; a = constant.THE_CONST", g, python_path=[pylib])
+        self.assertEqual(g['a'], 23)
+
+    def test_extra_files(self):
+        g = {}
+        self.pool.safe_exec(
+            "a = open('data.txt').read()", g, extra_files=[("data.txt", "some data")],
+        )
+        self.assertEqual(g['a'], "some data")
+
+    def test_worker_reused(self):
+        self.pool.safe_exec("a = 1", {})
+        pid = self._worker_pid()
+        self.pool.safe_exec("a = 1", {})
+        # The worker reached max_executions.
+        self.assertEqual(self.pool._idle_workers, [])  # pylint: disable=protected-access
+        self.pool.safe_exec("a = 1", {})
+        self.assertNotEqual(self._worker_pid(), pid)
+
+    def test_worker_replaced_after_failure(self):
+        self.pool.safe_exec("a = 1", {})
+        self.assertEqual(len(self.pool._idle_workers), 1)  # pylint: disable=protected-access
+        with self.assertRaises(SafeExecException):
+            self.pool.safe_exec("1/0", {})
+        self.assertEqual(self.pool._idle_workers, [])  # pylint: disable=protected-access
+
+    @patch('capa.safe_exec.pool.jail_code.LIMITS', {'REALTIME': 1})
+    def test_time_limit(self):
+        with self.assertRaises(SafeExecException) as cm:
+            self.pool.safe_exec("import time; time.sleep(5)", {})
+        self.assertIn("after the time limit", text_type(cm.exception))
+
+    def test_results_cannot_be_forged(self):
+        # The code writes a result of its own, and the end of the execution,
+        # to each file it inherited, then exits.
+        code = textwrap.dedent("""
+            import json, os, struct
+            forged = json.dumps({'globals': {'a': 'forged'}})
+            message = struct.pack('!I', len(forged)) + forged
+            for fd in range(3, 256):
+                try:
+                    os.fstat(fd)
+                    os.write(fd, message + message + 'x')
+                except OSError:
+                    pass
+            os._exit(0)
+        """)
+        with self.assertRaises(SafeExecException):
+            self.pool.safe_exec(code, {})
+        g = {}
+        self.pool.safe_exec("a = 1", g)
+        self.assertEqual(g['a'], 1)
+        self.pool.safe_exec("a = 2", g)
+        self.assertEqual(g['a'], 2)
+
+    @patch('capa.safe_exec.pool.codejail_safe_exec')
+    def test_worker_with_extra_output_discarded(self, mock_safe_exec):
+        worker = self.pool._acquire_worker()  # pylint: disable=protected-access
+        receive = worker._receive  # pylint: disable=protected-access
+
+        def receive_with_extra_output(deadline):
+            """
+            Receive a result, followed by unexpected output.
+            """
+            result = receive(deadline)
+            worker._buffer += 'extra'  # pylint: disable=protected-access
+            return result
+
+        worker._receive = receive_with_extra_output  # pylint: disable=protected-access
+        self.pool._release_worker(worker)  # pylint: disable=protected-access
+        self.pool.safe_exec("a = 1", {})
+        self.assertTrue(mock_safe_exec.called)
+        self.assertEqual(self.pool._idle_workers, [])  # pylint: disable=protected-access
+        self.assertIsNotNone(worker.process.returncode)
+
+    def test_closed_worker_reaped(self):
+        worker = self.pool._acquire_worker()  # pylint: disable=protected-access
+        worker.close()
+        self.assertIsNotNone(worker.process.returncode)
+
+    @patch('capa.safe_exec.pool.codejail_safe_exec')
+    def test_fallback_when_busy(self, mock_safe_exec):
+        worker = self.pool._acquire_worker()  # pylint: disable=protected-access
+        self.addCleanup(worker.close)
+        self.pool.safe_exec("a = 1", {}, slug="busy")
+        self.assertTrue(mock_safe_exec.called)
+
+    def test_preload_modules(self):
+        self.assertEqual(pool.PRELOAD_MODULES, [modname for __, modname in ASSUMED_IMPORTS])
+
+
+class TestPoolWorker(unittest.TestCase):
+    """
+    Test the functions of pool_worker.py.
+    """
+    def test_read_message_leaves_next_message(self):
+        read_fd, write_fd = os.pipe()
+        self.addCleanup(os.close, read_fd)
+        pool_worker.write_message(write_fd, {'limits': {}})
+        pool_worker.write_message(write_fd, {'code': 'a = 1'})
+        os.close(write_fd)
+        self.assertEqual(pool_worker.read_message(read_fd), {'limits': {}})
+        # The next message is left for the child process.
+        self.assertEqual(pool_worker.read_message(read_fd), {'code': 'a = 1'})
+        self.assertIsNone(pool_worker.read_message(read_fd))
+
+    @patch('capa.safe_exec.pool_worker.resource.setrlimit')
+    def test_set_process_limits(self, mock_setrlimit):
+        pool_worker.set_process_limits({'CPU': 1, 'VMEM': 1000, 'FSIZE': 0}, preload_size=500)
+        limits = {args[0]: args[1] for args, __ in mock_setrlimit.call_args_list}
+        self.assertEqual(limits[resource.RLIMIT_CPU], (1, 2))
+        self.assertEqual(limits[resource.RLIMIT_AS], (1500, 1500))
+        self.assertEqual(limits[resource.RLIMIT_FSIZE], (0, 0))
+        self.assertEqual(limits[resource.RLIMIT_NPROC], (0, 0))
+
+
+class TestSafeExecWithPool(unittest.TestCase):
+    """
+    Test that safe_exec uses the configured pool.
+    """
+    def setUp(self):
+        super(TestSafeExecWithPool, self).setUp()
+        pool.configure_pool(sys.executable, size=1)
+        self.addCleanup(pool.configure_pool, sys.executable, size=0)
+
+    def test_safe_exec(self):
+        g = {}
+        safe_exec_module = importlib.import_module('capa.safe_exec.safe_exec')
+        with patch.object(safe_exec_module, 'codejail_safe_exec') as mock_safe_exec:
+            safe_exec("a = int(math.pi) + 1/2", g, random_seed=17)
+        self.assertFalse(mock_safe_exec.called)
+        self.assertEqual(g['a'], 3.5)
@@ -1,6 +1,7 @@
 """Test safe_exec.py"""
 
 import hashlib
+import importlib
 import os
 import os.path
 import random
@@ -8,12 +9,16 @@ import textwrap
 import unittest
 
 import pytest
+from mock import patch
 from six import text_type
 
-from capa.safe_exec import safe_exec, update_hash
+from capa.safe_exec import safe_exec, safe_exec_batch, update_hash
 from codejail.safe_exec import SafeExecException
 from codejail.jail_code import is_configured
 
+# The module, which the safe_exec function hides in the capa.safe_exec package.
+safe_exec_module = importlib.import_module('capa.safe_exec.safe_exec')
+
 
 class TestSafeExec(unittest.TestCase):
     def test_set_values(self):
@@ -178,6 +183,103 @@ class TestSafeExecCaching(unittest.TestCase):
                 self.fail("Tried executing code with non-ASCII unicode: {0}".format(code))
 
 
+class TestSafeExecBatch(unittest.TestCase):
+    """Test safe_exec_batch, which executes code for many cases in one sandbox."""
+
+    CODE = textwrap.dedent("""\
+        a = random.randint(0, 999) + b
+        c = int(math.pi) + 1/2
+        if b == 3:
+            raise ValueError("b is 3")
+        """)
+
+    def assert_matches_safe_exec(self, cases, results):
+        """Check the results of safe_exec_batch against safe_exec for each case."""
+        for (random_seed, globals_dict), exception in zip(cases, results):
+            g = {'b': globals_dict['b']}
+            try:
+                safe_exec(self.CODE, g, random_seed=random_seed)
+            except SafeExecException:
+                self.assertIsInstance(exception, SafeExecException)
+                self.assertIn("ValueError: b is 3", text_type(exception))
+                self.assertEqual(globals_dict, {'b': 3})
+            else:
+                self.assertIsNone(exception)
+                self.assertEqual(globals_dict, g)
+
+    def test_cases(self):
+        cases = [(seed, {'b': seed % 5}) for seed in xrange(10)]
+        results = safe_exec_batch(self.CODE, cases)
+        self.assertEqual(len(results), 10)
+        self.assert_matches_safe_exec(cases, results)
+
+    def test_single_sandbox(self):
+        with patch.object(safe_exec_module, 'codejail_safe_exec', wraps=safe_exec_module.codejail_safe_exec) as mock:
+            safe_exec_batch(self.CODE, [(seed, {'b': 1}) for seed in xrange(10)])
+        self.assertEqual(mock.call_count, 1)
+
+    def test_large_batch_is_split(self):
+        with patch.object(safe_exec_module, 'codejail_safe_exec', wraps=safe_exec_module.codejail_safe_exec) as mock:
+            safe_exec_batch(self.CODE, [(seed, {'b': 1}) for seed in xrange(25)])
+        self.assertEqual(
+            [len(call[0][1]['batch_cases']) for call in mock.call_args_list],
+            [10, 10, 5]
+        )
+
+    def test_failed_batch_is_split(self):
+        codejail_safe_exec = safe_exec_module.codejail_safe_exec
+
+        def fail_large_batches(code, globals_dict, **kwargs):
+            """Fail like a batch exceeding the limits of the sandbox."""
+            if len(globals_dict.get('batch_cases', ())) > 2:
+                raise SafeExecException("Couldn't execute jailed code: killed")
+            codejail_safe_exec(code, globals_dict, **kwargs)
+
+        cases = [(seed, {'b': seed}) for seed in xrange(5)]
+        with patch.object(safe_exec_module, 'codejail_safe_exec', side_effect=fail_large_batches):
+            results = safe_exec_batch(self.CODE, cases)
+        self.assert_matches_safe_exec(cases, results)
+
+    def test_python_lib_imported_per_case(self):
+        # The random module of a python lib is the one of the case importing it.
+        pylib = os.path.dirname(__file__) + "/test_files/pylib"
+        code = "import random_constant; a = random_constant.THE_RANDOM_CONST"
+        cases = [(seed, {}) for seed in xrange(5)]
+        results = safe_exec_batch(code, cases, python_path=[pylib])
+        self.assertEqual(results, [None] * 5)
+        for random_seed, globals_dict in cases:
+            g = {}
+            with patch.dict('sys.modules'):
+                safe_exec(code, g, random_seed=random_seed, python_path=[pylib])
+            self.assertEqual(globals_dict, g)
+        self.assertEqual(len(set(globals_dict['a'] for __, globals_dict in cases)), 5)
+
+    def test_cache(self):
+        cache = {}
+        cases = [(seed, {'b': seed}) for seed in xrange(5)]
+        results = safe_exec_batch(self.CODE, cases, cache=DictCache(cache))
+        self.assertEqual(len(cache), 5)
+
+        # safe_exec uses the results cached by safe_exec_batch.
+        for (random_seed, globals_dict), exception in zip(cases, results):
+            g = {'b': random_seed}
+            with patch.object(safe_exec_module, 'codejail_safe_exec') as mock:
+                try:
+                    safe_exec(self.CODE, g, random_seed=random_seed, cache=DictCache(cache))
+                except SafeExecException as e:
+                    self.assertEqual(text_type(e), text_type(exception))
+            self.assertFalse(mock.called)
+            self.assertEqual(g, globals_dict)
+
+        # safe_exec_batch uses the cached results.
+        cache[cache.keys()[0]] = (None, {'a': 17})
+        cases = [(seed, {'b': seed}) for seed in xrange(5)]
+        with patch.object(safe_exec_module, 'codejail_safe_exec') as mock:
+            safe_exec_batch(self.CODE, cases, cache=DictCache(cache))
+        self.assertFalse(mock.called)
+        self.assertIn(17, [globals_dict.get('a') for __, globals_dict in cases])
+
+
 class TestUpdateHash(unittest.TestCase):
     """Test the safe_exec.update_hash function to be sure it canonicalizes properly."""
 
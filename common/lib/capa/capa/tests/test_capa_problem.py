@@ -7,7 +7,9 @@ from lxml import etree
 from mock import patch
 import unittest
 
-from capa.tests.helpers import new_loncapa_problem
+from capa.capa_problem import LoncapaProblem, clear_problem_templates
+from capa.safe_exec.tests.test_safe_exec import DictCache, safe_exec_module
+from capa.tests.helpers import mock_capa_module, new_loncapa_problem, test_capa_system
 from openedx.core.djangolib.markup import HTML
 
 
@@ -708,3 +710,116 @@ class CAPAProblemReportHelpersTest(unittest.TestCase):
             """
         )
         self.assertEquals(problem.find_answer_text('1_2_1', 'hide'), 'hide')
+
+
+class CAPAProblemPrefetchContextsTest(unittest.TestCase):
+    """
+    Tests for LoncapaProblem.prefetch_contexts, which executes the script code
+    of a problem for many learners at once.
+    """
+    XML = textwrap.dedent("""
+        <problem>
+            <script type="loncapa/python">
+        x = random.randint(0, 999)
+        student = anonymous_student_id
+            </script>
+            <p>$x</p>
+        </problem>
+    """)
+
+    def test_prefetch_contexts(self):
+        capa_system = test_capa_system()
+        capa_system.cache = DictCache({})
+        problem = new_loncapa_problem(self.XML, capa_system=capa_system, seed=0)
+        problem.prefetch_contexts([(seed, 'student') for seed in range(1, 5)])
+
+        for seed in range(1, 5):
+            with patch.object(safe_exec_module, 'codejail_safe_exec') as mock_safe_exec:
+                cached_problem = new_loncapa_problem(self.XML, capa_system=capa_system, seed=seed)
+            self.assertFalse(mock_safe_exec.called)
+            executed_problem = new_loncapa_problem(self.XML, seed=seed)
+            self.assertEqual(cached_problem.context['x'], executed_problem.context['x'])
+            self.assertEqual(cached_problem.context['student'], 'student')
+
+    def test_prefetch_contexts_without_cache(self):
+        problem = new_loncapa_problem(self.XML)
+        with patch('capa.capa_problem.safe_exec_batch') as mock_safe_exec_batch:
+            problem.prefetch_contexts([(1, 'student')])
+        self.assertFalse(mock_safe_exec_batch.called)
+
+
+class CAPAProblemTemplateCacheTest(unittest.TestCase):
+    """
+    Tests for the template cache of LoncapaProblem, which keeps the parsed
+    trees of problems.
+    """
+    XML = textwrap.dedent("""
+        <problem>
+            <p>Which is a fruit?</p>
+            <multiplechoiceresponse>
+                <label>Which is a fruit?</label>
+                <choicegroup type="MultipleChoice" shuffle="true">
+                    <choice correct="false">Carrot</choice>
+                    <choice correct="false">Potato</choice>
+                    <choice correct="false">Leek</choice>
+                    <choice correct="true">Apple</choice>
+                </choicegroup>
+            </multiplechoiceresponse>
+            <stringresponse answer="blue">
+                <textline size="40"/>
+            </stringresponse>
+        </problem>
+    """)
+
+    def setUp(self):
+        super(CAPAProblemTemplateCacheTest, self).setUp()
+        clear_problem_templates()
+        self.addCleanup(clear_problem_templates)
+
+    def test_template_is_cached(self):
+        problem = new_loncapa_problem(self.XML, seed=1)
+        with patch('capa.capa_problem.etree.XML', wraps=etree.XML) as mock_xml:
+            cached_problem = new_loncapa_problem(self.XML, seed=1)
+        self.assertFalse(mock_xml.called)
+
+        self.assertIsNot(cached_problem.tree, problem.tree)
+        self.assertEqual(etree.tostring(cached_problem.tree), etree.tostring(problem.tree))
+        self.assertEqual(cached_problem.problem_data, problem.problem_data)
+        for response, responder in cached_problem.responders.iteritems():
+            self.assertIs(response.getroottree().getroot(), cached_problem.tree)
+            self.assertIs(responder.xml, response)
+        self.assertEqual(
+            sorted(responder.id for responder in cached_problem.responders.values()),
+            ['1_1', '1_2'],
+        )
+
+    def test_seed_dependent_transforms(self):
+        choices = set()
+        for seed in range(10):
+            problem = new_loncapa_problem(self.XML, seed=seed)
+            choices.add(tuple(choice.text for choice in problem.tree.iter('choice')))
+        self.assertGreater(len(choices), 1)
+
+        # The cached tree isn't shuffled.
+        cached_problem = LoncapaProblem(
+            self.XML, id='1', seed=0, capa_system=test_capa_system(), capa_module=mock_capa_module(), minimal_init=True,
+        )
+        self.assertEqual(
+            [choice.text for choice in cached_problem.tree.iter('choice')],
+            ['Carrot', 'Potato', 'Leek', 'Apple'],
+        )
+
+    def test_template_per_problem_id(self):
+        new_loncapa_problem(self.XML, problem_id='1')
+        problem = new_loncapa_problem(self.XML, problem_id='2')
+        self.assertEqual(problem.tree.find('.//textline').get('id'), '2_3_1')
+
+    def test_least_recently_used_template_is_evicted(self):
+        with patch('capa.capa_problem.PROBLEM_TEMPLATE_CACHE_SIZE', 1):
+            new_loncapa_problem(self.XML, problem_id='1')
+            new_loncapa_problem(self.XML, problem_id='2')
+            with patch('capa.capa_problem.etree.XML', wraps=etree.XML) as mock_xml:
+                new_loncapa_problem(self.XML, problem_id='2')
+                self.assertFalse(mock_xml.called)
+                new_loncapa_problem(self.XML, problem_id='1')
+                self.assertTrue(mock_xml.called)
@@ -58,3 +58,11 @@ class AssetManager(object):
         compressed course structure from the structure cache.
         """
         return contentstore().find(asset_key, throw_on_not_found, as_stream)
+
+    @staticmethod
+    def get_course_asset_index(course_key):
+        """
+        Returns the CourseAssetIndex of the course from the deprecated contentstore, or None if the
+        contentstore doesn't index assets.
+        """
+        return contentstore().get_course_asset_index(course_key)
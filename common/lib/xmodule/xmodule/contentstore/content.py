@@ -14,6 +14,7 @@ VERSIONED_ASSETS_PATTERN = r'/assets/courseware/(v[\d]/)?([a-f0-9]{32})'
 import os
 import logging
 import StringIO
+from collections import namedtuple
 from urlparse import urlparse, urlunparse, parse_qsl
 from urllib import urlencode, quote_plus
 
@@ -222,7 +223,7 @@ class StaticContent(object):
         return any(path.lower().endswith(excluded_ext.lower()) for excluded_ext in excluded_exts)
 
     @staticmethod
-    def get_canonicalized_asset_path(course_key, path, base_url, excluded_exts, encode=True):
+    def get_canonicalized_asset_path(course_key, path, base_url, excluded_exts, encode=True, asset_index=None):
         """
         Returns a fully-qualified path to a piece of static content.
 
@@ -232,6 +233,8 @@ class StaticContent(object):
         Args:
             course_key: key to the course which owns this asset
             path: the path to said content
+            asset_index: (optional) the CourseAssetIndex of the course, used instead of
+                finding the assets of the course in the contentstore
 
         Returns:
             string: fully-qualified path to asset
@@ -246,13 +249,17 @@ class StaticContent(object):
         # Check the status of the asset to see if this can be served via CDN aka publicly.
         serve_from_cdn = False
         content_digest = None
-        try:
-            content = AssetManager.find(asset_key, as_stream=True)
+        if asset_index is not None and asset_index.covers(asset_key):
+            content = asset_index.get(asset_key)
+        else:
+            try:
+                content = AssetManager.find(asset_key, as_stream=True)
+            except (ItemNotFoundError, NotFoundError):
+                content = None
+        # If we can't find the item, just treat it as if it's locked.
+        if content is not None:
             serve_from_cdn = not getattr(content, "locked", True)
             content_digest = getattr(content, "content_digest", None)
-        except (ItemNotFoundError, NotFoundError):
-            # If we can't find the item, just treat it as if it's locked.
-            serve_from_cdn = False
 
         # Do a generic check to see if anything about this asset disqualifies it from being CDN'd.
         is_excluded = False
@@ -268,7 +275,7 @@ class StaticContent(object):
         for query_name, query_val in query_params:
             if query_val.startswith("/static/"):
                 new_val = StaticContent.get_canonicalized_asset_path(
-                    course_key, query_val, base_url, excluded_exts, encode=False)
+                    course_key, query_val, base_url, excluded_exts, encode=False, asset_index=asset_index)
                 updated_query_params.append((query_name, new_val))
             else:
                 # Make sure we're encoding Unicode strings down to their byte string
@@ -294,6 +301,13 @@ class StaticContent(object):
     def stream_data(self):
         yield self._data
 
+    def stream_data_in_range(self, first_byte, last_byte, chunk_size=STREAM_DATA_CHUNK_SIZE):
+        """
+        Stream the data between first_byte and last_byte (included)
+        """
+        for position in xrange(first_byte, last_byte + 1, chunk_size):
+            yield self._data[position:min(position + chunk_size, last_byte + 1)]
+
     @staticmethod
     def serialize_asset_key_with_slash(asset_key):
         """
@@ -314,26 +328,26 @@ class StaticContentStream(StaticContent):
                                                   length=length, locked=locked, content_digest=content_digest)
         self._stream = stream
 
-    def stream_data(self):
+    def stream_data(self, chunk_size=STREAM_DATA_CHUNK_SIZE):
         while True:
-            chunk = self._stream.read(STREAM_DATA_CHUNK_SIZE)
+            chunk = self._stream.read(chunk_size)
             if len(chunk) == 0:
                 break
             yield chunk
 
-    def stream_data_in_range(self, first_byte, last_byte):
+    def stream_data_in_range(self, first_byte, last_byte, chunk_size=STREAM_DATA_CHUNK_SIZE):
         """
         Stream the data between first_byte and last_byte (included)
         """
         self._stream.seek(first_byte)
         position = first_byte
         while True:
-            if last_byte < position + STREAM_DATA_CHUNK_SIZE - 1:
+            if last_byte < position + chunk_size - 1:
                 chunk = self._stream.read(last_byte - position + 1)
                 yield chunk
                 break
-            chunk = self._stream.read(STREAM_DATA_CHUNK_SIZE)
-            position += STREAM_DATA_CHUNK_SIZE
+            chunk = self._stream.read(chunk_size)
+            position += chunk_size
             yield chunk
 
     def close(self):
@@ -348,6 +362,42 @@ class StaticContentStream(StaticContent):
         return content
 
 
+# The metadata of an asset which is needed to build its canonicalized path.
+AssetIndexEntry = namedtuple('AssetIndexEntry', ['locked', 'content_digest', 'content_type'])
+
+
+class CourseAssetIndex(object):
+    """
+    The AssetIndexEntry of each asset and thumbnail of a course, keyed by asset type and name.
+
+    The version identifies the entries: the indexes of a course read before and after one of its
+    assets changed have different versions.
+    """
+    def __init__(self, course_key, entries, version=None):
+        self.course_key = course_key
+        self.entries = entries
+        self.version = version
+
+    def covers(self, asset_key):
+        """
+        Returns whether the given asset key would be stored with the assets of the course, as
+        only those are indexed.  Like the contentstore, deprecated course keys have deprecated
+        asset keys, which don't have a run.
+        """
+        course_key = asset_key.course_key
+        if (course_key.org, course_key.course) != (self.course_key.org, self.course_key.course):
+            return False
+        if getattr(self.course_key, 'deprecated', False):
+            return getattr(asset_key, 'deprecated', False)
+        return not getattr(asset_key, 'deprecated', False) and course_key.run == self.course_key.run
+
+    def get(self, asset_key):
+        """
+        Returns the AssetIndexEntry of the given asset key, or None if the asset doesn't exist.
+        """
+        return self.entries.get((asset_key.block_type, asset_key.block_id))
+
+
 class ContentStore(object):
     '''
     Abstraction for all ContentStore providers (e.g. MongoDB)
@@ -380,6 +430,13 @@ class ContentStore(object):
         """
         raise NotImplementedError
 
+    def get_course_asset_index(self, course_key):
+        """
+        Returns the CourseAssetIndex of the assets of the course, or None if this store doesn't
+        index assets.
+        """
+        return None
+
     def copy_all_course_assets(self, source_course_key, dest_course_key):
         """
         Copy all the course assets from source_course_key to dest_course_key
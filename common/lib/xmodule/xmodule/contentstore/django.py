@@ -2,6 +2,8 @@ from __future__ import absolute_import
 from importlib import import_module
 
 from django.conf import settings
+from django.core.cache import caches, InvalidCacheBackendError
+from edx_django_utils.cache import DEFAULT_REQUEST_CACHE
 
 _CONTENTSTORE = {}
 
@@ -25,6 +27,13 @@ def contentstore(name='default'):
         if 'ADDITIONAL_OPTIONS' in settings.CONTENTSTORE:
             if name in settings.CONTENTSTORE['ADDITIONAL_OPTIONS']:
                 options.update(settings.CONTENTSTORE['ADDITIONAL_OPTIONS'][name])
+        if name == 'default':
+            # Keep the asset indexes of courses in the course_assets cache, or the default cache.
+            try:
+                options['asset_index_cache'] = caches['course_assets']
+            except InvalidCacheBackendError:
+                options['asset_index_cache'] = caches['default']
+            options['request_cache'] = DEFAULT_REQUEST_CACHE
         _CONTENTSTORE[name] = class_(**options)
 
     return _CONTENTSTORE[name]
@@ -1,8 +1,11 @@
 """
 MongoDB/GridFS-level code for the contentstore.
 """
-import os
+import cPickle as pickle
 import json
+import logging
+import os
+from uuid import uuid4
 import pymongo
 import gridfs
 from gridfs.errors import NoFile
@@ -10,13 +13,25 @@ from fs.osfs import OSFS
 from bson.son import SON
 
 from mongodb_proxy import autoretry_read
+from opaque_keys import InvalidKeyError
 from opaque_keys.edx.keys import AssetKey
 from xmodule.contentstore.content import XASSET_LOCATION_TAG
 from xmodule.exceptions import NotFoundError
 from xmodule.modulestore.django import ASSET_IGNORE_REGEX
 from xmodule.util.misc import escape_invalid_characters
 from xmodule.mongo_utils import connect_to_mongodb, create_collection_index
-from .content import StaticContent, ContentStore, StaticContentStream
+from .content import AssetIndexEntry, CourseAssetIndex, StaticContent, ContentStore, StaticContentStream
+
+# How long the asset indexes of courses are cached, in seconds.  They're removed from the cache
+# whenever an asset of the course changes, so this only bounds how long an index read while an
+# asset was changing can stay out of date.
+ASSET_INDEX_CACHE_TIMEOUT = 5 * 60
+
+# The size of the largest asset index kept in the asset index cache, in bytes, since memcached
+# doesn't store values larger than 1MB.  Larger indexes are only kept in the request cache.
+ASSET_INDEX_MAX_CACHED_SIZE = 1000 * 1000
+
+log = logging.getLogger(__name__)
 
 
 class MongoContentStore(ContentStore):
@@ -26,12 +41,16 @@ class MongoContentStore(ContentStore):
     # pylint: disable=unused-argument, bad-continuation
     def __init__(
         self, host, db,
-        port=27017, tz_aware=True, user=None, password=None, bucket='fs', collection=None, **kwargs
+        port=27017, tz_aware=True, user=None, password=None, bucket='fs', collection=None,
+        asset_index_cache=None, request_cache=None, **kwargs
     ):
         """
         Establish the connection with the mongo backend and connect to the collections
 
         :param collection: ignores but provided for consistency w/ other doc_store_config patterns
+        :param asset_index_cache: (optional) a Django cache in which to keep the asset indexes of courses
+        :param request_cache: (optional) a RequestCache in which to keep the asset indexes of courses
+            which are too large for the asset index cache
         """
         # GridFS will throw an exception if the Database is wrapped in a MongoProxy. So don't wrap it.
         # The appropriate methods below are marked as autoretry_read - those methods will handle
@@ -46,6 +65,8 @@ class MongoContentStore(ContentStore):
 
         self.fs_files = mongo_db[bucket + ".files"]  # the underlying collection GridFS uses
         self.chunks = mongo_db[bucket + ".chunks"]
+        self.asset_index_cache = asset_index_cache
+        self.request_cache = request_cache
 
     def close_connections(self):
         """
@@ -100,16 +121,20 @@ class MongoContentStore(ContentStore):
             else:
                 fp.write(content.data)
 
+        self._clear_asset_index_of(content.location)
         return content
 
     def delete(self, location_or_id):
         """
         Delete an asset.
         """
-        if isinstance(location_or_id, AssetKey):
-            location_or_id, _ = self.asset_db_key(location_or_id)
+        asset_id = location_or_id
+        if isinstance(asset_id, AssetKey):
+            asset_id, _ = self.asset_db_key(asset_id)
         # Deletes of non-existent files are considered successful
-        self.fs.delete(location_or_id)
+        self.fs.delete(asset_id)
+        # After the delete, so that an index read meanwhile isn't kept.
+        self._clear_asset_index_of(location_or_id)
 
     @autoretry_read()
     def find(self, location, throw_on_not_found=True, as_stream=False):
@@ -224,6 +249,7 @@ class MongoContentStore(ContentStore):
             items = self.fs_files.find(query)
             assets_to_delete = assets_to_delete + items.count()
             for asset in items:
+                self._clear_asset_index_of(asset[prefix])
                 self.fs.delete(asset[prefix])
 
             self.fs_files.remove(query)
@@ -357,6 +383,7 @@ class MongoContentStore(ContentStore):
         result = self.fs_files.update({'_id': asset_db_key}, {"$set": attr_dict}, upsert=False)
         if not result.get('updatedExisting', True):
             raise NotFoundError(asset_db_key)
+        self._clear_asset_index_of(location)
 
     @autoretry_read()
     def get_attrs(self, location):
@@ -413,6 +440,7 @@ class MongoContentStore(ContentStore):
                 # getattr b/c caching may mean some pickled instances don't have attr
                 locked=asset.get('locked', False)
             )
+        self.clear_course_asset_index(dest_course_key)
 
     def delete_all_course_assets(self, course_key):
         """
@@ -425,6 +453,118 @@ class MongoContentStore(ContentStore):
         for asset in matching_assets:
             asset_key = self.make_id_son(asset)
             self.fs.delete(asset_key)
+        self.clear_course_asset_index(course_key)
+
+    def get_course_asset_index(self, course_key):
+        """
+        See :meth:`.ContentStore.get_course_asset_index`
+
+        The index is read with a single query, and kept in the asset index cache until an asset of
+        the course is saved, changed or deleted.
+        """
+        cache_key = self._asset_index_cache_key(*self._asset_index_course_fields(course_key))
+        cached = self._get_cached_asset_index(cache_key)
+        if cached is None:
+            # Each index read from the database gets a new version.
+            cached = (uuid4().hex, self._get_asset_index_entries(course_key))
+            self._cache_asset_index(course_key, cache_key, cached)
+        version, entries = cached
+        return CourseAssetIndex(course_key, entries, version)
+
+    def _get_cached_asset_index(self, cache_key):
+        """
+        Returns the cached version and entries of an asset index, or None.
+        """
+        if self.request_cache is not None and cache_key in self.request_cache.data:
+            return self.request_cache.data[cache_key]
+        if not self.asset_index_cache:
+            return None
+        data = self.asset_index_cache.get(cache_key)
+        return None if data is None else pickle.loads(data)
+
+    def _cache_asset_index(self, course_key, cache_key, cached):
+        """
+        Caches the version and entries of an asset index, in the request cache if they're too
+        large for the asset index cache.  They're cached pickled, so that their size is known.
+        """
+        if not self.asset_index_cache:
+            return
+        data = pickle.dumps(cached, pickle.HIGHEST_PROTOCOL)
+        if len(data) <= ASSET_INDEX_MAX_CACHED_SIZE:
+            self.asset_index_cache.set(cache_key, data, ASSET_INDEX_CACHE_TIMEOUT)
+            return
+        log.warning(
+            u"The asset index of %s is too large to be cached: %d bytes for %d assets",
+            course_key, len(data), len(cached[1])
+        )
+        if self.request_cache is not None:
+            self.request_cache.data[cache_key] = cached
+
+    def _delete_cached_asset_index(self, cache_key):
+        """
+        Removes an asset index from the asset index cache and the request cache.
+        """
+        self.asset_index_cache.delete(cache_key)
+        if self.request_cache is not None:
+            self.request_cache.data.pop(cache_key, None)
+
+    @autoretry_read()
+    def _get_asset_index_entries(self, course_key):
+        """
+        Returns the AssetIndexEntry of each asset and thumbnail of the course, keyed by
+        (category, name).
+        """
+        fields = {'content_son': 1, 'locked': 1, 'md5': 1, 'contentType': 1}
+        entries = {}
+        for asset in self.fs_files.find(query_for_course(course_key), fields):
+            asset_id = asset.get('content_son', asset['_id'])
+            entries[(asset_id['category'], asset_id['name'])] = AssetIndexEntry(
+                locked=asset.get('locked', False),
+                content_digest=asset.get('md5'),
+                content_type=asset.get('contentType'),
+            )
+        return entries
+
+    def clear_course_asset_index(self, course_key):
+        """
+        Removes the asset index of the course from the asset index cache.
+        """
+        if self.asset_index_cache:
+            self._delete_cached_asset_index(self._asset_index_cache_key(*self._asset_index_course_fields(course_key)))
+
+    def _clear_asset_index_of(self, location_or_id):
+        """
+        Removes the asset index of the course of the given asset key or database id from the
+        asset index cache.
+        """
+        if not self.asset_index_cache:
+            return
+        if isinstance(location_or_id, basestring):
+            try:
+                location_or_id = AssetKey.from_string(location_or_id)
+            except InvalidKeyError:
+                return
+        if isinstance(location_or_id, AssetKey):
+            course_fields = self._asset_index_course_fields(location_or_id.course_key)
+        else:
+            course_fields = (location_or_id['org'], location_or_id['course'], location_or_id.get('run'))
+        self._delete_cached_asset_index(self._asset_index_cache_key(*course_fields))
+
+    @staticmethod
+    def _asset_index_course_fields(course_key):
+        """
+        Returns the org, course and run which identify the assets of the course in the database.
+        As in query_for_course, the assets of deprecated course keys don't have a run.
+        """
+        run = None if getattr(course_key, 'deprecated', False) else course_key.run
+        return course_key.org, course_key.course, run
+
+    @staticmethod
+    def _asset_index_cache_key(org, course, run):
+        """
+        Returns the cache key of the asset index of the course with the given database fields.
+        """
+        return u'asset_index/{}/{}/{}'.format(org, course, run or '').encode('utf-8')
 
     # codifying the original order which pymongo used for the dicts coming out of location_to_dict
     # stability of order is more important than sanity of order as any changes to order make things
@@ -1,5 +1,6 @@
 import sys
 import logging
+from functools import partial
 
 from contracts import contract, new_contract
 from fs.osfs import OSFS
@@ -83,6 +84,9 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
         self.default_class = default_class
         self.local_modules = {}
         self._services['library_tools'] = LibraryToolsService(modulestore)
+        # The ids of the definitions to load together, the first time one
+        # of the blocks loaded lazily needs its definition.
+        self._pending_definition_ids = set()
 
     @lazy
     @contract(returns="dict(BlockKey: BlockKey)")
@@ -141,6 +145,23 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
         self.modulestore.cache_block(course_key, version_guid, block_key, block)
         return block
 
+    def add_pending_definitions(self, definition_ids):
+        """
+        Adds the given ids to the definitions to load together, the first time
+        one of them is loaded lazily.
+        """
+        self._pending_definition_ids.update(definition_ids)
+
+    def load_pending_definitions(self, course_key):
+        """
+        Loads all of the pending definitions with a single get_definitions call,
+        which caches them for the following get_definition calls.
+        """
+        if self._pending_definition_ids:
+            definition_ids = list(self._pending_definition_ids)
+            self._pending_definition_ids.clear()
+            self.modulestore.get_definitions(course_key, definition_ids)
+
     @contract(block_key=BlockKey, course_key="CourseLocator | LibraryLocator")
     def get_module_data(self, block_key, course_key):
         """
@@ -198,6 +219,7 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
                 block_key.type,
                 definition_id,
                 convert_fields,
+                prefetch=partial(self.load_pending_definitions, course_key),
             )
         else:
             definition_loader = None
@@ -1,13 +1,16 @@
 """
 Segregation of pymongo functions from the data modeling mechanisms for split modulestore.
 """
+import copy
 import datetime
 import cPickle as pickle
 import math
+import threading
 import zlib
 import pymongo
 import pytz
 import re
+from collections import OrderedDict
 from contextlib import contextmanager
 from time import time
 
@@ -15,6 +18,7 @@ from time import time
 from pymongo.errors import DuplicateKeyError  # pylint: disable=unused-import
 
 try:
+    from django.conf import settings
     from django.core.cache import caches, InvalidCacheBackendError
     DJANGO_AVAILABLE = True
 except ImportError:
@@ -203,6 +207,39 @@ def structure_to_mongo(structure, course_context=None):
         return new_structure
 
 
+# The fields of the structure documents stored as deltas.
+DELTA_BASE = 'delta_base'
+DELTA_BLOCKS = 'delta_blocks'
+DELTA_REMOVED_BLOCKS = 'delta_removed_blocks'
+
+
+def apply_structure_delta(base_document, delta_document):
+    """
+    Returns the full structure document of the given delta document, in
+    mongo format, by applying its changes to the blocks of its base document.
+
+    The base document is left untouched, so that it can be shared by
+    several delta documents.
+    """
+    replaced_blocks = {
+        (block['block_type'], block['block_id']) for block in delta_document[DELTA_BLOCKS]
+    }
+    replaced_blocks.update(tuple(block_key) for block_key in delta_document[DELTA_REMOVED_BLOCKS])
+
+    document = {
+        key: value
+        for key, value in delta_document.iteritems()
+        if key not in (DELTA_BASE, DELTA_BLOCKS, DELTA_REMOVED_BLOCKS)
+    }
+    document['blocks'] = [
+        copy.deepcopy(block)
+        for block in base_document['blocks']
+        if (block['block_type'], block['block_id']) not in replaced_blocks
+    ]
+    document['blocks'].extend(delta_document[DELTA_BLOCKS])
+    return document
+
+
 class CourseStructureCache(object):
     """
     Wrapper around django cache object to cache course structure objects.
@@ -241,7 +278,11 @@ class CourseStructureCache(object):
             return pickle.loads(pickled_data)
 
     def set(self, key, structure, course_context=None):
-        """Given a structure, will pickle, compress, and write to cache."""
+        """
+        Given a structure, will pickle, compress, and write to cache.
+
+        Returns the pickled size of the structure, or None if there is no cache.
+        """
         if self.cache is None:
             return None
 
@@ -255,19 +296,100 @@ class CourseStructureCache(object):
 
             # Stuctures are immutable, so we set a timeout of "never"
             self.cache.set(key, compressed_pickled_data, None)
+            return len(pickled_data)
+
+
+class StructureProcessCache(object):
+    """
+    In-process cache of deserialized course structures, keyed by version id
+    and shared by all requests handled by the process.
+
+    Structures are immutable once written, so entries never need to be
+    invalidated.  The least recently used structures are evicted once the
+    total size of the cached structures, measured as their pickled size,
+    exceeds max_size.
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.size = 0
+        # OrderedDict {version_id: (structure, size)}, from least to most recently used.
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Returns the cached structure with the given version id, or None.
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+
+            self._entries[key] = entry
+            return entry[0]
+
+    def set(self, key, structure, size=None):
+        """
+        Caches the given structure, evicting the least recently used
+        structures as needed to remain within max_size.
+
+        size is the pickled size of the structure, if already known.
+        """
+        if size is None:
+            size = len(pickle.dumps(structure, pickle.HIGHEST_PROTOCOL))
+        if size > self.max_size:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                return
+
+            self._entries[key] = (structure, size)
+            self.size += size
+            while self.size > self.max_size:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+
+
+_structure_process_cache = None
+
+
+def get_structure_process_cache():
+    """
+    Returns the process-wide StructureProcessCache, or None if disabled by
+    the COURSE_STRUCTURE_PROCESS_CACHE_SIZE setting.
+    """
+    global _structure_process_cache  # pylint: disable=global-statement
+    if _structure_process_cache is None:
+        max_size = 0
+        if DJANGO_AVAILABLE and settings.configured:
+            max_size = getattr(settings, 'COURSE_STRUCTURE_PROCESS_CACHE_SIZE', 0)
+        if not max_size:
+            return None
+        _structure_process_cache = StructureProcessCache(max_size)
+    return _structure_process_cache
 
 
 class MongoConnection(object):
     """
     Segregation of pymongo functions from the data modeling mechanisms for split modulestore.
     """
+    # A new structure is stored in full rather than as a delta once the
+    # delta would change more than this fraction of its blocks.
+    STRUCTURE_DELTA_REBASE_RATIO = 0.5
+
     def __init__(
         self, db, collection, host, port=27017, tz_aware=True, user=None, password=None,
-        asset_collection=None, retry_wait_time=0.1, **kwargs
+        asset_collection=None, retry_wait_time=0.1, structure_deltas=False, **kwargs
     ):
         """
         Create & open the connection, authenticate, and provide pointers to the collections
+
+        If structure_deltas is True, new structures are stored as the blocks
+        they change relative to a base structure, stored in full.
         """
+        self.structure_deltas = structure_deltas
+
         # Set a write concern of 1, which makes writes complete successfully to the primary
         # only before returning. Also makes pymongo report write errors.
         kwargs['w'] = 1
@@ -295,19 +417,34 @@ class MongoConnection(object):
         """
         Get the structure from the persistence mechanism whose id is the given key.
 
-        This method will use a cached version of the structure if it is available.
+        This method will use a cached version of the structure if it is available,
+        from the process cache first and then from the CourseStructureCache.
+        Structures returned from the process cache are shared, so they must
+        not be modified.
         """
         with TIMER.timer("get_structure", course_context) as tagger_get_structure:
+            process_cache = get_structure_process_cache()
+            if process_cache is not None:
+                structure = process_cache.get(key)
+                tagger_get_structure.tag(from_process_cache=str(bool(structure)).lower())
+                if structure:
+                    return structure
+
             cache = CourseStructureCache()
 
             structure = cache.get(key, course_context)
             tagger_get_structure.tag(from_cache=str(bool(structure)).lower())
+            size = None
             if not structure:
                 # Always log cache misses, because they are unexpected
                 tagger_get_structure.sample_rate = 1
 
                 with TIMER.timer("get_structure.find_one", course_context) as tagger_find_one:
                     doc = self.structures.find_one({'_id': key})
+                    if doc is not None:
+                        tagger_find_one.tag(delta=str(DELTA_BASE in doc).lower())
+                        docs = self._materialize_structure_documents([doc], course_context)
+                        doc = docs[0] if docs else None
                     if doc is None:
                         log.warning(
                             "doc was None when attempting to retrieve structure for item with key %s",
@@ -318,8 +455,10 @@ class MongoConnection(object):
                     structure = structure_from_mongo(doc, course_context)
                     tagger_find_one.sample_rate = 1
 
-                cache.set(key, structure, course_context)
+                size = cache.set(key, structure, course_context)
 
+            if process_cache is not None:
+                process_cache.set(key, structure, size)
             return structure
 
     @autoretry_read()
@@ -334,7 +473,9 @@ class MongoConnection(object):
             tagger.measure("requested_ids", len(ids))
             docs = [
                 structure_from_mongo(structure, course_context)
-                for structure in self.structures.find({'_id': {'$in': ids}})
+                for structure in self._materialize_structure_documents(
+                    self.structures.find({'_id': {'$in': ids}}), course_context
+                )
             ]
             tagger.measure("structures", len(docs))
             return docs
@@ -352,14 +493,44 @@ class MongoConnection(object):
             tagger.measure("requested_ids", len(ids))
             docs = [
                 structure_from_mongo(structure, course_context)
-                for structure in self.structures.find(
-                    {'_id': {'$in': ids}},
-                    {'blocks': {'$elemMatch': {'block_type': block_type}}, 'root': 1}
-                )
+                for structure in self._find_courselike_block_documents(ids, block_type)
             ]
             tagger.measure("structures", len(docs))
             return docs
 
+    def _find_courselike_block_documents(self, ids, block_type):
+        """
+        Returns the documents of the structures with the given ids, in mongo
+        format, with only their root and their first block of the given type.
+        """
+        projection = {
+            'blocks': {'$elemMatch': {'block_type': block_type}},
+            DELTA_BLOCKS: {'$elemMatch': {'block_type': block_type}},
+            DELTA_BASE: 1,
+            'root': 1,
+        }
+        documents = list(self.structures.find({'_id': {'$in': ids}}, projection))
+
+        # The courselike block of a delta document is only stored in the delta
+        # if it changed; otherwise, it's read from the base.
+        base_ids = list({
+            document[DELTA_BASE] for document in documents
+            if DELTA_BASE in document and not document.get(DELTA_BLOCKS)
+        })
+        bases = {}
+        if base_ids:
+            bases = {base['_id']: base for base in self._find_courselike_block_documents(base_ids, block_type)}
+
+        for document in documents:
+            if DELTA_BASE in document:
+                base_id = document.pop(DELTA_BASE)
+                blocks = document.pop(DELTA_BLOCKS, None)
+                if not blocks:
+                    blocks = copy.deepcopy(bases.get(base_id, {}).get('blocks', []))
+                document['blocks'] = blocks
+            document.setdefault('blocks', [])
+        return documents
+
     @autoretry_read()
     def find_structures_derived_from(self, ids, course_context=None):
         """
@@ -372,7 +543,9 @@ class MongoConnection(object):
             tagger.measure("base_ids", len(ids))
             docs = [
                 structure_from_mongo(structure, course_context)
-                for structure in self.structures.find({'previous_version': {'$in': ids}})
+                for structure in self._materialize_structure_documents(
+                    self.structures.find({'previous_version': {'$in': ids}}), course_context
+                )
             ]
             tagger.measure("structures", len(docs))
             return docs
@@ -382,25 +555,34 @@ class MongoConnection(object):
         """
         Find all structures that originated from ``original_version`` that contain ``block_key``.
 
+        Structures stored as deltas are only found if ``block_key`` changed
+        relative to their base, which includes all of the structures in
+        which ``block_key`` was updated.
+
         Arguments:
             original_version (str or ObjectID): The id of a structure
             block_key (BlockKey): The id of the block in question
         """
         with TIMER.timer("find_ancestor_structures", course_context) as tagger:
+            block_query = {
+                'block_id': block_key.id,
+                'block_type': block_key.type,
+                'edit_info.update_version': {
+                    '$exists': True,
+                },
+            }
             docs = [
                 structure_from_mongo(structure, course_context)
-                for structure in self.structures.find({
-                    'original_version': original_version,
-                    'blocks': {
-                        '$elemMatch': {
-                            'block_id': block_key.id,
-                            'block_type': block_key.type,
-                            'edit_info.update_version': {
-                                '$exists': True,
-                            },
-                        },
-                    },
-                })
+                for structure in self._materialize_structure_documents(
+                    self.structures.find({
+                        'original_version': original_version,
+                        '$or': [
+                            {'blocks': {'$elemMatch': block_query}},
+                            {DELTA_BLOCKS: {'$elemMatch': block_query}},
+                        ],
+                    }),
+                    course_context
+                )
             ]
             tagger.measure("structures", len(docs))
             return docs
@@ -411,7 +593,120 @@ class MongoConnection(object):
         """
         with TIMER.timer("insert_structure", course_context) as tagger:
             tagger.measure("blocks", len(structure["blocks"]))
-            self.structures.insert(structure_to_mongo(structure, course_context))
+            document = structure_to_mongo(structure, course_context)
+            if self.structure_deltas:
+                delta_document = self.make_structure_delta(structure, document, course_context)
+                tagger.tag(delta=str(delta_document is not None).lower())
+                if delta_document is not None:
+                    tagger.measure("delta_blocks", len(delta_document[DELTA_BLOCKS]))
+                    document = delta_document
+            self.structures.insert(document)
+
+    def make_structure_delta(self, structure, document, course_context=None):
+        """
+        Returns the delta document storing the given structure, whose mongo
+        document is given, relative to the base of its previous version.
+
+        Returns None if the structure should be stored in full instead: if
+        it has no stored previous version, or if it changed too many blocks
+        of the base, in which case it becomes the base of the next versions.
+        """
+        previous_version = structure.get('previous_version')
+        if previous_version is None:
+            return None
+        previous_document = self.structures.find_one({'_id': previous_version}, {DELTA_BASE: 1})
+        if previous_document is None:
+            return None
+
+        # Deltas are always relative to a structure stored in full, so that
+        # materializing a structure reads at most two documents.
+        base_id = previous_document.get(DELTA_BASE, previous_version)
+        base = self.get_structure(base_id, course_context)
+        if base is None:
+            return None
+
+        changed_blocks = {
+            block_key
+            for block_key, block in structure['blocks'].iteritems()
+            if block_key not in base['blocks'] or base['blocks'][block_key].to_storable() != block.to_storable()
+        }
+        removed_blocks = [block_key for block_key in base['blocks'] if block_key not in structure['blocks']]
+        num_changes = len(changed_blocks) + len(removed_blocks)
+        if num_changes > self.STRUCTURE_DELTA_REBASE_RATIO * len(structure['blocks']):
+            return None
+
+        delta_document = {key: value for key, value in document.iteritems() if key != 'blocks'}
+        delta_document[DELTA_BASE] = base_id
+        delta_document[DELTA_BLOCKS] = [
+            block for block in document['blocks']
+            if (block['block_type'], block['block_id']) in changed_blocks
+        ]
+        delta_document[DELTA_REMOVED_BLOCKS] = [list(block_key) for block_key in removed_blocks]
+        return delta_document
+
+    def reencode_structure(self, structure_id, delta=True, commit=True, course_context=None):
+        """
+        Re-stores the existing structure with the given id as a delta if delta
+        is True, or in full otherwise.
+
+        Returns a tuple of the current document of the structure and its new
+        document, which is None if the structure is already stored that way
+        or if it can't be stored as a delta.  The new document is only
+        written if commit is True.
+        """
+        document = self.structures.find_one({'_id': structure_id})
+        if document is None:
+            return None, None
+
+        new_document = None
+        if delta and DELTA_BASE not in document:
+            # Structures which are the base of deltas must remain in full.
+            if self.structures.find_one({DELTA_BASE: structure_id}, {'_id': 1}) is None:
+                structure = structure_from_mongo(copy.deepcopy(document), course_context)
+                new_document = self.make_structure_delta(
+                    structure, structure_to_mongo(structure, course_context), course_context
+                )
+        elif not delta and DELTA_BASE in document:
+            documents = self._materialize_structure_documents([document], course_context)
+            new_document = documents[0] if documents else None
+
+        if new_document is not None and commit:
+            self.structures.update({'_id': structure_id}, new_document)
+        return document, new_document
+
+    def _materialize_structure_documents(self, documents, course_context=None):
+        """
+        Returns the given structure documents, in mongo format, with the delta
+        documents replaced by the full documents they encode.
+        """
+        documents = list(documents)
+        base_ids = list({document[DELTA_BASE] for document in documents if DELTA_BASE in document})
+        if not base_ids:
+            return documents
+
+        with TIMER.timer("materialize_structure_documents", course_context) as tagger:
+            tagger.measure("bases", len(base_ids))
+            # Bases are stored in full, except for structures that were
+            # re-encoded as deltas after new versions were based on them.
+            bases = {
+                base['_id']: base
+                for base in self._materialize_structure_documents(
+                    self.structures.find({'_id': {'$in': base_ids}}), course_context
+                )
+            }
+            materialized = []
+            for document in documents:
+                if DELTA_BASE in document:
+                    base = bases.get(document[DELTA_BASE])
+                    if base is None:
+                        log.error(
+                            "Base structure %s of structure %s not found",
+                            unicode(document[DELTA_BASE]), unicode(document['_id'])
+                        )
+                        continue
+                    document = apply_structure_delta(base, document)
+                materialized.append(document)
+            return materialized
 
     def get_course_index(self, key, ignore_case=False):
         """
@@ -574,6 +869,12 @@ class MongoConnection(object):
             unique=True,
             background=True
         )
+        create_collection_index(
+            self.structures,
+            [(DELTA_BASE, pymongo.ASCENDING)],
+            sparse=True,
+            background=True
+        )
 
     def close_connections(self):
         """
@@ -88,6 +88,7 @@ from .caching_descriptor_system import CachingDescriptorSystem
 from xmodule.partitions.partitions_service import PartitionService
 from xmodule.modulestore.split_mongo.mongo_connection import MongoConnection, DuplicateKeyError
 from xmodule.modulestore.split_mongo import BlockKey, CourseEnvelope
+from xmodule.modulestore.split_mongo.structure_index import StructureIndexCache
 from xmodule.modulestore.store_utilities import DETACHED_XBLOCK_TYPES
 from xmodule.error_module import ErrorDescriptor
 from collections import defaultdict
@@ -195,6 +196,13 @@ class SplitBulkWriteMixin(BulkOperationsMixin):
     """
     _bulk_ops_record_type = SplitBulkWriteRecord
 
+    # Whether definitions are cached in the request cache and loaded in
+    # batches, see SplitMongoModuleStore.
+    prefetch_definitions = False
+
+    # The maximum number of definitions loaded by a single query.
+    DEFINITION_BATCH_SIZE = 500
+
     def _get_bulk_ops_record(self, course_key, ignore_case=False):
         """
         Return the :class:`.SplitBulkWriteRecord` for this course.
@@ -399,7 +407,7 @@ class SplitBulkWriteMixin(BulkOperationsMixin):
 
             # The definition hasn't been loaded from the db yet, so load it
             if definition is None:
-                definition = self.db_connection.get_definition(definition_guid, course_key)
+                definition = self._get_definition_from_db(course_key, definition_guid)
                 bulk_write_record.definitions[definition_guid] = definition
                 if definition is not None:
                     bulk_write_record.definitions_in_db.add(definition_guid)
@@ -408,7 +416,35 @@ class SplitBulkWriteMixin(BulkOperationsMixin):
         else:
             # cast string to ObjectId if necessary
             definition_guid = course_key.as_object_id(definition_guid)
-            return self.db_connection.get_definition(definition_guid, course_key)
+            return self._get_definition_from_db(course_key, definition_guid)
+
+    def _get_definition_cache(self):
+        """
+        Returns the request cache of the definitions loaded from the db, by
+        id, or None if definitions aren't cached.
+
+        Definitions are never modified once written, so they can be shared
+        by all of the bulk operations of the request.  The definitions which
+        are returned are the cached ones, so callers copy them before
+        modifying them, as DefinitionLazyLoader does.
+        """
+        if not self.prefetch_definitions or self.request_cache is None:
+            return None
+        return self.request_cache.data.setdefault('definition_cache', {})
+
+    def _get_definition_from_db(self, course_key, definition_guid):
+        """
+        Retrieve a single definition by id from the request cache of
+        definitions, or from the db.
+        """
+        definition_cache = self._get_definition_cache()
+        if definition_cache is not None and definition_guid in definition_cache:
+            return definition_cache[definition_guid]
+
+        definition = self.db_connection.get_definition(definition_guid, course_key)
+        if definition_cache is not None and definition is not None:
+            definition_cache[definition_guid] = definition
+        return definition
 
     def get_definitions(self, course_key, ids):
         """
@@ -434,10 +470,26 @@ class SplitBulkWriteMixin(BulkOperationsMixin):
                     ids.remove(definition_id)
                     definitions.append(definition)
 
+        definition_cache = self._get_definition_cache()
+        if definition_cache is not None:
+            for definition_id in list(ids):
+                if definition_id in definition_cache:
+                    ids.remove(definition_id)
+                    definitions.append(definition_cache[definition_id])
+
         if len(ids):
             # Query the db for the definitions.
-            defs_from_db = list(self.db_connection.get_definitions(list(ids), course_key))
+            # Query the definitions in batches, so that the queries remain
+            # small for the largest courses.
+            ids = list(ids)
+            defs_from_db = []
+            for index in range(0, len(ids), self.DEFINITION_BATCH_SIZE):
+                defs_from_db.extend(self.db_connection.get_definitions(
+                    ids[index:index + self.DEFINITION_BATCH_SIZE], course_key
+                ))
             defs_dict = {d.get('_id'): d for d in defs_from_db}
+            if definition_cache is not None:
+                definition_cache.update(defs_dict)
             # Add the retrieved definitions to the cache.
             bulk_write_record.definitions_in_db.update(defs_dict.iterkeys())
             bulk_write_record.definitions.update(defs_dict)
@@ -693,18 +745,25 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
     DEFAULT_ROOT_LIBRARY_BLOCK_TYPE = 'library'
     DEFAULT_ROOT_COURSE_BLOCK_TYPE = 'course'
 
+    # The number of structures whose StructureIndex is cached.
+    STRUCTURE_INDEX_CACHE_SIZE = 16
+
     def __init__(self, contentstore, doc_store_config, fs_root, render_template,
                  default_class=None,
                  error_tracker=null_error_tracker,
                  i18n_service=None, fs_service=None, user_service=None,
-                 services=None, signal_handler=None, **kwargs):
+                 services=None, signal_handler=None, structure_deltas=False, prefetch_definitions=False,
+                 **kwargs):
         """
         :param doc_store_config: must have a host, db, and collection entries. Other common entries: port, tz_aware.
+        :param structure_deltas: whether to store new structures as deltas relative to a base structure.
+        :param prefetch_definitions: whether to cache definitions for the duration of the request, and to
+            load the definitions of lazily loaded blocks together, the first time one of them is needed.
         """
 
         super(SplitMongoModuleStore, self).__init__(contentstore, **kwargs)
 
-        self.db_connection = MongoConnection(**doc_store_config)
+        self.db_connection = MongoConnection(structure_deltas=structure_deltas, **doc_store_config)
 
         if default_class is not None:
             module_path, __, class_name = default_class.rpartition('.')
@@ -729,6 +788,8 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             self.services["request_cache"] = self.request_cache
 
         self.signal_handler = signal_handler
+        self.prefetch_definitions = prefetch_definitions
+        self._structure_indexes = StructureIndexCache(self.STRUCTURE_INDEX_CACHE_SIZE)
 
     def close_connections(self):
         """
@@ -758,6 +819,7 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         super(SplitMongoModuleStore, self)._drop_database(database, collections, connections)
 
         self.db_connection._drop_database(database, collections, connections)  # pylint: disable=protected-access
+        self._structure_indexes.clear()
 
     def cache_items(self, system, base_block_ids, course_key, depth=0, lazy=True):
         """
@@ -796,12 +858,26 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
                 definitions = {definition['_id']: definition
                                for definition in descendent_definitions}
 
-                for block in new_module_data.itervalues():
+                for block_key, block in new_module_data.items():
                     if block.definition in definitions:
                         definition = definitions[block.definition]
-                        # convert_fields gets done later in the runtime's xblock_from_json
-                        block.fields.update(definition.get('fields'))
+                        # Merge the definition into a copy of the block, since
+                        # structures can be shared across requests.
+                        block = copy.copy(block)
+                        block.fields = dict(block.fields)
+                        # convert_fields gets done later in the runtime's xblock_from_json.
+                        # The definition can be cached, so the block gets copies of its fields.
+                        block.fields.update(copy.deepcopy(definition.get('fields')))
                         block.definition_loaded = True
+                        new_module_data[block_key] = block
+            elif self._get_definition_cache() is not None:
+                # Lazy loading with prefetching: the definitions of the loaded blocks
+                # are loaded together the first time one of them is needed.
+                system.add_pending_definitions(
+                    block.definition
+                    for block in new_module_data.itervalues()
+                    if block.definition is not None and not block.definition_loaded
+                )
 
             system.module_data.update(new_module_data)
             return system.module_data
@@ -1277,11 +1353,17 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
 
         if settings is None:
             settings = {}
+        structure_index = self._get_structure_index(course_locator, course.structure)
         if 'name' in qualifiers:
             # odd case where we don't search just confirm
             block_name = qualifiers.pop('name')
             block_ids = []
-            for block_id, block in course.structure['blocks'].iteritems():
+            if structure_index is not None and isinstance(block_name, six.string_types):
+                candidate_ids = structure_index.blocks_by_id.get(block_name, [])
+            else:
+                candidate_ids = course.structure['blocks'].iterkeys()
+            for block_id in candidate_ids:
+                block = course.structure['blocks'][block_id]
                 # Don't do an in comparison blindly; first check to make sure
                 # that the name qualifier we're looking at isn't a plain string;
                 # if it is a string, then it should match exactly. If it's other
@@ -1308,16 +1390,25 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         path_cache = None
         parents_cache = None
 
-        if not include_orphans:
+        if not include_orphans and structure_index is None:
             path_cache = {}
             parents_cache = self.build_block_key_to_parents_mapping(course.structure)
 
-        for block_id, value in course.structure['blocks'].iteritems():
-            if _block_matches_all(value):
+        candidate_ids = None
+        if structure_index is not None:
+            candidate_ids = structure_index.find_candidates(qualifiers, settings)
+        if candidate_ids is None:
+            candidate_ids = course.structure['blocks'].iterkeys()
+
+        for block_id in candidate_ids:
+            if _block_matches_all(course.structure['blocks'][block_id]):
                 if not include_orphans:
                     if (  # pylint: disable=bad-continuation
                         block_id.type in DETACHED_XBLOCK_TYPES or
-                        self.has_path_to_root(block_id, course, path_cache, parents_cache)
+                        (
+                            structure_index.has_path_to_root(block_id) if structure_index is not None
+                            else self.has_path_to_root(block_id, course, path_cache, parents_cache)
+                        )
                     ):
                         items.append(block_id)
                 else:
@@ -1344,6 +1435,17 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
 
         return children_to_parents
 
+    def _get_structure_index(self, course_key, structure):
+        """
+        Returns the StructureIndex of the given structure of the given course,
+        or None if the structure can still be modified by the active bulk
+        operation on the course.
+        """
+        bulk_write_record = self._get_bulk_ops_record(course_key)
+        if bulk_write_record.active and structure['_id'] not in bulk_write_record.structures_in_db:
+            return None
+        return self._structure_indexes.get_index(structure)
+
     def has_path_to_root(self, block_key, course, path_cache=None, parents_cache=None):
         """
         Check recursively if an xblock has a path to the course root
@@ -1396,15 +1498,23 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             raise ItemNotFoundError(locator)
 
         course = self._lookup_course(locator.course_key)
-        all_parent_ids = self._get_parents_from_structure(BlockKey.from_usage_key(locator), course.structure)
+        block_key = BlockKey.from_usage_key(locator)
+        structure_index = self._get_structure_index(locator.course_key, course.structure)
 
         # Check and verify the found parent_ids are not orphans; Remove parent which has no valid path
         # to the course root
-        parent_ids = [
-            valid_parent
-            for valid_parent in all_parent_ids
-            if self.has_path_to_root(valid_parent, course)
-        ]
+        if structure_index is not None:
+            parent_ids = [
+                valid_parent
+                for valid_parent in structure_index.get_parents(block_key)
+                if structure_index.has_path_to_root(valid_parent)
+            ]
+        else:
+            parent_ids = [
+                valid_parent
+                for valid_parent in self._get_parents_from_structure(block_key, course.structure)
+                if self.has_path_to_root(valid_parent, course)
+            ]
 
         if len(parent_ids) == 0:
             return None
@@ -2014,7 +2124,8 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
                 root_block.fields.update(self._serialize_fields(root_category, block_fields))
             if definition_fields is not None:
                 old_def = self.get_definition(locator, root_block.definition)
-                new_fields = old_def['fields']
+                # The definition can be cached, and shared with the course being rerun.
+                new_fields = copy.deepcopy(old_def['fields'])
                 new_fields.update(definition_fields)
                 definition_id = self._update_definition_from_data(locator, old_def, new_fields, user_id).definition_id
                 root_block.definition = definition_id
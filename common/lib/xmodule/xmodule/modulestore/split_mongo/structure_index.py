@@ -0,0 +1,183 @@
+"""
+Secondary indexes over the blocks of split modulestore structures.
+
+Structures are immutable once written, so the indexes of a structure are
+built once, lazily, and cached by the structure's version id.
+"""
+import re
+import threading
+from collections import OrderedDict, defaultdict
+
+
+class StructureIndex(object):
+    """
+    Indexes of the blocks of a single immutable structure.
+
+    The blocks are indexed by type, by block id and by parent.  The
+    inverted indexes of field values, and the set of blocks with a path to
+    the root, are built the first time they are needed.
+    """
+    def __init__(self, structure):
+        self._blocks = structure['blocks']
+        self.blocks_by_type = defaultdict(list)
+        self.blocks_by_id = defaultdict(list)
+        # dict {child BlockKey: [parent BlockKey]}
+        self.parents = defaultdict(list)
+        for block_key, block in self._blocks.iteritems():
+            self.blocks_by_type[block_key.type].append(block_key)
+            self.blocks_by_id[block_key.id].append(block_key)
+            for child_key in block.fields.get('children', []):
+                self.parents[child_key].append(block_key)
+
+        # dict {field name: {value: [BlockKey]}}
+        self._field_indexes = {}
+        self._blocks_with_path_to_root = None
+
+    def get_parents(self, block_key):
+        """
+        Returns the keys of the parents of the given block.
+        """
+        return self.parents.get(block_key, [])
+
+    def has_path_to_root(self, block_key):
+        """
+        Returns whether the given block can be reached from a course or
+        library block without parents.
+        """
+        if self._blocks_with_path_to_root is None:
+            roots = [
+                block_key
+                for block_type in ('course', 'library')
+                for block_key in self.blocks_by_type.get(block_type, [])
+                if not self.parents.get(block_key)
+            ]
+            reached = set(roots)
+            stack = list(roots)
+            while stack:
+                block = self._blocks.get(stack.pop())
+                if block is None:
+                    continue
+                for child_key in block.fields.get('children', []):
+                    if child_key not in reached:
+                        reached.add(child_key)
+                        stack.append(child_key)
+            self._blocks_with_path_to_root = reached
+        return block_key in self._blocks_with_path_to_root
+
+    def find_candidates(self, qualifiers, settings):
+        """
+        Returns the keys of a superset of the blocks matching the given
+        get_items qualifiers and settings, or None if no index applies to
+        them.  The candidates still need to be matched against all of the
+        criteria.
+        """
+        candidate_lists = []
+        if 'block_type' in qualifiers:
+            candidate_lists.append(_lookup(self.blocks_by_type, qualifiers['block_type']))
+        for field_name, criteria in settings.iteritems():
+            if field_name == 'children':
+                candidate_lists.append(_lookup(self.parents, criteria))
+            elif _is_indexable(criteria):
+                candidate_lists.append(_lookup(self._get_field_index(field_name), criteria))
+
+        candidate_lists = [candidates for candidates in candidate_lists if candidates is not None]
+        if not candidate_lists:
+            return None
+        return min(candidate_lists, key=len)
+
+    def _get_field_index(self, field_name):
+        """
+        Returns the inverted index {value: [BlockKey]} of the given field.
+        The elements of list values are indexed separately, as get_items
+        matches any of them.
+        """
+        field_index = self._field_indexes.get(field_name)
+        if field_index is None:
+            field_index = defaultdict(list)
+            for block_key, block in self._blocks.iteritems():
+                if field_name not in block.fields:
+                    continue
+                value = block.fields[field_name]
+                values = value if isinstance(value, list) else [value]
+                for element in values:
+                    if _is_hashable(element):
+                        field_index[element].append(block_key)
+            self._field_indexes[field_name] = field_index
+        return field_index
+
+
+def _is_hashable(value):
+    """
+    Returns whether the given value can be used as an index key.
+    """
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+
+def _is_indexable(criteria):
+    """
+    Returns whether the given get_items criteria can be looked up in an index,
+    i.e. whether it's compared to the field values by equality.
+    """
+    if isinstance(criteria, dict):
+        return criteria.keys() == ['$in'] and all(_is_indexable(value) for value in criteria['$in'])
+    return (
+        not isinstance(criteria, re._pattern_type) and  # pylint: disable=protected-access
+        not callable(criteria) and
+        _is_hashable(criteria)
+    )
+
+
+def _lookup(index, criteria):
+    """
+    Returns the keys of the blocks indexed under the given criteria, or None
+    if the criteria can't be looked up in an index.
+    """
+    if not _is_indexable(criteria):
+        return None
+    if isinstance(criteria, dict):
+        block_keys = OrderedDict()
+        for value in criteria['$in']:
+            block_keys.update((block_key, None) for block_key in index.get(value, []))
+        return block_keys.keys()
+    return index.get(criteria, [])
+
+
+class StructureIndexCache(object):
+    """
+    Caches the StructureIndex of the most recently used structures, by
+    version id.
+    """
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_index(self, structure):
+        """
+        Returns the StructureIndex of the given structure, building it if
+        needed.  The structure must not be modified afterwards.
+        """
+        version_guid = structure['_id']
+        with self._lock:
+            index = self._indexes.pop(version_guid, None)
+            if index is not None:
+                self._indexes[version_guid] = index
+                return index
+
+        index = StructureIndex(structure)
+        with self._lock:
+            self._indexes[version_guid] = index
+            while len(self._indexes) > self.max_entries:
+                self._indexes.popitem(last=False)
+        return index
+
+    def clear(self):
+        """
+        Removes all of the cached indexes.
+        """
+        with self._lock:
+            self._indexes.clear()
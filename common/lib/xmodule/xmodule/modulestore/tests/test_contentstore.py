@@ -9,6 +9,9 @@ from tempfile import mkdtemp
 import path
 import shutil
 
+from django.core.cache.backends.locmem import LocMemCache
+from edx_django_utils.cache import RequestCache
+from mock import patch
 from opaque_keys.edx.locator import CourseLocator, AssetLocator
 from opaque_keys.edx.keys import AssetKey
 from xmodule.tests import DATA_DIR
@@ -51,13 +54,15 @@ class TestContentstore(unittest.TestCase):
             del CourseLocator.deprecated
         return super(TestContentstore, cls).tearDownClass()
 
-    def set_up_assets(self, deprecated):
+    def set_up_assets(self, deprecated, asset_index_cache=None, request_cache=None):
         """
         Setup contentstore w/ proper overriding of deprecated.
         """
         # since MongoModuleStore and MongoContentStore are basically assumed to be together, create this class
         # as well
-        self.contentstore = MongoContentStore(HOST, DB, port=PORT)
+        self.contentstore = MongoContentStore(
+            HOST, DB, port=PORT, asset_index_cache=asset_index_cache, request_cache=request_cache
+        )
         self.addCleanup(self.contentstore._drop_database)  # pylint: disable=protected-access
 
         AssetLocator.deprecated = deprecated
@@ -209,3 +214,102 @@ class TestContentstore(unittest.TestCase):
         # ensure it didn't remove any from other course
         __, count = self.contentstore.get_all_content_for_course(self.course2_key)
         self.assertEqual(count, len(self.course2_files))
+
+    @ddt.data(True, False)
+    def test_course_asset_index(self, deprecated):
+        """
+        get_course_asset_index
+        """
+        self.set_up_assets(deprecated)
+        asset_index = self.contentstore.get_course_asset_index(self.course1_key)
+        self.assertEqual(sorted(name for __, name in asset_index.entries), sorted(self.course1_files))
+        for filename in self.course1_files:
+            asset_key = self.course1_key.make_asset_key('asset', filename)
+            content = self.contentstore.find(asset_key, as_stream=True)
+            self.assertTrue(asset_index.covers(asset_key))
+            self.assertEqual(asset_index.get(asset_key), (content.locked, content.content_digest, content.content_type))
+
+        self.assertIsNone(asset_index.get(self.course1_key.make_asset_key('asset', 'no_such_file.gif')))
+        self.assertFalse(asset_index.covers(self.course2_key.make_asset_key('asset', self.course2_files[0])))
+
+    @ddt.data(True, False)
+    def test_cached_course_asset_index(self, deprecated):
+        """
+        The cached asset index of a course is read again once an asset of the course changes.
+        """
+        self.set_up_assets(deprecated, asset_index_cache=LocMemCache('asset_index', {}))
+        asset_key = self.course1_key.make_asset_key('asset', self.course1_files[0])
+        other_course_asset_key = self.course2_key.make_asset_key('asset', self.course2_files[0])
+
+        def get_entry():
+            """
+            Returns the index entry of asset_key, and whether the index was read from mongo.
+            """
+            with patch.object(
+                self.contentstore, '_get_asset_index_entries', wraps=self.contentstore._get_asset_index_entries
+            ) as mock_get_entries:
+                entry = self.contentstore.get_course_asset_index(self.course1_key).get(asset_key)
+            return entry, mock_get_entries.called
+
+        entry, read = get_entry()
+        self.assertFalse(entry.locked)
+        self.assertTrue(read)
+        self.assertEqual(get_entry(), (entry, False))
+
+        self.contentstore.set_attr(other_course_asset_key, 'locked', True)
+        self.assertFalse(get_entry()[1])
+
+        self.contentstore.set_attr(asset_key, 'locked', True)
+        entry, read = get_entry()
+        self.assertTrue(entry.locked)
+        self.assertTrue(read)
+
+        self.contentstore.delete(asset_key)
+        self.assertEqual(get_entry(), (None, True))
+
+        self.save_asset(self.course1_files[0], asset_key, self.course1_files[0], False)
+        entry, read = get_entry()
+        self.assertFalse(entry.locked)
+        self.assertTrue(read)
+
+        self.contentstore.delete_all_course_assets(self.course1_key)
+        self.assertEqual(get_entry(), (None, True))
+
+    def test_asset_index_read_while_deleting(self):
+        """
+        An asset index read while an asset is being deleted isn't kept in the cache.
+        """
+        self.set_up_assets(False, asset_index_cache=LocMemCache('asset_index', {}))
+        asset_key = self.course1_key.make_asset_key('asset', self.course1_files[0])
+        fs_delete = self.contentstore.fs.delete
+
+        def read_index_then_delete(file_id):
+            """
+            Reads the asset index before the asset is removed from GridFS.
+            """
+            self.assertIsNotNone(self.contentstore.get_course_asset_index(self.course1_key).get(asset_key))
+            fs_delete(file_id)
+
+        with patch.object(self.contentstore.fs, 'delete', side_effect=read_index_then_delete):
+            self.contentstore.delete(asset_key)
+        self.assertIsNone(self.contentstore.get_course_asset_index(self.course1_key).get(asset_key))
+
+    @patch('xmodule.contentstore.mongo.ASSET_INDEX_MAX_CACHED_SIZE', 10)
+    def test_large_asset_index(self):
+        """
+        An asset index too large for the asset index cache is only kept in the request cache.
+        """
+        asset_index_cache = LocMemCache(uuid4().hex, {})
+        request_cache = RequestCache('asset_index')
+        request_cache.clear()
+        self.set_up_assets(False, asset_index_cache=asset_index_cache, request_cache=request_cache)
+        asset_key = self.course1_key.make_asset_key('asset', self.course1_files[0])
+
+        asset_index = self.contentstore.get_course_asset_index(self.course1_key)
+        with patch.object(self.contentstore, '_get_asset_index_entries') as mock_get_entries:
+            self.assertEqual(self.contentstore.get_course_asset_index(self.course1_key).version, asset_index.version)
+        self.assertFalse(mock_get_entries.called)
+        self.assertEqual(asset_index_cache._cache, {})  # pylint: disable=protected-access
+
+        self.contentstore.set_attr(asset_key, 'locked', True)
+        self.assertTrue(self.contentstore.get_course_asset_index(self.course1_key).get(asset_key).locked)
@@ -175,6 +175,27 @@ class CountMongoCallsCourseTraversal(TestCase):
                     start_block = modulestore.get_course(course_key, depth=depth, lazy=lazy)
                     self._traverse_blocks_in_course(start_block, access_all_block_fields)
 
+    @ddt.data(
+        # With definition prefetching, the definitions of all the loaded blocks
+        # are read in one batch the first time any of them is needed.
+        (None, True, 4),
+        (0, True, 4),
+        (None, False, 4),
+        (0, False, 38),
+    )
+    @ddt.unpack
+    def test_number_mongo_calls_prefetch_definitions(self, depth, lazy, num_mongo_calls):
+        request_cache = MemoryCache()
+        with MIXED_SPLIT_MODULESTORE_BUILDER.build(
+            request_cache=request_cache, prefetch_definitions=True
+        ) as (content_store, modulestore):
+            course_key = self._import_course(content_store, modulestore)
+
+            with check_mongo_calls(num_mongo_calls):
+                with modulestore.bulk_operations(course_key):
+                    start_block = modulestore.get_course(course_key, depth=depth, lazy=lazy)
+                    self._traverse_blocks_in_course(start_block, access_all_block_fields=True)
+
     @ddt.data(
         (MIXED_OLD_MONGO_MODULESTORE_BUILDER, 176),
         (MIXED_SPLIT_MODULESTORE_BUILDER, 5),
@@ -2,6 +2,7 @@
     Test split modulestore w/o using any django stuff.
 """
 from mock import patch
+import copy
 import datetime
 from importlib import import_module
 from path import Path as path
@@ -34,7 +35,7 @@ from xmodule.modulestore.tests.test_modulestore import check_has_course_method
 from xmodule.modulestore.split_mongo import BlockKey
 from xmodule.modulestore.tests.factories import check_mongo_calls
 from xmodule.modulestore.tests.mongo_connection import MONGO_PORT_NUM, MONGO_HOST
-from xmodule.modulestore.tests.utils import mock_tab_from_json
+from xmodule.modulestore.tests.utils import MemoryCache, mock_tab_from_json
 from xmodule.modulestore.edit_info import EditInfoMixin
 
 
@@ -1875,6 +1876,26 @@ class TestCourseCreation(SplitModuleTest):
             fields['grading_policy']['GRADE_CUTOFFS']
         )
 
+    def test_derived_course_keeps_cached_definition(self):
+        """
+        Create a new course overriding course_data while the definitions of the original course are cached
+        """
+        store = modulestore()
+        original_locator = CourseLocator(org='guestx', course='contender', run="run", branch=BRANCH_NAME_DRAFT)
+        original_index = store.get_course_index_info(original_locator)
+        with patch.object(store, 'prefetch_definitions', True), patch.object(store, 'request_cache', MemoryCache()):
+            original = store.get_course(original_locator)
+            definition_id = original.definition_locator.definition_id
+            original_fields = copy.deepcopy(store.get_definition(original_locator, definition_id)['fields'])
+            grading_policy = copy.deepcopy(original.grading_policy)
+            grading_policy['GRADE_CUTOFFS'] = {'A': .9, 'B': .8, 'C': .65}
+            store.create_course(
+                'counter', 'cached_leech', 'leech_run', 'leech_master', BRANCH_NAME_DRAFT,
+                versions_dict={BRANCH_NAME_DRAFT: original_index['versions'][BRANCH_NAME_DRAFT]},
+                fields={'grading_policy': grading_policy}
+            )
+            self.assertEqual(store.get_definition(original_locator, definition_id)['fields'], original_fields)
+
     @patch('xmodule.tabs.CourseTab.from_json', side_effect=mock_tab_from_json)
     def test_update_course_index(self, _from_json):
         """
@@ -1,7 +1,8 @@
 """ Test the behavior of split_mongo/MongoConnection """
+import cPickle as pickle
 import unittest
 from mock import patch
-from xmodule.modulestore.split_mongo.mongo_connection import MongoConnection
+from xmodule.modulestore.split_mongo.mongo_connection import MongoConnection, StructureProcessCache
 from xmodule.exceptions import HeartbeatFailure
 
 
@@ -19,3 +20,41 @@ class TestHeartbeatFailureException(unittest.TestCase):
 
             with self.assertRaises(HeartbeatFailure):
                 useless_conn.heartbeat()
+
+
+class TestStructureProcessCache(unittest.TestCase):
+    """ Test the LRU eviction of the StructureProcessCache """
+    shard = 2
+
+    def setUp(self):
+        super(TestStructureProcessCache, self).setUp()
+        self.structures = {key: {'_id': key, 'blocks': {}} for key in ('a', 'b', 'c')}
+        self.structure_size = len(pickle.dumps(self.structures['a'], pickle.HIGHEST_PROTOCOL))
+        self.cache = StructureProcessCache(max_size=2 * self.structure_size)
+
+    def test_get(self):
+        self.assertIsNone(self.cache.get('a'))
+        self.cache.set('a', self.structures['a'])
+        self.assertIs(self.cache.get('a'), self.structures['a'])
+        self.assertEqual(self.cache.size, self.structure_size)
+
+    def test_set_with_known_size(self):
+        self.cache.set('a', self.structures['a'], self.structure_size)
+        self.assertIs(self.cache.get('a'), self.structures['a'])
+        self.assertEqual(self.cache.size, self.structure_size)
+
+    def test_evicts_least_recently_used(self):
+        self.cache.set('a', self.structures['a'])
+        self.cache.set('b', self.structures['b'])
+        self.cache.get('a')
+        self.cache.set('c', self.structures['c'])
+        self.assertIsNotNone(self.cache.get('a'))
+        self.assertIsNone(self.cache.get('b'))
+        self.assertIsNotNone(self.cache.get('c'))
+        self.assertEqual(self.cache.size, 2 * self.structure_size)
+
+    def test_skips_oversized_structure(self):
+        structure = {'_id': 'd', 'blocks': {'x' * 2 * self.structure_size: None}}
+        self.cache.set('d', structure)
+        self.assertIsNone(self.cache.get('d'))
+        self.assertEqual(self.cache.size, 0)
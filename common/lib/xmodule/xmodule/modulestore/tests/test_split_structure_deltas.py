@@ -0,0 +1,150 @@
+"""
+Tests the storage of split modulestore structures as deltas.
+"""
+import os
+import unittest
+
+from openedx.core.lib import tempdir
+from openedx.core.lib.tests import attr
+from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.edit_info import EditInfoMixin
+from xmodule.modulestore.inheritance import InheritanceMixin
+from xmodule.modulestore.split_mongo.mongo_connection import DELTA_BASE, DELTA_BLOCKS
+from xmodule.modulestore.split_mongo.split import SplitMongoModuleStore
+from xmodule.modulestore.tests.mongo_connection import MONGO_HOST, MONGO_PORT_NUM
+from xmodule.x_module import XModuleMixin
+
+BRANCH_NAME_DRAFT = ModuleStoreEnum.BranchName.draft
+NUM_CHAPTERS = 4
+
+
+@attr(shard=2)
+@attr('mongo')
+class TestStructureDeltas(unittest.TestCase):
+    """
+    Tests that structures stored as deltas are read back unchanged.
+    """
+    DOC_STORE_CONFIG = {
+        'host': MONGO_HOST,
+        'db': 'test_xmodule_{0}'.format(os.getpid()),
+        'port': MONGO_PORT_NUM,
+        'collection': 'modulestore',
+    }
+
+    def setUp(self):
+        super(TestStructureDeltas, self).setUp()
+        self.user_id = ModuleStoreEnum.UserID.test
+        self.store = self._create_store(structure_deltas=True)
+        self.addCleanup(self.store._drop_database, database=False, connections=False)  # pylint: disable=protected-access
+
+        course_key = self.store.make_course_key('testx', 'Deltas', 'run')
+        with self.store.bulk_operations(course_key):
+            self.course = self.store.create_course(
+                'testx', 'Deltas', 'run', self.user_id, BRANCH_NAME_DRAFT, fields={'display_name': 'Deltas'}
+            )
+            self.chapters = [
+                self.store.create_child(self.user_id, self.course.location, 'chapter', 'chapter_{}'.format(index))
+                for index in range(NUM_CHAPTERS)
+            ]
+
+    def _create_store(self, structure_deltas):
+        """
+        Returns a new split modulestore, without any cached structure.
+        """
+        return SplitMongoModuleStore(
+            None,
+            self.DOC_STORE_CONFIG,
+            structure_deltas=structure_deltas,
+            default_class='xmodule.raw_module.RawDescriptor',
+            fs_root=tempdir.mkdtemp_clean(),
+            xblock_mixins=(InheritanceMixin, XModuleMixin, EditInfoMixin),
+        )
+
+    def _update_chapter(self, store, index):
+        """
+        Updates the display name of the chapter with the given index, and
+        returns the id of the new structure.
+        """
+        chapter = store.get_item(self.chapters[index].location.for_branch(BRANCH_NAME_DRAFT))
+        chapter.display_name = 'Chapter {}'.format(index)
+        return store.update_item(chapter, self.user_id).location.version_guid
+
+    def _get_document(self, structure_id):
+        """
+        Returns the stored document of the structure with the given id.
+        """
+        return self.store.db_connection.structures.find_one({'_id': structure_id})
+
+    def test_update_stored_as_delta(self):
+        base_id = self.store.get_course(self.course.id).location.version_guid
+        first_id = self._update_chapter(self.store, 0)
+        second_id = self._update_chapter(self.store, 1)
+
+        self.assertNotIn(DELTA_BASE, self._get_document(base_id))
+        for structure_id in (first_id, second_id):
+            document = self._get_document(structure_id)
+            self.assertEqual(document[DELTA_BASE], base_id)
+            self.assertEqual(len(document[DELTA_BLOCKS]), 1)
+            self.assertNotIn('blocks', document)
+
+        store = self._create_store(structure_deltas=False)
+        course = store.get_course(self.course.id, depth=1)
+        self.assertEqual(course.location.version_guid, second_id)
+        self.assertEqual(
+            [chapter.display_name for chapter in course.get_children()][:2],
+            ['Chapter 0', 'Chapter 1'],
+        )
+        self.assertEqual(
+            [summary.display_name for summary in store.get_course_summaries(BRANCH_NAME_DRAFT)],
+            ['Deltas'],
+        )
+
+    def test_block_generations(self):
+        base_id = self.store.get_course(self.course.id).location.version_guid
+        first_id = self._update_chapter(self.store, 0)
+        second_id = self._update_chapter(self.store, 0)
+        generations = self.store.get_block_generations(
+            self.chapters[0].location.for_version(second_id)
+        )
+        self.assertEqual(generations.locator.version_guid, base_id)
+        self.assertEqual(len(generations.children), 1)
+        self.assertEqual(generations.children[0].locator.version_guid, first_id)
+        self.assertEqual(len(generations.children[0].children), 1)
+        self.assertEqual(generations.children[0].children[0].locator.version_guid, second_id)
+
+    def test_rebase(self):
+        course = self.store.get_course(self.course.id)
+        course.display_name = 'Renamed'
+        self.store.update_item(course, self.user_id)
+        self._update_chapter(self.store, 0)
+        # With this update, more than half of the blocks changed since the base.
+        rebased_id = self._update_chapter(self.store, 1)
+        self.assertNotIn(DELTA_BASE, self._get_document(rebased_id))
+
+        structure_id = self._update_chapter(self.store, 2)
+        self.assertEqual(self._get_document(structure_id)[DELTA_BASE], rebased_id)
+
+    def test_reencode_structure(self):
+        base_id = self.store.get_course(self.course.id).location.version_guid
+        store = self._create_store(structure_deltas=False)
+        structure_id = self._update_chapter(store, 0)
+        self.assertNotIn(DELTA_BASE, self._get_document(structure_id))
+
+        __, new_document = self.store.db_connection.reencode_structure(structure_id, commit=False)
+        self.assertEqual(new_document[DELTA_BASE], base_id)
+        self.assertNotIn(DELTA_BASE, self._get_document(structure_id))
+
+        self.store.db_connection.reencode_structure(structure_id)
+        self.assertEqual(self._get_document(structure_id)[DELTA_BASE], base_id)
+        self.assertEqual(
+            self._create_store(structure_deltas=False).get_item(
+                self.chapters[0].location.for_branch(BRANCH_NAME_DRAFT)
+            ).display_name,
+            'Chapter 0',
+        )
+
+        # The base of a delta can't be re-encoded as a delta.
+        self.assertIsNone(self.store.db_connection.reencode_structure(base_id)[1])
+
+        self.store.db_connection.reencode_structure(structure_id, delta=False)
+        self.assertNotIn(DELTA_BASE, self._get_document(structure_id))
@@ -0,0 +1,100 @@
+"""
+Tests for split_mongo/structure_index.py
+"""
+import re
+import unittest
+
+import ddt
+from bson.objectid import ObjectId
+
+from xmodule.modulestore import BlockData
+from xmodule.modulestore.split_mongo import BlockKey
+from xmodule.modulestore.split_mongo.structure_index import StructureIndex, StructureIndexCache
+
+COURSE = BlockKey('course', 'course')
+CHAPTER = BlockKey('chapter', 'chapter')
+PROBLEM_1 = BlockKey('problem', 'problem_1')
+PROBLEM_2 = BlockKey('problem', 'problem_2')
+ORPHAN = BlockKey('problem', 'orphan')
+
+
+def make_structure():
+    """
+    Returns a structure with a course, a chapter with two problems, and an
+    orphaned problem.
+    """
+    return {
+        '_id': ObjectId(),
+        'root': COURSE,
+        'blocks': {
+            COURSE: BlockData(block_type='course', fields={'children': [CHAPTER]}),
+            CHAPTER: BlockData(block_type='chapter', fields={'children': [PROBLEM_1, PROBLEM_2]}),
+            PROBLEM_1: BlockData(block_type='problem', fields={'weight': 1, 'tags': ['easy', 'short']}),
+            PROBLEM_2: BlockData(block_type='problem', fields={'weight': 2, 'tags': ['hard']}),
+            ORPHAN: BlockData(block_type='problem', fields={'weight': 1}),
+        },
+    }
+
+
+@ddt.ddt
+class TestStructureIndex(unittest.TestCase):
+    """
+    Tests StructureIndex.
+    """
+    shard = 2
+
+    def setUp(self):
+        super(TestStructureIndex, self).setUp()
+        self.index = StructureIndex(make_structure())
+
+    def test_parents(self):
+        self.assertEqual(self.index.get_parents(PROBLEM_1), [CHAPTER])
+        self.assertEqual(self.index.get_parents(COURSE), [])
+
+    @ddt.data(
+        (COURSE, True),
+        (PROBLEM_2, True),
+        (ORPHAN, False),
+    )
+    @ddt.unpack
+    def test_has_path_to_root(self, block_key, expected):
+        self.assertEqual(self.index.has_path_to_root(block_key), expected)
+
+    @ddt.data(
+        ({'block_type': 'problem'}, {}, {PROBLEM_1, PROBLEM_2, ORPHAN}),
+        ({'block_type': {'$in': ['course', 'chapter']}}, {}, {COURSE, CHAPTER}),
+        ({'block_type': 'problem'}, {'weight': 2}, {PROBLEM_2}),
+        ({}, {'tags': 'easy'}, {PROBLEM_1}),
+        ({}, {'children': PROBLEM_2}, {CHAPTER}),
+        ({}, {'weight': 3}, set()),
+    )
+    @ddt.unpack
+    def test_find_candidates(self, qualifiers, settings, expected):
+        self.assertEqual(set(self.index.find_candidates(qualifiers, settings)), expected)
+
+    @ddt.data(
+        ({}, {}),
+        ({'edited_by': 1}, {}),
+        ({}, {'display_name': re.compile('problem')}),
+        ({}, {'weight': lambda weight: weight > 1}),
+        ({}, {'weight': {'$nin': [1]}}),
+    )
+    @ddt.unpack
+    def test_no_candidates(self, qualifiers, settings):
+        self.assertIsNone(self.index.find_candidates(qualifiers, settings))
+
+
+class TestStructureIndexCache(unittest.TestCase):
+    """
+    Tests StructureIndexCache.
+    """
+    shard = 2
+
+    def test_get_index(self):
+        cache = StructureIndexCache(max_entries=1)
+        structure = make_structure()
+        index = cache.get_index(structure)
+        self.assertIs(cache.get_index(structure), index)
+
+        cache.get_index(make_structure())
+        self.assertIsNot(cache.get_index(structure), index)
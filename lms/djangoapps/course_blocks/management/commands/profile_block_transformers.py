@@ -0,0 +1,106 @@
+"""
+Command to profile the Block Structure Transformers against a course.
+"""
+from collections import OrderedDict
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey
+from xmodule.modulestore.django import modulestore
+
+from lms.djangoapps.course_blocks.api import get_course_block_access_transformers, get_course_blocks
+from lms.djangoapps.course_blocks.transformers.hidden_content import HiddenContentTransformer
+from lms.djangoapps.course_blocks.transformers.hide_empty import HideEmptyTransformer
+from openedx.core.djangoapps.content.block_structure.factory import BlockStructureFactory
+from openedx.core.djangoapps.content.block_structure.instrumentation import ListRecorder, recording
+from openedx.core.djangoapps.content.block_structure.transformers import BlockStructureTransformers
+
+
+class Command(BaseCommand):
+    """
+    Collects data for all registered Block Structure Transformers from the
+    modulestore, without storing it, and then transforms the collected
+    block structure for the given user, reporting the time spent, the
+    blocks kept and the data collected by each Transformer.
+
+    Example usage:
+        $ ./manage.py lms profile_block_transformers 'course-v1:edX+DemoX+Demo_Course' --username staff --settings=devstack
+    """
+    help = u'Profiles the collect and transform phases of the block transformers against a course.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'course_id',
+            help=u'ID of the course to profile the transformers against.',
+        )
+        parser.add_argument(
+            '--username',
+            required=True,
+            help=u'Username of the user for whom the course blocks are transformed.',
+        )
+        parser.add_argument(
+            '--iterations',
+            help=u'Number of times the course blocks are transformed.',
+            default=10,
+            type=int,
+        )
+
+    def handle(self, *args, **options):
+        try:
+            course_key = CourseKey.from_string(options['course_id'])
+        except InvalidKeyError:
+            raise CommandError(u'Invalid course_id: {}'.format(options['course_id']))
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(u'Unknown username: {}'.format(options['username']))
+        if options['iterations'] < 1:
+            raise CommandError(u'--iterations must be positive.')
+
+        store = modulestore()
+        course_usage_key = store.make_course_usage_key(course_key)
+
+        with recording(ListRecorder()) as collect_recorder:
+            with store.bulk_operations(course_key):
+                block_structure = BlockStructureFactory.create_from_modulestore(course_usage_key, store)
+                BlockStructureTransformers.collect(block_structure)
+
+        with recording(ListRecorder()) as transform_recorder:
+            for _ in range(options['iterations']):
+                transformers = BlockStructureTransformers(
+                    get_course_block_access_transformers(user) +
+                    [HiddenContentTransformer(), HideEmptyTransformer()]
+                )
+                get_course_blocks(user, course_usage_key, transformers, block_structure)
+
+        self.stdout.write(u'Collect ({} blocks):'.format(len(block_structure)))
+        self._write_table(collect_recorder.measurements, with_bytes=True)
+        self.stdout.write(u'Transform (mean of {} iterations):'.format(options['iterations']))
+        self._write_table(transform_recorder.measurements, with_bytes=False)
+
+    def _write_table(self, measurements, with_bytes):
+        """
+        Writes the given measurements, averaged for each Transformer.
+        """
+        measurements_by_name = OrderedDict()
+        for measurement in measurements:
+            measurements_by_name.setdefault(measurement.transformer_name, []).append(measurement)
+
+        row_format = u'  {:<32} {:>12} {:>10} {:>10}' + (u' {:>14}' if with_bytes else u'')
+        headers = [u'transformer', u'duration_ms', u'blocks_in', u'blocks_out']
+        if with_bytes:
+            headers.append(u'collected_bytes')
+        self.stdout.write(row_format.format(*headers))
+
+        for transformer_name, transformer_measurements in measurements_by_name.iteritems():
+            count = len(transformer_measurements)
+            row = [
+                transformer_name,
+                u'{:.3f}'.format(sum(m.duration for m in transformer_measurements) * 1000 / count),
+                sum(m.num_blocks_before for m in transformer_measurements) // count,
+                sum(m.num_blocks_after for m in transformer_measurements) // count,
+            ]
+            if with_bytes:
+                row.append(transformer_measurements[-1].collected_bytes)
+            self.stdout.write(row_format.format(*row))
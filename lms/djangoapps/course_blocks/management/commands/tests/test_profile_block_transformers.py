@@ -0,0 +1,49 @@
+"""
+Tests for profile_block_transformers management command.
+"""
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from six import StringIO
+
+from student.tests.factories import UserFactory
+from xmodule.modulestore.tests.django_utils import SharedModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
+
+
+class TestProfileBlockTransformers(SharedModuleStoreTestCase):
+    """
+    Tests profile_block_transformers management command.
+    """
+    @classmethod
+    def setUpClass(cls):
+        super(TestProfileBlockTransformers, cls).setUpClass()
+        cls.course = CourseFactory.create()
+        chapter = ItemFactory.create(parent=cls.course, category='chapter')
+        ItemFactory.create(parent=chapter, category='sequential')
+
+    def setUp(self):
+        super(TestProfileBlockTransformers, self).setUp()
+        self.user = UserFactory.create()
+
+    def test_profile(self):
+        out = StringIO()
+        call_command(
+            'profile_block_transformers',
+            unicode(self.course.id),
+            '--username', self.user.username,
+            '--iterations', '2',
+            stdout=out,
+        )
+        output = out.getvalue()
+        self.assertIn('Collect (3 blocks):', output)
+        self.assertIn('Transform (mean of 2 iterations):', output)
+        self.assertIn('visibility', output)
+        self.assertIn('xblock_fields', output)
+
+    def test_unknown_username(self):
+        with self.assertRaises(CommandError):
+            call_command('profile_block_transformers', unicode(self.course.id), '--username', 'unknown')
+
+    def test_invalid_course_id(self):
+        with self.assertRaises(CommandError):
+            call_command('profile_block_transformers', 'invalid', '--username', self.user.username)
@@ -26,6 +26,7 @@ class ContentLibraryTransformer(FilteringTransformerMixin, BlockStructureTransfo
     """
     WRITE_VERSION = 1
     READ_VERSION = 1
+    SUPPORTS_PARTIAL_COLLECT = True
 
     @classmethod
     def name(cls):
@@ -0,0 +1,87 @@
+"""
+Command to compare the time taken to construct the capa test problems with
+and without the template cache of LoncapaProblem.
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import os
+from time import time
+
+from django.core.management.base import BaseCommand, CommandError
+from lxml import etree
+from six.moves import range
+
+import capa.tests
+from capa.capa_problem import LoncapaProblem, clear_problem_templates
+
+from .benchmark_safe_exec_pool import benchmark_capa_system
+
+TEST_FILES_DIR = os.path.join(os.path.dirname(capa.tests.__file__), 'test_files')
+
+
+class Command(BaseCommand):
+    """
+    Example usage:
+        $ ./manage.py lms benchmark_capa_problem_construction --repeat 100 --settings=devstack
+    """
+    help = 'Benchmarks constructing the capa test problems with and without the template cache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat',
+            help='Number of times each problem is constructed.',
+            default=100,
+            type=int,
+        )
+
+    def handle(self, *args, **options):
+        problems = test_problems()
+        if not problems:
+            raise CommandError('No problems found in {}'.format(TEST_FILES_DIR))
+
+        uncached_time = cached_time = 0
+        for problem_text in problems:
+            for seed in range(options['repeat']):
+                clear_problem_templates()
+                uncached_time += construct(problem_text, seed)
+
+            construct(problem_text, 0)
+            for seed in range(options['repeat']):
+                cached_time += construct(problem_text, seed)
+        clear_problem_templates()
+
+        self.stdout.write(u'Constructed {} problems {} times: uncached {:.3f}s, cached {:.3f}s'.format(
+            len(problems), options['repeat'], uncached_time, cached_time,
+        ))
+
+
+def test_problems():
+    """
+    Returns the text of the problems of the capa test files, skipping those
+    which can't be constructed, such as the problems testing errors.
+    """
+    problems = []
+    for filename in sorted(os.listdir(TEST_FILES_DIR)):
+        if not filename.endswith('.xml'):
+            continue
+        with open(os.path.join(TEST_FILES_DIR, filename)) as problem_file:
+            problem_text = problem_file.read()
+        if etree.XML(problem_text).tag != 'problem':
+            continue
+        try:
+            construct(problem_text, 0)
+        except Exception:  # pylint: disable=broad-except
+            continue
+        problems.append(problem_text)
+    return problems
+
+
+def construct(problem_text, seed):
+    """
+    Constructs a LoncapaProblem, and returns the time taken.
+    """
+    capa_system = benchmark_capa_system(seed)
+    start = time()
+    LoncapaProblem(problem_text, id='1', seed=seed, capa_system=capa_system, capa_module=None)
+    return time() - start
@@ -0,0 +1,153 @@
+"""
+Command to compare the latency of rendering and checking a problem with
+Python code when safe_exec uses the pool of sandbox workers, and when it
+starts a sandboxed Python process for each execution.
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import gettext
+import os
+from time import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from fs.osfs import OSFS
+from six.moves import range
+
+from capa.capa_problem import LoncapaProblem, LoncapaSystem
+from capa.safe_exec import pool
+
+PROBLEM_XML = """
+<problem>
+  <script type="loncapa/python">
+x = random.randint(2, 100)
+root = numpy.sqrt(x)
+
+def check(expect, ans):
+    return abs(float(ans) - root) &lt; 1e-3
+  </script>
+  <p>What is the square root of $x?</p>
+  <customresponse cfn="check">
+    <textline size="10"/>
+  </customresponse>
+</problem>
+"""
+
+
+class Command(BaseCommand):
+    """
+    Example usage:
+        $ ./manage.py lms benchmark_safe_exec_pool --problems 50 --settings=devstack
+    """
+    help = 'Benchmarks rendering and checking a problem with and without the pool of sandbox workers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--problems',
+            help='Number of problems to render and check.',
+            default=50,
+            type=int,
+        )
+        parser.add_argument(
+            '--pool_size',
+            help='Number of sandbox workers in the pool.',
+            default=1,
+            type=int,
+        )
+        parser.add_argument(
+            '--python_bin',
+            help='Sandboxed Python executable, CODE_JAIL["python_bin"] by default.',
+            default=settings.CODE_JAIL.get('python_bin'),
+        )
+        parser.add_argument(
+            '--user',
+            help='User running the sandboxed Python, CODE_JAIL["user"] by default.',
+            default=settings.CODE_JAIL.get('user'),
+        )
+
+    def handle(self, *args, **options):
+        if not options['python_bin']:
+            raise CommandError('CODE_JAIL["python_bin"] is not configured.')
+
+        try:
+            pool.configure_pool(options['python_bin'], size=0)
+            render_times, check_times = benchmark(options['problems'])
+            self.write_times('one-shot sandbox', render_times, check_times)
+
+            pool.configure_pool(options['python_bin'], user=options['user'], size=options['pool_size'])
+            # Start the workers before timing.
+            benchmark(options['pool_size'])
+            render_times, check_times = benchmark(options['problems'])
+            self.write_times('sandbox pool', render_times, check_times)
+        finally:
+            pool.configure_pool(options['python_bin'], size=0)
+
+    def write_times(self, name, render_times, check_times):
+        """
+        Writes the median and worst latencies of the render and check times.
+        """
+        self.stdout.write(
+            u'{}: {} problems, render median {:.1f}ms max {:.1f}ms, check median {:.1f}ms max {:.1f}ms'.format(
+                name, len(render_times),
+                median(render_times) * 1000, max(render_times) * 1000,
+                median(check_times) * 1000, max(check_times) * 1000,
+            )
+        )
+
+
+def benchmark(num_problems):
+    """
+    Renders and checks num_problems problems with different seeds, and returns
+    the lists of the render and check times.  Raises CommandError if a correct
+    answer isn't graded as correct.
+    """
+    render_times = []
+    check_times = []
+    for seed in range(num_problems):
+        start = time()
+        problem = LoncapaProblem(
+            PROBLEM_XML, id='1', seed=seed, capa_system=benchmark_capa_system(seed), capa_module=None,
+        )
+        problem.get_html()
+        render_times.append(time() - start)
+
+        answer = str(problem.context['root'])
+        start = time()
+        correct_map = problem.grade_answers({'1_2_1': answer})
+        check_times.append(time() - start)
+        if not correct_map.is_correct('1_2_1'):
+            raise CommandError(u'The answer {} is incorrect for seed {}'.format(answer, seed))
+    return render_times, check_times
+
+
+def benchmark_capa_system(seed):
+    """
+    Returns a LoncapaSystem which renders templates to the repr of their context.
+    """
+    return LoncapaSystem(
+        ajax_url='/benchmark',
+        anonymous_student_id='student',
+        cache=None,
+        can_execute_unsafe_code=lambda: False,
+        get_python_lib_zip=lambda: None,
+        DEBUG=False,
+        filestore=OSFS(os.path.dirname(__file__)),
+        i18n=gettext.NullTranslations(),
+        node_path='',
+        render_template=lambda template, context: u'<div>{}</div>'.format(len(context)),
+        seed=seed,
+        STATIC_URL='/static/',
+        xqueue=None,
+    )
+
+
+def median(values):
+    """
+    Returns the median of the values.
+    """
+    values = sorted(values)
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2
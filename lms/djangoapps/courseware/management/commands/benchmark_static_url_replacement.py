@@ -0,0 +1,125 @@
+"""
+Command to compare the Mongo queries made and the time taken to replace the
+static urls of all of the assets of a course, when each asset is looked up
+in the contentstore and when the asset index of the course is used.
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+from contextlib import contextmanager
+from time import time
+
+import pymongo
+from django.core.management.base import BaseCommand, CommandError
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey
+from six.moves import range
+
+from static_replace import replace_static_urls
+from static_replace.models import AssetBaseUrlConfig, AssetExcludedExtensionsConfig
+from xmodule.contentstore.content import StaticContent
+from xmodule.contentstore.django import contentstore
+
+
+class Command(BaseCommand):
+    """
+    Example usage:
+        $ ./manage.py lms benchmark_static_url_replacement course-v1:edX+DemoX+Demo_Course --settings=devstack
+    """
+    help = 'Benchmarks replacing the static urls of the assets of a course with and without its asset index.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_id', help='Course whose assets are referenced.')
+        parser.add_argument(
+            '--repeat',
+            help='Number of times the static urls are replaced.',
+            default=10,
+            type=int,
+        )
+
+    def handle(self, *args, **options):
+        try:
+            course_key = CourseKey.from_string(options['course_id'])
+        except InvalidKeyError:
+            raise CommandError('Invalid course id: {}'.format(options['course_id']))
+
+        assets, __ = contentstore().get_all_content_for_course(course_key)
+        if not assets:
+            raise CommandError('No assets found for {}'.format(course_key))
+        paths = [asset['asset_key'].block_id for asset in assets]
+        text = ''.join('<img src="/static/{}"/>'.format(path) for path in paths)
+        base_url = AssetBaseUrlConfig.get_base_url()
+        excluded_exts = AssetExcludedExtensionsConfig.get_excluded_extensions()
+
+        def replace_per_asset():
+            """
+            Canonicalizes the path of each asset with its own contentstore lookup.
+            """
+            for path in paths:
+                StaticContent.get_canonicalized_asset_path(course_key, path, base_url, excluded_exts)
+
+        def replace_with_uncached_index():
+            """
+            Replaces the static urls after removing the asset index from the cache.
+            """
+            contentstore().clear_course_asset_index(course_key)
+            replace_static_urls(text, course_id=course_key)
+
+        def replace_with_cached_index():
+            """
+            Replaces the static urls with the asset index from the cache, if any.
+            """
+            replace_static_urls(text, course_id=course_key)
+
+        replace_with_cached_index()
+        for label, replace in [
+            ('per asset', replace_per_asset),
+            ('uncached asset index', replace_with_uncached_index),
+            ('cached asset index', replace_with_cached_index),
+        ]:
+            queries, elapsed = benchmark(replace, options['repeat'])
+            self.stdout.write('Replaced {} static urls {} times with {}: {} queries, {:.3f}s'.format(
+                len(paths), options['repeat'], label, queries, elapsed,
+            ))
+
+
+def benchmark(function, repeat):
+    """
+    Calls function `repeat` times, and returns the number of Mongo queries
+    made and the time taken.
+    """
+    with count_mongo_queries() as counter:
+        start = time()
+        for __ in range(repeat):
+            function()
+        elapsed = time() - start
+    return counter['queries'], elapsed
+
+
+@contextmanager
+def count_mongo_queries():
+    """
+    Counts the queries sent by pymongo in the returned dict, as check_mongo_calls does in tests.
+    """
+    counter = {'queries': 0}
+    originals = {name: getattr(pymongo.message, name) for name in ('query', 'get_more')}
+
+    def counting(original):
+        """
+        Returns a version of the given pymongo message function which counts its calls.
+        """
+        def wrapper(*args, **kwargs):
+            """
+            Counts the call, and builds the message.
+            """
+            counter['queries'] += 1
+            return original(*args, **kwargs)
+        return wrapper
+
+    for name, original in originals.items():
+        setattr(pymongo.message, name, counting(original))
+    try:
+        yield counter
+    finally:
+        for name, original in originals.items():
+            setattr(pymongo.message, name, original)
@@ -0,0 +1,20 @@
+"""
+Tests for benchmark_capa_problem_construction management command.
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+from unittest import TestCase
+
+from django.core.management import call_command
+from six import StringIO
+
+
+class TestBenchmarkCapaProblemConstruction(TestCase):
+    """
+    Tests benchmark_capa_problem_construction management command.
+    """
+    def test_benchmark(self):
+        out = StringIO()
+        call_command('benchmark_capa_problem_construction', '--repeat', '2', stdout=out)
+        self.assertRegexpMatches(out.getvalue(), r'Constructed \d+ problems 2 times')
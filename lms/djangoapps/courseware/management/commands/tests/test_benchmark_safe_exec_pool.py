@@ -0,0 +1,34 @@
+"""
+Tests for benchmark_safe_exec_pool management command.
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import sys
+from unittest import TestCase
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from six import StringIO
+
+from capa.safe_exec import pool
+
+
+class TestBenchmarkSafeExecPool(TestCase):
+    """
+    Tests benchmark_safe_exec_pool management command, with a pool of
+    workers running this Python as the current user.
+    """
+    def test_benchmark(self):
+        out = StringIO()
+        call_command(
+            'benchmark_safe_exec_pool', '--problems', '3', '--python_bin', sys.executable, '--user', '',
+            stdout=out,
+        )
+        self.assertIn('one-shot sandbox: 3 problems', out.getvalue())
+        self.assertIn('sandbox pool: 3 problems', out.getvalue())
+        self.assertIsNone(pool.get_pool())
+
+    def test_python_bin_required(self):
+        with self.assertRaises(CommandError):
+            call_command('benchmark_safe_exec_pool', '--python_bin', '')
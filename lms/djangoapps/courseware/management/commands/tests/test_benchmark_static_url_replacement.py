@@ -0,0 +1,39 @@
+"""
+Tests for benchmark_static_url_replacement management command.
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from six import StringIO
+
+from xmodule.contentstore.content import StaticContent
+from xmodule.contentstore.django import contentstore
+from xmodule.modulestore.tests.django_utils import SharedModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory
+
+
+class TestBenchmarkStaticUrlReplacement(SharedModuleStoreTestCase):
+    """
+    Tests benchmark_static_url_replacement management command.
+    """
+    @classmethod
+    def setUpClass(cls):
+        super(TestBenchmarkStaticUrlReplacement, cls).setUpClass()
+        cls.course = CourseFactory.create()
+        for name in ['image1.png', 'image2.png', 'image3.png']:
+            asset_key = StaticContent.compute_location(cls.course.id, name)
+            contentstore().save(StaticContent(asset_key, name, 'image/png', 'data'))
+
+    def test_benchmark(self):
+        out = StringIO()
+        call_command('benchmark_static_url_replacement', unicode(self.course.id), '--repeat', '2', stdout=out)
+        output = out.getvalue()
+        self.assertIn('Replaced 3 static urls 2 times with per asset: 6 queries', output)
+        self.assertIn('Replaced 3 static urls 2 times with uncached asset index: 2 queries', output)
+
+    def test_no_assets(self):
+        course = CourseFactory.create()
+        with self.assertRaises(CommandError):
+            call_command('benchmark_static_url_replacement', unicode(course.id))
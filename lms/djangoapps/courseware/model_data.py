@@ -36,6 +36,7 @@ from xblock.exceptions import InvalidScopeError, KeyValueMultiSaveError
 from xblock.fields import Scope, UserScope
 from xblock.runtime import KeyValueStore
 
+from courseware.student_module_writes import StudentModuleWriteBuffer
 from courseware.user_state_client import DjangoXBlockUserStateClient
 from xmodule.modulestore.django import modulestore
 
@@ -561,6 +562,8 @@ class PreferencesCache(DjangoOrmFieldCache):
     def __init__(self, user):
         super(PreferencesCache, self).__init__()
         self.user = user
+        # Names of the fields already loaded for each block type.
+        self._cached_field_names = defaultdict(set)
 
     def _create_object(self, kvs_key, value):
         """
@@ -591,11 +594,19 @@ class PreferencesCache(DjangoOrmFieldCache):
             aside_types (list of str): Asides to load field for (which annotate the supplied
                 xblocks).
         """
+        field_names = set(field.name for field in fields)
+        block_types = [
+            block_type for block_type in _all_block_types(xblocks, aside_types)
+            if not field_names <= self._cached_field_names[block_type]
+        ]
+        for block_type in block_types:
+            self._cached_field_names[block_type] |= field_names
+
         return XModuleStudentPrefsField.objects.chunked_filter(
             'module_type__in',
-            _all_block_types(xblocks, aside_types),
+            block_types,
             student=self.user.pk,
-            field_name__in=set(field.name for field in fields),
+            field_name__in=field_names,
         )
 
     def _cache_key_for_field_object(self, field_object):
@@ -624,6 +635,8 @@ class UserInfoCache(DjangoOrmFieldCache):
     def __init__(self, user):
         super(UserInfoCache, self).__init__()
         self.user = user
+        # Names of the fields already loaded, for all blocks.
+        self._cached_field_names = set()
 
     def _create_object(self, kvs_key, value):
         """
@@ -653,9 +666,14 @@ class UserInfoCache(DjangoOrmFieldCache):
             aside_types (list of str): Asides to load field for (which annotate the supplied
                 xblocks).
         """
+        field_names = set(field.name for field in fields) - self._cached_field_names
+        if not field_names:
+            return []
+        self._cached_field_names |= field_names
+
         return XModuleStudentInfoField.objects.filter(
             student=self.user.pk,
-            field_name__in=set(field.name for field in fields),
+            field_name__in=field_names,
         )
 
     def _cache_key_for_field_object(self, field_object):
@@ -681,6 +699,13 @@ class FieldDataCache(object):
     """
     A cache of django model objects needed to supply the data
     for a module and its descendants
+
+    Descriptors can be added to the cache incrementally, for instance
+    the course outline first and then the subtree of the requested
+    sequence.  Each addition bulk-loads the data of every scope with one
+    query per scope (per chunk of keys) for only the descriptors, block
+    types and fields that weren't already loaded, so all modules bound
+    with this cache, including nested children, share its data.
     """
     def __init__(self, descriptors, course_id, user, asides=None, read_only=False):
         """
@@ -722,13 +747,16 @@ class FieldDataCache(object):
             ),
         }
         self.scorable_locations = set()
+        self._cached_usage_ids = set()
         self.add_descriptors_to_cache(descriptors)
 
     def add_descriptors_to_cache(self, descriptors):
         """
-        Add all `descriptors` to this FieldDataCache.
+        Add all `descriptors` to this FieldDataCache, skipping those
+        that were already added.
         """
         if self.user.is_authenticated:
+            descriptors = self._uncached_descriptors(descriptors)
             self.scorable_locations.update(desc.location for desc in descriptors if desc.has_score)
             for scope, fields in self._fields_to_cache(descriptors).items():
                 if scope not in self.cache:
@@ -793,6 +821,19 @@ class FieldDataCache(object):
         cache.add_descriptor_descendents(descriptor, depth, descriptor_filter)
         return cache
 
+    def _uncached_descriptors(self, descriptors):
+        """
+        Returns the given descriptors that weren't already added to this
+        FieldDataCache, without duplicates, and records them as added.
+        """
+        uncached_descriptors = []
+        for descriptor in descriptors:
+            usage_id = descriptor.scope_ids.usage_id
+            if usage_id not in self._cached_usage_ids:
+                self._cached_usage_ids.add(usage_id)
+                uncached_descriptors.append(descriptor)
+        return uncached_descriptors
+
     def _fields_to_cache(self, descriptors):
         """
         Returns a map of scopes to fields in that scope that should be cached
@@ -988,12 +1029,43 @@ class ScoresClient(object):
         client.fetch_scores(scorable_locations)
         return client
 
+    @classmethod
+    def create_for_users(cls, course_id, user_ids, scorable_locations):
+        """
+        Create ScoresClients, keyed by user id, with pre-fetched data for the
+        given users and locations, using a single query.
+        """
+        clients = {}
+        for user_id in user_ids:
+            clients[user_id] = cls(course_id, user_id)
+            clients[user_id]._has_fetched = True  # pylint: disable=protected-access
+
+        scores_qset = StudentModule.objects.filter(
+            student_id__in=clients.keys(),
+            course_id=course_id,
+            module_state_key__in=set(scorable_locations),
+        )
+        for user_id, location, correct, total, created in scores_qset.values_list(
+                'student_id', 'module_state_key', 'grade', 'max_grade', 'created'
+        ):
+            clients[user_id]._locations_to_scores[  # pylint: disable=protected-access
+                location.map_into_course(course_id)
+            ] = cls.Score(correct, total, created)
+        return clients
+
 
 # @contract(user_id=int, usage_key=UsageKey, score="number|None", max_score="number|None")
 def set_score(user_id, usage_key, score, max_score):
     """
     Set the score and max_score for the specified user and xblock usage.
+
+    Within coalesce_student_module_writes, the score is written along with
+    any state of the xblock usage when leaving the context.
     """
+    write_buffer = StudentModuleWriteBuffer.get_active()
+    if write_buffer is not None:
+        return write_buffer.set_score(user_id, usage_key, score, max_score)
+
     created = False
     kwargs = {"student_id": user_id, "module_state_key": usage_key, "course_id": usage_key.course_key}
     try:
@@ -1026,6 +1098,10 @@ def get_score(user_id, usage_key):
     Get the score and max_score for the specified user and xblock usage.
     Returns None if not found.
     """
+    write_buffer = StudentModuleWriteBuffer.get_active()
+    if write_buffer is not None:
+        write_buffer.flush([usage_key])
+
     try:
         student_module = StudentModule.objects.get(
             student_id=user_id,
@@ -0,0 +1,183 @@
+"""
+Coalescing of the StudentModule writes made while handling a request.
+
+An XBlock handler can save the same StudentModule row several times, for
+instance a problem check publishes the problem's score and then saves the
+problem's state.  Within the coalesce_student_module_writes context, those
+writes are buffered and merged per (student, module_state_key), and each
+row is written once when leaving the context.  A single StudentModuleHistory
+entry is then recorded per row, with the row's final state and score.
+
+Buffered rows are flushed before being read through
+DjangoXBlockUserStateClient or get_score, so their readers see the
+buffered writes.
+"""
+import json
+import logging
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.utils import IntegrityError
+from django.utils import timezone
+
+from openedx.core.djangoapps.waffle_utils import WaffleSwitchNamespace
+from openedx.core.lib.cache_utils import get_cache
+
+from .models import StudentModule
+
+log = logging.getLogger(__name__)
+
+WAFFLE_NAMESPACE = u'courseware'
+
+# Switches
+COALESCE_STUDENT_MODULE_WRITES = u'coalesce_student_module_writes'
+
+REQUEST_CACHE_NAMESPACE = u'courseware.student_module_writes'
+
+
+def waffle():
+    """
+    Returns the namespaced, cached, audited Waffle class for StudentModule writes.
+    """
+    return WaffleSwitchNamespace(name=WAFFLE_NAMESPACE, log_prefix=u'Courseware: ')
+
+
+class _PendingWrite(object):
+    """
+    The buffered writes to a single StudentModule row.
+    """
+    def __init__(self):
+        # Fields of the state to overlay over the stored state, or None
+        # if the state wasn't written.
+        self.state = None
+        self.has_score = False
+        self.grade = None
+        self.max_grade = None
+
+
+class StudentModuleWriteBuffer(object):
+    """
+    Buffers the writes to StudentModule rows, keyed by (student_id, module_state_key).
+    """
+    def __init__(self):
+        self._pending_writes = {}
+
+    @classmethod
+    def get_active(cls):
+        """
+        Returns the buffer of the current coalesce_student_module_writes
+        context, or None if not within one.
+        """
+        return get_cache(REQUEST_CACHE_NAMESPACE).get('buffer')
+
+    def set_state(self, user_id, usage_key, state):
+        """
+        Buffers the given state fields, to be overlaid over the stored state
+        of the given user and usage key.
+        """
+        pending_write = self._get_pending_write(user_id, usage_key)
+        if pending_write.state is None:
+            pending_write.state = {}
+        pending_write.state.update(state)
+
+    def set_score(self, user_id, usage_key, score, max_score):
+        """
+        Buffers the given score of the given user and usage key.
+
+        Returns the time before which the row will not be modified.
+        """
+        pending_write = self._get_pending_write(user_id, usage_key)
+        pending_write.has_score = True
+        pending_write.grade = score
+        pending_write.max_grade = max_score
+        return timezone.now()
+
+    def flush(self, usage_keys=None):
+        """
+        Writes the buffered rows for the given usage keys, or all buffered
+        rows if None.
+        """
+        if usage_keys is None:
+            keys = self._pending_writes.keys()
+        else:
+            usage_keys = set(usage_keys)
+            keys = [key for key in self._pending_writes if key[1] in usage_keys]
+
+        for key in sorted(keys):
+            self._write(key, self._pending_writes.pop(key))
+
+    def _get_pending_write(self, user_id, usage_key):
+        """
+        Returns the pending write for the given user and usage key.
+        """
+        key = (user_id, usage_key)
+        if key not in self._pending_writes:
+            self._pending_writes[key] = _PendingWrite()
+        return self._pending_writes[key]
+
+    def _write(self, key, pending_write):
+        """
+        Writes the given pending write to its StudentModule row, creating
+        it if needed.
+        """
+        user_id, usage_key = key
+        defaults = {'module_type': usage_key.block_type}
+        if pending_write.state is not None:
+            defaults['state'] = json.dumps(pending_write.state)
+        if pending_write.has_score:
+            defaults.update(grade=pending_write.grade, max_grade=pending_write.max_grade)
+
+        kwargs = {'student_id': user_id, 'module_state_key': usage_key, 'course_id': usage_key.course_key}
+        try:
+            with transaction.atomic():
+                student_module, created = StudentModule.objects.get_or_create(defaults=defaults, **kwargs)
+        except IntegrityError:
+            # See set_score: the row was created by another process in the meantime.
+            log.exception(
+                'StudentModuleWriteBuffer: IntegrityError for student %s - course_id %s - usage_key %s',
+                str(user_id), usage_key.course_key, usage_key,
+            )
+            student_module = StudentModule.objects.get(**kwargs)
+            created = False
+
+        if created:
+            return
+
+        if pending_write.state is not None:
+            current_state = json.loads(student_module.state) if student_module.state else {}
+            current_state.update(pending_write.state)
+            student_module.state = json.dumps(current_state)
+        if pending_write.has_score:
+            student_module.grade = pending_write.grade
+            student_module.max_grade = pending_write.max_grade
+        try:
+            with transaction.atomic():
+                student_module.save(force_update=True)
+        except IntegrityError:
+            # See DjangoXBlockUserStateClient.set_many.
+            log.warning(
+                'StudentModuleWriteBuffer: IntegrityError for student %s - course_id %s - usage key %s',
+                str(user_id), usage_key.course_key, usage_key,
+            )
+
+
+@contextmanager
+def coalesce_student_module_writes():
+    """
+    A context manager that buffers the StudentModule writes made within it
+    and writes each buffered row once when leaving it, if the
+    coalesce_student_module_writes waffle switch is enabled.
+
+    Nested contexts share the buffer of the outermost one.
+    """
+    cache = get_cache(REQUEST_CACHE_NAMESPACE)
+    if cache.get('buffer') is not None or not waffle().is_enabled(COALESCE_STUDENT_MODULE_WRITES):
+        yield
+        return
+
+    write_buffer = cache['buffer'] = StudentModuleWriteBuffer()
+    try:
+        yield
+    finally:
+        del cache['buffer']
+        write_buffer.flush()
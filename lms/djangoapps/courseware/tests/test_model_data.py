@@ -4,8 +4,9 @@ Test for lms courseware app, module data (runtime data storage for XBlocks)
 import json
 from functools import partial
 
-from django.db import DatabaseError
+from django.db import DatabaseError, connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from mock import Mock, patch
 from xblock.core import XBlock
 from xblock.exceptions import KeyValueMultiSaveError
@@ -28,6 +29,8 @@ from courseware.tests.factories import (
 )
 from openedx.core.lib.tests import attr
 from student.tests.factories import UserFactory
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 
 
 def mock_field(scope, name):
@@ -434,3 +437,71 @@ class TestStudentInfoStorage(OtherUserFailureTestMixin, StorageTestBase, TestCas
     storage_class = XModuleStudentInfoField
     other_key_factory = partial(DjangoKeyValueStore.Key, Scope.user_info, 2, 'mock_problem')  # user_id=2, not 1
     existing_field_name = "existing_field"
+
+
+@attr(shard=1)
+class TestFieldDataCachePrefetch(ModuleStoreTestCase):
+    """
+    Query-count benchmark for prefetching the field data of a sequence, as
+    is done when rendering the courseware.
+    """
+    NUM_PROBLEMS = 50
+    PROBLEMS_PER_VERTICAL = 5
+
+    def setUp(self):
+        super(TestFieldDataCachePrefetch, self).setUp()
+        self.course = CourseFactory.create()
+        with self.store.bulk_operations(self.course.id):
+            chapter = ItemFactory.create(category='chapter', parent_location=self.course.location)
+            self.small_sequence, _ = self._create_sequence(chapter, 1)
+            self.sequence, self.problems = self._create_sequence(chapter, self.NUM_PROBLEMS)
+
+        self.user = UserFactory.create()
+        for problem in self.problems:
+            cmfStudentModuleFactory.create(
+                student=self.user,
+                course_id=self.course.id,
+                module_state_key=problem.location,
+                state=json.dumps({'attempts': 1}),
+            )
+
+    def _create_sequence(self, chapter, num_problems):
+        """
+        Creates a sequence with the given number of problems in the given
+        chapter, and returns it along with its problems.
+        """
+        sequence = ItemFactory.create(category='sequential', parent_location=chapter.location)
+        problems = []
+        for index in range(num_problems):
+            if index % self.PROBLEMS_PER_VERTICAL == 0:
+                vertical = ItemFactory.create(category='vertical', parent_location=sequence.location)
+            problems.append(ItemFactory.create(category='problem', parent_location=vertical.location))
+        return sequence, problems
+
+    def _prefetch_sequence(self, sequence):
+        """
+        Prefetches the field data of the course outline and then of the
+        given sequence's subtree, and returns the FieldDataCache along with
+        the number of queries made for the sequence.
+        """
+        field_data_cache = FieldDataCache.cache_for_descriptor_descendents(
+            self.course.id, self.user, self.store.get_course(self.course.id), depth=2,
+        )
+        sequence = self.store.get_item(sequence.location, depth=None)
+        with CaptureQueriesContext(connection) as queries:
+            field_data_cache.add_descriptor_descendents(sequence)
+        return field_data_cache, len(queries)
+
+    def test_queries_independent_of_sequence_size(self):
+        _, num_queries = self._prefetch_sequence(self.sequence)
+        _, num_small_sequence_queries = self._prefetch_sequence(self.small_sequence)
+        self.assertEqual(num_queries, num_small_sequence_queries)
+
+    def test_prefetched_state_shared(self):
+        field_data_cache, _ = self._prefetch_sequence(self.sequence)
+
+        with self.assertNumQueries(0):
+            field_data_cache.add_descriptor_descendents(self.store.get_item(self.sequence.location, depth=None))
+            for problem in self.problems:
+                key = DjangoKeyValueStore.Key(Scope.user_state, self.user.id, problem.location, 'attempts')
+                self.assertEqual(field_data_cache.get(key), 1)
@@ -0,0 +1,96 @@
+"""
+Tests for student_module_writes.py
+"""
+import json
+
+from django.test import TestCase
+
+from courseware.model_data import get_score, set_score
+from courseware.models import StudentModule
+from courseware.student_module_writes import (
+    COALESCE_STUDENT_MODULE_WRITES,
+    coalesce_student_module_writes,
+    waffle
+)
+from courseware.tests.factories import StudentModuleFactory, course_id, location
+from courseware.user_state_client import DjangoXBlockUserStateClient
+from openedx.core.lib.tests import attr
+
+
+@attr(shard=1)
+class TestCoalesceStudentModuleWrites(TestCase):
+    """
+    Tests the coalescing of StudentModule writes.
+    """
+    # Tell Django to clean out all databases, not just default
+    multi_db = True
+
+    def setUp(self):
+        super(TestCoalesceStudentModuleWrites, self).setUp()
+        self.usage_key = location('problem')
+        self.student_module = StudentModuleFactory(
+            course_id=course_id,
+            module_state_key=self.usage_key,
+            state=json.dumps({'a_field': 'a_value', 'b_field': 'b_value'}),
+        )
+        self.user = self.student_module.student
+        self.client = DjangoXBlockUserStateClient(self.user)
+
+    def _write(self):
+        """
+        Writes the state and score of the problem, as a problem check does.
+        """
+        self.client.set_many(self.user.username, {self.usage_key: {'a_field': 'new_value'}})
+        set_score(self.user.id, self.usage_key, 1, 2)
+        self.client.set_many(self.user.username, {self.usage_key: {'c_field': 'c_value'}})
+
+    def _assert_written(self, usage_key=None):
+        """
+        Asserts that the writes of _write were saved to the database.
+        """
+        student_module = StudentModule.objects.get(student=self.user, module_state_key=usage_key or self.usage_key)
+        self.assertEqual(
+            json.loads(student_module.state),
+            {'a_field': 'new_value', 'b_field': 'b_value', 'c_field': 'c_value'},
+        )
+        self.assertEqual((student_module.grade, student_module.max_grade), (1, 2))
+
+    def test_coalesced(self):
+        with waffle().override(COALESCE_STUDENT_MODULE_WRITES, active=True):
+            with self.assertNumQueries(1, using='student_module_history'):
+                with coalesce_student_module_writes():
+                    with self.assertNumQueries(0):
+                        self._write()
+                    self.assertIsNone(StudentModule.objects.get(pk=self.student_module.pk).grade)
+        self._assert_written()
+
+    def test_created(self):
+        usage_key = location('other_problem')
+        with waffle().override(COALESCE_STUDENT_MODULE_WRITES, active=True):
+            with coalesce_student_module_writes():
+                self.client.set_many(self.user.username, {usage_key: {'a_field': 'new_value', 'b_field': 'b_value'}})
+                set_score(self.user.id, usage_key, 1, 2)
+                self.client.set_many(self.user.username, {usage_key: {'c_field': 'c_value'}})
+        self._assert_written(usage_key)
+
+    def test_reads_flush(self):
+        with waffle().override(COALESCE_STUDENT_MODULE_WRITES, active=True):
+            with coalesce_student_module_writes():
+                self._write()
+                self.assertEqual(self.client.get(self.user.username, self.usage_key).state['a_field'], 'new_value')
+                self.assertEqual(get_score(self.user.id, self.usage_key).grade, 1)
+        self._assert_written()
+
+    def test_nested(self):
+        with waffle().override(COALESCE_STUDENT_MODULE_WRITES, active=True):
+            with coalesce_student_module_writes():
+                with coalesce_student_module_writes():
+                    self._write()
+                self.assertIsNone(StudentModule.objects.get(pk=self.student_module.pk).grade)
+        self._assert_written()
+
+    def test_disabled(self):
+        with waffle().override(COALESCE_STUDENT_MODULE_WRITES, active=False):
+            with coalesce_student_module_writes():
+                self._write()
+                self._assert_written()
@@ -18,6 +18,7 @@ from edx_user_state_client.interface import XBlockUserState, XBlockUserStateClie
 from xblock.fields import Scope
 
 from courseware.models import BaseStudentModuleHistory, StudentModule
+from courseware.student_module_writes import StudentModuleWriteBuffer
 
 try:
     import simplejson as json
@@ -86,6 +87,11 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
             username (str): The name of the user to load `StudentModule`s for.
             block_keys (list of :class:`~UsageKey`): The set of XBlocks to load data for.
         """
+        # Read any buffered writes to these blocks from the database.
+        write_buffer = StudentModuleWriteBuffer.get_active()
+        if write_buffer is not None:
+            write_buffer.flush(block_keys)
+
         course_key_func = attrgetter('course_key')
         by_course = itertools.groupby(
             sorted(block_keys, key=course_key_func),
@@ -239,6 +245,14 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
             # what we have.
             return
 
+        # Within coalesce_student_module_writes, the state is written once
+        # per block when leaving the context.
+        write_buffer = StudentModuleWriteBuffer.get_active()
+        if write_buffer is not None:
+            for usage_key, state in block_keys_to_state.items():
+                write_buffer.set_state(user.id, usage_key, state)
+            return
+
         evt_time = time()
 
         for usage_key, state in block_keys_to_state.items():
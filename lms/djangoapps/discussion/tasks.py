@@ -17,7 +17,11 @@ from edx_ace.utils import date
 from edx_ace.recipient import Recipient
 from eventtracking import tracker
 from opaque_keys.edx.keys import CourseKey
-from lms.djangoapps.django_comment_client.utils import permalink, get_accessible_discussion_xblocks_by_course_id
+from lms.djangoapps.django_comment_client.utils import (
+    get_accessible_discussion_xblocks_by_course_id,
+    permalink,
+    update_discussion_category_entries
+)
 import lms.lib.comment_client as cc
 
 from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
@@ -25,6 +29,7 @@ from openedx.core.djangoapps.ace_common.template_context import get_base_templat
 from openedx.core.djangoapps.ace_common.message import BaseMessageType
 from openedx.core.lib.celery.task_utils import emulate_http_request
 from track import segment
+from xmodule.modulestore.django import modulestore
 
 
 log = logging.getLogger(__name__)
@@ -38,7 +43,8 @@ ROUTING_KEY = getattr(settings, 'ACE_ROUTING_KEY', None)
 def update_discussions_map(context):
     """
     Updates the mapping between discussion_id to discussion block usage key
-    for all discussion blocks in the given course.
+    for all discussion blocks in the given course, and caches their category
+    entries for the published version of the course.
 
     context is a dict that contains:
         course_id (string): identifier of the course
@@ -50,6 +56,10 @@ def update_discussions_map(context):
         for discussion_block in discussion_blocks
     }
     DiscussionsIdMapping.update_mapping(course_key, discussions_id_map)
+    course = modulestore().get_course(course_key)
+    # The course may have been deleted since it was published.
+    if course is not None:
+        update_discussion_category_entries(course)
 
 
 class ResponseNotification(BaseMessageType):
@@ -4,7 +4,7 @@ Views handling read (GET) requests for the Discussion tab and inline discussions
 from __future__ import print_function
 
 import logging
-from functools import wraps
+from functools import partial, wraps
 
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
@@ -523,12 +523,15 @@ def create_user_profile_context(request, course_key, user_id):
     else:
         profiled_user = cc.User(id=user_id, course_id=course_key)
 
-    threads, page, num_pages = profiled_user.active_threads(query_params)
+    (threads, page, num_pages), user_info, __ = cc.utils.run_concurrently(
+        partial(profiled_user.active_threads, query_params),
+        cc.User.from_django_user(request.user).to_dict,
+        profiled_user.retrieve,
+    )
     query_params['page'] = page
     query_params['num_pages'] = num_pages
 
     with function_trace("get_metadata_for_threads"):
-        user_info = cc.User.from_django_user(request.user).to_dict()
         annotated_content_info = utils.get_metadata_for_threads(course_key, threads, request.user, user_info)
 
     is_staff = has_permission(request.user, 'openclose_thread', course.id)
@@ -633,12 +636,14 @@ def followed_threads(request, course_key, user_id):
         if group_id is not None:
             query_params['group_id'] = group_id
 
-        paginated_results = profiled_user.subscribed_threads(query_params)
+        paginated_results, user_info = cc.utils.run_concurrently(
+            partial(profiled_user.subscribed_threads, query_params),
+            cc.User.from_django_user(request.user).to_dict,
+        )
         print("\n \n \n paginated results \n \n \n ")
         print(paginated_results)
         query_params['page'] = paginated_results.page
         query_params['num_pages'] = paginated_results.num_pages
-        user_info = cc.User.from_django_user(request.user).to_dict()
 
         with function_trace("get_metadata_for_threads"):
             annotated_content_info = utils.get_metadata_for_threads(
@@ -1,12 +1,15 @@
 # -*- coding: utf-8 -*-
 import datetime
 import json
+from functools import partial
 
 import ddt
 import mock
 
 from django.urls import reverse
 from django.test import RequestFactory, TestCase
+from django.test.utils import override_settings
+from django.utils import translation
 from edx_django_utils.cache import RequestCache
 from mock import Mock, patch
 from pytz import UTC
@@ -32,15 +35,25 @@ from django_comment_common.utils import (
     seed_permissions_roles,
     set_course_discussion_settings
 )
+from lms.djangoapps.discussion.tasks import update_discussions_map
 from lms.djangoapps.teams.tests.factories import CourseTeamFactory
-from lms.lib.comment_client.utils import CommentClientMaintenanceError, perform_request
+from lms.lib.comment_client import cache as response_cache
+from lms.lib.comment_client import utils as cc_utils
+from lms.lib.comment_client.utils import (
+    CommentClientMaintenanceError,
+    CommentClientRequestError,
+    perform_request,
+    run_concurrently
+)
 from openedx.core.djangoapps.course_groups import cohorts
 from openedx.core.djangoapps.course_groups.cohorts import set_course_cohorted
 from openedx.core.djangoapps.course_groups.tests.helpers import CohortFactory, config_course_cohorts
 from openedx.core.djangoapps.util.testing import ContentGroupTestCase
+from openedx.core.djangolib.testing.utils import CacheIsolationTestCase
 from openedx.core.lib.tests import attr
 from student.roles import CourseStaffRole
 from student.tests.factories import AdminFactory, CourseEnrollmentFactory, UserFactory
+from terrain.stubs.comments import StubCommentsService
 from xmodule.modulestore import ModuleStoreEnum
 from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.tests.django_utils import TEST_DATA_MIXED_MODULESTORE, ModuleStoreTestCase
@@ -1219,6 +1232,106 @@ class ContentGroupCategoryMapTestCase(CategoryMapTestMixin, ContentGroupTestCase
         )
 
 
+@attr(shard=3)
+@ddt.ddt
+class DiscussionCategoryEntriesTestCase(ModuleStoreTestCase):
+    """
+    Tests the cached category entries of the discussion xblocks of courses.
+    """
+    def setUp(self):
+        super(DiscussionCategoryEntriesTestCase, self).setUp()
+        self.course = CourseFactory.create(
+            default_store=ModuleStoreEnum.Type.split, start=datetime.datetime(2012, 2, 3, tzinfo=UTC)
+        )
+        self.create_discussion('discussion1', 'Week 1', 'Visible to Everyone')
+
+    def create_discussion(self, discussion_id, discussion_category, discussion_target, **kwargs):
+        """
+        Creates a discussion xblock in the course, and returns the new version of the course.
+        """
+        ItemFactory.create(
+            parent_location=self.course.location,
+            category="discussion",
+            discussion_id=discussion_id,
+            discussion_category=discussion_category,
+            discussion_target=discussion_target,
+            **kwargs
+        )
+        RequestCache.clear_all_namespaces()
+        self.course = self.store.get_course(self.course.id)
+        return self.course
+
+    def get_entry_ids(self, course, build_count):
+        """
+        Returns the ids of the category entries of course, asserting how many times they are built.
+        """
+        with patch.object(
+            utils, 'get_accessible_discussion_xblocks_by_course_id',
+            wraps=utils.get_accessible_discussion_xblocks_by_course_id
+        ) as mock_get_xblocks:
+            entry_ids = [entry["id"] for entry in utils.get_discussion_category_entries(course)]
+        self.assertEqual(mock_get_xblocks.call_count, build_count)
+        return entry_ids
+
+    def test_entries(self):
+        self.create_discussion('discussion2', 'Week 2', 'Staff Only', visible_to_staff_only=True)
+        self.assertEqual(
+            [
+                (entry["id"], entry["category"], entry["target"], entry["visible_to_staff_only"])
+                for entry in utils.get_discussion_category_entries(self.course)
+            ],
+            [
+                ('discussion1', 'Week 1', 'Visible to Everyone', False),
+                ('discussion2', 'Week 2', 'Staff Only', True),
+            ]
+        )
+
+    def test_cached_per_version(self):
+        course = self.course
+        self.assertEqual(self.get_entry_ids(course, build_count=1), ['discussion1'])
+        self.assertEqual(self.get_entry_ids(course, build_count=0), ['discussion1'])
+
+        new_course = self.create_discussion('discussion2', 'Week 2', 'Visible to Everyone')
+        self.assertEqual(self.get_entry_ids(new_course, build_count=1), ['discussion1', 'discussion2'])
+        self.assertEqual(self.get_entry_ids(course, build_count=0), ['discussion1'])
+
+    def test_built_on_publish(self):
+        update_discussions_map({'course_id': text_type(self.course.id)})
+        self.assertEqual(self.get_entry_ids(self.course, build_count=0), ['discussion1'])
+
+    def test_publish_of_missing_course(self):
+        with patch('lms.djangoapps.discussion.tasks.modulestore') as mock_modulestore:
+            mock_modulestore.return_value.get_course.return_value = None
+            update_discussions_map({'course_id': text_type(self.course.id)})
+        self.assertEqual(self.get_entry_ids(self.course, build_count=1), ['discussion1'])
+
+    def test_unversioned_course_not_cached(self):
+        self.course = CourseFactory.create(default_store=ModuleStoreEnum.Type.mongo)
+        self.create_discussion('discussion1', 'Week 1', 'Visible to Everyone')
+        self.assertEqual(self.get_entry_ids(self.course, build_count=1), ['discussion1'])
+        RequestCache.clear_all_namespaces()
+        self.assertEqual(self.get_entry_ids(self.course, build_count=1), ['discussion1'])
+
+    @ddt.data(
+        (False, ['discussion1']),
+        (True, ['discussion1', 'discussion2', 'discussion3']),
+    )
+    @ddt.unpack
+    def test_accessible_entries(self, is_staff, expected_entry_ids):
+        self.create_discussion('discussion2', 'Week 2', 'Staff Only', visible_to_staff_only=True)
+        self.create_discussion(
+            'discussion3', 'Week 3', 'Not Started', start=datetime.datetime(2050, 1, 1, tzinfo=UTC)
+        )
+        user = UserFactory.create()
+        if is_staff:
+            CourseStaffRole(self.course.id).add_users(user)
+        RequestCache.clear_all_namespaces()
+        self.assertEqual(
+            [entry["id"] for entry in utils.get_accessible_discussion_category_entries(self.course, user)],
+            expected_entry_ids
+        )
+
+
 class JsonResponseTestCase(TestCase, UnicodeTestMixin):
     def _test_unicode_data(self, text):
         response = utils.JsonResponse(text)
@@ -1839,6 +1952,199 @@ class ClientConfigurationTestCase(TestCase):
         result = perform_request('GET', 'http://www.google.com')
         self.assertEqual(result, {})
 
+    @patch('requests.request')
+    def test_config_read_once(self, mock_request):
+        """Ensures that the ForumsConfig is only read once per request, until it's changed."""
+        config = ForumsConfig.current()
+        config.enabled = True
+        config.save()
+        mock_request.return_value = Mock(status_code=200, json=lambda: {})
+
+        with patch.object(ForumsConfig, 'current', wraps=ForumsConfig.current) as mock_current:
+            perform_request('GET', 'http://www.google.com')
+            perform_request('GET', 'http://www.google.com')
+            self.assertEqual(mock_current.call_count, 1)
+
+            config.enabled = False
+            config.save()
+            with self.assertRaises(CommentClientMaintenanceError):
+                perform_request('GET', 'http://www.google.com')
+            self.assertEqual(mock_current.call_count, 2)
+
+
+@ddt.ddt
+class PerformRequestTestCase(TestCase):
+    """Tests of the pooled connections, concurrent requests and metrics of the comments service client."""
+
+    def setUp(self):
+        super(PerformRequestTestCase, self).setUp()
+        config = ForumsConfig.current()
+        config.enabled = True
+        config.save()
+        self.response = Mock(status_code=200, json=lambda: {'id': 'test_thread'})
+
+    @override_settings(COMMENTS_SERVICE_POOL_SIZE=2)
+    @patch('requests.request')
+    def test_pooled_session(self, mock_request):
+        with patch('requests.Session.request', return_value=self.response) as mock_session_request:
+            self.assertEqual(perform_request('get', 'http://localhost:4567/api/v1/threads/a'), {'id': 'test_thread'})
+            self.assertEqual(perform_request('get', 'http://localhost:4567/api/v1/threads/b'), {'id': 'test_thread'})
+        self.assertEqual(mock_session_request.call_count, 2)
+        self.assertFalse(mock_request.called)
+        self.assertIs(cc_utils._get_session(), cc_utils._get_session())  # pylint: disable=protected-access
+
+    @patch('requests.request')
+    def test_unpooled(self, mock_request):
+        mock_request.return_value = self.response
+        perform_request('get', 'http://localhost:4567/api/v1/threads/a')
+        self.assertIsNone(cc_utils._get_session())  # pylint: disable=protected-access
+        self.assertEqual(mock_request.call_count, 1)
+
+    @patch('lms.lib.comment_client.utils.monitoring_utils.accumulate')
+    @patch('requests.request')
+    def test_request_metrics(self, mock_request, mock_accumulate):
+        mock_request.return_value = Mock(status_code=404, text='Not found')
+        with self.assertRaises(CommentClientRequestError):
+            perform_request(
+                'get',
+                'http://localhost:4567/api/v1/threads/a',
+                metric_action='model.retrieve',
+                metric_tags=[u'model_class:Thread'],
+            )
+        metrics = {call[0][0] for call in mock_accumulate.call_args_list}
+        self.assertEqual(metrics, {
+            u'forums.requests',
+            u'forums.duration_ms',
+            u'forums.errors',
+            u'forums.thread.retrieve.requests',
+            u'forums.thread.retrieve.duration_ms',
+            u'forums.thread.retrieve.errors',
+        })
+
+    @ddt.data(0, 2)
+    def test_run_concurrently(self, max_workers):
+        with override_settings(COMMENTS_SERVICE_MAX_WORKERS=max_workers), translation.override('eo'):
+            self.assertEqual(
+                run_concurrently(translation.get_language, lambda: 'result'),
+                ['eo', 'result'],
+            )
+
+    @ddt.data(0, 2)
+    def test_run_concurrently_error(self, max_workers):
+        def fail():
+            """Raises a request error."""
+            raise CommentClientRequestError('error', 404)
+
+        with override_settings(COMMENTS_SERVICE_MAX_WORKERS=max_workers):
+            with self.assertRaises(CommentClientRequestError):
+                run_concurrently(lambda: 'result', fail)
+
+    @override_settings(COMMENTS_SERVICE_MAX_WORKERS=2)
+    @patch('lms.lib.comment_client.utils.monitoring_utils.accumulate')
+    @patch('requests.request')
+    def test_concurrent_request_metrics(self, mock_request, mock_accumulate):
+        mock_request.return_value = self.response
+        with patch.object(ForumsConfig, 'current', wraps=ForumsConfig.current) as mock_current:
+            results = run_concurrently(*[
+                partial(perform_request, 'get', 'http://localhost:4567/api/v1/threads/a', metric_action='thread.get')
+                for __ in range(3)
+            ])
+            self.assertEqual(mock_current.call_count, 1)
+        self.assertEqual(results, [{'id': 'test_thread'}] * 3)
+        self.assertEqual(mock_request.call_count, 3)
+        mock_accumulate.assert_any_call(u'forums.thread.get.requests', 1)
+        self.assertEqual(
+            len([call for call in mock_accumulate.call_args_list if call[0][0] == u'forums.thread.get.requests']),
+            3,
+        )
+
+
+@override_settings(COMMENTS_SERVICE_CACHE_TIMEOUT=60)
+class ResponseCacheTestCase(CacheIsolationTestCase):
+    """Tests of the cache of the responses of the comments service, with a stub comments service."""
+
+    ENABLED_CACHES = ['default']
+
+    def setUp(self):
+        super(ResponseCacheTestCase, self).setUp()
+        config = ForumsConfig.current()
+        config.enabled = True
+        config.save()
+        self.server = StubCommentsService()
+        self.addCleanup(self.server.shutdown)
+        self.server.config['threads'] = {
+            'test_thread': {'id': 'test_thread', 'title': 'Old title', 'course_id': 'course-v1:x+y+z'},
+        }
+        self.prefix = 'http://127.0.0.1:{}/api/v1'.format(self.server.port)
+        self.thread_url = self.prefix + '/threads/test_thread'
+
+    def get_title(self, **params):
+        """Returns the title of the thread read through the comment client."""
+        return perform_request('get', self.thread_url, params, metric_action='thread.get')['title']
+
+    def set_title(self, title):
+        """Changes the title of the thread in the comments service."""
+        self.server.config['threads']['test_thread']['title'] = title
+
+    def test_cached_until_written(self):
+        self.assertEqual(self.get_title(), 'Old title')
+        self.set_title('New title')
+        self.assertEqual(self.get_title(), 'Old title')
+        self.assertEqual(self.get_title(user_id='1'), 'New title')
+
+        perform_request('delete', self.thread_url)
+        self.assertEqual(self.get_title(), 'New title')
+
+    def test_write_to_course(self):
+        self.assertEqual(self.get_title(), 'Old title')
+        self.set_title('New title')
+        perform_request('delete', self.prefix + '/threads/other_thread', {'course_id': 'course-v1:x+y+z'})
+        self.assertEqual(self.get_title(), 'New title')
+
+    def test_write_to_other_thread(self):
+        self.assertEqual(self.get_title(), 'Old title')
+        self.set_title('New title')
+        perform_request('delete', self.prefix + '/threads/other_thread')
+        self.assertEqual(self.get_title(), 'Old title')
+
+    def test_write_while_reading(self):
+        send_request = cc_utils._send_request  # pylint: disable=protected-access
+
+        def send_request_then_write(method, url, **kwargs):
+            """Reads the thread, which is then written to before the response is cached."""
+            response = send_request(method, url, **kwargs)
+            self.set_title('New title')
+            response_cache.invalidate_responses('delete', self.thread_url, {}, {}, 60)
+            return response
+
+        with patch.object(cc_utils, '_send_request', side_effect=send_request_then_write):
+            self.assertEqual(self.get_title(), 'Old title')
+        self.assertEqual(self.get_title(), 'New title')
+
+    def test_mark_as_read(self):
+        self.assertEqual(self.get_title(user_id='1'), 'Old title')
+        self.set_title('New title')
+        self.assertEqual(self.get_title(user_id='1', mark_as_read=True), 'New title')
+        self.assertEqual(self.get_title(user_id='1'), 'New title')
+
+    @override_settings(COMMENTS_SERVICE_CACHE_TIMEOUT=0)
+    def test_disabled(self):
+        self.assertEqual(self.get_title(), 'Old title')
+        self.set_title('New title')
+        self.assertEqual(self.get_title(), 'New title')
+
+    @patch('lms.lib.comment_client.utils.monitoring_utils.accumulate')
+    def test_cache_metrics(self, mock_accumulate):
+        self.get_title()
+        self.get_title()
+        mock_accumulate.assert_any_call(u'forums.thread.get.cache_misses', 1)
+        mock_accumulate.assert_any_call(u'forums.thread.get.cache_hits', 1)
+        mock_accumulate.assert_any_call(u'forums.cache_hits', 1)
+        self.assertEqual(
+            len([call for call in mock_accumulate.call_args_list if call[0][0] == u'forums.thread.get.requests']),
+            1,
+        )
+
 
 def set_discussion_division_settings(
         course_key, enable_cohorts=False, always_divide_inline_discussions=False,
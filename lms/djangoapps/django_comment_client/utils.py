@@ -4,7 +4,8 @@ from collections import defaultdict
 from datetime import datetime
 
 from django.conf import settings
-from django.contrib.auth.models import User
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
 from django.urls import reverse
 from django.db import connection
 from django.http import HttpResponse
@@ -14,7 +15,8 @@ from opaque_keys.edx.locations import i4xEncoder
 from six import text_type
 
 from courseware import courses
-from courseware.access import has_access
+from courseware.access import get_user_role, has_access, has_staff_access_to_preview_mode
+from courseware.access_utils import check_start_date, in_preview_mode
 from django_comment_client.constants import TYPE_ENTRY, TYPE_SUBCATEGORY
 from django_comment_client.permissions import check_permissions_by_view, get_team, has_permission
 from django_comment_client.settings import MAX_COMMENT_DEPTH
@@ -31,8 +33,8 @@ from openedx.core.lib.cache_utils import request_cached
 from student.models import get_user_by_username_or_email
 from student.roles import GlobalStaff
 from xmodule.modulestore.django import modulestore
-from xmodule.partitions.partitions import ENROLLMENT_TRACK_PARTITION_ID
-from xmodule.partitions.partitions_service import PartitionService
+from xmodule.partitions.partitions import ENROLLMENT_TRACK_PARTITION_ID, NoSuchUserPartitionGroupError
+from xmodule.partitions.partitions_service import PartitionService, get_all_partitions_for_course
 
 log = logging.getLogger(__name__)
 
@@ -241,6 +243,153 @@ def _get_item_from_modulestore(key):
     return modulestore().get_item(key)
 
 
+# Incremented when the fields of the cached discussion category entries change.
+DISCUSSION_CATEGORY_ENTRIES_VERSION = 1
+DISCUSSION_CATEGORY_ENTRIES_CACHE_TIMEOUT = 24 * 60 * 60
+
+
+def _get_discussion_category_entries_cache_key(course_key, course_version):
+    """
+    Returns the cache key of the discussion category entries of a version of a course.
+    """
+    return u'django_comment_client.discussion_category_entries.{}.{}.{}'.format(
+        DISCUSSION_CATEGORY_ENTRIES_VERSION, course_key, course_version
+    )
+
+
+def get_discussion_category_entry(xblock):
+    """
+    Returns the fields of a discussion xblock needed to add it to the category map of a user, including
+    the groups, start date and visibility which restrict its access.
+    """
+    return {
+        "id": xblock.discussion_id,
+        "category": xblock.discussion_category,
+        "target": xblock.discussion_target,
+        "sort_key": xblock.sort_key,
+        "start": xblock.start,
+        "days_early_for_beta": xblock.days_early_for_beta,
+        "visible_to_staff_only": xblock.visible_to_staff_only,
+        "group_access": xblock.merged_group_access,
+    }
+
+
+def update_discussion_category_entries(course):
+    """
+    Builds the category entries of all of the valid discussion xblocks of the course, and caches them
+    for its version.  This is done when the course is published, and when they aren't cached.  Courses
+    without versions, which are stored in old Mongo, aren't cached.
+    """
+    entries = [
+        get_discussion_category_entry(xblock)
+        for xblock in get_accessible_discussion_xblocks_by_course_id(course.id, include_all=True)
+    ]
+    course_version = getattr(course, 'course_version', None)
+    if course_version:
+        cache.set(
+            _get_discussion_category_entries_cache_key(course.id, course_version),
+            entries,
+            DISCUSSION_CATEGORY_ENTRIES_CACHE_TIMEOUT,
+        )
+    return entries
+
+
+def get_discussion_category_entries(course):
+    """
+    Returns the category entries of all of the valid discussion xblocks of the course, from the cache
+    when they were built for its version.
+    """
+    course_version = getattr(course, 'course_version', None)
+    if course_version:
+        entries = cache.get(_get_discussion_category_entries_cache_key(course.id, course_version))
+        if entries is not None:
+            return entries
+    return update_discussion_category_entries(course)
+
+
+def _get_discussion_category_entry_access_checker(course, user):
+    """
+    Returns a function returning whether user has access to load the discussion xblock of a category
+    entry, as has_access would, which only looks up the groups of the user and checks each start date
+    once.
+    """
+    if not user:
+        user = AnonymousUser()
+    course_key = course.id
+    if in_preview_mode() and not has_staff_access_to_preview_mode(user, course_key):
+        return lambda entry: False
+    # As in has_access, staff who are masquerading as students only have the group access of the students.
+    has_all_group_access = get_user_role(user, course_key) in ['staff', 'instructor']
+    has_staff_access = bool(has_access(user, 'staff', course))
+    partitions = {partition.id: partition for partition in get_all_partitions_for_course(course)}
+    user_groups = {}
+    start_date_access = {}
+
+    def get_user_group(partition):
+        """
+        Returns the group of the user in partition.
+        """
+        if partition.id not in user_groups:
+            user_groups[partition.id] = partition.scheme.get_group_for_user(course_key, user, partition)
+        return user_groups[partition.id]
+
+    def has_group_access(group_access):
+        """
+        Returns whether the user is in one of the groups allowed by each partition of group_access.
+        """
+        for partition_id, group_ids in group_access.items():
+            partition = partitions.get(partition_id)
+            if partition is None or group_ids is False:
+                return False
+            if not partition.active or not group_ids:
+                continue
+            try:
+                groups = [partition.get_group(group_id) for group_id in group_ids]
+            except NoSuchUserPartitionGroupError:
+                return False
+            if get_user_group(partition) not in groups:
+                return False
+        return True
+
+    def has_start_date_access(days_early_for_beta, start):
+        """
+        Returns whether the start date, moved earlier for beta testers, has passed for the user.
+        """
+        if (days_early_for_beta, start) not in start_date_access:
+            start_date_access[(days_early_for_beta, start)] = bool(
+                check_start_date(user, days_early_for_beta, start, course_key)
+            )
+        return start_date_access[(days_early_for_beta, start)]
+
+    def has_entry_access(entry):
+        """
+        Returns whether the user has access to load the discussion xblock of entry.
+        """
+        if not (has_all_group_access or has_group_access(entry["group_access"])):
+            return False
+        if has_staff_access:
+            return True
+        return (
+            not entry["visible_to_staff_only"] and
+            has_start_date_access(entry["days_early_for_beta"], entry["start"])
+        )
+
+    return has_entry_access
+
+
+def get_accessible_discussion_category_entries(course, user, include_all=False):
+    """
+    Returns the category entries of the discussion xblocks of the course which are accessible to the
+    given user, like get_accessible_discussion_xblocks but without loading the xblocks.
+    """
+    include_all = getattr(user, 'is_community_ta', False)
+    entries = get_discussion_category_entries(course)
+    if include_all or not entries:
+        return entries
+    has_entry_access = _get_discussion_category_entry_access_checker(course, user)
+    return [entry for entry in entries if has_entry_access(entry)]
+
+
 def _filter_unstarted_categories(category_map, course):
     """
     Returns a subset of categories from the provided map which have not yet met the start date
@@ -347,19 +496,19 @@ def get_discussion_category_map(course, user, divided_only_if_explicit=False, ex
     """
     unexpanded_category_map = defaultdict(list)
 
-    xblocks = get_accessible_discussion_xblocks(course, user)
+    category_entries = get_accessible_discussion_category_entries(course, user)
 
     discussion_settings = get_course_discussion_settings(course.id)
     discussion_division_enabled = course_discussion_division_enabled(discussion_settings)
     divided_discussion_ids = discussion_settings.divided_discussions
 
-    for xblock in xblocks:
-        discussion_id = xblock.discussion_id
-        title = xblock.discussion_target
-        sort_key = xblock.sort_key
-        category = " / ".join([x.strip() for x in xblock.discussion_category.split("/")])
-        # Handle case where xblock.start is None
-        entry_start_date = xblock.start if xblock.start else datetime.max.replace(tzinfo=UTC)
+    for category_entry in category_entries:
+        discussion_id = category_entry["id"]
+        title = category_entry["target"]
+        sort_key = category_entry["sort_key"]
+        category = " / ".join([x.strip() for x in category_entry["category"].split("/")])
+        # Handle case where the start of the xblock is None
+        entry_start_date = category_entry["start"] if category_entry["start"] else datetime.max.replace(tzinfo=UTC)
         unexpanded_category_map[category].append({"title": title,
                                                   "id": discussion_id,
                                                   "sort_key": sort_key,
@@ -470,7 +619,8 @@ def get_discussion_categories_ids(course, user, include_all=False):
 
     """
     accessible_discussion_ids = [
-        xblock.discussion_id for xblock in get_accessible_discussion_xblocks(course, user, include_all=include_all)
+        category_entry["id"]
+        for category_entry in get_accessible_discussion_category_entries(course, user, include_all=include_all)
     ]
     return course.top_level_discussion_topic_ids + accessible_discussion_ids
 
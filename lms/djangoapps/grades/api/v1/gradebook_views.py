@@ -30,7 +30,6 @@ from lms.djangoapps.grades.course_data import CourseData
 from lms.djangoapps.grades.course_grade_factory import CourseGradeFactory
 from lms.djangoapps.grades.events import SUBSECTION_GRADE_CALCULATED, subsection_grade_calculated
 from lms.djangoapps.grades.models import (
-    PersistentCourseGrade,
     PersistentSubsectionGrade,
     PersistentSubsectionGradeOverride,
     PersistentSubsectionGradeOverrideHistory,
@@ -61,18 +60,14 @@ log = logging.getLogger(__name__)
 @contextmanager
 def bulk_gradebook_view_context(course_key, users):
     """
-    Prefetches all course and subsection grades in the given course for the given
-    list of users, also, fetch all the score relavant data,
-    storing the result in a RequestCache and deleting grades on context exit.
+    Prefetches the enrollment, cohort and role data in the given course for the
+    given list of users, storing the result in a RequestCache.  Their grades are
+    prefetched by CourseGradeFactory.iter_batched.
     """
-    PersistentSubsectionGrade.prefetch(course_key, users)
-    PersistentCourseGrade.prefetch(course_key, users)
     CourseEnrollment.bulk_fetch_enrollment_states(users, course_key)
     cohorts.bulk_cache_cohorts(course_key, users)
     BulkRoleCache.prefetch(users)
     yield
-    PersistentSubsectionGrade.clear_prefetched_data(course_key)
-    PersistentCourseGrade.clear_prefetched_data(course_key)
 
 
 def verify_writable_gradebook_enabled(view_func):
@@ -536,7 +531,7 @@ class GradebookView(GradeViewMixin, PaginatedAPIView):
             users = self._paginate_users(course_key, filter_kwargs, related_models)
 
             with bulk_gradebook_view_context(course_key, users):
-                for user, course_grade, exc in CourseGradeFactory().iter(
+                for user, course_grade, exc in CourseGradeFactory().iter_batched(
                     users, course_key=course_key, collected_block_structure=course_data.collected_structure
                 ):
                     if not exc:
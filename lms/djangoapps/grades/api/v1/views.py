@@ -1,6 +1,5 @@
 """ API v0 views. """
 import logging
-from contextlib import contextmanager
 
 from rest_framework import status
 from rest_framework.generics import ListAPIView
@@ -19,7 +18,6 @@ from lms.djangoapps.grades.api.v1.utils import (
     verify_course_exists
 )
 from lms.djangoapps.grades.course_grade_factory import CourseGradeFactory
-from lms.djangoapps.grades.models import PersistentCourseGrade
 from opaque_keys import InvalidKeyError
 from openedx.core.lib.api.authentication import OAuth2AuthenticationAllowInactiveUser
 from xmodule.modulestore.django import modulestore
@@ -27,18 +25,6 @@ from xmodule.modulestore.django import modulestore
 log = logging.getLogger(__name__)
 
 
-@contextmanager
-def bulk_course_grade_context(course_key, users):
-    """
-    Prefetches grades for the given users in the given course
-    within a context, storing in a RequestCache and deleting
-    on context exit.
-    """
-    PersistentCourseGrade.prefetch(course_key, users)
-    yield
-    PersistentCourseGrade.clear_prefetched_data(course_key)
-
-
 class CourseGradesView(GradeViewMixin, PaginatedAPIView):
     """
     **Use Case**
@@ -138,10 +124,9 @@ class CourseGradesView(GradeViewMixin, PaginatedAPIView):
         user_grades = []
         users = self._paginate_users(course_key)
 
-        with bulk_course_grade_context(course_key, users):
-            for user, course_grade, exc in CourseGradeFactory().iter(users, course_key=course_key):
-                if not exc:
-                    user_grades.append(self._serialize_user_grade(user, course_key, course_grade))
+        for user, course_grade, exc in CourseGradeFactory().iter_batched(users, course_key=course_key):
+            if not exc:
+                user_grades.append(self._serialize_user_grade(user, course_key, course_grade))
 
         return self.get_paginated_response(user_grades)
 
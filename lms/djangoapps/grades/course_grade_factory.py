@@ -2,6 +2,8 @@
 Course Grade Factory Class
 """
 from collections import namedtuple
+from contextlib import contextmanager
+from itertools import islice
 from logging import getLogger
 
 from six import text_type
@@ -11,7 +13,8 @@ from openedx.core.djangoapps.signals.signals import COURSE_GRADE_CHANGED, COURSE
 from .config import assume_zero_if_absent, should_persist_grades
 from .course_data import CourseData
 from .course_grade import CourseGrade, ZeroCourseGrade
-from .models import PersistentCourseGrade, prefetch
+from .models import PersistentCourseGrade, bulk_prefetch, clear_bulk_prefetched_data, prefetch
+from .subsection_grade_factory import SubsectionGradeFactory
 
 log = getLogger(__name__)
 
@@ -22,6 +25,9 @@ class CourseGradeFactory(object):
     """
     GradeResult = namedtuple('GradeResult', ['student', 'course_grade', 'error'])
 
+    # Number of users whose grading data is prefetched together by iter_batched.
+    BATCH_SIZE = 100
+
     def read(
             self,
             user,
@@ -104,6 +110,48 @@ class CourseGradeFactory(object):
         for user in users:
             yield self._iter_grade_result(user, course_data, force_update)
 
+    def iter_batched(
+            self,
+            users,
+            course=None,
+            collected_block_structure=None,
+            course_key=None,
+            force_update=False,
+            batch_size=None,
+    ):
+        """
+        Like iter, but grades the students in batches of batch_size (by
+        default, BATCH_SIZE).  Before a batch is graded, the persisted course
+        and subsection grades, visible blocks and grade overrides of all of
+        its students are prefetched with a few queries, and their courseware
+        scores are fetched together the first time any of them is needed,
+        rather than querying for each student.
+        """
+        course_data = CourseData(
+            user=None, course=course, collected_block_structure=collected_block_structure, course_key=course_key,
+        )
+        users = iter(users)
+        batch = list(islice(users, batch_size or self.BATCH_SIZE))
+        while batch:
+            with self._prefetch_batch(batch, course_data):
+                for user in batch:
+                    yield self._iter_grade_result(user, course_data, force_update)
+            batch = list(islice(users, batch_size or self.BATCH_SIZE))
+
+    @contextmanager
+    def _prefetch_batch(self, users, course_data):
+        """
+        Prefetches the grading data of the given students within a context,
+        clearing it on context exit.
+        """
+        bulk_prefetch(users, course_data.course_key)
+        SubsectionGradeFactory.prefetch_csm_scores(course_data, users)
+        try:
+            yield
+        finally:
+            SubsectionGradeFactory.clear_prefetched_csm_scores(course_data.course_key)
+            clear_bulk_prefetched_data(users, course_data.course_key)
+
     def _iter_grade_result(self, user, course_data, force_update):
         try:
             kwargs = {
@@ -0,0 +1,221 @@
+"""
+Vectorized computation of course grades for many learners at once.
+
+A GradingLayout describes the graded-block layout of a course, built once
+from its collected structure.  Given matrices of the weighted earned and
+possible scores of a batch of learners (one row per learner, one column per
+problem of the layout), GradingLayout.grade computes the learners' subsection
+percents, assignment type percents, course percents, letter grades and
+passed statuses with NumPy, matching the values computed one learner at a
+time by CourseGrade.
+
+Problems that are not visible to a learner are given earned and possible
+scores of 0, so that, as for CourseGrade, they and any subsection left
+without possible points do not count towards the learner's grade.  Persisted
+subsection grade overrides are not applied.
+"""
+from collections import OrderedDict, namedtuple
+
+import numpy
+
+from xmodule.graders import AssignmentFormatGrader
+
+from .course_grade import CourseGradeBase
+from .scores import possibly_scored
+
+LayoutSubsection = namedtuple('LayoutSubsection', ['location', 'format', 'graded', 'graded_problems'])
+MatrixGrades = namedtuple(
+    'MatrixGrades', ['subsection_percents', 'assignment_percents', 'percents', 'letter_grades', 'passed'],
+)
+
+
+class GradingLayout(object):
+    """
+    The graded-block layout of a course, shared by all of its learners.
+
+    Arguments:
+        problem_keys (list): The usage keys of the scorable problems of the
+            course, in the order of the columns of the score matrices.
+        subsections (list): The LayoutSubsections of the course, in course
+            order, where graded_problems lists the column indices of the
+            graded problems of the subsection, in post-order.
+        grader (WeightedSubsectionsGrader): The course's grader, whose
+            subgraders must all be AssignmentFormatGraders.
+        grade_cutoffs (dict): The course's letter grade cutoffs.
+    """
+    def __init__(self, problem_keys, subsections, grader, grade_cutoffs):
+        self.problem_keys = problem_keys
+        self.subsections = subsections
+        self.grader = grader
+        self.grade_cutoffs = grade_cutoffs
+        self.assignment_graders = []
+        for subgrader, assignment_type, weight in grader.subgraders:
+            if not isinstance(subgrader, AssignmentFormatGrader):
+                raise ValueError(u'Unsupported subgrader: {}'.format(subgrader))
+            self.assignment_graders.append((subgrader, assignment_type, weight))
+
+    @classmethod
+    def from_structure(cls, course_structure, course):
+        """
+        Returns the GradingLayout of the given collected course structure,
+        graded with the grading policy of the given course.
+        """
+        problem_keys = []
+        problem_indices = {}
+        subsections = OrderedDict()
+        root_key = course_structure.root_block_usage_key
+        for chapter_key in course_structure.get_children(root_key):
+            for subsection_key in course_structure.get_children(chapter_key):
+                if subsection_key in subsections:
+                    continue
+                graded_problems = []
+                for block_key in course_structure.post_order_traversal(
+                        filter_func=possibly_scored,
+                        start_node=subsection_key,
+                ):
+                    if not course_structure.get_xblock_field(block_key, 'has_score', False):
+                        continue
+                    if block_key not in problem_indices:
+                        problem_indices[block_key] = len(problem_keys)
+                        problem_keys.append(block_key)
+                    if course_structure.get_xblock_field(block_key, 'graded', False):
+                        graded_problems.append(problem_indices[block_key])
+                subsections[subsection_key] = LayoutSubsection(
+                    location=subsection_key,
+                    format=course_structure.get_xblock_field(subsection_key, 'format', ''),
+                    graded=course_structure.get_xblock_field(subsection_key, 'graded', False),
+                    graded_problems=graded_problems,
+                )
+
+        course = CourseGradeBase._prep_course_for_grading(course)  # pylint: disable=protected-access
+        return cls(problem_keys, subsections.values(), course.grader, course.grade_cutoffs)
+
+    def grade(self, earned, possible):
+        """
+        Grades a batch of learners from their scores on the problems of the
+        layout.
+
+        Arguments:
+            earned (array): The learners' weighted earned scores, with one
+                row per learner and one column per problem.
+            possible (array): The learners' weighted possible scores, of the
+                same shape.
+
+        Returns a MatrixGrades of:
+            subsection_percents: An array of the learners' graded percents
+                for each subsection.
+            assignment_percents: An OrderedDict of the learners' percents for
+                each assignment type, before weighting, keyed by type.
+            percents: An array of the learners' course percents.
+            letter_grades: An array of the learners' letter grades, or None.
+            passed: A boolean array of whether the learners passed.
+        """
+        earned = numpy.asarray(earned, dtype=numpy.float64)
+        possible = numpy.asarray(possible, dtype=numpy.float64)
+        num_learners = earned.shape[0]
+
+        subsection_percents = numpy.zeros((num_learners, len(self.subsections)))
+        subsection_possible = numpy.zeros((num_learners, len(self.subsections)))
+        for column, subsection in enumerate(self.subsections):
+            # Sum in the same order as the scores of a single learner are
+            # summed, so that the results are identical.
+            total_earned = numpy.zeros(num_learners)
+            total_possible = numpy.zeros(num_learners)
+            for problem in subsection.graded_problems:
+                total_earned += earned[:, problem]
+                total_possible += possible[:, problem]
+            subsection_percents[:, column] = _compute_percents(total_earned, total_possible)
+            subsection_possible[:, column] = total_possible
+
+        assignment_percents = OrderedDict()
+        percents = numpy.zeros(num_learners)
+        for subgrader, assignment_type, weight in self.assignment_graders:
+            columns = [
+                column for column, subsection in enumerate(self.subsections)
+                if subsection.graded and subsection.format == subgrader.type
+            ]
+            assignment_percents[assignment_type] = _total_with_drops(
+                subsection_percents[:, columns],
+                subsection_possible[:, columns] > 0,
+                subgrader.min_count,
+                subgrader.drop_count,
+            )
+            percents += assignment_percents[assignment_type] * weight
+
+        percents = _round_half_up(percents * 100 + 0.05) / 100
+        letter_grades, passed = self._letter_grades(percents)
+        return MatrixGrades(subsection_percents, assignment_percents, percents, letter_grades, passed)
+
+    def _letter_grades(self, percents):
+        """
+        Returns arrays of the letter grades and passed statuses for the
+        given course percents, as CourseGrade computes them.
+        """
+        letter_grades = numpy.empty(len(percents), dtype=object)
+        assigned = numpy.zeros(len(percents), dtype=bool)
+        descending_grades = sorted(self.grade_cutoffs, key=lambda x: self.grade_cutoffs[x], reverse=True)
+        for possible_grade in descending_grades:
+            matches = ~assigned & (percents >= self.grade_cutoffs[possible_grade])
+            letter_grades[matches] = possible_grade
+            assigned |= matches
+
+        nonzero_cutoffs = [cutoff for cutoff in self.grade_cutoffs.values() if cutoff > 0]
+        if nonzero_cutoffs:
+            passed = percents >= min(nonzero_cutoffs)
+        else:
+            passed = numpy.zeros(len(percents), dtype=bool)
+        return letter_grades, passed
+
+
+def _compute_percents(earned, possible):
+    """
+    Vectorized compute_percent.
+    """
+    percents = numpy.zeros(len(earned))
+    valid = possible > 0
+    percents[valid] = numpy.around(earned[valid] / possible[valid], decimals=2)
+    return percents
+
+
+def _total_with_drops(percents, included, min_count, drop_count):
+    """
+    Vectorized AssignmentFormatGrader.grade, returning the percent of each
+    learner for the assignment type given their percents for the
+    subsections of the type, where included marks the subsections with
+    possible points.
+    """
+    num_learners, num_columns = percents.shape
+    num_included = included.sum(axis=1)
+    num_placeholders = numpy.maximum(min_count - num_included, 0)
+    num_entries = num_included + num_placeholders
+
+    # The lowest entries are dropped and, among entries with equal percents,
+    # the latest are dropped first.  So placeholder entries, which are zero
+    # and come last, are dropped before any of the included entries.
+    num_dropped = numpy.maximum(drop_count - num_placeholders, 0)
+
+    # Rank the included entries from the first to be dropped to the last.
+    # Sorting the reversed columns stably ranks later entries first among
+    # equal percents.
+    ranks = numpy.empty((num_learners, num_columns), dtype=int)
+    order = numpy.argsort(numpy.where(included, percents, numpy.inf)[:, ::-1], axis=1, kind='mergesort')
+    ranks[numpy.arange(num_learners)[:, numpy.newaxis], order] = numpy.arange(num_columns)
+    ranks = ranks[:, ::-1]
+    counted = included & (ranks >= num_dropped[:, numpy.newaxis])
+
+    totals = numpy.zeros(num_learners)
+    for column in range(num_columns):
+        totals += numpy.where(counted[:, column], percents[:, column], 0.0)
+    denominators = num_entries - drop_count
+    valid = denominators > 0
+    totals[valid] /= denominators[valid]
+    return totals
+
+
+def _round_half_up(values):
+    """
+    Vectorized Python 2 round() of non-negative values to integral values,
+    which rounds halves away from zero unlike numpy.round.
+    """
+    floors = numpy.floor(values)
+    return floors + (values - floors >= 0.5)
@@ -0,0 +1,153 @@
+"""
+Command to compare the performance of the vectorized grading engine with
+grading learners one at a time, on a synthetic course.
+"""
+
+# pylint: disable=protected-access
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+from collections import OrderedDict, defaultdict, namedtuple
+from time import time
+
+import numpy
+from django.core.management.base import BaseCommand, CommandError
+
+from xmodule import graders
+from xmodule.graders import ProblemScore
+
+from ...course_grade import CourseGrade
+from ...grade_matrix import GradingLayout, LayoutSubsection
+from ...scores import compute_percent
+
+GRADER = [
+    {'type': 'Homework', 'min_count': 12, 'drop_count': 2, 'short_label': 'HW', 'weight': 0.15},
+    {'type': 'Lab', 'min_count': 12, 'drop_count': 2, 'weight': 0.15},
+    {'type': 'Midterm Exam', 'short_label': 'Midterm', 'min_count': 1, 'drop_count': 0, 'weight': 0.3},
+    {'type': 'Final Exam', 'short_label': 'Final', 'min_count': 1, 'drop_count': 0, 'weight': 0.4},
+]
+GRADE_CUTOFFS = {'A': 0.87, 'B': 0.7, 'C': 0.6}
+
+_SubsectionScores = namedtuple('_SubsectionScores', ['display_name', 'graded_total', 'percent_graded'])
+
+
+class Command(BaseCommand):
+    """
+    Example usage:
+        $ ./manage.py lms benchmark_grade_matrix --learners 100000 --settings=devstack
+    """
+    help = 'Benchmarks vectorized grading against grading learners one at a time.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--learners',
+            help='Number of synthetic learners to grade.',
+            default=100000,
+            type=int,
+        )
+        parser.add_argument(
+            '--problems_per_subsection',
+            help='Number of problems in each synthetic subsection.',
+            default=5,
+            type=int,
+        )
+        parser.add_argument(
+            '--seed',
+            help='Seed for the synthetic scores.',
+            default=0,
+            type=int,
+        )
+
+    def handle(self, *args, **options):
+        layout = synthetic_layout(options['problems_per_subsection'])
+        earned, possible = synthetic_scores(layout, options['learners'], options['seed'])
+
+        start = time()
+        matrix_grades = layout.grade(earned, possible)
+        matrix_time = time() - start
+
+        start = time()
+        learner_grades = [grade_learner(layout, earned[row], possible[row]) for row in range(len(earned))]
+        learner_time = time() - start
+
+        for row, (percent, letter_grade, passed) in enumerate(learner_grades):
+            if (
+                    percent != matrix_grades.percents[row] or
+                    letter_grade != matrix_grades.letter_grades[row] or
+                    bool(passed) != matrix_grades.passed[row]
+            ):
+                raise CommandError(u'Grades differ for learner {}: {} != {}'.format(
+                    row,
+                    (percent, letter_grade, passed),
+                    (matrix_grades.percents[row], matrix_grades.letter_grades[row], matrix_grades.passed[row]),
+                ))
+
+        self.stdout.write(u'Graded {} learners on {} problems: vectorized {:.3f}s, one at a time {:.3f}s'.format(
+            len(earned), len(layout.problem_keys), matrix_time, learner_time,
+        ))
+
+
+def synthetic_layout(problems_per_subsection):
+    """
+    Returns a GradingLayout with enough subsections of each assignment type
+    of GRADER, plus an ungraded subsection, each containing
+    problems_per_subsection problems of which the last is ungraded.
+    """
+    subsections = []
+    formats = [(conf['type'], conf['min_count'] + 1) for conf in GRADER] + [('', 1)]
+    for assignment_type, count in formats:
+        for _ in range(count):
+            first_problem = len(subsections) * problems_per_subsection
+            subsections.append(LayoutSubsection(
+                location='subsection_{}'.format(len(subsections)),
+                format=assignment_type,
+                graded=bool(assignment_type),
+                graded_problems=range(first_problem, first_problem + problems_per_subsection - 1),
+            ))
+    problem_keys = ['problem_{}'.format(index) for index in range(len(subsections) * problems_per_subsection)]
+    return GradingLayout(problem_keys, subsections, graders.grader_from_conf(GRADER), GRADE_CUTOFFS)
+
+
+def synthetic_scores(layout, num_learners, seed):
+    """
+    Returns matrices of random earned and possible scores for the problems
+    of the given layout, where some problems are hidden from some learners.
+    """
+    random_state = numpy.random.RandomState(seed)
+    num_problems = len(layout.problem_keys)
+    possible = random_state.randint(1, 4, size=(num_learners, num_problems)).astype(numpy.float64)
+    possible[random_state.random_sample((num_learners, num_problems)) < 0.1] = 0.0
+    earned = numpy.floor(random_state.random_sample((num_learners, num_problems)) * (possible + 1))
+    return earned, possible
+
+
+def grade_learner(layout, earned, possible):
+    """
+    Grades a single learner, given their scores on the problems of the
+    layout, the way CourseGrade does, returning a tuple of the learner's
+    course percent, letter grade and passed status.
+    """
+    grade_sheet = defaultdict(OrderedDict)
+    for subsection in layout.subsections:
+        scores = [
+            ProblemScore(
+                float(earned[problem]), float(possible[problem]),
+                float(earned[problem]), float(possible[problem]),
+                1, True, None,
+            )
+            for problem in subsection.graded_problems
+            if possible[problem] > 0
+        ]
+        _, graded_total = graders.aggregate_scores(scores)
+        if subsection.graded and graded_total.possible > 0:
+            grade_sheet[subsection.format][subsection.location] = _SubsectionScores(
+                subsection.location,
+                graded_total,
+                compute_percent(graded_total.earned, graded_total.possible),
+            )
+
+    grader_result = layout.grader.grade(grade_sheet)
+    percent = CourseGrade._compute_percent(grader_result)
+    letter_grade = CourseGrade._compute_letter_grade(layout.grade_cutoffs, percent)
+    passed = CourseGrade._compute_passed(layout.grade_cutoffs, percent)
+    return percent, letter_grade, passed
@@ -0,0 +1,35 @@
+"""
+Tests for benchmark_grade_matrix management command.
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+from unittest import TestCase
+
+import ddt
+from django.core.management import call_command
+from six import StringIO
+
+
+@ddt.ddt
+class TestBenchmarkGradeMatrix(TestCase):
+    """
+    Tests benchmark_grade_matrix management command, which fails when the
+    vectorized grades differ from the grades of learners graded one at a time.
+    """
+    @ddt.data(0, 1, 2)
+    def test_grades_match(self, seed):
+        out = StringIO()
+        call_command('benchmark_grade_matrix', '--learners', '500', '--seed', str(seed), stdout=out)
+        self.assertIn('Graded 500 learners', out.getvalue())
+
+    @ddt.data(1, 3)
+    def test_problems_per_subsection(self, problems_per_subsection):
+        out = StringIO()
+        call_command(
+            'benchmark_grade_matrix',
+            '--learners', '100',
+            '--problems_per_subsection', str(problems_per_subsection),
+            stdout=out,
+        )
+        self.assertIn('Graded 100 learners', out.getvalue())
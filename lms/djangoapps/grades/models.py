@@ -233,14 +233,18 @@ class VisibleBlocks(models.Model):
         Returns a dictionary mapping hashes of these block records to the
         block record objects.
         """
-        grades_with_blocks = PersistentSubsectionGrade.objects.select_related('visible_blocks').filter(
-            user_id=user_id,
-            course_id=course_key,
-        )
+        grades_with_blocks = PersistentSubsectionGrade.bulk_read_grades(user_id, course_key)
         prefetched = {grade.visible_blocks.hashed: grade.visible_blocks for grade in grades_with_blocks}
         get_cache(cls._CACHE_NAMESPACE)[cls._cache_key(user_id, course_key)] = prefetched
         return prefetched
 
+    @classmethod
+    def clear_prefetched_data(cls, user_id, course_key):
+        """
+        Clears prefetched visible blocks for this user and course from the RequestCache.
+        """
+        get_cache(cls._CACHE_NAMESPACE).pop(cls._cache_key(user_id, course_key), None)
+
     @classmethod
     def _update_cache(cls, user_id, course_key, visible_blocks):
         """
@@ -662,6 +666,27 @@ class PersistentSubsectionGradeOverride(models.Model):
             cls.objects.filter(grade__user_id=user_id, grade__course_id=course_key)
         }
 
+    @classmethod
+    def prefetch_from_grades(cls, user_id, course_key, grades):
+        """
+        Caches the overrides of the given subsection grades, which must be
+        all of the user's grades in the course, read with their overrides.
+        """
+        overrides = {}
+        for grade in grades:
+            try:
+                overrides[grade.usage_key] = grade.override
+            except cls.DoesNotExist:
+                pass
+        get_cache(cls._CACHE_NAMESPACE)[(user_id, str(course_key))] = overrides
+
+    @classmethod
+    def clear_prefetched_data(cls, user_id, course_key):
+        """
+        Clears prefetched overrides for this user and course from the RequestCache.
+        """
+        get_cache(cls._CACHE_NAMESPACE).pop((user_id, str(course_key)), None)
+
     @classmethod
     def get_override(cls, user_id, usage_key):
         prefetch_values = get_cache(cls._CACHE_NAMESPACE).get((user_id, str(usage_key.course_key)), None)
@@ -781,3 +806,28 @@ class PersistentSubsectionGradeOverrideHistory(models.Model):
 def prefetch(user, course_key):
     PersistentSubsectionGradeOverride.prefetch(user.id, course_key)
     VisibleBlocks.bulk_read(user.id, course_key)
+
+
+def bulk_prefetch(users, course_key):
+    """
+    Prefetches the persisted course and subsection grades of the given users
+    in the course, along with the visible blocks and overrides of the
+    subsection grades, using a constant number of queries.
+    """
+    PersistentCourseGrade.prefetch(course_key, users)
+    PersistentSubsectionGrade.prefetch(course_key, users)
+    for user in users:
+        grades = PersistentSubsectionGrade.bulk_read_grades(user.id, course_key)
+        PersistentSubsectionGradeOverride.prefetch_from_grades(user.id, course_key, grades)
+        VisibleBlocks.bulk_read(user.id, course_key)
+
+
+def clear_bulk_prefetched_data(users, course_key):
+    """
+    Clears the data prefetched by bulk_prefetch for the given users in the course.
+    """
+    PersistentCourseGrade.clear_prefetched_data(course_key)
+    PersistentSubsectionGrade.clear_prefetched_data(course_key)
+    for user in users:
+        PersistentSubsectionGradeOverride.clear_prefetched_data(user.id, course_key)
+        VisibleBlocks.clear_prefetched_data(user.id, course_key)
@@ -7,6 +7,7 @@ from courseware.model_data import ScoresClient
 from lms.djangoapps.grades.config import assume_zero_if_absent, should_persist_grades
 from lms.djangoapps.grades.models import PersistentSubsectionGrade
 from lms.djangoapps.grades.scores import possibly_scored
+from openedx.core.lib.cache_utils import get_cache
 from openedx.core.lib.grade_utils import is_score_higher_or_equal
 from student.models import anonymous_id_for_user
 from submissions import api as submissions_api
@@ -21,6 +22,8 @@ class SubsectionGradeFactory(object):
     """
     Factory for Subsection Grades.
     """
+    _CACHE_NAMESPACE = u'grades.subsection_grade_factory.SubsectionGradeFactory'
+
     def __init__(self, student, course=None, course_structure=None, course_data=None):
         self.student = student
         self.course_data = course_data or CourseData(student, course=course, structure=course_structure)
@@ -98,12 +101,38 @@ class SubsectionGradeFactory(object):
 
         return calculated_grade
 
+    @classmethod
+    def prefetch_csm_scores(cls, course_data, users):
+        """
+        Prepares a batched fetch of the scores stored in the user state (in
+        CSM) for the course for the given users.  The scores of all of the
+        users are queried together, the first time any of them is needed.
+        """
+        get_cache(cls._CACHE_NAMESPACE)[cls._cache_key(course_data.course_key)] = _BatchedCSMScores(
+            course_data, [user.id for user in users],
+        )
+
+    @classmethod
+    def clear_prefetched_csm_scores(cls, course_key):
+        """
+        Clears prefetched scores for this course from the RequestCache.
+        """
+        get_cache(cls._CACHE_NAMESPACE).pop(cls._cache_key(course_key), None)
+
+    @classmethod
+    def _cache_key(cls, course_key):
+        return u"csm_scores.{}".format(course_key)
+
     @lazy
     def _csm_scores(self):
         """
         Lazily queries and returns all the scores stored in the user
         state (in CSM) for the course, while caching the result.
         """
+        prefetched = get_cache(self._CACHE_NAMESPACE).get(self._cache_key(self.course_data.course_key))
+        if prefetched is not None and self.student.id in prefetched:
+            return prefetched[self.student.id]
+
         scorable_locations = [block_key for block_key in self.course_data.structure if possibly_scored(block_key)]
         return ScoresClient.create_for_locations(self.course_data.course_key, self.student.id, scorable_locations)
 
@@ -161,3 +190,31 @@ class SubsectionGradeFactory(object):
             getattr(subsection, 'subtree_edited_on', None),
             self.student.id,
         ))
+
+
+class _BatchedCSMScores(object):
+    """
+    Lazily fetched CSM scores for a batch of users in a course, keyed by
+    user id.  Scores are fetched for all of the scorable blocks of the
+    course's collected structure, which include those of any user's
+    structure.
+    """
+    def __init__(self, course_data, user_ids):
+        self.course_data = course_data
+        self.user_ids = set(user_ids)
+
+    def __contains__(self, user_id):
+        return user_id in self.user_ids
+
+    def __getitem__(self, user_id):
+        return self._clients[user_id]
+
+    @lazy
+    def _clients(self):
+        """
+        Returns a ScoresClient for each user of the batch.
+        """
+        scorable_locations = [
+            block_key for block_key in self.course_data.collected_structure if possibly_scored(block_key)
+        ]
+        return ScoresClient.create_for_users(self.course_data.course_key, self.user_ids, scorable_locations)
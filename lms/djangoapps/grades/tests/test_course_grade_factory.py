@@ -6,9 +6,12 @@ import itertools
 import ddt
 from courseware.access import has_access
 from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from lms.djangoapps.grades.config.tests.utils import persistent_grades_feature_flags
 from mock import patch
 from openedx.core.djangoapps.content.block_structure.factory import BlockStructureFactory
+from openedx.core.lib.cache_utils import get_cache
 from six import text_type
 
 from student.tests.factories import UserFactory
@@ -18,6 +21,7 @@ from xmodule.modulestore.tests.factories import CourseFactory
 from ..config.waffle import ASSUME_ZERO_GRADE_IF_ABSENT, waffle
 from ..course_grade import CourseGrade, ZeroCourseGrade
 from ..course_grade_factory import CourseGradeFactory
+from ..models import PersistentCourseGrade
 from ..subsection_grade import ReadSubsectionGrade, ZeroSubsectionGrade
 from .base import GradeTestBase
 from .utils import mock_get_score
@@ -126,6 +130,40 @@ class TestCourseGradeFactory(GradeTestBase):
         with self.assertNumQueries(5):
             _assert_read(expected_pass=False, expected_percent=0.0)  # updated to grade of 0.0
 
+    @ddt.data(1, 2)
+    def test_iter_batched(self, batch_size):
+        other_user = UserFactory.create()
+        with mock_get_score(1, 2):
+            CourseGradeFactory().update(self.request.user, self.course, force_update_subsections=True)
+
+        results = list(CourseGradeFactory().iter_batched(
+            [self.request.user, other_user], self.course, batch_size=batch_size,
+        ))
+        self.assertEqual(
+            [(result.student, result.error) for result in results],
+            [(self.request.user, None), (other_user, None)],
+        )
+        self.assertEqual([result.course_grade.percent for result in results], [0.5, 0.0])
+
+        # the prefetched grades are cleared once the students are graded
+        self.assertNotIn(
+            PersistentCourseGrade._cache_key(self.course.id),  # pylint: disable=protected-access
+            get_cache(PersistentCourseGrade._CACHE_NAMESPACE),  # pylint: disable=protected-access
+        )
+
+    def test_iter_batched_queries(self):
+        users = [self.request.user] + [UserFactory.create() for _ in range(4)]
+        with mock_get_score(1, 2):
+            for user in users:
+                CourseGradeFactory().update(user, self.course, force_update_subsections=True)
+        list(CourseGradeFactory().iter(users, self.course))
+
+        with CaptureQueriesContext(connection) as iter_queries:
+            list(CourseGradeFactory().iter(users, self.course))
+        with CaptureQueriesContext(connection) as batched_queries:
+            list(CourseGradeFactory().iter_batched(users, self.course))
+        self.assertLess(len(batched_queries), len(iter_queries))
+
     @patch.dict(settings.FEATURES, {'ASSUME_ZERO_GRADE_IF_ABSENT_FOR_ALL_TESTS': False})
     @ddt.data(*itertools.product((True, False), (True, False)))
     @ddt.unpack
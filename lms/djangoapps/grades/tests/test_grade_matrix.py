@@ -0,0 +1,83 @@
+"""
+Tests for grade_matrix.py
+"""
+from unittest import TestCase
+
+import ddt
+import numpy
+
+from xmodule.graders import grader_from_conf
+
+from ..grade_matrix import GradingLayout, LayoutSubsection
+from .base import GradeTestBase
+
+
+def homework_layout(num_subsections, min_count, drop_count):
+    """
+    Returns a layout of homework subsections with one problem each.
+    """
+    subsections = [
+        LayoutSubsection(location=index, format='Homework', graded=True, graded_problems=[index])
+        for index in range(num_subsections)
+    ]
+    grader = grader_from_conf([
+        {'type': 'Homework', 'min_count': min_count, 'drop_count': drop_count, 'weight': 1.0},
+    ])
+    return GradingLayout(range(num_subsections), subsections, grader, {'A': 0.9, 'Pass': 0.5, 'Audit': 0.0})
+
+
+@ddt.ddt
+class TestGradingLayout(TestCase):
+    """
+    Tests for GradingLayout.grade.
+    """
+    @ddt.data(
+        # Drops the lowest score.
+        (3, 0, 1, [[1, 0.5, 0.8]], 0.9),
+        # Drops the latest of equal scores.
+        (3, 0, 1, [[0.5, 1, 0.5]], 0.75),
+        # Drops placeholder scores before actual scores.
+        (2, 3, 1, [[1, 0.5]], 0.75),
+        (2, 4, 1, [[1, 0.5]], 0.5),
+        # Scores zero when all entries are dropped.
+        (1, 0, 2, [[1]], 0),
+    )
+    @ddt.unpack
+    def test_drop_lowest(self, num_subsections, min_count, drop_count, earned, expected_percent):
+        layout = homework_layout(num_subsections, min_count, drop_count)
+        grades = layout.grade(earned, numpy.ones((1, num_subsections)))
+        self.assertEqual(list(grades.assignment_percents['Homework']), [expected_percent])
+
+    def test_hidden_problems(self):
+        layout = homework_layout(3, 3, 0)
+        grades = layout.grade([[1, 0, 0.5]], [[1, 0, 1]])
+        self.assertEqual(list(grades.subsection_percents[0]), [1, 0, 0.5])
+        self.assertEqual(list(grades.assignment_percents['Homework']), [0.5])
+
+    def test_letter_grades(self):
+        layout = homework_layout(1, 1, 0)
+        grades = layout.grade([[0.95], [0.5], [0.2]], numpy.ones((3, 1)))
+        self.assertEqual(list(grades.percents), [0.95, 0.5, 0.2])
+        self.assertEqual(list(grades.letter_grades), ['A', 'Pass', 'Audit'])
+        self.assertEqual(list(grades.passed), [True, True, False])
+
+    def test_unsupported_grader(self):
+        grader = grader_from_conf([{'type': 'Final', 'min_count': 1, 'drop_count': 0, 'weight': 1.0}])
+        grader.subgraders[0] = (object(), 'Final', 1.0)
+        with self.assertRaises(ValueError):
+            GradingLayout([], [], grader, {})
+
+
+class TestGradingLayoutFromStructure(GradeTestBase):
+    """
+    Tests for GradingLayout.from_structure.
+    """
+    def test_from_structure(self):
+        layout = GradingLayout.from_structure(self.course_structure, self.course)
+        self.assertEqual(layout.problem_keys, [self.problem.location, self.problem2.location])
+        self.assertEqual(
+            [(subsection.location, subsection.format, subsection.graded) for subsection in layout.subsections],
+            [(self.sequence.location, 'Homework', True), (self.sequence2.location, 'Homework', True)],
+        )
+        self.assertEqual([subsection.graded_problems for subsection in layout.subsections], [[0], [1]])
+        self.assertEqual(layout.grade_cutoffs, {'Pass': 0.5})
@@ -37,6 +37,7 @@ class GradesTransformer(BlockStructureTransformer):
     """
     WRITE_VERSION = 4
     READ_VERSION = 4
+    SUPPORTS_PARTIAL_COLLECT = True
     FIELDS_TO_COLLECT = [
         u'due',
         u'format',
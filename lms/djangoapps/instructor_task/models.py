@@ -18,12 +18,15 @@ import hashlib
 import json
 import logging
 import os.path
+import shutil
+from contextlib import contextmanager
+from tempfile import SpooledTemporaryFile
 from uuid import uuid4
 
 from boto.exception import BotoServerError
 from django.conf import settings
 from django.contrib.auth.models import User
-from django.core.files.base import ContentFile
+from django.core.files.base import File
 from django.db import models, transaction
 from opaque_keys.edx.django.models import CourseKeyField
 from six import text_type
@@ -183,9 +186,8 @@ class InstructorTask(models.Model):
 class ReportStore(object):
     """
     Simple abstraction layer that can fetch and store CSV files for reports
-    download. Should probably refactor later to create a ReportFile object that
-    can simply be appended to for the sake of memory efficiency, rather than
-    passing in the whole dataset. Doing that for now just because it's simpler.
+    download. Rows may be passed as generators, in which case they are written
+    out as they are produced rather than held in memory as a whole dataset.
     """
     @classmethod
     def from_config(cls, config_name):
@@ -231,6 +233,10 @@ class DjangoStorageReportStore(ReportStore):
     """
     ReportStore implementation that delegates to django's storage api.
     """
+    # Size, in bytes, above which csv files are written to disk rather
+    # than memory before being stored.
+    CSV_SPOOL_MAX_SIZE = 1024 * 1024
+
     def __init__(self, storage_class=None, storage_kwargs=None):
         if storage_kwargs is None:
             storage_kwargs = {}
@@ -269,14 +275,65 @@ class DjangoStorageReportStore(ReportStore):
         """
         Given a course_id, filename, and rows (each row is an iterable of
         strings), write the rows to the storage backend in csv format.
+
+        `rows` may be any iterable, including a generator.  Rows are written
+        to a temporary file as they are produced, so the report is never
+        held in memory as a whole.
+        """
+        with self._csv_file() as output_file:
+            csvwriter = csv.writer(output_file)
+            csvwriter.writerows(self._get_utf8_encoded_rows(rows))
+            self._store_file(course_id, filename, output_file)
+
+    def store_concatenated_rows(self, course_id, filename, header_rows, part_filenames):
+        """
+        Given a course_id, filename, header_rows and the filenames of csv
+        parts previously written with `store_rows` for the same course_id,
+        write a single csv file with the header_rows followed by the rows of
+        each part, in order.  The parts are copied through a temporary file
+        rather than loaded into memory.
+        """
+        with self._csv_file() as output_file:
+            csvwriter = csv.writer(output_file)
+            csvwriter.writerows(self._get_utf8_encoded_rows(header_rows))
+            for part_filename in part_filenames:
+                with self.storage.open(self.path_to(course_id, part_filename)) as part_file:
+                    if part_file.read(len(codecs.BOM_UTF8)) != codecs.BOM_UTF8:
+                        part_file.seek(0)
+                    shutil.copyfileobj(part_file, output_file)
+            self._store_file(course_id, filename, output_file)
+
+    @contextmanager
+    def _csv_file(self):
+        """
+        Context manager returning a temporary file for writing a csv, which
+        is removed on exit.  Files smaller than `CSV_SPOOL_MAX_SIZE` are
+        kept in memory.
+        """
+        with SpooledTemporaryFile(max_size=self.CSV_SPOOL_MAX_SIZE) as output_file:
+            # Adding unicode signature (BOM) for MS Excel 2013 compatibility
+            output_file.write(codecs.BOM_UTF8)
+            yield output_file
+
+    def _store_file(self, course_id, filename, output_file):
+        """
+        Store the contents of the temporary file `output_file`, written by
+        the caller, in the storage backend.
+        """
+        output_file.seek(0)
+        self.store(course_id, filename, File(output_file))
+
+    def exists(self, course_id, filename):
+        """
+        Return whether the file `filename` exists for the given `course_id`.
+        """
+        return self.storage.exists(self.path_to(course_id, filename))
+
+    def delete(self, course_id, filename):
+        """
+        Delete the file `filename` for the given `course_id`.
         """
-        output_buffer = ContentFile('')
-        # Adding unicode signature (BOM) for MS Excel 2013 compatibility
-        output_buffer.write(codecs.BOM_UTF8)
-        csvwriter = csv.writer(output_buffer)
-        csvwriter.writerows(self._get_utf8_encoded_rows(rows))
-        output_buffer.seek(0)
-        self.store(course_id, filename, output_buffer)
+        self.storage.delete(self.path_to(course_id, filename))
 
     def links_for(self, course_id):
         """
@@ -23,7 +23,10 @@ import logging
 from functools import partial
 
 from celery import task
+from celery.states import FAILURE, RETRY, SUCCESS
 from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
 from django.utils.translation import ugettext_noop
 
 from bulk_email.tasks import perform_delegate_email_batches
@@ -46,10 +49,12 @@ from lms.djangoapps.instructor_task.tasks_helper.module_state import (
     delete_problem_module_state,
     perform_module_state_update,
     override_score_module_state,
+    prefetch_rescore_module_states,
     rescore_problem_module_state,
     reset_attempts_module_state
 )
 from lms.djangoapps.instructor_task.tasks_helper.runner import run_main_task
+from lms.djangoapps.instructor_task.subtasks import SubtaskStatus, check_subtask_is_valid, update_subtask_status
 
 TASK_LOG = logging.getLogger('edx.celery.task')
 
@@ -76,8 +81,12 @@ def rescore_problem(entry_id, xmodule_instance_args):
     # Translators: This is a past-tense verb that is inserted into task progress messages as {action}.
     action_name = ugettext_noop('rescored')
     update_fcn = partial(rescore_problem_module_state, xmodule_instance_args)
+    prefetch_fcn = None
+    # The prefetched problem contexts are found in the default cache, which safe_exec uses.
+    if not isinstance(caches['default'], DummyCache):
+        prefetch_fcn = partial(prefetch_rescore_module_states, xmodule_instance_args)
 
-    visit_fcn = partial(perform_module_state_update, update_fcn, None)
+    visit_fcn = partial(perform_module_state_update, update_fcn, None, prefetch_fcn=prefetch_fcn)
     return run_main_task(entry_id, visit_fcn, action_name)
 
 
@@ -187,6 +196,77 @@ def calculate_grades_csv(entry_id, xmodule_instance_args):
     return run_main_task(entry_id, task_fn, action_name)
 
 
+@task(bind=True, default_retry_delay=60, max_retries=3, routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)
+def calculate_grades_csv_chunk(self, entry_id, xmodule_instance_args, report_input, chunk_index,
+                               subtask_status_dict=None):
+    """
+    Grade one chunk of the enrollees of a course grade report that is
+    generated in parallel, and queue the merge of all chunks if this
+    is the last chunk to complete.
+
+    `report_input` is the dict built by CourseGradeReport._generate_in_parallel,
+    describing all chunks, and `chunk_index` selects the chunk to grade.
+    On failure, the chunk is retried on its own up to `max_retries` times.
+    """
+    chunk = report_input['chunks'][chunk_index]
+    if subtask_status_dict is None:
+        subtask_status = SubtaskStatus.create(chunk['subtask_id'])
+    else:
+        subtask_status = SubtaskStatus.from_dict(subtask_status_dict)
+    current_task_id = subtask_status.task_id
+    check_subtask_is_valid(entry_id, current_task_id, subtask_status)
+
+    try:
+        num_succeeded, num_failed = CourseGradeReport.generate_chunk(
+            xmodule_instance_args, entry_id, report_input, chunk_index,
+        )
+    except Exception as exc:  # pylint: disable=broad-except
+        if subtask_status.retried_withmax < self.max_retries:
+            TASK_LOG.warning(u"Grade report chunk %s of instructor task %d: being retried", current_task_id, entry_id)
+            subtask_status.increment(retried_withmax=1, state=RETRY)
+            update_subtask_status(entry_id, current_task_id, subtask_status)
+            raise self.retry(
+                args=(entry_id, xmodule_instance_args, report_input, chunk_index, subtask_status.to_dict()),
+                exc=exc,
+            )
+        TASK_LOG.exception(u"Grade report chunk %s of instructor task %d: failed", current_task_id, entry_id)
+        subtask_status.increment(failed=chunk['num_users'], state=FAILURE)
+    else:
+        subtask_status.increment(succeeded=num_succeeded, failed=num_failed, state=SUCCESS)
+
+    # Only the merge subtask remains once all chunks are done.
+    if update_subtask_status(entry_id, current_task_id, subtask_status) == 1:
+        merge_grades_csv_chunks.apply_async(
+            (entry_id, xmodule_instance_args, report_input),
+            task_id=report_input['merge_subtask_id'],
+        )
+    return subtask_status.to_dict()
+
+
+@task(routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)
+def merge_grades_csv_chunks(entry_id, xmodule_instance_args, report_input):
+    """
+    Merge the partial CSVs of all chunks of a course grade report that
+    is generated in parallel into the final report, completing the
+    InstructorTask.
+    """
+    subtask_status = SubtaskStatus.create(report_input['merge_subtask_id'])
+    current_task_id = subtask_status.task_id
+    check_subtask_is_valid(entry_id, current_task_id, subtask_status)
+
+    try:
+        CourseGradeReport.merge_chunks(xmodule_instance_args, entry_id, report_input)
+    except Exception:
+        TASK_LOG.exception(u"Grade report merge %s of instructor task %d: failed", current_task_id, entry_id)
+        subtask_status.increment(state=FAILURE)
+        update_subtask_status(entry_id, current_task_id, subtask_status)
+        raise
+
+    subtask_status.increment(state=SUCCESS)
+    update_subtask_status(entry_id, current_task_id, subtask_status)
+    return subtask_status.to_dict()
+
+
 @task(base=BaseInstructorTask, routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)
 def calculate_problem_grade_report(entry_id, xmodule_instance_args):
     """
@@ -1,12 +1,14 @@
 """
 Functionality for generating grade reports.
 """
+import json
 import logging
 import re
 from collections import OrderedDict
 from datetime import datetime
-from itertools import chain, izip, izip_longest
+from itertools import chain, izip_longest
 from time import time
+from uuid import uuid4
 
 from django.contrib.auth import get_user_model
 from django.conf import settings
@@ -19,11 +21,11 @@ from course_blocks.api import get_course_blocks
 from courseware.courses import get_course_by_id
 from courseware.user_state_client import DjangoXBlockUserStateClient
 from instructor_analytics.basic import list_problem_responses
-from instructor_analytics.csvs import format_dictlist
 from lms.djangoapps.certificates.models import CertificateWhitelist, GeneratedCertificate, certificate_info_for_user
 from lms.djangoapps.grades.context import grading_context, grading_context_for_course
-from lms.djangoapps.grades.models import PersistentCourseGrade, PersistentSubsectionGrade
 from lms.djangoapps.grades.course_grade_factory import CourseGradeFactory
+from lms.djangoapps.instructor_task.models import InstructorTask, ReportStore
+from lms.djangoapps.instructor_task.subtasks import initialize_subtask_info
 from lms.djangoapps.teams.models import CourseTeamMembership
 from lms.djangoapps.verify_student.services import IDVerificationService
 from openedx.core.djangoapps.content.block_structure.api import get_course_in_cache
@@ -32,16 +34,18 @@ from openedx.core.djangoapps.user_api.course_tag.api import BulkCourseTags
 from openedx.core.djangoapps.waffle_utils import WaffleSwitchNamespace
 from student.models import CourseEnrollment
 from student.roles import BulkRoleCache
+from util.db import outer_atomic
 from xmodule.modulestore.django import modulestore
 from xmodule.partitions.partitions_service import PartitionService
 from xmodule.split_test_module import get_split_user_partitions
 
 from .runner import TaskProgress
-from .utils import upload_csv_to_report_store
+from .utils import upload_csv_parts_to_report_store, upload_csv_to_report_store
 
 WAFFLE_NAMESPACE = 'instructor_task'
 WAFFLE_SWITCHES = WaffleSwitchNamespace(name=WAFFLE_NAMESPACE)
 OPTIMIZE_GET_LEARNERS_FOR_COURSE = 'optimize_get_learners_for_course'
+PARALLELIZE_COURSE_GRADE_REPORT = 'parallelize_course_grade_report'
 
 TASK_LOG = logging.getLogger('edx.celery.task')
 
@@ -86,6 +90,7 @@ class _CourseGradeReportContext(object):
         )
         self.action_name = action_name
         self.course_id = course_id
+        self.entry_id = _entry_id
         self.task_progress = TaskProgress(self.action_name, total=None, start_time=time())
 
     @lazy
@@ -189,8 +194,6 @@ class _CourseGradeBulkContext(object):
         self.enrollments = _EnrollmentBulkContext(context, users)
         bulk_cache_cohorts(context.course_id, users)
         BulkRoleCache.prefetch(users)
-        PersistentCourseGrade.prefetch(context.course_id, users)
-        PersistentSubsectionGrade.prefetch(context.course_id, users)
         BulkCourseTags.prefetch(context.course_id, users)
 
 
@@ -201,6 +204,15 @@ class CourseGradeReport(object):
     # Batch size for chunking the list of enrollees in the course.
     USER_BATCH_SIZE = 100
 
+    # Maximum number of enrollees graded by each subtask when the report
+    # is generated in parallel.
+    USERS_PER_SUBTASK = 5000
+
+    # Directory, relative to the course's report directory, of the
+    # partial CSVs written by subtasks.  Files in subdirectories are
+    # not listed as downloadable reports.
+    CHUNKS_DIRECTORY = u'grade_report_chunks'
+
     @classmethod
     def generate(cls, _xmodule_instance_args, _entry_id, course_id, _task_input, action_name):
         """
@@ -208,8 +220,42 @@ class CourseGradeReport(object):
         """
         with modulestore().bulk_operations(course_id):
             context = _CourseGradeReportContext(_xmodule_instance_args, _entry_id, course_id, _task_input, action_name)
+            if WAFFLE_SWITCHES.is_enabled(PARALLELIZE_COURSE_GRADE_REPORT):
+                return CourseGradeReport()._generate_in_parallel(context, _xmodule_instance_args, _entry_id)
             return CourseGradeReport()._generate(context)
 
+    @classmethod
+    def generate_chunk(cls, _xmodule_instance_args, _entry_id, report_input, chunk_index):
+        """
+        Public method to grade the enrollees of a single chunk of a grade
+        report that is generated in parallel, storing their rows as partial
+        CSVs for the final merge.
+
+        Returns a tuple of the number of enrollees that were successfully
+        graded and the number that failed.
+        """
+        entry = InstructorTask.objects.get(pk=_entry_id)
+        course_id = entry.course_id
+        with modulestore().bulk_operations(course_id):
+            context = _CourseGradeReportContext(
+                _xmodule_instance_args, _entry_id, course_id, json.loads(entry.task_input), report_input['action_name'],
+            )
+            return CourseGradeReport()._generate_chunk(context, report_input, chunk_index)
+
+    @classmethod
+    def merge_chunks(cls, _xmodule_instance_args, _entry_id, report_input):
+        """
+        Public method to merge the partial CSVs of all chunks of a grade
+        report that is generated in parallel into the final report.
+        """
+        entry = InstructorTask.objects.get(pk=_entry_id)
+        course_id = entry.course_id
+        with modulestore().bulk_operations(course_id):
+            context = _CourseGradeReportContext(
+                _xmodule_instance_args, _entry_id, course_id, json.loads(entry.task_input), report_input['action_name'],
+            )
+            CourseGradeReport()._merge_chunks(context, report_input)
+
     def _generate(self, context):
         """
         Internal method for generating a grade report for the given context.
@@ -219,14 +265,150 @@ class CourseGradeReport(object):
         error_headers = self._error_headers()
         batched_rows = self._batched_rows(context)
 
-        context.update_status(u'Compiling grades')
-        success_rows, error_rows = self._compile(context, batched_rows)
-
-        context.update_status(u'Uploading grades')
+        context.update_status(u'Compiling and uploading grades')
+        error_rows = []
+        success_rows = self._compile(context, batched_rows, error_rows)
         self._upload(context, success_headers, success_rows, error_headers, error_rows)
 
         return context.update_status(u'Completed grades')
 
+    def _generate_in_parallel(self, context, xmodule_instance_args, entry_id):
+        """
+        Internal method for generating a grade report for the given context
+        by fanning out to subtasks.
+
+        The enrollees, ordered by user id, are split into consecutive user id
+        ranges of at most USERS_PER_SUBTASK enrollees.  Each range is graded
+        by its own subtask, which writes its rows to partial CSVs.  One more
+        subtask, queued by whichever range subtask completes last, merges the
+        partial CSVs in range order, so the final report is deterministic.
+        A failing range subtask is retried on its own, without regrading the
+        other ranges.  Progress is accumulated in the InstructorTask's
+        task_output by the subtasks.
+
+        Courses small enough for a single subtask are graded in this task.
+        """
+        # Avoid a circular import, since the tasks module imports this one.
+        from lms.djangoapps.instructor_task.tasks import calculate_grades_csv_chunk
+
+        entry = InstructorTask.objects.get(pk=entry_id)
+        if len(entry.subtasks) > 0 and len(entry.task_output) > 0:
+            # The task was requeued after its subtasks were queued.
+            TASK_LOG.warning(u'%s, Subtasks were already queued', context.task_info_string)
+            return json.loads(entry.task_output)
+
+        user_ids = list(self._enrolled_users(context.course_id).order_by('id').values_list('id', flat=True))
+        if len(user_ids) <= self.USERS_PER_SUBTASK:
+            return self._generate(context)
+
+        chunks = []
+        for start in range(0, len(user_ids), self.USERS_PER_SUBTASK):
+            chunk_user_ids = user_ids[start:start + self.USERS_PER_SUBTASK]
+            chunks.append({
+                'subtask_id': str(uuid4()),
+                'first_user_id': chunk_user_ids[0],
+                'last_user_id': chunk_user_ids[-1],
+                'num_users': len(chunk_user_ids),
+            })
+        report_input = {
+            'action_name': context.action_name,
+            'chunks': chunks,
+            'merge_subtask_id': str(uuid4()),
+            'timestamp': time(),
+        }
+        subtask_ids = [chunk['subtask_id'] for chunk in chunks] + [report_input['merge_subtask_id']]
+
+        # Make sure the subtasks are committed to the database before handing them to celery.
+        with outer_atomic():
+            progress = initialize_subtask_info(entry, context.action_name, len(user_ids), subtask_ids)
+
+        context.update_status(u'Queuing {} grading subtasks'.format(len(chunks)))
+        for chunk_index, chunk in enumerate(chunks):
+            calculate_grades_csv_chunk.apply_async(
+                (entry_id, xmodule_instance_args, report_input, chunk_index),
+                task_id=chunk['subtask_id'],
+            )
+        return progress
+
+    def _generate_chunk(self, context, report_input, chunk_index):
+        """
+        Internal method for grading the enrollees of the given chunk and
+        storing their rows as partial CSVs.  Rerunning a chunk overwrites
+        only its own partial CSVs.
+        """
+        chunk = report_input['chunks'][chunk_index]
+        report_store = ReportStore.from_config('GRADES_DOWNLOAD')
+        batched_rows = (
+            self._rows_for_users(context, users)
+            for users in self._batch_users_in_range(context, chunk['first_user_id'], chunk['last_user_id'])
+        )
+        grades_filename = self._chunk_filename(context, chunk_index, 'grades')
+        errors_filename = self._chunk_filename(context, chunk_index, 'errors')
+        for filename in (grades_filename, errors_filename):
+            # Storages may not overwrite the files of a previous attempt.
+            if report_store.exists(context.course_id, filename):
+                report_store.delete(context.course_id, filename)
+
+        error_rows = []
+        success_rows = self._compile(context, batched_rows, error_rows)
+        report_store.store_rows(context.course_id, grades_filename, success_rows)
+        if error_rows:
+            report_store.store_rows(context.course_id, errors_filename, error_rows)
+        num_succeeded, num_failed = context.task_progress.succeeded, context.task_progress.failed
+        TASK_LOG.info(
+            u'%s, Task type: %s, Graded chunk %d: %d succeeded, %d failed',
+            context.task_info_string, context.action_name, chunk_index, num_succeeded, num_failed,
+        )
+        return num_succeeded, num_failed
+
+    def _merge_chunks(self, context, report_input):
+        """
+        Internal method for merging the partial CSVs of all chunks, in
+        chunk order, into the final success and error reports.  Enrollees of
+        chunks that could not be graded are listed in the error report.
+        """
+        report_store = ReportStore.from_config('GRADES_DOWNLOAD')
+        success_parts, error_parts = [], []
+        for chunk_index, chunk in enumerate(report_input['chunks']):
+            grades_filename = self._chunk_filename(context, chunk_index, 'grades')
+            errors_filename = self._chunk_filename(context, chunk_index, 'errors')
+            if report_store.exists(context.course_id, grades_filename):
+                success_parts.append(grades_filename)
+            else:
+                users = chain(*self._batch_users_in_range(context, chunk['first_user_id'], chunk['last_user_id']))
+                if report_store.exists(context.course_id, errors_filename):
+                    report_store.delete(context.course_id, errors_filename)
+                report_store.store_rows(context.course_id, errors_filename, (
+                    [user.id, user.username, u'Failed to grade learner'] for user in users
+                ))
+            if report_store.exists(context.course_id, errors_filename):
+                error_parts.append(errors_filename)
+
+        context.update_status(u'Merging grades')
+        timestamp = datetime.fromtimestamp(report_input['timestamp'], UTC)
+        upload_csv_parts_to_report_store(
+            [self._success_headers(context)], success_parts, 'grade_report', context.course_id, timestamp,
+        )
+        if error_parts:
+            upload_csv_parts_to_report_store(
+                [self._error_headers()], error_parts, 'grade_report_err', context.course_id, timestamp,
+            )
+
+        for filename in success_parts + error_parts:
+            report_store.delete(context.course_id, filename)
+
+    def _chunk_filename(self, context, chunk_index, kind):
+        """
+        Returns the filename of the partial CSV of the given kind for the
+        given chunk.
+        """
+        return u'{directory}/{task_id}_{chunk_index:05d}_{kind}.csv'.format(
+            directory=self.CHUNKS_DIRECTORY,
+            task_id=context.entry_id,
+            chunk_index=chunk_index,
+            kind=kind,
+        )
+
     def _success_headers(self, context):
         """
         Returns a list of all applicable column headers for this grade report.
@@ -256,29 +438,32 @@ class CourseGradeReport(object):
             users = filter(lambda u: u is not None, users)
             yield self._rows_for_users(context, users)
 
-    def _compile(self, context, batched_rows):
+    def _compile(self, context, batched_rows, error_rows):
         """
-        Compiles and returns the complete list of (success_rows, error_rows) for
-        the given batched_rows and context.
+        Returns a generator of the success rows for the given batched_rows
+        and context, appending the error rows to the given error_rows list.
+        Only one batch of success rows is held in memory at a time.
         """
-        # partition and chain successes and errors
-        success_rows, error_rows = izip(*batched_rows)
-        success_rows = list(chain(*success_rows))
-        error_rows = list(chain(*error_rows))
+        for success_rows, batch_error_rows in batched_rows:
+            error_rows.extend(batch_error_rows)
 
-        # update metrics on task status
-        context.task_progress.succeeded = len(success_rows)
-        context.task_progress.failed = len(error_rows)
-        context.task_progress.attempted = context.task_progress.succeeded + context.task_progress.failed
-        context.task_progress.total = context.task_progress.attempted
-        return success_rows, error_rows
+            # update metrics on task status
+            context.task_progress.succeeded += len(success_rows)
+            context.task_progress.failed += len(batch_error_rows)
+            context.task_progress.attempted = context.task_progress.succeeded + context.task_progress.failed
+            context.task_progress.total = context.task_progress.attempted
+
+            for row in success_rows:
+                yield row
 
     def _upload(self, context, success_headers, success_rows, error_headers, error_rows):
         """
-        Creates and uploads a CSV for the given headers and rows.
+        Creates and uploads a CSV for the given headers and rows.  The
+        success_rows are written out as they are generated, so error_rows
+        is complete only once they have been uploaded.
         """
         date = datetime.now(UTC)
-        upload_csv_to_report_store([success_headers] + success_rows, 'grade_report', context.course_id, date)
+        upload_csv_to_report_store(chain([success_headers], success_rows), 'grade_report', context.course_id, date)
         if len(error_rows) > 0:
             error_rows = [error_headers] + error_rows
             upload_csv_to_report_store(error_rows, 'grade_report_err', context.course_id, date)
@@ -348,6 +533,31 @@ class CourseGradeReport(object):
         batch_users = users_for_course(context.course_id)
         return batch_users
 
+    def _enrolled_users(self, course_id):
+        """
+        Returns a queryset of all users enrolled in the course, including
+        inactive enrollments.
+        """
+        return CourseEnrollment.objects.users_enrolled_in(course_id, include_inactive=True)
+
+    def _batch_users_in_range(self, context, first_user_id, last_user_id):
+        """
+        Returns a generator of batches of the enrolled users whose ids are
+        within the given inclusive range, in order of user id.
+        """
+        users = self._enrolled_users(context.course_id).filter(
+            id__gte=first_user_id,
+            id__lte=last_user_id,
+        ).select_related('profile').order_by('id')
+        batch = []
+        for user in users.iterator():
+            batch.append(user)
+            if len(batch) == self.USER_BATCH_SIZE:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
     def _user_grades(self, course_grade, context):
         """
         Returns a list of grade results for the given course_grade corresponding
@@ -477,7 +687,7 @@ class CourseGradeReport(object):
             bulk_context = _CourseGradeBulkContext(context, users)
 
             success_rows, error_rows = [], []
-            for user, course_grade, error in CourseGradeFactory().iter(
+            for user, course_grade, error in CourseGradeFactory().iter_batched(
                 users,
                 course=context.course,
                 collected_block_structure=context.course_structure,
@@ -509,7 +719,6 @@ class ProblemGradeReport(object):
         """
         start_time = time()
         start_date = datetime.now(UTC)
-        status_interval = 100
         enrolled_students = CourseEnrollment.objects.users_enrolled_in(course_id, include_inactive=True)
         task_progress = TaskProgress(action_name, enrolled_students.count(), start_time)
 
@@ -522,15 +731,40 @@ class ProblemGradeReport(object):
         graded_scorable_blocks = cls._graded_scorable_blocks_to_header(course)
 
         # Just generate the static fields for now.
-        rows = [list(header_row.values()) + ['Enrollment Status', 'Grade'] + _flatten(graded_scorable_blocks.values())]
+        header = list(header_row.values()) + ['Enrollment Status', 'Grade'] + _flatten(graded_scorable_blocks.values())
         error_rows = [list(header_row.values()) + ['error_msg']]
-        current_step = {'step': 'Calculating Grades'}
 
         # Bulk fetch and cache enrollment states so we can efficiently determine
         # whether each user is currently enrolled in the course.
         CourseEnrollment.bulk_fetch_enrollment_states(enrolled_students, course_id)
 
-        for student, course_grade, error in CourseGradeFactory().iter(enrolled_students, course):
+        rows = cls._rows(
+            course, enrolled_students, header_row, graded_scorable_blocks, task_progress, error_rows,
+        )
+
+        # Perform the upload if any students have been successfully graded,
+        # writing out the rows as they are generated.
+        first_row = next(rows, None)
+        if first_row is not None:
+            upload_csv_to_report_store(
+                chain([header, first_row], rows), 'problem_grade_report', course_id, start_date,
+            )
+        # If there are any error rows, write them out as well
+        if len(error_rows) > 1:
+            upload_csv_to_report_store(error_rows, 'problem_grade_report_err', course_id, start_date)
+
+        return task_progress.update_task_state(extra_meta={'step': 'Uploading CSV'})
+
+    @classmethod
+    def _rows(cls, course, enrolled_students, header_row, graded_scorable_blocks, task_progress, error_rows):
+        """
+        Returns a generator of the report rows of the successfully graded
+        students, appending the rows of the students that could not be
+        graded to the given error_rows list.
+        """
+        status_interval = 100
+        current_step = {'step': 'Calculating Grades'}
+        for student, course_grade, error in CourseGradeFactory().iter_batched(enrolled_students, course):
             student_fields = [getattr(student, field_name) for field_name in header_row]
             task_progress.attempted += 1
 
@@ -543,7 +777,7 @@ class ProblemGradeReport(object):
                 task_progress.failed += 1
                 continue
 
-            enrollment_status = _user_enrollment_status(student, course_id)
+            enrollment_status = _user_enrollment_status(student, course.id)
 
             earned_possible_values = []
             for block_location in graded_scorable_blocks:
@@ -557,21 +791,12 @@ class ProblemGradeReport(object):
                     else:
                         earned_possible_values.append([u'Not Attempted', problem_score.possible])
 
-            rows.append(student_fields + [enrollment_status, course_grade.percent] + _flatten(earned_possible_values))
+            yield student_fields + [enrollment_status, course_grade.percent] + _flatten(earned_possible_values)
 
             task_progress.succeeded += 1
             if task_progress.attempted % status_interval == 0:
                 task_progress.update_task_state(extra_meta=current_step)
 
-        # Perform the upload if any students have been successfully graded
-        if len(rows) > 1:
-            upload_csv_to_report_store(rows, 'problem_grade_report', course_id, start_date)
-        # If there are any error rows, write them out as well
-        if len(error_rows) > 1:
-            upload_csv_to_report_store(error_rows, 'problem_grade_report_err', course_id, start_date)
-
-        return task_progress.update_task_state(extra_meta={'step': 'Uploading CSV'})
-
     @classmethod
     def _graded_scorable_blocks_to_header(cls, course):
         """
@@ -728,17 +953,16 @@ class ProblemResponses(object):
             usage_key_str=problem_location
         )
 
-        for data in student_data:
-            for key in student_data_keys:
-                data.setdefault(key, '')
-
-        header, rows = format_dictlist(student_data, student_data_keys)
+        # Format the rows as they are written out, rather than building a
+        # second copy of the responses in memory.
+        rows = chain(
+            [student_data_keys],
+            ([data.get(key, '') for key in student_data_keys] for data in student_data),
+        )
 
-        task_progress.attempted = task_progress.succeeded = len(rows)
+        task_progress.attempted = task_progress.succeeded = len(student_data)
         task_progress.skipped = task_progress.total - task_progress.attempted
 
-        rows.insert(0, header)
-
         current_step = {'step': 'Uploading CSV'}
         task_progress.update_task_state(extra_meta=current_step)
 
@@ -3,6 +3,8 @@ Instructor Tasks related to module state.
 """
 import json
 import logging
+from collections import defaultdict
+from itertools import islice
 from time import time
 
 from django.utils.translation import ugettext_noop
@@ -14,7 +16,7 @@ from courseware.model_data import DjangoKeyValueStore, FieldDataCache
 from courseware.models import StudentModule
 from courseware.module_render import get_module_for_descriptor_internal
 from lms.djangoapps.grades.events import GRADES_OVERRIDE_EVENT_TYPE, GRADES_RESCORE_EVENT_TYPE
-from student.models import get_user_by_username_or_email
+from student.models import anonymous_id_for_user, get_user_by_username_or_email
 from track.event_transaction_utils import create_new_event_transaction_id, set_event_transaction_type
 from track.views import task_track
 from util.db import outer_atomic
@@ -28,8 +30,13 @@ from .utils import UNKNOWN_TASK_ID, UPDATE_STATUS_FAILED, UPDATE_STATUS_SKIPPED,
 
 TASK_LOG = logging.getLogger('edx.celery.task')
 
+# The number of StudentModules passed to each call of the prefetch_fcn of
+# perform_module_state_update.
+PREFETCH_BATCH_SIZE = 100
 
-def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, task_input, action_name):
+
+def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, task_input, action_name,
+                                prefetch_fcn=None):
     """
     Performs generic update by visiting StudentModule instances with the update_fcn provided.
 
@@ -41,6 +48,9 @@ def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, ta
     on the particular student module failed.
     A raised exception indicates a fatal condition -- that no other student modules should be considered.
 
+    If `prefetch_fcn` is not None, it is called with the problem descriptors by location and each batch
+    of PREFETCH_BATCH_SIZE StudentModules, before the StudentModules of the batch are updated.
+
     The return value is a dict containing the task's results, with the following keys:
 
           'attempted': number of attempts made
@@ -82,10 +92,16 @@ def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, ta
     modules_to_update = _get_modules_to_update(
         course_id, usage_keys, student_identifier, filter_fcn, override_score_task
     )
+    if prefetch_fcn is not None and hasattr(modules_to_update, 'select_related'):
+        # The prefetch and the updates read the learner of each StudentModule.
+        modules_to_update = modules_to_update.select_related('student')
 
     task_progress = TaskProgress(action_name, len(modules_to_update), start_time)
     task_progress.update_task_state()
 
+    if prefetch_fcn is not None:
+        modules_to_update = _prefetch_in_batches(modules_to_update, problems, prefetch_fcn)
+
     for module_to_update in modules_to_update:
         task_progress.attempted += 1
         module_descriptor = problems[unicode(module_to_update.module_state_key)]
@@ -106,6 +122,58 @@ def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, ta
     return task_progress.update_task_state()
 
 
+def _prefetch_in_batches(modules_to_update, problems, prefetch_fcn):
+    """
+    Yields the StudentModules to update, calling `prefetch_fcn` on each batch
+    of PREFETCH_BATCH_SIZE of them before yielding them.
+    """
+    modules_iterator = iter(modules_to_update)
+    batch = list(islice(modules_iterator, PREFETCH_BATCH_SIZE))
+    while batch:
+        prefetch_fcn(problems, batch)
+        for module_to_update in batch:
+            yield module_to_update
+        batch = list(islice(modules_iterator, PREFETCH_BATCH_SIZE))
+
+
+def prefetch_rescore_module_states(xmodule_instance_args, problems, student_modules):
+    """
+    Executes the script code of the capa problems of the given StudentModules
+    for all of their learners at once (see LoncapaProblem.prefetch_contexts),
+    so that rescoring each of them finds its problem context in the cache of
+    safe_exec instead of executing the code again.
+    """
+    student_modules_by_problem = defaultdict(list)
+    for student_module in student_modules:
+        student_modules_by_problem[unicode(student_module.module_state_key)].append(student_module)
+
+    for location, problem_student_modules in student_modules_by_problem.iteritems():
+        learners = []
+        for student_module in problem_student_modules:
+            seed = json.loads(student_module.state or '{}').get('seed')
+            if seed is not None:
+                # The anonymous id which module_render gives to XModules.
+                learners.append((seed, anonymous_id_for_user(student_module.student, None, save=False)))
+        if len(learners) < 2:
+            continue
+
+        student_module = problem_student_modules[0]
+        with modulestore().bulk_operations(student_module.course_id):
+            try:
+                instance = _get_module_instance_for_task(
+                    student_module.course_id,
+                    student_module.student,
+                    problems[location],
+                    xmodule_instance_args,
+                    grade_bucket_type='rescore',
+                )
+            except (LoncapaProblemError, StudentInputError, ResponseError):
+                # Rescoring will report the error.
+                continue
+        if instance is not None and hasattr(instance, 'lcp'):
+            instance.lcp.prefetch_contexts(learners)
+
+
 @outer_atomic
 def rescore_problem_module_state(xmodule_instance_args, module_descriptor, student_module, task_input):
     '''
@@ -24,6 +24,8 @@ def upload_csv_to_report_store(rows, csv_name, course_id, timestamp, config_name
                 [row1_colum1, row1_colum2, ...],
                 ...
             ]
+            Any iterable of rows, such as a generator, may be passed to
+            write the rows out as they are produced.
         csv_name: Name of the resulting CSV
         course_id: ID of the course
 
@@ -31,17 +33,48 @@ def upload_csv_to_report_store(rows, csv_name, course_id, timestamp, config_name
         report_name: string - Name of the generated report
     """
     report_store = ReportStore.from_config(config_name)
-    report_name = u"{course_prefix}_{csv_name}_{timestamp_str}.csv".format(
-        course_prefix=course_filename_prefix_generator(course_id),
-        csv_name=csv_name,
-        timestamp_str=timestamp.strftime("%Y-%m-%d-%H%M")
-    )
+    report_name = _report_name(csv_name, course_id, timestamp)
 
     report_store.store_rows(course_id, report_name, rows)
     tracker_emit(csv_name)
     return report_name
 
 
+def upload_csv_parts_to_report_store(header_rows, part_filenames, csv_name, course_id, timestamp,
+                                     config_name='GRADES_DOWNLOAD'):
+    """
+    Upload a CSV assembled from the header rows and the given CSV parts,
+    previously stored with `ReportStore.store_rows`, using ReportStore.
+
+    Arguments:
+        header_rows: CSV rows to write before the rows of the parts.
+        part_filenames: Names of the stored CSV parts, in order.
+        csv_name: Name of the resulting CSV
+        course_id: ID of the course
+
+    Returns:
+        report_name: string - Name of the generated report
+    """
+    report_store = ReportStore.from_config(config_name)
+    report_name = _report_name(csv_name, course_id, timestamp)
+
+    report_store.store_concatenated_rows(course_id, report_name, header_rows, part_filenames)
+    tracker_emit(csv_name)
+    return report_name
+
+
+def _report_name(csv_name, course_id, timestamp):
+    """
+    Returns the name of the report file for the given CSV name, course
+    and timestamp.
+    """
+    return u"{course_prefix}_{csv_name}_{timestamp_str}.csv".format(
+        course_prefix=course_filename_prefix_generator(course_id),
+        csv_name=csv_name,
+        timestamp_str=timestamp.strftime("%Y-%m-%d-%H%M")
+    )
+
+
 def tracker_emit(report_name):
     """
     Emits a 'report.requested' event for the given report.
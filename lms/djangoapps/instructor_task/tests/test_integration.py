@@ -13,11 +13,13 @@ from collections import namedtuple
 import ddt
 from celery.states import FAILURE, SUCCESS
 from django.contrib.auth.models import User
+from django.core.cache.backends.dummy import DummyCache
 from django.urls import reverse
 from mock import patch
 from six import text_type
 
 from capa.responsetypes import StudentInputError
+from capa.safe_exec import safe_exec_batch
 from capa.tests.response_xml_factory import CodeResponseXMLFactory, CustomResponseXMLFactory
 from courseware.model_data import StudentModule
 from lms.djangoapps.grades.course_grade_factory import CourseGradeFactory
@@ -428,6 +430,39 @@ class TestRescoringTask(TestIntegrationTask):
         for user in self.users:
             self.check_state(user, descriptor, 0, 1, expected_attempts=2)
 
+    def test_rescoring_executes_script_in_one_batch(self):
+        """Rescoring all students executes the problem's script for all of them at once"""
+        problem_url_name = 'H1P1'
+        self.define_randomized_custom_response_problem(problem_url_name)
+        location = InstructorTaskModuleTestCase.problem_location(problem_url_name)
+        descriptor = self.module_store.get_item(location)
+        for user in self.users:
+            self.render_problem(user.username, problem_url_name)
+            self.submit_student_answer(user.username, problem_url_name, ["1000", "1000"])
+            self.check_state(user, descriptor, 0, 1, expected_attempts=1)
+
+        with patch('capa.capa_problem.safe_exec_batch', wraps=safe_exec_batch) as mock_safe_exec_batch:
+            self.submit_rescore_all_student_answers('instructor', problem_url_name)
+
+        self.assertEqual(mock_safe_exec_batch.call_count, 1)
+        self.assertEqual(len(mock_safe_exec_batch.call_args[0][1]), len(self.users))
+        for user in self.users:
+            self.check_state(user, descriptor, 0, 1, expected_attempts=1)
+
+    def test_rescoring_without_cache_executes_script_per_student(self):
+        """Rescoring doesn't prefetch the problem's contexts when they can't be cached"""
+        problem_url_name = 'H1P1'
+        self.define_randomized_custom_response_problem(problem_url_name)
+        for user in self.users:
+            self.render_problem(user.username, problem_url_name)
+            self.submit_student_answer(user.username, problem_url_name, ["1000", "1000"])
+
+        with patch('lms.djangoapps.instructor_task.tasks.caches', {'default': DummyCache('dummy', {})}):
+            with patch('capa.capa_problem.safe_exec_batch') as mock_safe_exec_batch:
+                self.submit_rescore_all_student_answers('instructor', problem_url_name)
+
+        self.assertFalse(mock_safe_exec_batch.called)
+
 
 class TestResetAttemptsTask(TestIntegrationTask):
     """
@@ -1,21 +1,24 @@
 """
 Tests for instructor_task/models.py.
 """
+import codecs
 import copy
 import time
 from cStringIO import StringIO
 
 import boto
+import ddt
 from django.conf import settings
 from django.test import SimpleTestCase, TestCase, override_settings
 from mock import patch
 from opaque_keys.edx.locator import CourseLocator
 
 from common.test.utils import MockS3Mixin
-from lms.djangoapps.instructor_task.models import ReportStore
+from lms.djangoapps.instructor_task.models import DjangoStorageReportStore, ReportStore
 from lms.djangoapps.instructor_task.tests.test_base import TestReportMixin
 
 
+@ddt.ddt
 class ReportStoreTestMixin(object):
     """
     Mixin for report store tests.
@@ -51,6 +54,45 @@ class ReportStoreTestMixin(object):
             ['new_file', 'middle_file', 'old_file']
         )
 
+    def read_report(self, report_store, filename):
+        """
+        Returns the contents of the given file in the report store.
+        """
+        with report_store.storage.open(report_store.path_to(self.course_id, filename)) as report_file:
+            return report_file.read()
+
+    @ddt.data(1024 * 1024, 1)
+    def test_store_rows_from_generator(self, spool_max_size):
+        """
+        Test that rows produced by a generator are written out, whether
+        the csv is spooled in memory or on disk.
+        """
+        report_store = self.create_report_store()
+        rows = ([u'r\xe9sum\xe9', index] for index in range(3))
+        with patch.object(DjangoStorageReportStore, 'CSV_SPOOL_MAX_SIZE', spool_max_size):
+            report_store.store_rows(self.course_id, 'report.csv', rows)
+        self.assertEqual(
+            self.read_report(report_store, 'report.csv'),
+            codecs.BOM_UTF8 + u'r\xe9sum\xe9,0\r\nr\xe9sum\xe9,1\r\nr\xe9sum\xe9,2\r\n'.encode('utf-8'),
+        )
+
+    def test_store_concatenated_rows(self):
+        """
+        Test that parts stored with store_rows are concatenated after the
+        header, with a single unicode signature.
+        """
+        report_store = self.create_report_store()
+        report_store.store_rows(self.course_id, 'parts/part_1.csv', [['a', 1], ['b', 2]])
+        report_store.store_rows(self.course_id, 'parts/part_2.csv', [['c', 3]])
+        report_store.store_concatenated_rows(
+            self.course_id, 'report.csv', [['name', 'value']], ['parts/part_1.csv', 'parts/part_2.csv'],
+        )
+        self.assertEqual(
+            self.read_report(report_store, 'report.csv'),
+            codecs.BOM_UTF8 + 'name,value\r\na,1\r\nb,2\r\nc,3\r\n',
+        )
+        self.assertEqual([link[0] for link in report_store.links_for(self.course_id)], ['report.csv'])
+
 
 class LocalFSReportStoreTestCase(ReportStoreTestMixin, TestReportMixin, SimpleTestCase):
     """
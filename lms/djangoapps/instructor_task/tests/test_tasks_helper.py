@@ -9,11 +9,13 @@ Unit tests for LMS instructor-initiated background tasks helper functions.
 """
 
 import os
+import re
 import shutil
 import tempfile
 import urllib
 from contextlib import contextmanager
 from datetime import datetime, timedelta
+from uuid import uuid4
 
 import ddt
 import unicodecsv
@@ -67,6 +69,8 @@ from lms.djangoapps.instructor_task.tasks_helper.enrollments import (
 from lms.djangoapps.instructor_task.tasks_helper.grades import (
     ENROLLED_IN_COURSE,
     NOT_ENROLLED_IN_COURSE,
+    PARALLELIZE_COURSE_GRADE_REPORT,
+    WAFFLE_SWITCHES,
     CourseGradeReport,
     ProblemGradeReport,
     ProblemResponses,
@@ -76,6 +80,7 @@ from lms.djangoapps.instructor_task.tasks_helper.misc import (
     upload_course_survey_report,
     upload_ora2_data,
 )
+from lms.djangoapps.instructor_task.tests.factories import InstructorTaskFactory
 from lms.djangoapps.instructor_task.tests.test_base import (
     InstructorTaskCourseTestCase,
     InstructorTaskModuleTestCase,
@@ -140,7 +145,7 @@ class TestInstructorGradeReport(InstructorGradeReportTestCase):
         self.assertDictContainsSubset({'attempted': num_students, 'succeeded': num_students, 'failed': 0}, result)
 
     @patch('lms.djangoapps.instructor_task.tasks_helper.runner._get_current_task')
-    @patch('lms.djangoapps.grades.course_grade_factory.CourseGradeFactory.iter')
+    @patch('lms.djangoapps.grades.course_grade_factory.CourseGradeFactory.iter_batched')
     def test_grading_failure(self, mock_grades_iter, _mock_current_task):
         """
         Test that any grading errors are properly reported in the
@@ -317,7 +322,7 @@ class TestInstructorGradeReport(InstructorGradeReportTestCase):
         )
 
     @patch('lms.djangoapps.instructor_task.tasks_helper.runner._get_current_task')
-    @patch('lms.djangoapps.grades.course_grade_factory.CourseGradeFactory.iter')
+    @patch('lms.djangoapps.grades.course_grade_factory.CourseGradeFactory.iter_batched')
     def test_unicode_in_csv_header(self, mock_grades_iter, _mock_current_task):
         """
         Tests that CSV grade report works if unicode in headers.
@@ -442,6 +447,94 @@ class TestInstructorGradeReport(InstructorGradeReportTestCase):
         )
 
 
+@patch.object(CourseGradeReport, 'USERS_PER_SUBTASK', 2)
+class TestParallelCourseGradeReport(InstructorGradeReportTestCase):
+    """
+    Tests that CSV grade reports generated in parallel chunks match
+    those generated by a single task.
+    """
+    def setUp(self):
+        super(TestParallelCourseGradeReport, self).setUp()
+        self.course = CourseFactory.create()
+        self.students = [
+            self.create_student(u'student{}'.format(index), u'student{}@example.com'.format(index))
+            for index in range(5)
+        ]
+        self.entry = InstructorTaskFactory.create(
+            course_id=self.course.id,
+            task_type='grade_course',
+            task_id=str(uuid4()),
+        )
+
+    def _queue_chunks(self):
+        """
+        Generates the report in parallel, returning the report input that
+        was handed to the chunk subtasks instead of queuing them.
+        """
+        with WAFFLE_SWITCHES.override(PARALLELIZE_COURSE_GRADE_REPORT, active=True):
+            with patch('lms.djangoapps.instructor_task.tasks.calculate_grades_csv_chunk.apply_async') as mock_queue:
+                with patch('lms.djangoapps.instructor_task.tasks_helper.runner._get_current_task'):
+                    CourseGradeReport.generate(None, self.entry.id, self.course.id, None, 'graded')
+        self.assertEqual(mock_queue.call_count, 3)
+        return mock_queue.call_args[0][0][2]
+
+    def _report_usernames(self, csv_name):
+        """
+        Returns the usernames listed in the report with the given name.
+        """
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        report_names = [
+            name for name, _ in report_store.links_for(self.course.id)
+            if re.search(u'_{}_\\d'.format(csv_name), name)
+        ]
+        self.assertEqual(len(report_names), 1)
+        report_path = report_store.path_to(self.course.id, report_names[0])
+        with report_store.storage.open(report_path) as csv_file:
+            return [row['Username'] for row in unicodecsv.DictReader(csv_file, encoding='utf-8-sig')]
+
+    def test_merged_report(self):
+        report_input = self._queue_chunks()
+        self.assertEqual([chunk['num_users'] for chunk in report_input['chunks']], [2, 2, 1])
+
+        # Grade the chunks out of order, as concurrent subtasks may.
+        for chunk_index in reversed(range(len(report_input['chunks']))):
+            self.assertEqual(CourseGradeReport.generate_chunk(None, self.entry.id, report_input, chunk_index), (
+                report_input['chunks'][chunk_index]['num_users'], 0,
+            ))
+        CourseGradeReport.merge_chunks(None, self.entry.id, report_input)
+
+        self.assertEqual(self._report_usernames('grade_report'), [student.username for student in self.students])
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        self.assertEqual(len(report_store.links_for(self.course.id)), 1)
+        self.assertFalse(report_store.exists(
+            self.course.id, u'{}/{}_00000_grades.csv'.format(CourseGradeReport.CHUNKS_DIRECTORY, self.entry.id),
+        ))
+
+    def test_failed_chunk(self):
+        report_input = self._queue_chunks()
+        CourseGradeReport.generate_chunk(None, self.entry.id, report_input, 0)
+        CourseGradeReport.generate_chunk(None, self.entry.id, report_input, 2)
+        CourseGradeReport.merge_chunks(None, self.entry.id, report_input)
+
+        self.assertEqual(
+            self._report_usernames('grade_report'),
+            [self.students[0].username, self.students[1].username, self.students[4].username],
+        )
+        self.assertEqual(
+            self._report_usernames('grade_report_err'),
+            [self.students[2].username, self.students[3].username],
+        )
+
+    def test_small_course(self):
+        with patch.object(CourseGradeReport, 'USERS_PER_SUBTASK', len(self.students)):
+            with WAFFLE_SWITCHES.override(PARALLELIZE_COURSE_GRADE_REPORT, active=True):
+                with patch('lms.djangoapps.instructor_task.tasks.calculate_grades_csv_chunk.apply_async') as mock_queue:
+                    with patch('lms.djangoapps.instructor_task.tasks_helper.runner._get_current_task'):
+                        result = CourseGradeReport.generate(None, self.entry.id, self.course.id, None, 'graded')
+        self.assertFalse(mock_queue.called)
+        self.assertDictContainsSubset({'attempted': 5, 'succeeded': 5, 'failed': 0}, result)
+
+
 class TestTeamGradeReport(InstructorGradeReportTestCase):
     """ Test that teams appear correctly in the grade report when it is enabled for the course. """
 
@@ -925,7 +1018,7 @@ class TestProblemGradeReport(TestReportMixin, InstructorTaskModuleTestCase):
         ])
 
     @patch('lms.djangoapps.instructor_task.tasks_helper.runner._get_current_task')
-    @patch('lms.djangoapps.grades.course_grade_factory.CourseGradeFactory.iter')
+    @patch('lms.djangoapps.grades.course_grade_factory.CourseGradeFactory.iter_batched')
     @ddt.data(u'Cannot grade student', '')
     def test_grading_failure(self, error_message, mock_grades_iter, _mock_current_task):
         """
@@ -864,6 +864,7 @@ MODULESTORE = {
                         'default_class': 'xmodule.hidden_module.HiddenDescriptor',
                         'fs_root': DATA_DIR,
                         'render_template': 'edxmako.shortcuts.render_to_string',
+                        'prefetch_definitions': True,
                     }
                 },
                 {
@@ -881,6 +882,38 @@ MODULESTORE = {
     }
 }
 
+# Maximum total size, in pickled bytes, of the deserialized split modulestore
+# structures cached in each process.  Set to 0 to disable the cache.
+COURSE_STRUCTURE_PROCESS_CACHE_SIZE = 50 * 1024 * 1024
+
+# Local disk cache of the course assets too large for the course_assets cache,
+# shared by the processes of a server.  Set DIRECTORY to enable it.
+CONTENTSERVER_DISK_CACHE = {
+    'DIRECTORY': None,
+    'MAX_SIZE': 1024 * 1024 * 1024,
+}
+
+# Maximum total size of the chunks of recently ranged course assets cached in
+# each process.  Set to 0 to disable the cache.
+CONTENTSERVER_RANGE_CACHE_SIZE = 32 * 1024 * 1024
+
+# Maximum total size of the XBlock fragment contents whose static, course and
+# jump_to_id urls were rewritten, cached in each process.  Set to 0 to disable
+# the cache.
+URL_REWRITE_CACHE_SIZE = 16 * 1024 * 1024
+
+# Maximum number of keep-alive connections to the comments service kept open by
+# each process.  Set to 0 to open a new connection for every request.
+COMMENTS_SERVICE_POOL_SIZE = 10
+
+# Number of threads of each process making independent requests to the comments
+# service concurrently.  Set to 0 to make them one after another.
+COMMENTS_SERVICE_MAX_WORKERS = 4
+
+# Number of seconds the responses of the comments service to GET requests are
+# cached for.  Set to 0 to disable the cache.
+COMMENTS_SERVICE_CACHE_TIMEOUT = 0
+
 #################### Python sandbox ############################################
 
 CODE_JAIL = {
@@ -894,6 +927,14 @@ CODE_JAIL = {
         # How many CPU seconds can jailed code use?
         'CPU': 1,
     },
+
+    # Pool of pre-started sandbox workers for safe_exec (see
+    # capa/safe_exec/pool.py).  A size of 0 disables it.  Each worker is
+    # replaced after max_executions executions.
+    'pool': {
+        'size': 0,
+        'max_executions': 100,
+    },
 }
 
 # Some courses are allowed to run unsafe code. This is a list of regexes, one
@@ -1903,6 +1944,19 @@ BLOCK_STRUCTURES_SETTINGS = dict(
 
     # Backend storage options
     PRUNING_ACTIVE=False,
+
+    # Format in which collected block structures are serialized
+    # into the cache and storage: 'pickle' or 'columnar'.
+    SERIALIZATION_FORMAT='pickle',
+
+    # Maximum total size, in bytes, of serialized block structures kept
+    # in each process in front of the cache.  0 disables the local tier.
+    LOCAL_CACHE_MAX_BYTES=0,
+
+    # Number of seconds after which a locally cached block structure is
+    # refetched.  Bounds staleness across processes when storage backing
+    # is disabled, since entries are then not versioned.
+    LOCAL_CACHE_TIMEOUT=5 * 60,
 )
 
 ################################ Bulk Email ###################################
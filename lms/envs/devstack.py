@@ -58,6 +58,7 @@ INSTALLED_APPS += ['debug_toolbar', 'debug_toolbar_mongo']
 MIDDLEWARE_CLASSES += [
     'django_comment_client.utils.QueryCountDebugMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
+    'openedx.core.djangoapps.content.block_structure.middleware.TransformerTimingMiddleware',
 ]
 
 INTERNAL_IPS = ('127.0.0.1',)
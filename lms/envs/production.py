@@ -561,6 +561,15 @@ XQUEUE_INTERFACE = AUTH_TOKENS['XQUEUE_INTERFACE']
 # Get the MODULESTORE from auth.json, but if it doesn't exist,
 # use the one from common.py
 MODULESTORE = convert_module_store_setting_if_needed(AUTH_TOKENS.get('MODULESTORE', MODULESTORE))
+COURSE_STRUCTURE_PROCESS_CACHE_SIZE = ENV_TOKENS.get(
+    'COURSE_STRUCTURE_PROCESS_CACHE_SIZE', COURSE_STRUCTURE_PROCESS_CACHE_SIZE
+)
+CONTENTSERVER_DISK_CACHE = ENV_TOKENS.get('CONTENTSERVER_DISK_CACHE', CONTENTSERVER_DISK_CACHE)
+CONTENTSERVER_RANGE_CACHE_SIZE = ENV_TOKENS.get('CONTENTSERVER_RANGE_CACHE_SIZE', CONTENTSERVER_RANGE_CACHE_SIZE)
+URL_REWRITE_CACHE_SIZE = ENV_TOKENS.get('URL_REWRITE_CACHE_SIZE', URL_REWRITE_CACHE_SIZE)
+COMMENTS_SERVICE_POOL_SIZE = ENV_TOKENS.get('COMMENTS_SERVICE_POOL_SIZE', COMMENTS_SERVICE_POOL_SIZE)
+COMMENTS_SERVICE_MAX_WORKERS = ENV_TOKENS.get('COMMENTS_SERVICE_MAX_WORKERS', COMMENTS_SERVICE_MAX_WORKERS)
+COMMENTS_SERVICE_CACHE_TIMEOUT = ENV_TOKENS.get('COMMENTS_SERVICE_CACHE_TIMEOUT', COMMENTS_SERVICE_CACHE_TIMEOUT)
 CONTENTSTORE = AUTH_TOKENS.get('CONTENTSTORE', CONTENTSTORE)
 DOC_STORE_CONFIG = AUTH_TOKENS.get('DOC_STORE_CONFIG', DOC_STORE_CONFIG)
 MONGODB_LOG = AUTH_TOKENS.get('MONGODB_LOG', {})
@@ -218,6 +218,11 @@ CACHES = {
     },
 }
 
+COURSE_STRUCTURE_PROCESS_CACHE_SIZE = 0
+URL_REWRITE_CACHE_SIZE = 0
+COMMENTS_SERVICE_POOL_SIZE = 0
+COMMENTS_SERVICE_MAX_WORKERS = 0
+
 # Dummy secret key for dev
 SECRET_KEY = '85920908f28904ed733fe576320db18cabd7b6cd'
 
@@ -0,0 +1,137 @@
+"""
+An opt-in cache of the responses of the comments service to GET requests.
+
+Responses are cached for COMMENTS_SERVICE_CACHE_TIMEOUT seconds, keyed by the
+url and parameters of their request.  Each of them is stored with the
+generations of the scopes it depends on: its course, and the threads,
+comments and users in its url or response.  The generations of the scopes of
+the request are those read before it was sent.  A write made through the
+comment client gives the scopes of its url, parameters and response new
+generations, which invalidates the responses depending on them in every
+process.
+"""
+import hashlib
+import json
+import re
+from uuid import uuid4
+
+import six
+from django.conf import settings
+from django.core.cache import cache
+
+RESPONSE_KEY_PREFIX = 'comment_client.response'
+GENERATION_KEY_PREFIX = 'comment_client.generation'
+
+# The threads, comments and users which are the subjects of a url.
+_URL_SCOPE_PATTERN = re.compile(r'/(threads|comments|users)/([^/?]+)')
+
+# The fields of parameters and responses which identify the scopes they belong to.
+_FIELD_SCOPES = (
+    ('course_id', 'courses'),
+    ('thread_id', 'threads'),
+    ('user_id', 'users'),
+)
+
+
+def get_cache_timeout():
+    """
+    Returns the number of seconds responses are cached for, or 0 if they aren't.
+    """
+    return getattr(settings, 'COMMENTS_SERVICE_CACHE_TIMEOUT', 0)
+
+
+def is_cacheable(method, params):
+    """
+    Returns whether the response to a request can be cached.  Requests which
+    mark a thread as read have to reach the comments service.
+    """
+    return method.lower() == 'get' and not params.get('mark_as_read')
+
+
+def get_response_key(url, params, raw, language):
+    """
+    Returns the cache key of the response to a GET request.
+    """
+    request = json.dumps([url, params, raw, language], sort_keys=True, default=six.text_type)
+    return u'{}.{}'.format(RESPONSE_KEY_PREFIX, hashlib.sha1(request).hexdigest())
+
+
+def get_scopes(url, *objects):
+    """
+    Returns the set of the scopes of a url, and of the parameters and
+    responses in objects.
+    """
+    scopes = {u'{}:{}'.format(kind, subject_id) for kind, subject_id in _URL_SCOPE_PATTERN.findall(url)}
+    for obj in objects:
+        if isinstance(obj, dict):
+            for field, kind in _FIELD_SCOPES:
+                if obj.get(field):
+                    scopes.add(u'{}:{}'.format(kind, obj[field]))
+    return scopes
+
+
+def _get_generation_key(scope):
+    """
+    Returns the cache key of the generation of a scope.
+    """
+    return u'{}.{}'.format(GENERATION_KEY_PREFIX, hashlib.sha1(scope.encode('utf-8')).hexdigest())
+
+
+def _get_generations(scopes):
+    """
+    Returns a dict of the current generations of scopes, which are None for
+    the scopes which weren't written to recently.
+    """
+    keys = {scope: _get_generation_key(scope) for scope in scopes}
+    generations = cache.get_many(keys.values())
+    return {scope: generations.get(key) for scope, key in keys.items()}
+
+
+def get_response(key):
+    """
+    Returns whether a response is cached with key and is still valid, and the
+    response.
+    """
+    entry = cache.get(key)
+    if entry is None:
+        return False, None
+    generations, response = entry
+    if _get_generations(generations.keys()) != generations:
+        return False, None
+    return True, response
+
+
+def get_request_generations(url, params):
+    """
+    Returns the generations of the scopes of the url and parameters of a GET
+    request, which are read before sending it, so that its response isn't
+    valid for the writes made while it's sent.
+    """
+    return _get_generations(get_scopes(url, params))
+
+
+def set_response(key, url, params, response, timeout, request_generations):
+    """
+    Caches the response to a GET request with key for timeout seconds, with
+    the generations of the scopes of its request, read before sending it, and
+    the current generations of the other scopes of its response.
+    """
+    generations = dict(request_generations)
+    response_scopes = get_scopes(url, params, response) - set(generations)
+    generations.update(_get_generations(response_scopes))
+    cache.set(key, (generations, response), timeout)
+
+
+def invalidate_responses(method, url, params, response, timeout):
+    """
+    Invalidates the cached responses which depend on the scopes written to by
+    a request which isn't cacheable.  The new generations outlive the
+    responses cached before them.
+    """
+    if method.lower() == 'get':
+        # Marking a thread as read only changes what its user sees.
+        scopes = get_scopes(u'', {'user_id': params.get('user_id')})
+    else:
+        scopes = get_scopes(url, params, response)
+    generation = uuid4().hex
+    cache.set_many({_get_generation_key(scope): generation for scope in scopes}, timeout)
@@ -1,16 +1,38 @@
 """" Common utilities for comment client wrapper """
 import logging
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 from time import time
 from uuid import uuid4
 
 import requests
+import six
+from django.conf import settings
+from django.db import connections
+from django.utils import translation
 from django.utils.translation import get_language
+from edx_django_utils import monitoring as monitoring_utils
+from edx_django_utils.cache import RequestCache
+from requests.adapters import HTTPAdapter
+from six.moves import http_cookiejar
 
+from . import cache as response_cache
 from .settings import SERVICE_HOST as COMMENTS_SERVICE
 
 log = logging.getLogger(__name__)
 
+# The state of the threads of the pool which make concurrent requests.
+_worker_state = threading.local()
+
+_pool_lock = threading.Lock()
+_session = None
+_session_key = None
+_executor = None
+_executor_key = None
+
 
 def strip_none(dic):
     return dict([(k, v) for k, v in dic.iteritems() if v is not None])
@@ -29,11 +51,127 @@ def extract(dic, keys):
         return strip_none({k: dic.get(k) for k in keys})
 
 
-def perform_request(method, url, data_or_params=None, raw=False,
-                    metric_action=None, metric_tags=None, paged_results=False):
+def _get_forums_config_cache():
+    """
+    Returns the request cache of the current ForumsConfig.
+    """
+    # To avoid dependency conflict
+    from django_comment_common.models import FORUMS_CONFIG_CACHE_NAMESPACE
+    return RequestCache(FORUMS_CONFIG_CACHE_NAMESPACE)
+
+
+def get_forums_config():
+    """
+    Returns the current ForumsConfig, which is only read once per request.
+    """
+    request_cache = _get_forums_config_cache()
+    cached_response = request_cache.get_cached_response('config')
+    if cached_response.is_found:
+        return cached_response.value
     # To avoid dependency conflict
     from django_comment_common.models import ForumsConfig
     config = ForumsConfig.current()
+    request_cache.set('config', config)
+    return config
+
+
+def _get_session():
+    """
+    Returns the requests Session of this process, which keeps up to
+    COMMENTS_SERVICE_POOL_SIZE connections to the comments service alive, or
+    None if the connections aren't pooled.
+    """
+    global _session, _session_key  # pylint: disable=global-statement
+    pool_size = getattr(settings, 'COMMENTS_SERVICE_POOL_SIZE', 0)
+    if not pool_size:
+        return None
+    # A forked process must not share the connections of its parent.
+    key = (os.getpid(), pool_size)
+    with _pool_lock:
+        if _session_key != key:
+            session = requests.Session()
+            # The session is used for the requests of all of the users, so it
+            # mustn't keep the cookies set by the comments service.
+            session.cookies.set_policy(http_cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session, _session_key = session, key
+        return _session
+
+
+def _send_request(method, url, **kwargs):
+    """
+    Sends a request to the comments service, on a pooled connection if possible.
+    """
+    session = _get_session()
+    if session is None:
+        return requests.request(method, url, **kwargs)
+    return session.request(method, url, **kwargs)
+
+
+def _get_endpoint_name(method, metric_action, metric_tags):
+    """
+    Returns the name of the endpoint of a request in its metrics, e.g.
+    "thread.retrieve" for the "model.retrieve" action of a Thread.
+    """
+    if not metric_action:
+        return method.lower()
+    if metric_action.startswith(u'model.'):
+        for tag in metric_tags:
+            if tag.startswith(u'model_class:'):
+                return u'{}.{}'.format(tag.split(u':', 1)[1].lower(), metric_action.split(u'.', 1)[1])
+    return metric_action
+
+
+def _accumulate_metric(name, value):
+    """
+    Accumulates a custom metric of the current transaction.  The metrics of
+    the threads of the pool are sent back to the thread of the transaction.
+    """
+    metrics = getattr(_worker_state, 'metrics', None)
+    if metrics is None:
+        monitoring_utils.accumulate(name, value)
+    else:
+        metrics.append((name, value))
+
+
+def _record_request_metrics(endpoint, duration, failed):
+    """
+    Records the number, latency and failures of the requests to an endpoint
+    of the comments service.
+    """
+    for prefix in (u'forums.', u'forums.{}.'.format(endpoint)):
+        _accumulate_metric(prefix + u'requests', 1)
+        _accumulate_metric(prefix + u'duration_ms', duration * 1000)
+        if failed:
+            _accumulate_metric(prefix + u'errors', 1)
+
+
+def _record_cache_metrics(endpoint, hit):
+    """
+    Records whether the response to a request to an endpoint of the comments
+    service was found in the cache.
+    """
+    name = u'cache_hits' if hit else u'cache_misses'
+    for prefix in (u'forums.', u'forums.{}.'.format(endpoint)):
+        _accumulate_metric(prefix + name, 1)
+
+
+def _invalidate_cached_responses(method, url, data_or_params, response, timeout):
+    """
+    Invalidates the cached responses which may have been changed by a request.
+    """
+    try:
+        response_data = response.json()
+    except ValueError:
+        response_data = None
+    response_cache.invalidate_responses(method, url, data_or_params, response_data, timeout)
+
+
+def perform_request(method, url, data_or_params=None, raw=False,
+                    metric_action=None, metric_tags=None, paged_results=False):
+    config = get_forums_config()
 
     if not config.enabled:
         raise CommentClientMaintenanceError('service disabled')
@@ -41,12 +179,24 @@ def perform_request(method, url, data_or_params=None, raw=False,
     if metric_tags is None:
         metric_tags = []
 
+    endpoint = _get_endpoint_name(method, metric_action, metric_tags)
     metric_tags.append(u'method:{}'.format(method))
     if metric_action:
         metric_tags.append(u'action:{}'.format(metric_action))
 
     if data_or_params is None:
         data_or_params = {}
+
+    cache_timeout = response_cache.get_cache_timeout()
+    cache_key = None
+    if cache_timeout and response_cache.is_cacheable(method, data_or_params):
+        cache_key = response_cache.get_response_key(url, data_or_params, raw, get_language())
+        is_found, cached_response = response_cache.get_response(cache_key)
+        _record_cache_metrics(endpoint, hit=is_found)
+        if is_found:
+            return cached_response
+        request_generations = response_cache.get_request_generations(url, data_or_params)
+
     headers = {
         'X-Edx-Api-Key': config.api_key,
         'Accept-Language': get_language(),
@@ -61,14 +211,22 @@ def perform_request(method, url, data_or_params=None, raw=False,
         data = None
         params = data_or_params.copy()
         params.update(request_id_dict)
-    response = requests.request(
-        method,
-        url,
-        data=data,
-        params=params,
-        headers=headers,
-        timeout=config.connection_timeout
-    )
+    start = time()
+    try:
+        response = _send_request(
+            method,
+            url,
+            data=data,
+            params=params,
+            headers=headers,
+            timeout=config.connection_timeout
+        )
+    except requests.RequestException:
+        _record_request_metrics(endpoint, time() - start, failed=True)
+        raise
+    _record_request_metrics(endpoint, time() - start, failed=response.status_code > 200)
+    if cache_timeout and cache_key is None:
+        _invalidate_cached_responses(method, url, data_or_params, response, cache_timeout)
 
     metric_tags.append(u'status_code:{}'.format(response.status_code))
     if response.status_code > 200:
@@ -85,7 +243,7 @@ def perform_request(method, url, data_or_params=None, raw=False,
         raise CommentClient500Error(response.text)
     else:
         if raw:
-            return response.text
+            data = response.text
         else:
             try:
                 data = response.json()
@@ -96,7 +254,73 @@ def perform_request(method, url, data_or_params=None, raw=False,
                         content=response.text[:100]
                     )
                 )
-            return data
+        if cache_key is not None:
+            response_cache.set_response(cache_key, url, data_or_params, data, cache_timeout, request_generations)
+        return data
+
+
+def _get_executor(max_workers):
+    """
+    Returns the pool of threads of this process which make concurrent requests.
+    """
+    global _executor, _executor_key  # pylint: disable=global-statement
+    key = (os.getpid(), max_workers)
+    with _pool_lock:
+        if _executor_key != key:
+            if _executor is not None and _executor_key[0] == key[0]:
+                _executor.shutdown(wait=False)
+            _executor, _executor_key = ThreadPoolExecutor(max_workers=max_workers), key
+        return _executor
+
+
+def _call_in_worker(function, language, config):
+    """
+    Calls function in a thread of the pool, with the language and ForumsConfig
+    of the request it's called for, and returns its result, the exc_info of
+    its exception if it raised one, and the metrics it accumulated.
+    """
+    _worker_state.metrics = metrics = []
+    _get_forums_config_cache().set('config', config)
+    try:
+        with translation.override(language):
+            return function(), None, metrics
+    except Exception:  # pylint: disable=broad-except
+        return None, sys.exc_info(), metrics
+    finally:
+        _worker_state.metrics = None
+        # The thread is reused for other requests.
+        RequestCache.clear_all_namespaces()
+        connections.close_all()
+
+
+def run_concurrently(*functions):
+    """
+    Calls the given functions, which make independent requests to the comments
+    service, in the pool of threads of this process, and returns the list of
+    their results.  Once they have all returned, the exception of the first
+    function which failed, if any, is raised.
+
+    The functions are called one after another in the current thread if
+    COMMENTS_SERVICE_MAX_WORKERS is lower than 2, or if the current thread is
+    already one of the pool.
+    """
+    max_workers = getattr(settings, 'COMMENTS_SERVICE_MAX_WORKERS', 0)
+    if max_workers < 2 or len(functions) < 2 or getattr(_worker_state, 'metrics', None) is not None:
+        return [function() for function in functions]
+
+    executor = _get_executor(max_workers)
+    language = get_language()
+    config = get_forums_config()
+    futures = [executor.submit(_call_in_worker, function, language, config) for function in functions]
+    outcomes = [future.result() for future in futures]
+
+    for __, __, metrics in outcomes:
+        for name, value in metrics:
+            monitoring_utils.accumulate(name, value)
+    for __, exc_info, __ in outcomes:
+        if exc_info is not None:
+            six.reraise(*exc_info)
+    return [result for result, __, __ in outcomes]
 
 
 class CommentClientError(Exception):
@@ -134,16 +358,15 @@ def check_forum_heartbeat():
     heartbeat django application.
     This function can be connected to the LMS heartbeat checker through the HEARTBEAT_CHECKS variable.
     """
-    # To avoid dependency conflict
-    from django_comment_common.models import ForumsConfig
-    config = ForumsConfig.current()
+    config = get_forums_config()
 
     if not config.enabled:
         # If this check is enabled but forums disabled, don't connect, just report no error
         return 'forum', True, 'OK'
 
     try:
-        res = requests.get(
+        res = _send_request(
+            'get',
             '%s/heartbeat' % COMMENTS_SERVICE,
             timeout=config.connection_timeout
         ).json()
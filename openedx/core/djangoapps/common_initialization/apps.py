@@ -13,6 +13,7 @@ class CommonInitializationConfig(AppConfig):
         # Common settings validations for the LMS and CMS.
         from . import checks
         self._add_mimetypes()
+        self._configure_sandbox_pool()
 
     @staticmethod
     def _add_mimetypes():
@@ -25,3 +26,22 @@ class CommonInitializationConfig(AppConfig):
         mimetypes.add_type('application/x-font-opentype', '.otf')
         mimetypes.add_type('application/x-font-ttf', '.ttf')
         mimetypes.add_type('application/font-woff', '.woff')
+
+    @staticmethod
+    def _configure_sandbox_pool():
+        """
+        Start the pool of sandbox workers of safe_exec, if CODE_JAIL configures one.
+        """
+        from django.conf import settings
+
+        code_jail = getattr(settings, 'CODE_JAIL', {})
+        pool_settings = code_jail.get('pool') or {}
+        if code_jail.get('python_bin') and pool_settings.get('size'):
+            from capa.safe_exec import pool
+
+            pool.configure_pool(
+                code_jail['python_bin'],
+                user=code_jail.get('user'),
+                size=pool_settings['size'],
+                max_executions=pool_settings.get('max_executions', 100),
+            )
@@ -5,6 +5,7 @@ from django.core.cache import cache
 from xmodule.modulestore.django import modulestore
 
 from .manager import BlockStructureManager
+from .store import BlockStructureStore
 
 
 def get_course_in_cache(course_key):
@@ -43,6 +44,17 @@ def clear_course_from_cache(course_key):
     get_block_structure_manager(course_key).clear()
 
 
+def clear_course_from_local_cache(course_key):
+    """
+    Clears the block structure for the given course_key from the
+    process-local cache tier of the current process only.  Other
+    processes notice the change through the versioned storage entry, or
+    when their local entry times out.
+    """
+    course_usage_key = modulestore().make_course_usage_key(course_key)
+    BlockStructureStore.delete_from_local_cache(course_usage_key)
+
+
 def get_block_structure_manager(course_key):
     """
     Returns the manager for managing Block Structures for the given course.
@@ -3,6 +3,8 @@ Module with family of classes for block structures.
     BlockStructure - responsible for block existence and relations.
     BlockStructureBlockData - responsible for block & transformer data.
     BlockStructureModulestoreData - responsible for xBlock data.
+    BlockStructureModulestoreChanges - responsible for xBlock data of
+        changed blocks.
 
 The following internal data structures are implemented:
     _BlockRelations - Data structure for a single block's relations.
@@ -23,6 +25,10 @@ logger = getLogger(__name__)  # pylint: disable=invalid-name
 # A dictionary key value for storing a transformer's version number.
 TRANSFORMER_VERSION_KEY = '_version'
 
+# Names of the xBlock fields with a block's edit info, which are
+# collected for every block.
+EDIT_INFO_FIELDS = ('edited_on', 'subtree_edited_on')
+
 
 class _BlockRelations(object):
     """
@@ -858,3 +864,56 @@ class BlockStructureModulestoreData(BlockStructureBlockData):
         """
         if hasattr(xblock, field_name):
             setattr(block_data, field_name, getattr(xblock, field_name))
+
+
+class BlockStructureModulestoreChanges(BlockStructureModulestoreData):
+    """
+    Subclass of BlockStructureModulestoreData that is responsible for
+    managing the xBlocks of the blocks whose collected data is outdated
+    in a previously collected block structure.
+
+    Besides the outdated blocks, the structure contains all of their
+    ancestors so that data percolated down from ancestors is collected
+    correctly.  xBlocks of any other blocks are loaded from the
+    modulestore on demand, without being added to the structure.
+    """
+    def __init__(self, root_block_usage_key, modulestore, outdated_block_keys, course_block_relations):
+        """
+        Arguments:
+            root_block_usage_key (UsageKey) - The usage_key for the root
+                of the block structure.
+
+            modulestore (ModuleStoreRead) - The modulestore from which
+                xBlocks are loaded on demand.
+
+            outdated_block_keys (set(UsageKey)) - The usage keys of the
+                blocks whose collected data is outdated.
+
+            course_block_relations (dict({UsageKey: _BlockRelations})) -
+                Map of the current relations of all blocks of the
+                updated block structure.
+        """
+        super(BlockStructureModulestoreChanges, self).__init__(root_block_usage_key)
+        self.outdated_block_keys = outdated_block_keys
+        self.course_block_relations = course_block_relations
+        self._modulestore = modulestore
+
+        # Map of a block's usage key to its xBlock loaded on demand.
+        # dict {UsageKey: XBlock}
+        self._loaded_xblock_map = {}
+
+    def get_xblock(self, usage_key):
+        """
+        Returns the instantiated xBlock for the given usage key, loading
+        it from the modulestore if it is not part of the structure.
+
+        Arguments:
+            usage_key (UsageKey) - Usage key of the block whose
+                xBlock object is to be returned.
+        """
+        try:
+            return self._xblock_map[usage_key]
+        except KeyError:
+            if usage_key not in self._loaded_xblock_map:
+                self._loaded_xblock_map[usage_key] = self._modulestore.get_item(usage_key, lazy=True)
+            return self._loaded_xblock_map[usage_key]
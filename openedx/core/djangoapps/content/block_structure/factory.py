@@ -1,7 +1,12 @@
 """
 Module for factory class for BlockStructure objects.
 """
-from .block_structure import BlockStructureModulestoreData, BlockStructureBlockData
+from .block_structure import (
+    BlockStructure,
+    BlockStructureBlockData,
+    BlockStructureModulestoreChanges,
+    BlockStructureModulestoreData,
+)
 
 
 class BlockStructureFactory(object):
@@ -57,6 +62,142 @@ class BlockStructureFactory(object):
         build_block_structure(root_xblock)
         return block_structure
 
+    @classmethod
+    def create_from_modulestore_changes(cls, collected_block_structure, modulestore):
+        """
+        Creates and returns a block structure from the modulestore
+        containing the blocks whose data in the given previously
+        collected block structure is outdated, along with their
+        ancestors.
+
+        The data of a block is outdated if the block was added or edited
+        since it was collected, or if any of its ancestors was.  Subtrees
+        whose edit info is unchanged since they were collected are not
+        loaded from the modulestore.
+
+        Arguments:
+            collected_block_structure (BlockStructureBlockData) - A
+                block structure previously collected from the
+                modulestore, including the blocks' edit info.
+
+            modulestore (ModuleStoreRead) - The modulestore that
+                contains the current data for the xBlocks within the
+                block structure.
+
+        Returns:
+            BlockStructureModulestoreChanges - The created block
+                structure, or None if the data of the root block is
+                outdated, in which case the entire block structure needs
+                to be collected again.
+        """
+        root_block_usage_key = collected_block_structure.root_block_usage_key
+        children_map = {}
+        xblock_map = {}
+        edited_block_keys = set()
+
+        def is_unchanged(xblock, field_name):
+            """
+            Returns whether the given edit info field of the xBlock has the
+            same known value as when it was collected.
+            """
+            value = getattr(xblock, field_name, None)
+            return (
+                value is not None and
+                xblock.location in collected_block_structure and
+                value == collected_block_structure.get_xblock_field(xblock.location, field_name)
+            )
+
+        def add_collected_subtree(block_key):
+            """
+            Recursively adds the collected relations of the given block
+            and its descendants.
+            """
+            if block_key in children_map:
+                return
+            children_map[block_key] = collected_block_structure.get_children(block_key)
+            for child_key in children_map[block_key]:
+                add_collected_subtree(child_key)
+
+        def find_edited_blocks(xblock):
+            """
+            Recursively finds the edited blocks within the given xBlock's
+            subtree, unless the entire subtree is unchanged.
+            """
+            if xblock.location in children_map:
+                return
+            if is_unchanged(xblock, 'edited_on') and is_unchanged(xblock, 'subtree_edited_on'):
+                add_collected_subtree(xblock.location)
+                return
+
+            xblock_map[xblock.location] = xblock
+            if not is_unchanged(xblock, 'edited_on'):
+                edited_block_keys.add(xblock.location)
+
+            children = xblock.get_children()
+            children_map[xblock.location] = [child.location for child in children]
+            for child in children:
+                find_edited_blocks(child)
+
+        root_xblock = modulestore.get_item(root_block_usage_key, depth=None, lazy=True)
+        find_edited_blocks(root_xblock)
+        if root_block_usage_key in edited_block_keys:
+            return None
+
+        course_block_relations = {}
+        BlockStructure._add_block(course_block_relations, root_block_usage_key)  # pylint: disable=protected-access
+        cls._add_relations(course_block_relations, root_block_usage_key, children_map)
+
+        # Blocks descending from edited blocks are outdated, and the
+        # structure includes all of their ancestors, up to the root.
+        outdated_block_keys = cls._find_related_blocks(course_block_relations, edited_block_keys, 'children')
+        included_block_keys = cls._find_related_blocks(course_block_relations, outdated_block_keys, 'parents')
+        included_block_keys.add(root_block_usage_key)
+
+        block_structure = BlockStructureModulestoreChanges(
+            root_block_usage_key, modulestore, outdated_block_keys, course_block_relations,
+        )
+        cls._add_relations(
+            block_structure._block_relations,  # pylint: disable=protected-access
+            root_block_usage_key,
+            children_map,
+            included_block_keys,
+        )
+        for block_key in block_structure:
+            xblock = xblock_map.get(block_key) or modulestore.get_item(block_key, lazy=True)
+            block_structure._add_xblock(block_key, xblock)  # pylint: disable=protected-access
+        return block_structure
+
+    @classmethod
+    def create_from_changes(cls, collected_block_structure, block_structure_changes):
+        """
+        Returns a new block structure with the data of the given
+        previously collected block structure, updated with the newly
+        collected data of the given block structure changes.
+
+        Arguments:
+            collected_block_structure (BlockStructureBlockData) - The
+                block structure that was previously collected.
+
+            block_structure_changes (BlockStructureModulestoreChanges) -
+                The block structure created by
+                create_from_modulestore_changes for the collected block
+                structure, with newly collected data.
+        """
+        block_relations = block_structure_changes.course_block_relations
+        block_data_map = {}
+        for block_key in block_relations:
+            if block_key in block_structure_changes:
+                block_data_map[block_key] = block_structure_changes[block_key]
+            else:
+                block_data_map[block_key] = collected_block_structure[block_key]
+
+        return cls.create_new(
+            block_structure_changes.root_block_usage_key,
+            block_relations,
+            block_structure_changes.transformer_data,
+            block_data_map,
+        )
+
     @classmethod
     def create_from_store(cls, root_block_usage_key, block_structure_store):
         """
@@ -95,3 +236,40 @@ class BlockStructureFactory(object):
         block_structure.transformer_data = transformer_data
         block_structure._block_data_map = block_data_map  # pylint: disable=protected-access
         return block_structure
+
+    @staticmethod
+    def _add_relations(block_relations, block_key, children_map, included_block_keys=None, blocks_visited=None):
+        """
+        Recursively adds the relations of the given block and its
+        descendants in the given children map to the given block
+        relations map, in the same order as create_from_modulestore,
+        optionally restricted to the given set of blocks.
+        """
+        if blocks_visited is None:
+            blocks_visited = set()
+        if block_key in blocks_visited:
+            return
+        blocks_visited.add(block_key)
+
+        for child_key in children_map[block_key]:
+            if included_block_keys is None or child_key in included_block_keys:
+                BlockStructure._add_to_relations(block_relations, block_key, child_key)  # pylint: disable=protected-access
+                BlockStructureFactory._add_relations(
+                    block_relations, child_key, children_map, included_block_keys, blocks_visited,
+                )
+
+    @staticmethod
+    def _find_related_blocks(block_relations, block_keys, relation_name):
+        """
+        Returns the set of the given blocks along with all blocks related
+        to them transitively through the given relation, either
+        'children' or 'parents', in the given block relations map.
+        """
+        related_block_keys = set(block_keys)
+        block_keys_to_visit = list(block_keys)
+        while block_keys_to_visit:
+            for related_key in getattr(block_relations[block_keys_to_visit.pop()], relation_name):
+                if related_key not in related_block_keys:
+                    related_block_keys.add(related_key)
+                    block_keys_to_visit.append(related_key)
+        return related_block_keys
@@ -0,0 +1,269 @@
+"""
+Instrumentation of the collect and transform phases of Block Structure
+Transformers.
+
+Each time Transformers collect data for, or transform, a block structure,
+a TransformerMeasurement for each Transformer is passed to the enabled
+recorders.  The following recorders are registered by default:
+
+    MetricsRecorder - Reports the measurements as custom monitoring
+        metrics, when the transformer_metrics waffle switch is enabled.
+
+    RequestRecorder - Keeps the measurements made while handling the
+        current request, when started by TransformerTimingMiddleware.
+
+Other recorders can be registered with add_recorder or recording.
+"""
+import cPickle as pickle
+from collections import namedtuple
+from contextlib import contextmanager
+from time import time
+
+from edx_django_utils import monitoring as monitoring_utils
+
+from openedx.core.lib.cache_utils import get_cache
+
+from . import config
+
+
+# Phases of the Transformers.
+COLLECT = u'collect'
+TRANSFORM = u'transform'
+
+# Name under which the collection of the xBlock fields requested by all
+# Transformers is measured.
+XBLOCK_FIELDS = u'xblock_fields'
+
+REQUEST_CACHE_NAMESPACE = u'block_structure.instrumentation'
+
+# A measurement of a single phase of a single Transformer.
+#   phase (unicode) - COLLECT or TRANSFORM.
+#   transformer_name (unicode) - Name of the Transformer.
+#   duration (float) - Wall time spent by the Transformer, in seconds.
+#   num_blocks_before (int) - Number of blocks before the Transformer ran.
+#       For filtering Transformers, this is the number of blocks that
+#       reached the Transformer's filters.
+#   num_blocks_after (int) - Number of blocks after the Transformer ran.
+#       For filtering Transformers, this is the number of blocks that
+#       were kept by the Transformer's filters.
+#   collected_bytes (int) - Size of the pickled data collected by the
+#       Transformer, or None for the transform phase.
+TransformerMeasurement = namedtuple(
+    'TransformerMeasurement',
+    ['phase', 'transformer_name', 'duration', 'num_blocks_before', 'num_blocks_after', 'collected_bytes'],
+)
+
+
+class TransformerRecorder(object):
+    """
+    Base class for recorders of Transformer measurements.
+    """
+    def is_enabled(self):
+        """
+        Returns whether measurements should be made for this recorder.
+        """
+        return True
+
+    def record(self, measurement):
+        """
+        Records the given TransformerMeasurement.
+        """
+        raise NotImplementedError
+
+
+class MetricsRecorder(TransformerRecorder):
+    """
+    Reports Transformer measurements as custom monitoring metrics.
+    """
+    def is_enabled(self):
+        return config.waffle().is_enabled(config.TRANSFORMER_METRICS)
+
+    def record(self, measurement):
+        metric_prefix = u'block_structure.{}.{}.'.format(measurement.phase, measurement.transformer_name)
+        monitoring_utils.accumulate(metric_prefix + u'duration_ms', measurement.duration * 1000)
+        monitoring_utils.accumulate(
+            metric_prefix + u'blocks_removed',
+            measurement.num_blocks_before - measurement.num_blocks_after,
+        )
+        if measurement.collected_bytes is not None:
+            monitoring_utils.accumulate(metric_prefix + u'collected_bytes', measurement.collected_bytes)
+
+
+class RequestRecorder(TransformerRecorder):
+    """
+    Keeps the Transformer measurements made while handling the current
+    request in the request cache, once started.
+    """
+    @classmethod
+    def start(cls):
+        """
+        Starts keeping the measurements made for the current request.
+        """
+        get_cache(REQUEST_CACHE_NAMESPACE)['measurements'] = []
+
+    @classmethod
+    def get_measurements(cls):
+        """
+        Returns the list of measurements made for the current request, or
+        None if not started.
+        """
+        return get_cache(REQUEST_CACHE_NAMESPACE).get('measurements')
+
+    def is_enabled(self):
+        return self.get_measurements() is not None
+
+    def record(self, measurement):
+        self.get_measurements().append(measurement)
+
+
+class ListRecorder(TransformerRecorder):
+    """
+    Keeps Transformer measurements in a list.
+    """
+    def __init__(self):
+        self.measurements = []
+
+    def record(self, measurement):
+        self.measurements.append(measurement)
+
+
+_recorders = [MetricsRecorder(), RequestRecorder()]
+
+
+def add_recorder(recorder):
+    """
+    Registers the given TransformerRecorder.
+    """
+    _recorders.append(recorder)
+
+
+def remove_recorder(recorder):
+    """
+    Unregisters the given TransformerRecorder.
+    """
+    _recorders.remove(recorder)
+
+
+@contextmanager
+def recording(recorder):
+    """
+    A context manager for registering the given TransformerRecorder
+    while in its context.
+    """
+    add_recorder(recorder)
+    try:
+        yield recorder
+    finally:
+        remove_recorder(recorder)
+
+
+def get_enabled_recorders():
+    """
+    Returns the registered recorders that are enabled.
+    """
+    return [recorder for recorder in _recorders if recorder.is_enabled()]
+
+
+def record_collect(recorders, block_structure, durations):
+    """
+    Records measurements of the collect phase of Transformers.
+
+    Arguments:
+        recorders (list(TransformerRecorder)) - Recorders to record to.
+
+        block_structure (BlockStructureModulestoreData) - The block
+            structure, with its collected data.
+
+        durations (list((unicode, float))) - Names of the Transformers,
+            or XBLOCK_FIELDS, with the time spent collecting their data.
+    """
+    num_blocks = len(block_structure)
+    for transformer_name, duration in durations:
+        _record(recorders, TransformerMeasurement(
+            COLLECT,
+            transformer_name,
+            duration,
+            num_blocks,
+            num_blocks,
+            _get_collected_bytes(block_structure, transformer_name),
+        ))
+
+
+def record_transform(recorders, transformer_name, duration, num_blocks_before, num_blocks_after):
+    """
+    Records a measurement of the transform phase of a Transformer.
+    """
+    _record(recorders, TransformerMeasurement(
+        TRANSFORM, transformer_name, duration, num_blocks_before, num_blocks_after, None,
+    ))
+
+
+class FiltersMeasurement(object):
+    """
+    Measures the time spent in, and the blocks kept by, the filters of a
+    filtering Transformer during a combined traversal.
+    """
+    def __init__(self, transformer_name, duration):
+        """
+        Arguments:
+            transformer_name (unicode) - Name of the Transformer.
+
+            duration (float) - Time already spent by the Transformer,
+                creating its filters.
+        """
+        self.transformer_name = transformer_name
+        self.duration = duration
+        self.num_blocks_before = 0
+        self.num_blocks_after = 0
+
+    def measured_filter(self, filters):
+        """
+        Returns a single filter function equivalent to the given list
+        of filter functions, that measures their execution.
+        """
+        def _filter(block_key):
+            """
+            Filter function that measures the Transformer's filters.
+            """
+            start = time()
+            keep_block = all(filter_func(block_key) for filter_func in filters)
+            self.duration += time() - start
+            self.num_blocks_before += 1
+            self.num_blocks_after += keep_block
+            return keep_block
+        return _filter
+
+    def record(self, recorders):
+        """
+        Records the measurement to the given recorders.
+        """
+        record_transform(
+            recorders, self.transformer_name, self.duration, self.num_blocks_before, self.num_blocks_after,
+        )
+
+
+def _record(recorders, measurement):
+    """
+    Records the given measurement to the given recorders.
+    """
+    for recorder in recorders:
+        recorder.record(measurement)
+
+
+def _get_collected_bytes(block_structure, transformer_name):
+    """
+    Returns the size of the pickled data collected in the given block
+    structure for the given Transformer, or for the xBlock fields.
+    """
+    if transformer_name == XBLOCK_FIELDS:
+        collected_data = [block_data.fields for block_data in block_structure.itervalues()]
+    else:
+        collected_data = [
+            block_structure.transformer_data.get(transformer_name),
+            [
+                block_data.transformer_data[transformer_name].fields
+                for block_data in block_structure.itervalues()
+                if transformer_name in block_data.transformer_data
+            ],
+        ]
+    return len(pickle.dumps(collected_data, pickle.HIGHEST_PROTOCOL))
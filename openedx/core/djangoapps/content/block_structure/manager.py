@@ -3,6 +3,7 @@ Top-level module for the Block Structure framework with a class for managing
 BlockStructures.
 """
 from contextlib import contextmanager
+from logging import getLogger
 
 from . import config
 from .exceptions import UsageKeyNotInBlockStructure, TransformerDataIncompatible, BlockStructureNotFound
@@ -11,6 +12,9 @@ from .store import BlockStructureStore
 from .transformers import BlockStructureTransformers
 
 
+logger = getLogger(__name__)  # pylint: disable=invalid-name
+
+
 class BlockStructureManager(object):
     """
     Top-level class for managing Block Structures.
@@ -112,6 +116,9 @@ class BlockStructureManager(object):
         """
         with self._bulk_operations():
             if not self.store.is_up_to_date(self.root_block_usage_key, self.modulestore):
+                if config.waffle().is_enabled(config.UPDATE_CHANGED_BLOCKS_ONLY):
+                    if self._update_collected_changes() is not None:
+                        return
                 self._update_collected()
 
     def _update_collected(self):
@@ -128,6 +135,48 @@ class BlockStructureManager(object):
             self.store.add(block_structure)
             return block_structure
 
+    def _update_collected_changes(self):
+        """
+        The store is updated with transformers data newly collected from
+        the modulestore for only the blocks that changed since the stored
+        block structure was collected, and their descendants.
+
+        Returns the updated block structure, or None if the stored block
+        structure cannot be updated partially, in which case it should be
+        collected again entirely.
+        """
+        try:
+            collected_block_structure = BlockStructureFactory.create_from_store(
+                self.root_block_usage_key,
+                self.store,
+            )
+        except BlockStructureNotFound:
+            return None
+
+        if not BlockStructureTransformers.supports_partial_collect(collected_block_structure):
+            return None
+
+        block_structure_changes = BlockStructureFactory.create_from_modulestore_changes(
+            collected_block_structure,
+            self.modulestore,
+        )
+        if block_structure_changes is None:
+            return None
+
+        BlockStructureTransformers.collect(block_structure_changes)
+        block_structure = BlockStructureFactory.create_from_changes(
+            collected_block_structure,
+            block_structure_changes,
+        )
+        self.store.add(block_structure)
+        logger.info(
+            "BlockStructure: Updated %d of %d blocks of %s.",
+            len(block_structure_changes.outdated_block_keys),
+            len(block_structure_changes.course_block_relations),
+            self.root_block_usage_key,
+        )
+        return block_structure
+
     def clear(self):
         """
         Removes data for the block structure associated with the given
@@ -0,0 +1,58 @@
+"""
+Middleware for exposing the measurements of Block Structure Transformers.
+"""
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .instrumentation import RequestRecorder
+
+
+class TransformerTimingMiddleware(object):
+    """
+    In debug mode, adds a Server-Timing header to responses with the time
+    spent by each Block Structure Transformer while handling the request,
+    along with the number of blocks before and after each Transformer.
+
+    Must be placed after the RequestCacheMiddleware, since measurements
+    are kept in the request cache.
+    """
+    def process_request(self, _request):
+        """
+        Starts recording Transformer measurements for the request.
+        """
+        if settings.DEBUG:
+            RequestRecorder.start()
+
+    def process_response(self, _request, response):
+        """
+        Adds the recorded Transformer measurements to the response.
+        """
+        measurements = RequestRecorder.get_measurements()
+        if measurements:
+            response['Server-Timing'] = server_timing_header(measurements)
+        return response
+
+
+def server_timing_header(measurements):
+    """
+    Returns the value of a Server-Timing header for the given list of
+    TransformerMeasurements.  Measurements of the same phase of the same
+    Transformer are summed.
+    """
+    totals = OrderedDict()
+    for measurement in measurements:
+        key = (measurement.phase, measurement.transformer_name)
+        duration, num_blocks_before, num_blocks_after = totals.get(key, (0, 0, 0))
+        totals[key] = (
+            duration + measurement.duration,
+            num_blocks_before + measurement.num_blocks_before,
+            num_blocks_after + measurement.num_blocks_after,
+        )
+
+    return u', '.join(
+        u'{}.{};dur={:.3f};desc="{} -> {} blocks"'.format(
+            phase, transformer_name, duration * 1000, num_blocks_before, num_blocks_after,
+        )
+        for (phase, transformer_name), (duration, num_blocks_before, num_blocks_after) in totals.iteritems()
+    )
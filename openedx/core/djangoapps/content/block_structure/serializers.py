@@ -0,0 +1,422 @@
+"""
+Serialization formats for collected BlockStructures.
+
+Two formats are supported:
+
+  * pickle - The original format. The block structure's relations,
+    transformer data and block data map are pickled and compressed as
+    a whole.  Reading the structure requires unpickling every
+    _BlockRelations, BlockData and TransformerData object.
+
+  * columnar - A compact, versioned format.  Usage keys are stored
+    once in a key table, parent/child relations are stored as
+    integer-indexed adjacency arrays, and block data is stored as one
+    column per xBlock field and one column per transformer.  Each column
+    is encoded separately, so on read only the key table and the
+    adjacency arrays are decoded eagerly.  A column is decoded the first
+    time any block's value in it is accessed.
+
+The format used for writes is selected per deployment with the
+SERIALIZATION_FORMAT key of settings.BLOCK_STRUCTURES_SETTINGS.  Reads
+detect the format from the serialized data itself, so data written in
+either format remains readable after the setting changes.
+"""
+import cPickle as pickle
+import zlib
+
+from django.conf import settings
+
+from openedx.core.lib.cache_utils import zpickle, zunpickle
+
+from .block_structure import BlockData, TransformerData, TransformerDataMap, _BlockRelations
+from .exceptions import BlockStructureNotFound
+from .factory import BlockStructureFactory
+
+
+PICKLE_FORMAT = u'pickle'
+COLUMNAR_FORMAT = u'columnar'
+
+
+class PickleSerializer(object):
+    """
+    Serializes block structures as a single compressed pickle.
+    """
+    name = PICKLE_FORMAT
+
+    @classmethod
+    def serialize(cls, block_structure):
+        """
+        Returns the serialized data for the given block_structure.
+        """
+        data_to_cache = (
+            block_structure._block_relations,  # pylint: disable=protected-access
+            block_structure.transformer_data,
+            block_structure._block_data_map,  # pylint: disable=protected-access
+        )
+        return zpickle(data_to_cache)
+
+    @classmethod
+    def deserialize(cls, serialized_data, root_block_usage_key):
+        """
+        Returns the block structure parsed from the given serialized_data.
+        """
+        block_relations, transformer_data, block_data_map = zunpickle(serialized_data)
+        return BlockStructureFactory.create_new(
+            root_block_usage_key,
+            block_relations,
+            transformer_data,
+            block_data_map,
+        )
+
+
+class ColumnarSerializer(object):
+    """
+    Serializes block structures in the columnar format.
+
+    Layout of the (compressed) payload:
+        keys - pickled list of all usage keys in the structure.
+            All other fields refer to blocks by their index in
+            this list.
+        num_related - number of leading keys that are in the
+            structure's relations map.
+        children, parents - adjacency arrays in compressed sparse row
+            form: (offsets, indices), where the relations of the block
+            at index i are indices[offsets[i]:offsets[i + 1]].
+        data_blocks - indices of the blocks that have block data.
+        xblock_fields - map of field name to a pickled
+            {block index: field value} column.
+        transformer_block_data - map of transformer name to a pickled
+            {block index: transformer fields} column.
+        transformer_data - pickled non-block-specific transformer data.
+    """
+    name = COLUMNAR_FORMAT
+
+    # Increment whenever the layout of the payload changes.  Data
+    # written with any other version is treated as not found.
+    VERSION = 1
+
+    MAGIC = 'BSC'
+
+    @classmethod
+    def serialize(cls, block_structure):
+        """
+        Returns the serialized data for the given block_structure.
+        """
+        block_relations = block_structure._block_relations  # pylint: disable=protected-access
+        block_data_map = block_structure._block_data_map  # pylint: disable=protected-access
+
+        related_keys = list(block_relations)
+        keys = related_keys + [key for key in block_data_map if key not in block_relations]
+        key_index = {key: index for index, key in enumerate(keys)}
+
+        xblock_fields = {}
+        transformer_block_data = {}
+        for usage_key, block_data in block_data_map.iteritems():
+            index = key_index[usage_key]
+            for field_name, value in block_data.fields.iteritems():
+                xblock_fields.setdefault(field_name, {})[index] = value
+            for transformer_name, transformer_data in block_data.transformer_data.iteritems():
+                transformer_block_data.setdefault(transformer_name, {})[index] = transformer_data.fields
+
+        payload = dict(
+            keys=_dumps(keys),
+            num_related=len(related_keys),
+            children=cls._encode_adjacency(related_keys, key_index, block_relations, 'children'),
+            parents=cls._encode_adjacency(related_keys, key_index, block_relations, 'parents'),
+            data_blocks=sorted(key_index[usage_key] for usage_key in block_data_map),
+            xblock_fields={name: _dumps(column) for name, column in xblock_fields.iteritems()},
+            transformer_block_data={name: _dumps(column) for name, column in transformer_block_data.iteritems()},
+            transformer_data=_dumps(block_structure.transformer_data),
+        )
+        return cls._header() + zlib.compress(_dumps(payload))
+
+    @classmethod
+    def deserialize(cls, serialized_data, root_block_usage_key):
+        """
+        Returns the block structure parsed from the given serialized_data.
+        The block data of the returned structure is decoded lazily.
+        """
+        header = cls._header()
+        if not serialized_data.startswith(header):
+            raise BlockStructureNotFound(root_block_usage_key)
+
+        payload = pickle.loads(zlib.decompress(serialized_data[len(header):]))
+        keys = pickle.loads(payload['keys'])
+
+        block_relations = {}
+        for usage_key in keys[:payload['num_related']]:
+            block_relations[usage_key] = _BlockRelations()
+        cls._decode_adjacency(keys, block_relations, payload['children'], 'children')
+        cls._decode_adjacency(keys, block_relations, payload['parents'], 'parents')
+
+        xblock_columns = _LazyColumns(payload['xblock_fields'])
+        transformer_columns = _LazyColumns(payload['transformer_block_data'])
+        block_data_map = {}
+        for index in payload['data_blocks']:
+            usage_key = keys[index]
+            block_data_map[usage_key] = _LazyBlockData(usage_key, index, xblock_columns, transformer_columns)
+
+        return BlockStructureFactory.create_new(
+            root_block_usage_key,
+            block_relations,
+            pickle.loads(payload['transformer_data']),
+            block_data_map,
+        )
+
+    @classmethod
+    def can_deserialize(cls, serialized_data):
+        """
+        Returns whether the given serialized_data was written by this
+        serializer, of any version.
+        """
+        return serialized_data.startswith(cls.MAGIC)
+
+    @classmethod
+    def _header(cls):
+        """
+        Returns the prefix identifying data written by this serializer
+        version.
+        """
+        return '{}{:03d}'.format(cls.MAGIC, cls.VERSION)
+
+    @staticmethod
+    def _encode_adjacency(related_keys, key_index, block_relations, relation_name):
+        """
+        Returns the (offsets, indices) adjacency arrays of the given
+        relation for the given related_keys.
+        """
+        offsets = [0]
+        indices = []
+        for usage_key in related_keys:
+            related = getattr(block_relations[usage_key], relation_name)
+            indices.extend(key_index[related_key] for related_key in related)
+            offsets.append(len(indices))
+        return offsets, indices
+
+    @staticmethod
+    def _decode_adjacency(keys, block_relations, adjacency, relation_name):
+        """
+        Populates the given relation of the block_relations from the
+        given (offsets, indices) adjacency arrays.
+        """
+        offsets, indices = adjacency
+        for index in xrange(len(offsets) - 1):
+            related = [keys[i] for i in indices[offsets[index]:offsets[index + 1]]]
+            setattr(block_relations[keys[index]], relation_name, related)
+
+
+class _LazyColumns(object):
+    """
+    Decodes and caches encoded columns on first access.
+    """
+    def __init__(self, encoded_columns):
+        self._encoded_columns = encoded_columns
+        self._decoded_columns = {}
+
+    def names(self):
+        """
+        Returns the names of all the columns.
+        """
+        return self._encoded_columns.keys()
+
+    def get(self, name):
+        """
+        Returns the decoded column for the given name; an empty column
+        if not found.
+        """
+        try:
+            return self._decoded_columns[name]
+        except KeyError:
+            encoded_column = self._encoded_columns.get(name)
+            column = pickle.loads(encoded_column) if encoded_column is not None else {}
+            self._decoded_columns[name] = column
+            return column
+
+
+class _LazyColumnDict(dict):
+    """
+    A dict whose entries for a single block are lazily filled from
+    shared columns on lookup.  Any operation that needs to see all
+    entries first materializes all of the block's remaining entries.
+    """
+    def __init__(self, index, columns):
+        super(_LazyColumnDict, self).__init__()
+        self._index = index
+        self._columns = columns
+
+    def _decode_value(self, column_value):
+        """
+        Returns the entry value for the given value stored in a column.
+        """
+        return column_value
+
+    def __missing__(self, name):
+        if self._columns is not None:
+            column = self._columns.get(name)
+            if self._index in column:
+                value = self._decode_value(column[self._index])
+                dict.__setitem__(self, name, value)
+                return value
+        raise KeyError(name)
+
+    def materialize(self):
+        """
+        Decodes all of this block's entries that were not yet accessed.
+        """
+        if self._columns is not None:
+            columns, self._columns = self._columns, None
+            for name in columns.names():
+                if not dict.__contains__(self, name):
+                    column = columns.get(name)
+                    if self._index in column:
+                        dict.__setitem__(self, name, self._decode_value(column[self._index]))
+
+    def _materialized(method_name):  # pylint: disable=no-self-argument
+        """
+        Returns a dict method that first materializes all entries.
+        """
+        def method(self, *args, **kwargs):
+            self.materialize()
+            return getattr(super(_LazyColumnDict, self), method_name)(*args, **kwargs)
+        method.__name__ = method_name
+        return method
+
+    __contains__ = _materialized('__contains__')
+    __delitem__ = _materialized('__delitem__')
+    __iter__ = _materialized('__iter__')
+    __len__ = _materialized('__len__')
+    __eq__ = _materialized('__eq__')
+    __ne__ = _materialized('__ne__')
+    __repr__ = _materialized('__repr__')
+    get = _materialized('get')
+    has_key = _materialized('has_key')
+    items = _materialized('items')
+    iteritems = _materialized('iteritems')
+    iterkeys = _materialized('iterkeys')
+    itervalues = _materialized('itervalues')
+    keys = _materialized('keys')
+    values = _materialized('values')
+    pop = _materialized('pop')
+    popitem = _materialized('popitem')
+    setdefault = _materialized('setdefault')
+    update = _materialized('update')
+
+    del _materialized
+
+    def copy(self):
+        self.materialize()
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        from copy import deepcopy
+        self.materialize()
+        return deepcopy(dict(self), memo)
+
+    def __reduce__(self):
+        self.materialize()
+        return dict, (dict(self),)
+
+
+class _LazyFields(_LazyColumnDict):
+    """
+    The xBlock fields of a single block, decoded lazily from the
+    per-field columns.
+    """
+    pass
+
+
+class _LazyTransformerDataMap(_LazyColumnDict, TransformerDataMap):
+    """
+    The transformer data of a single block, decoded lazily from the
+    per-transformer columns.
+    """
+    def _decode_value(self, column_value):
+        transformer_data = TransformerData()
+        transformer_data.fields = column_value
+        return transformer_data
+
+    def __reduce__(self):
+        self.materialize()
+        return TransformerDataMap, (dict(self),)
+
+    def __deepcopy__(self, memo):
+        from copy import deepcopy
+        self.materialize()
+        return deepcopy(TransformerDataMap(self), memo)
+
+
+class _LazyBlockData(BlockData):
+    """
+    BlockData whose xBlock fields and transformer data are decoded from
+    the structure's columns only when accessed.
+
+    The fields and transformer_data dicts are materialized when copied,
+    pickled or iterated, so the lazy view is transparent to callers.
+    """
+    def __init__(self, usage_key, index, xblock_columns, transformer_columns):
+        super(_LazyBlockData, self).__init__(usage_key)
+        self.fields = _LazyFields(index, xblock_columns)
+        self.transformer_data = _LazyTransformerDataMap(index, transformer_columns)
+
+    def __reduce__(self):
+        return _restore_block_data, (
+            self.location,
+            self.fields.copy(),
+            TransformerDataMap(self.transformer_data.copy()),
+        )
+
+    def __deepcopy__(self, memo):
+        from copy import deepcopy
+        block_data = BlockData(self.location)
+        block_data.fields = deepcopy(self.fields, memo)
+        block_data.transformer_data = deepcopy(self.transformer_data, memo)
+        return block_data
+
+
+def _restore_block_data(location, fields, transformer_data):
+    """
+    Returns a plain BlockData with the given contents.
+    """
+    block_data = BlockData(location)
+    block_data.fields = fields
+    block_data.transformer_data = transformer_data
+    return block_data
+
+
+def _dumps(data):
+    """
+    Returns the pickled data.
+    """
+    return pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+
+
+SERIALIZERS = {
+    serializer.name: serializer
+    for serializer in (PickleSerializer, ColumnarSerializer)
+}
+
+
+def get_serializer():
+    """
+    Returns the serializer configured for writing block structures.
+    """
+    format_name = settings.BLOCK_STRUCTURES_SETTINGS.get('SERIALIZATION_FORMAT', PICKLE_FORMAT)
+    return SERIALIZERS[format_name]
+
+
+def serialize(block_structure):
+    """
+    Returns the serialized data for the given block_structure, in the
+    configured format.
+    """
+    return get_serializer().serialize(block_structure)
+
+
+def deserialize(serialized_data, root_block_usage_key):
+    """
+    Returns the block structure parsed from the given serialized_data,
+    in whichever format it was written.
+    """
+    if ColumnarSerializer.can_deserialize(serialized_data):
+        return ColumnarSerializer.deserialize(serialized_data, root_block_usage_key)
+    return PickleSerializer.deserialize(serialized_data, root_block_usage_key)
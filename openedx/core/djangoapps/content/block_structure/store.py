@@ -4,12 +4,14 @@ Module for the Storage of BlockStructure objects.
 # pylint: disable=protected-access
 from logging import getLogger
 
-from openedx.core.lib.cache_utils import zpickle, zunpickle
+from django.conf import settings
+from edx_django_utils import monitoring as monitoring_utils
 
-from . import config
+from openedx.core.lib.cache_utils import ProcessLocalLRUCache, process_cached
+
+from . import config, serializers
 from .block_structure import BlockStructureBlockData
 from .exceptions import BlockStructureNotFound
-from .factory import BlockStructureFactory
 from .models import BlockStructureModel
 from .transformer_registry import TransformerRegistry
 
@@ -51,8 +53,8 @@ class BlockStructureStore(object):
 
     def add(self, block_structure):
         """
-        Stores and caches a compressed and pickled serialization of
-        the given block structure.
+        Stores and caches a compressed serialization of the given
+        block structure, in the configured serialization format.
 
         The data stored includes the structure's
         block relations, transformer data, and block data.
@@ -65,6 +67,7 @@ class BlockStructureStore(object):
 
         bs_model = self._update_or_create_model(block_structure, serialized_data)
         self._add_to_cache(serialized_data, bs_model)
+        self._add_to_local_cache(serialized_data, bs_model)
 
     def get(self, root_block_usage_key):
         """
@@ -90,10 +93,14 @@ class BlockStructureStore(object):
         bs_model = self._get_model(root_block_usage_key)
 
         try:
-            serialized_data = self._get_from_cache(bs_model)
+            serialized_data = self._get_from_local_cache(bs_model)
         except BlockStructureNotFound:
-            serialized_data = self._get_from_store(bs_model)
-            self._add_to_cache(serialized_data, bs_model)
+            try:
+                serialized_data = self._get_from_cache(bs_model)
+            except BlockStructureNotFound:
+                serialized_data = self._get_from_store(bs_model)
+                self._add_to_cache(serialized_data, bs_model)
+            self._add_to_local_cache(serialized_data, bs_model)
 
         return self._deserialize(serialized_data, root_block_usage_key)
 
@@ -108,6 +115,7 @@ class BlockStructureStore(object):
         """
         bs_model = self._get_model(root_block_usage_key)
         self._cache.delete(self._encode_root_cache_key(bs_model))
+        self.delete_from_local_cache(root_block_usage_key)
         bs_model.delete()
         logger.info("BlockStructure: Deleted from cache and store; %s.", bs_model)
 
@@ -126,6 +134,20 @@ class BlockStructureStore(object):
 
         return False
 
+    @staticmethod
+    def delete_from_local_cache(root_block_usage_key):
+        """
+        Removes the block structure for the given root_block_usage_key
+        from this process's local cache tier.
+
+        Arguments:
+            root_block_usage_key (UsageKey) - The usage_key for the root
+                of the block structure that is to be removed.
+        """
+        local_cache = get_local_cache()
+        if local_cache is not None:
+            local_cache.delete(unicode(root_block_usage_key))
+
     def _get_model(self, root_block_usage_key):
         """
         Returns the model associated with the given key.
@@ -175,6 +197,44 @@ class BlockStructureStore(object):
             raise BlockStructureNotFound(bs_model.data_usage_key)
         return serialized_data
 
+    def _add_to_local_cache(self, serialized_data, bs_model):
+        """
+        Adds the given serialized_data for the given BlockStructureModel
+        to this process's local cache tier, if enabled.
+
+        Entries are keyed on the root usage key and tagged with the
+        encoded cache key of the model.  When storage backing is enabled,
+        that key includes the version fields computed at collection time
+        by _version_data_of_block, so a newer collection made by another
+        process is never shadowed by an older locally cached one.
+        """
+        local_cache = get_local_cache()
+        if local_cache is not None:
+            entry = (self._encode_root_cache_key(bs_model), serialized_data)
+            num_evicted = local_cache.set(unicode(bs_model.data_usage_key), entry)
+            if num_evicted:
+                monitoring_utils.accumulate('block_structure.local_cache.evictions', num_evicted)
+
+    def _get_from_local_cache(self, bs_model):
+        """
+        Returns the serialized data for the given BlockStructureModel
+        from this process's local cache tier.
+        Raises:
+             BlockStructureNotFound if not found, outdated or if the
+             local cache is disabled.
+        """
+        local_cache = get_local_cache()
+        if local_cache is None:
+            raise BlockStructureNotFound(bs_model.data_usage_key)
+
+        entry = local_cache.get(unicode(bs_model.data_usage_key))
+        if entry is None or entry[0] != self._encode_root_cache_key(bs_model):
+            monitoring_utils.increment('block_structure.local_cache.misses')
+            raise BlockStructureNotFound(bs_model.data_usage_key)
+
+        monitoring_utils.increment('block_structure.local_cache.hits')
+        return entry[1]
+
     def _get_from_store(self, bs_model):
         """
         Returns the serialized data for the given BlockStructureModel
@@ -191,24 +251,13 @@ class BlockStructureStore(object):
         """
         Serializes the data for the given block_structure.
         """
-        data_to_cache = (
-            block_structure._block_relations,
-            block_structure.transformer_data,
-            block_structure._block_data_map,
-        )
-        return zpickle(data_to_cache)
+        return serializers.serialize(block_structure)
 
     def _deserialize(self, serialized_data, root_block_usage_key):
         """
         Deserializes the given data and returns the parsed block_structure.
         """
-        block_relations, transformer_data, block_data_map = zunpickle(serialized_data)
-        return BlockStructureFactory.create_new(
-            root_block_usage_key,
-            block_relations,
-            transformer_data,
-            block_data_map,
-        )
+        return serializers.deserialize(serialized_data, root_block_usage_key)
 
     @staticmethod
     def _encode_root_cache_key(bs_model):
@@ -249,6 +298,29 @@ class BlockStructureStore(object):
         }
 
 
+def get_local_cache():
+    """
+    Returns the process-local cache tier for serialized block structures,
+    or None if it is disabled.
+
+    The tier is enabled by setting LOCAL_CACHE_MAX_BYTES in
+    settings.BLOCK_STRUCTURES_SETTINGS to the maximum total size of the
+    serialized structures to keep in each process.
+    """
+    max_bytes = settings.BLOCK_STRUCTURES_SETTINGS.get('LOCAL_CACHE_MAX_BYTES', 0)
+    if not max_bytes:
+        return None
+    return _create_local_cache(max_bytes, settings.BLOCK_STRUCTURES_SETTINGS.get('LOCAL_CACHE_TIMEOUT'))
+
+
+@process_cached
+def _create_local_cache(max_bytes, timeout):
+    """
+    Returns the process-local cache for the given configuration.
+    """
+    return ProcessLocalLRUCache(max_bytes, size_func=lambda entry: len(entry[1]), timeout=timeout)
+
+
 def _is_storage_backing_enabled():
     """
     Returns whether storage backing for Block Structures is enabled.
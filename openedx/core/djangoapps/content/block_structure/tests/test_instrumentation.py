@@ -0,0 +1,146 @@
+"""
+Tests for instrumentation.py and middleware.py
+"""
+from unittest import TestCase
+
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from edx_django_utils.cache import RequestCache
+from mock import MagicMock, patch
+
+from .. import instrumentation
+from ..block_structure import BlockStructureModulestoreData
+from ..instrumentation import COLLECT, TRANSFORM, XBLOCK_FIELDS, ListRecorder, RequestRecorder, TransformerMeasurement
+from ..middleware import TransformerTimingMiddleware, server_timing_header
+from ..transformer import FilteringTransformerMixin
+from ..transformers import BlockStructureTransformers
+from .helpers import ChildrenMapTestMixin, MockTransformer, mock_registered_transformers
+
+
+class CollectingTransformer(MockTransformer):
+    """
+    Mock transformer that collects data for each block.
+    """
+    @classmethod
+    def collect(cls, block_structure):
+        for block_key in block_structure:
+            block_structure.set_transformer_block_field(block_key, cls, 'collected', 'data' * 10)
+
+
+class RemovingTransformer(FilteringTransformerMixin, MockTransformer):
+    """
+    Mock filtering transformer that removes block 4.
+    """
+    def transform_block_filters(self, usage_info, block_structure):
+        return [block_structure.create_removal_filter(lambda block_key: block_key == 4)]
+
+
+class TestTransformerInstrumentation(ChildrenMapTestMixin, TestCase):
+    """
+    Tests the measurements of the collect and transform phases of transformers.
+    """
+    def setUp(self):
+        super(TestTransformerInstrumentation, self).setUp()
+        self.recorder = ListRecorder()
+        recorders_patcher = patch.object(instrumentation, '_recorders', [self.recorder])
+        recorders_patcher.start()
+        self.addCleanup(recorders_patcher.stop)
+
+    def test_collect(self):
+        block_structure = self.create_block_structure(self.SIMPLE_CHILDREN_MAP, BlockStructureModulestoreData)
+        with mock_registered_transformers([MockTransformer(), CollectingTransformer()]):
+            BlockStructureTransformers.collect(block_structure)
+
+        measurements = {measurement.transformer_name: measurement for measurement in self.recorder.measurements}
+        self.assertEqual(
+            set(measurements),
+            {MockTransformer.name(), CollectingTransformer.name(), XBLOCK_FIELDS},
+        )
+        for measurement in measurements.itervalues():
+            self.assertEqual(measurement.phase, COLLECT)
+            self.assertEqual(measurement.num_blocks_before, 5)
+            self.assertEqual(measurement.num_blocks_after, 5)
+            self.assertGreaterEqual(measurement.duration, 0)
+        self.assertGreater(
+            measurements[CollectingTransformer.name()].collected_bytes,
+            measurements[MockTransformer.name()].collected_bytes,
+        )
+
+    def test_transform(self):
+        with mock_registered_transformers([MockTransformer(), RemovingTransformer()]):
+            transformers = BlockStructureTransformers([MockTransformer(), RemovingTransformer()], MagicMock())
+        block_structure = self.create_block_structure(self.SIMPLE_CHILDREN_MAP)
+        transformers.transform(block_structure)
+
+        self.assertEqual(
+            [
+                (measurement.phase, measurement.transformer_name, measurement.num_blocks_before,
+                 measurement.num_blocks_after, measurement.collected_bytes)
+                for measurement in self.recorder.measurements
+            ],
+            [
+                (TRANSFORM, RemovingTransformer.name(), 5, 4, None),
+                (TRANSFORM, MockTransformer.name(), 4, 4, None),
+            ],
+        )
+
+    def test_disabled(self):
+        with patch.object(ListRecorder, 'is_enabled', return_value=False):
+            with mock_registered_transformers([RemovingTransformer()]):
+                transformers = BlockStructureTransformers([RemovingTransformer()], MagicMock())
+            block_structure = self.create_block_structure(self.SIMPLE_CHILDREN_MAP)
+            transformers.transform(block_structure)
+
+        self.assertEqual(self.recorder.measurements, [])
+        self.assertNotIn(4, block_structure)
+
+    def test_recording(self):
+        other_recorder = ListRecorder()
+        with instrumentation.recording(other_recorder):
+            self.assertEqual(instrumentation.get_enabled_recorders(), [self.recorder, other_recorder])
+        self.assertEqual(instrumentation.get_enabled_recorders(), [self.recorder])
+
+
+class TestTransformerTimingMiddleware(TestCase):
+    """
+    Tests TransformerTimingMiddleware.
+    """
+    MEASUREMENT = TransformerMeasurement(TRANSFORM, u'visibility', 0.002, 10, 8, None)
+
+    def setUp(self):
+        super(TestTransformerTimingMiddleware, self).setUp()
+        RequestCache.clear_all_namespaces()
+        self.addCleanup(RequestCache.clear_all_namespaces)
+        self.middleware = TransformerTimingMiddleware()
+        self.request = RequestFactory().get('/')
+
+    def _get_response(self):
+        """
+        Returns the response to a request during which the measurement is made.
+        """
+        self.middleware.process_request(self.request)
+        if RequestRecorder().is_enabled():
+            RequestRecorder().record(self.MEASUREMENT)
+        return self.middleware.process_response(self.request, HttpResponse())
+
+    @override_settings(DEBUG=True)
+    def test_debug(self):
+        response = self._get_response()
+        self.assertEqual(response['Server-Timing'], u'transform.visibility;dur=2.000;desc="10 -> 8 blocks"')
+
+    @override_settings(DEBUG=False)
+    def test_not_debug(self):
+        response = self._get_response()
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_header_sums_measurements(self):
+        self.assertEqual(
+            server_timing_header([
+                self.MEASUREMENT,
+                TransformerMeasurement(COLLECT, u'visibility', 0.001, 10, 10, 100),
+                self.MEASUREMENT,
+            ]),
+            u'transform.visibility;dur=4.000;desc="20 -> 16 blocks", '
+            u'collect.visibility;dur=1.000;desc="10 -> 10 blocks"',
+        )
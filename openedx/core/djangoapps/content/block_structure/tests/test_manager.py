@@ -3,14 +3,15 @@ Tests for manager.py
 """
 import ddt
 from django.test import TestCase
+from mock import patch
 
 from ..block_structure import BlockStructureBlockData
-from ..config import RAISE_ERROR_WHEN_NOT_FOUND, STORAGE_BACKING_FOR_CACHE, waffle
+from ..config import RAISE_ERROR_WHEN_NOT_FOUND, STORAGE_BACKING_FOR_CACHE, UPDATE_CHANGED_BLOCKS_ONLY, waffle
 from ..exceptions import UsageKeyNotInBlockStructure, BlockStructureNotFound
 from ..manager import BlockStructureManager
 from ..transformers import BlockStructureTransformers
 from .helpers import (
-    MockModulestoreFactory, MockCache, MockTransformer,
+    MockModulestoreFactory, MockCache, MockTransformer, MockXBlock,
     ChildrenMapTestMixin, UsageKeyFactoryMixin,
     mock_registered_transformers,
 )
@@ -88,6 +89,26 @@ class TestTransformer1(MockTransformer):
         return data_key + 't1.val1.' + unicode(block_key)
 
 
+class TestPartialTransformer(TestTransformer1):
+    """
+    Test Transformer class that supports partial collection and records
+    the blocks it last collected data for.
+    """
+    WRITE_VERSION = 1
+    READ_VERSION = 1
+    SUPPORTS_PARTIAL_COLLECT = True
+    collect_call_count = 0
+    collected_block_keys = None
+
+    @classmethod
+    def collect(cls, block_structure):
+        """
+        Collects block data for the block structure.
+        """
+        super(TestPartialTransformer, cls).collect(block_structure)
+        cls.collected_block_keys = set(block_structure.get_block_keys())
+
+
 @ddt.ddt
 class TestBlockStructureManager(UsageKeyFactoryMixin, ChildrenMapTestMixin, TestCase):
     """
@@ -219,3 +240,130 @@ class TestBlockStructureManager(UsageKeyFactoryMixin, ChildrenMapTestMixin, Test
         self.bs_manager.clear()
         self.collect_and_verify(expect_modulestore_called=True, expect_cache_updated=True)
         self.assertEquals(TestTransformer1.collect_call_count, 2)
+
+
+@ddt.ddt
+class TestBlockStructureManagerChangedBlocks(UsageKeyFactoryMixin, ChildrenMapTestMixin, TestCase):
+    """
+    Test class for updating only the changed blocks with BlockStructureManager.
+    """
+    shard = 2
+
+    def setUp(self):
+        super(TestBlockStructureManagerChangedBlocks, self).setUp()
+
+        TestPartialTransformer.collect_call_count = 0
+        self.registered_transformers = [TestPartialTransformer()]
+
+        self.children_map = [list(children) for children in self.SIMPLE_CHILDREN_MAP]
+        self.modulestore = MockModulestoreFactory.create(self.children_map, self.block_key_factory)
+        self.edit_count = 0
+        for block_id in range(len(self.children_map)):
+            self.modulestore.blocks[self.block_key_factory(block_id)].field_map.update(
+                edited_on=self.edit_count,
+                subtree_edited_on=self.edit_count,
+            )
+        self.cache = MockCache()
+        self.bs_manager = BlockStructureManager(self.block_key_factory(0), self.modulestore, self.cache)
+        self.update_and_verify(expected_collected_blocks=range(len(self.children_map)))
+
+    def edit_block(self, block_id):
+        """
+        Updates the edit info of the given block and its ancestors in the
+        mock modulestore.
+        """
+        self.edit_count += 1
+        self.modulestore.blocks[self.block_key_factory(block_id)].field_map['edited_on'] = self.edit_count
+        block_ids_to_visit = [block_id]
+        while block_ids_to_visit:
+            edited_block_id = block_ids_to_visit.pop()
+            self.modulestore.blocks[self.block_key_factory(edited_block_id)].field_map['subtree_edited_on'] = (
+                self.edit_count
+            )
+            block_ids_to_visit.extend(self.get_parents_map(self.children_map)[edited_block_id])
+
+    def set_children(self, block_id, children):
+        """
+        Updates the children of the given block in the mock modulestore.
+        """
+        self.children_map[block_id] = children
+        self.modulestore.blocks[self.block_key_factory(block_id)].children = [
+            self.block_key_factory(child) for child in children
+        ]
+        self.edit_block(block_id)
+
+    def update_and_verify(self, expected_collected_blocks, missing_blocks=None, update_changed_blocks_only=True):
+        """
+        Updates the collected block structure and verifies the blocks
+        for which data was collected and the resulting block structure.
+        """
+        with waffle().override(UPDATE_CHANGED_BLOCKS_ONLY, active=update_changed_blocks_only):
+            with mock_registered_transformers(self.registered_transformers):
+                self.bs_manager.update_collected_if_needed()
+                block_structure = self.bs_manager.get_collected()
+
+        self.assertEqual(
+            TestPartialTransformer.collected_block_keys,
+            {self.block_key_factory(block_id) for block_id in expected_collected_blocks},
+        )
+        self.assert_block_structure(block_structure, self.children_map, missing_blocks=missing_blocks)
+        TestPartialTransformer.assert_collected(block_structure)
+        for block_key in block_structure:
+            self.assertEqual(
+                block_structure.get_xblock_field(block_key, 'edited_on'),
+                self.modulestore.blocks[block_key].field_map['edited_on'],
+            )
+
+    @ddt.data(
+        (1, [0, 1, 3, 4]),
+        (2, [0, 2]),
+        (3, [0, 1, 3]),
+    )
+    @ddt.unpack
+    def test_edited_block(self, block_id, expected_collected_blocks):
+        self.edit_block(block_id)
+        self.update_and_verify(expected_collected_blocks)
+        self.assertEqual(TestPartialTransformer.collect_call_count, 2)
+
+    def test_unchanged_blocks(self):
+        self.update_and_verify(expected_collected_blocks=[0])
+
+    def test_added_block(self):
+        new_block_key = self.block_key_factory(5)
+        self.modulestore.blocks[new_block_key] = MockXBlock(
+            new_block_key,
+            field_map=dict(edited_on=self.edit_count, subtree_edited_on=self.edit_count),
+            modulestore=self.modulestore,
+        )
+        self.children_map.append([])
+        self.set_children(2, [5])
+        self.update_and_verify(expected_collected_blocks=[0, 2, 5])
+
+    def test_removed_block(self):
+        self.set_children(1, [3])
+        self.update_and_verify(expected_collected_blocks=[0, 1, 3], missing_blocks=[4])
+
+    def test_moved_block(self):
+        self.set_children(1, [3])
+        self.set_children(2, [4])
+        self.update_and_verify(expected_collected_blocks=[0, 1, 2, 3, 4])
+        self.set_children(2, [4, 3])
+        self.update_and_verify(expected_collected_blocks=[0, 1, 2, 3, 4])
+
+    def test_edited_root(self):
+        self.edit_block(0)
+        self.update_and_verify(expected_collected_blocks=range(len(self.children_map)))
+
+    def test_switch_disabled(self):
+        self.edit_block(3)
+        self.update_and_verify(expected_collected_blocks=range(len(self.children_map)), update_changed_blocks_only=False)
+
+    def test_transformer_version_changed(self):
+        self.edit_block(3)
+        with patch.object(TestPartialTransformer, 'WRITE_VERSION', 2):
+            self.update_and_verify(expected_collected_blocks=range(len(self.children_map)))
+
+    def test_transformer_without_partial_collect(self):
+        self.registered_transformers.append(TestTransformer1())
+        self.edit_block(3)
+        self.update_and_verify(expected_collected_blocks=range(len(self.children_map)))
@@ -0,0 +1,129 @@
+"""
+Tests for serializers.py
+"""
+# pylint: disable=protected-access
+import cPickle as pickle
+from unittest import TestCase
+
+import ddt
+from django.conf import settings
+from mock import patch
+
+from ..block_structure import BlockData, BlockStructureBlockData
+from ..exceptions import BlockStructureNotFound
+from ..serializers import (
+    COLUMNAR_FORMAT,
+    PICKLE_FORMAT,
+    ColumnarSerializer,
+    PickleSerializer,
+    deserialize,
+    serialize,
+)
+from .helpers import ChildrenMapTestMixin, MockTransformer, UsageKeyFactoryMixin
+
+
+@ddt.ddt
+class TestSerializers(UsageKeyFactoryMixin, ChildrenMapTestMixin, TestCase):
+    """
+    Tests for the block structure serialization formats.
+    """
+    shard = 2
+
+    def create_collected_structure(self, children_map):
+        """
+        Returns a block structure for the given children_map with
+        mocked collected xBlock fields and transformer data.
+        """
+        block_structure = self.create_block_structure(children_map, BlockStructureBlockData)
+        block_structure._add_transformer(MockTransformer)
+        for block_id in range(len(children_map)):
+            block_key = self.block_key_factory(block_id)
+            block_data = block_structure._get_or_create_block(block_key)
+            block_data.display_name = u'Block {}'.format(block_id)
+            if block_id % 2:
+                block_data.graded = True
+                block_structure.set_transformer_block_field(block_key, MockTransformer, 'test', block_id)
+        return block_structure
+
+    def assert_collected_structure(self, block_structure, children_map):
+        """
+        Verifies the given block structure matches the one created by
+        create_collected_structure.
+        """
+        self.assert_block_structure(block_structure, children_map)
+        self.assertEqual(block_structure._get_transformer_data_version(MockTransformer), 1)
+        for block_id in range(len(children_map)):
+            block_key = self.block_key_factory(block_id)
+            self.assertEqual(block_structure.get_xblock_field(block_key, 'display_name'), u'Block {}'.format(block_id))
+            self.assertEqual(block_structure.get_xblock_field(block_key, 'graded', False), bool(block_id % 2))
+            self.assertEqual(
+                block_structure.get_transformer_block_field(block_key, MockTransformer, 'test'),
+                block_id if block_id % 2 else None,
+            )
+
+    @ddt.data(
+        (PickleSerializer, ChildrenMapTestMixin.SIMPLE_CHILDREN_MAP),
+        (PickleSerializer, ChildrenMapTestMixin.DAG_CHILDREN_MAP),
+        (ColumnarSerializer, ChildrenMapTestMixin.SIMPLE_CHILDREN_MAP),
+        (ColumnarSerializer, ChildrenMapTestMixin.DAG_CHILDREN_MAP),
+    )
+    @ddt.unpack
+    def test_round_trip(self, serializer, children_map):
+        block_structure = self.create_collected_structure(children_map)
+        serialized_data = serializer.serialize(block_structure)
+        self.assert_collected_structure(deserialize(serialized_data, self.block_key_factory(0)), children_map)
+
+    def test_columnar_preserves_relation_order(self):
+        block_structure = self.create_collected_structure(self.DAG_CHILDREN_MAP)
+        deserialized = deserialize(ColumnarSerializer.serialize(block_structure), self.block_key_factory(0))
+        for block_key in block_structure:
+            self.assertEqual(deserialized.get_children(block_key), block_structure.get_children(block_key))
+            self.assertEqual(deserialized.get_parents(block_key), block_structure.get_parents(block_key))
+
+    def test_columnar_decodes_lazily(self):
+        block_structure = self.create_collected_structure(self.SIMPLE_CHILDREN_MAP)
+        deserialized = deserialize(ColumnarSerializer.serialize(block_structure), self.block_key_factory(0))
+        with patch('openedx.core.djangoapps.content.block_structure.serializers.pickle.loads') as mock_loads:
+            mock_loads.side_effect = pickle.loads
+            deserialized.get_xblock_field(self.block_key_factory(1), 'display_name')
+            deserialized.get_xblock_field(self.block_key_factory(2), 'display_name')
+            self.assertEqual(mock_loads.call_count, 1)
+
+    @ddt.data(True, False)
+    def test_columnar_copy_and_pickle(self, use_pickle):
+        block_structure = self.create_collected_structure(self.SIMPLE_CHILDREN_MAP)
+        deserialized = deserialize(ColumnarSerializer.serialize(block_structure), self.block_key_factory(0))
+        if use_pickle:
+            copied = PickleSerializer.deserialize(PickleSerializer.serialize(deserialized), self.block_key_factory(0))
+        else:
+            copied = deserialized.copy()
+        self.assertIs(type(copied[self.block_key_factory(1)]), BlockData)
+        self.assert_collected_structure(copied, self.SIMPLE_CHILDREN_MAP)
+
+    def test_columnar_field_updates(self):
+        block_key = self.block_key_factory(1)
+        block_structure = self.create_collected_structure(self.SIMPLE_CHILDREN_MAP)
+        deserialized = deserialize(ColumnarSerializer.serialize(block_structure), self.block_key_factory(0))
+
+        deserialized.override_xblock_field(block_key, 'display_name', u'Overridden')
+        delattr(deserialized[block_key], 'graded')
+        deserialized.remove_transformer_block_field(block_key, MockTransformer, 'test')
+
+        self.assertEqual(deserialized.get_xblock_field(block_key, 'display_name'), u'Overridden')
+        self.assertIsNone(deserialized.get_xblock_field(block_key, 'graded'))
+        self.assertIsNone(deserialized.get_transformer_block_field(block_key, MockTransformer, 'test'))
+        self.assertEqual(set(deserialized[block_key].fields), {'display_name'})
+
+    def test_unknown_columnar_version(self):
+        block_structure = self.create_collected_structure(self.SIMPLE_CHILDREN_MAP)
+        serialized_data = ColumnarSerializer.serialize(block_structure)
+        with patch.object(ColumnarSerializer, 'VERSION', ColumnarSerializer.VERSION + 1):
+            with self.assertRaises(BlockStructureNotFound):
+                deserialize(serialized_data, self.block_key_factory(0))
+
+    @ddt.data(PICKLE_FORMAT, COLUMNAR_FORMAT)
+    def test_configured_format(self, format_name):
+        block_structure = self.create_collected_structure(self.SIMPLE_CHILDREN_MAP)
+        with patch.dict(settings.BLOCK_STRUCTURES_SETTINGS, {'SERIALIZATION_FORMAT': format_name}):
+            serialized_data = serialize(block_structure)
+        self.assertEqual(ColumnarSerializer.can_deserialize(serialized_data), format_name == COLUMNAR_FORMAT)
@@ -1,14 +1,19 @@
 """
 Tests for block_structure/cache.py
 """
+import itertools
+
 import ddt
+from django.conf import settings
+from mock import patch
 
 from openedx.core.djangolib.testing.utils import CacheIsolationTestCase
 
 from ..config import STORAGE_BACKING_FOR_CACHE, waffle
 from ..config.models import BlockStructureConfiguration
 from ..exceptions import BlockStructureNotFound
-from ..store import BlockStructureStore
+from ..serializers import COLUMNAR_FORMAT, PICKLE_FORMAT
+from ..store import BlockStructureStore, get_local_cache
 from .helpers import ChildrenMapTestMixin, UsageKeyFactoryMixin, MockCache, MockTransformer
 
 
@@ -58,6 +63,19 @@ class TestBlockStructureStore(UsageKeyFactoryMixin, ChildrenMapTestMixin, CacheI
             self.assertIsNotNone(stored_value)
             self.assert_block_structure(stored_value, self.children_map)
 
+    @ddt.data(*itertools.product((True, False), (PICKLE_FORMAT, COLUMNAR_FORMAT)))
+    @ddt.unpack
+    def test_add_and_get_serialization_format(self, with_storage_backing, format_name):
+        with waffle().override(STORAGE_BACKING_FOR_CACHE, active=with_storage_backing):
+            with patch.dict(settings.BLOCK_STRUCTURES_SETTINGS, {'SERIALIZATION_FORMAT': format_name}):
+                self.store.add(self.block_structure)
+            stored_value = self.store.get(self.block_structure.root_block_usage_key)
+            self.assert_block_structure(stored_value, self.children_map)
+            self.assertEqual(
+                stored_value.get_transformer_block_field(self.block_key_factory(0), MockTransformer, 'test'),
+                '{} val'.format(MockTransformer.name()),
+            )
+
     @ddt.data(True, False)
     def test_delete(self, with_storage_backing):
         with waffle().override(STORAGE_BACKING_FOR_CACHE, active=with_storage_backing):
@@ -89,3 +107,38 @@ class TestBlockStructureStore(UsageKeyFactoryMixin, ChildrenMapTestMixin, CacheI
         self.assertEquals(self.mock_cache.timeout_from_last_call, 0)
         self.store.add(self.block_structure)
         self.assertEquals(self.mock_cache.timeout_from_last_call, timeout)
+
+    @ddt.data(True, False)
+    def test_local_cache(self, with_storage_backing):
+        with patch.dict(settings.BLOCK_STRUCTURES_SETTINGS, {'LOCAL_CACHE_MAX_BYTES': 10 ** 6}):
+            get_local_cache().clear()
+            with waffle().override(STORAGE_BACKING_FOR_CACHE, active=with_storage_backing):
+                self.store.add(self.block_structure)
+                self.mock_cache.map.clear()
+
+                # Served from the local tier without the shared cache.
+                stored_value = self.store.get(self.block_structure.root_block_usage_key)
+                self.assert_block_structure(stored_value, self.children_map)
+
+                self.store.delete(self.block_structure.root_block_usage_key)
+                with self.assertRaises(BlockStructureNotFound):
+                    self.store.get(self.block_structure.root_block_usage_key)
+
+    def test_local_cache_disabled(self):
+        with patch.dict(settings.BLOCK_STRUCTURES_SETTINGS, {'LOCAL_CACHE_MAX_BYTES': 0}):
+            self.assertIsNone(get_local_cache())
+            self.store.add(self.block_structure)
+            self.mock_cache.map.clear()
+            with self.assertRaises(BlockStructureNotFound):
+                self.store.get(self.block_structure.root_block_usage_key)
+
+    def test_local_cache_outdated(self):
+        with patch.dict(settings.BLOCK_STRUCTURES_SETTINGS, {'LOCAL_CACHE_MAX_BYTES': 10 ** 6}):
+            get_local_cache().clear()
+            with waffle().override(STORAGE_BACKING_FOR_CACHE, active=True):
+                self.store.add(self.block_structure)
+                with patch.object(BlockStructureStore, '_encode_root_cache_key', return_value=u'newer version'):
+                    with patch.object(BlockStructureStore, '_get_from_cache') as mock_get_from_cache:
+                        mock_get_from_cache.return_value = self.store._serialize(self.block_structure)  # pylint: disable=protected-access
+                        self.store.get(self.block_structure.root_block_usage_key)
+                        self.assertTrue(mock_get_from_cache.called)
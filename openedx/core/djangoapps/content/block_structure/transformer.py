@@ -55,6 +55,23 @@ class BlockStructureTransformer(object):
     WRITE_VERSION = 0
     READ_VERSION = 0
 
+    # Transformers should set this class attribute to True if their
+    # collect method can be run on a partial block structure in order to
+    # update the collected data of only some of the blocks of a course,
+    # namely those that changed since they were collected and their
+    # descendants.
+    #
+    # That requires the data collected for a block to depend only on the
+    # block itself and its ancestors, which are always part of the
+    # partial block structure, and non-block-specific data to depend only
+    # on the root block.  Any other xBlock accessed through get_xblock is
+    # loaded on demand, but is not necessarily part of the partial block
+    # structure.
+    #
+    # The collected data of a block structure is only ever updated
+    # partially if all registered transformers support it.
+    SUPPORTS_PARTIAL_COLLECT = False
+
     @classmethod
     def name(cls):
         """
@@ -3,7 +3,10 @@ Module for a collection of BlockStructureTransformers.
 """
 import functools
 from logging import getLogger
+from time import time
 
+from . import instrumentation
+from .block_structure import EDIT_INFO_FIELDS
 from .exceptions import TransformerException, TransformerDataIncompatible
 from .transformer import FilteringTransformerMixin
 from .transformer_registry import TransformerRegistry
@@ -75,12 +78,45 @@ class BlockStructureTransformers(object):
         """
         Collects data for each registered transformer.
         """
+        durations = []
         for transformer in TransformerRegistry.get_registered_transformers():
+            start = time()
             block_structure._add_transformer(transformer)  # pylint: disable=protected-access
             transformer.collect(block_structure)
+            durations.append((transformer.name(), time() - start))
+
+        # Collect the blocks' edit info, used to find the blocks whose
+        # collected data is outdated when the block structure is updated.
+        block_structure.request_xblock_fields(*EDIT_INFO_FIELDS)
 
         # Collect all fields that were requested by the transformers.
+        start = time()
         block_structure._collect_requested_xblock_fields()  # pylint: disable=protected-access
+        durations.append((instrumentation.XBLOCK_FIELDS, time() - start))
+
+        recorders = instrumentation.get_enabled_recorders()
+        if recorders:
+            instrumentation.record_collect(recorders, block_structure, durations)
+
+    @classmethod
+    def supports_partial_collect(cls, block_structure):
+        """
+        Returns whether the collected data in the given block structure
+        can be updated by collecting data for only some of its blocks.
+
+        This requires all registered Transformers to support partial
+        collection and the block structure's data to have been collected
+        with their current versions.
+        """
+        registered_transformers = TransformerRegistry.get_registered_transformers()
+        if set(block_structure.transformer_data) != {transformer.name() for transformer in registered_transformers}:
+            return False
+
+        return all(
+            transformer.SUPPORTS_PARTIAL_COLLECT and
+            block_structure._get_transformer_data_version(transformer) == transformer.WRITE_VERSION  # pylint: disable=protected-access
+            for transformer in registered_transformers
+        )
 
     @classmethod
     def verify_versions(cls, block_structure):
@@ -112,23 +148,36 @@ class BlockStructureTransformers(object):
         single course tree traversal, then remaining transformers are run in
         the order that they were added.
         """
-        self._transform_with_filters(block_structure)
-        self._transform_without_filters(block_structure)
+        recorders = instrumentation.get_enabled_recorders()
+        self._transform_with_filters(block_structure, recorders)
+        self._transform_without_filters(block_structure, recorders)
 
         # Prune the block structure to remove any unreachable blocks.
         block_structure._prune_unreachable()  # pylint: disable=protected-access
 
-    def _transform_with_filters(self, block_structure):
+    def _transform_with_filters(self, block_structure, recorders):
         """
         Transforms the given block_structure using the transform_block_filters
         method from the given transformers.
+
+        When measured for the given recorders, the filters of each
+        transformer are combined into a single measured filter, so the
+        time spent in and the blocks kept by each transformer are known
+        even though all filters are applied in a single traversal.
         """
         if not self._transformers['supports_filter']:
             return
 
         filters = []
+        measurements = []
         for transformer in self._transformers['supports_filter']:
-            filters.extend(transformer.transform_block_filters(self.usage_info, block_structure))
+            start = time()
+            transformer_filters = transformer.transform_block_filters(self.usage_info, block_structure)
+            if recorders:
+                measurement = instrumentation.FiltersMeasurement(transformer.name(), time() - start)
+                measurements.append(measurement)
+                transformer_filters = [measurement.measured_filter(transformer_filters)]
+            filters.extend(transformer_filters)
 
         combined_filters = functools.reduce(
             self._filter_chain,
@@ -137,6 +186,9 @@ class BlockStructureTransformers(object):
         )
         block_structure.filter_topological_traversal(combined_filters)
 
+        for measurement in measurements:
+            measurement.record(recorders)
+
     def _filter_chain(self, accumulated, additional):
         """
         Given two functions that take a block_key and return a boolean, yield
@@ -144,10 +196,18 @@ class BlockStructureTransformers(object):
         """
         return lambda block_key: accumulated(block_key) and additional(block_key)
 
-    def _transform_without_filters(self, block_structure):
+    def _transform_without_filters(self, block_structure, recorders):
         """
         Transforms the given block_structure using the transform
         method from the given transformers.
         """
         for transformer in self._transformers['no_filter']:
-            transformer.transform(self.usage_info, block_structure)
+            if recorders:
+                num_blocks_before = len(block_structure)
+                start = time()
+                transformer.transform(self.usage_info, block_structure)
+                instrumentation.record_transform(
+                    recorders, transformer.name(), time() - start, num_blocks_before, len(block_structure),
+                )
+            else:
+                transformer.transform(self.usage_info, block_structure)
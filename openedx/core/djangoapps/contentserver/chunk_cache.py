@@ -0,0 +1,78 @@
+"""
+A process-local cache of the chunks of recently ranged assets.
+
+Video players and PDF viewers read large assets with many small ranged
+requests, often of the same parts of the file.  Caching the chunks read keeps
+them from being read from GridFS again on every request.
+"""
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+class AssetChunkCache(object):
+    """
+    Caches fixed-size chunks of the data of assets, keyed by content digest
+    and chunk index, and removes the least recently used chunks when their
+    total size exceeds max_size.
+    """
+    def __init__(self, max_size, chunk_size):
+        self.max_size = max_size
+        self.chunk_size = chunk_size
+        self._chunks = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def stream_data_in_range(self, content, first_byte, last_byte):
+        """
+        Streams the data of the given StaticContentStream between first_byte
+        and last_byte (included), reading the chunks which aren't cached from
+        the content.
+        """
+        first_index = first_byte // self.chunk_size
+        last_index = last_byte // self.chunk_size
+        for index in xrange(first_index, last_index + 1):
+            chunk = self._get_chunk(content, index)
+            start = index * self.chunk_size
+            yield chunk[max(first_byte - start, 0):last_byte - start + 1]
+
+    def _get_chunk(self, content, index):
+        """
+        Returns the chunk of the data of the given content with the given index.
+        """
+        key = (content.content_digest, index)
+        with self._lock:
+            chunk = self._chunks.pop(key, None)
+            if chunk is not None:
+                self._chunks[key] = chunk
+                return chunk
+
+        start = index * self.chunk_size
+        last = min(start + self.chunk_size, content.length) - 1
+        chunk = ''.join(content.stream_data_in_range(start, last, chunk_size=self.chunk_size))
+        with self._lock:
+            if key not in self._chunks:
+                self._chunks[key] = chunk
+                self._size += len(chunk)
+                while self._size > self.max_size:
+                    __, evicted = self._chunks.popitem(last=False)
+                    self._size -= len(evicted)
+        return chunk
+
+
+_CHUNK_CACHE = None
+
+
+def get_asset_chunk_cache(chunk_size):
+    """
+    Returns the AssetChunkCache of this process, sized by the
+    CONTENTSERVER_RANGE_CACHE_SIZE setting, or None if it's disabled.
+    """
+    global _CHUNK_CACHE  # pylint: disable=global-statement
+    max_size = getattr(settings, 'CONTENTSERVER_RANGE_CACHE_SIZE', 0)
+    if not max_size:
+        return None
+    if _CHUNK_CACHE is None or (_CHUNK_CACHE.max_size, _CHUNK_CACHE.chunk_size) != (max_size, chunk_size):
+        _CHUNK_CACHE = AssetChunkCache(max_size, chunk_size)
+    return _CHUNK_CACHE
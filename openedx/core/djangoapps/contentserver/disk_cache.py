@@ -0,0 +1,153 @@
+"""
+A bounded cache of course assets on the local disk, keyed by content digest.
+
+Assets too large for the course_assets cache are otherwise read from GridFS on
+every request.  The cached files are served directly from the disk, which lets
+the WSGI server send them without copying them through the Python process.
+"""
+import errno
+import logging
+import os
+import re
+import tempfile
+
+from django.conf import settings
+
+log = logging.getLogger(__name__)
+
+DIGEST_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+TEMP_FILE_PREFIX = 'tmp-'
+
+
+class AssetDiskCache(object):
+    """
+    Stores the content of assets in files named after their content digest,
+    and removes the least recently used files when their total size exceeds
+    max_size.  As the content of a digest never changes, the files can be
+    shared by all of the processes of a server.
+    """
+    def __init__(self, directory, max_size):
+        self.directory = directory
+        self.max_size = max_size
+
+    def open(self, content_digest):
+        """
+        Returns the cached file of the given digest, opened for reading, or
+        None if it isn't cached.
+        """
+        if not DIGEST_PATTERN.match(content_digest or ''):
+            return None
+        path = self._path(content_digest)
+        try:
+            cached_file = open(path, 'rb')
+        except (IOError, OSError):
+            return None
+        try:
+            # The modification time records when the file was last used.
+            os.utime(path, None)
+        except (IOError, OSError):
+            cached_file.close()
+            return None
+        return cached_file
+
+    def cache_stream(self, content_digest, chunks):
+        """
+        Yields the given chunks of the content of the given digest, and stores
+        them in the cache once all of them were read.
+        """
+        if not DIGEST_PATTERN.match(content_digest or ''):
+            for chunk in chunks:
+                yield chunk
+            return
+
+        temp_file = self._create_temp_file()
+        if temp_file is None:
+            for chunk in chunks:
+                yield chunk
+            return
+
+        stored = False
+        try:
+            for chunk in chunks:
+                temp_file.write(chunk)
+                yield chunk
+            temp_file.close()
+            os.rename(temp_file.name, self._path(content_digest))
+            stored = True
+        except (IOError, OSError):
+            log.exception(u"Unable to cache the asset with digest %s", content_digest)
+        finally:
+            # The chunks may not all be read, e.g. if the client disconnects.
+            if not stored:
+                temp_file.close()
+                _remove(temp_file.name)
+
+        if stored:
+            try:
+                self.evict()
+            except OSError:
+                log.exception(u"Unable to evict assets from the asset disk cache %s", self.directory)
+
+    def evict(self):
+        """
+        Removes the least recently used files until the total size of the
+        cached files is at most max_size.
+        """
+        files = []
+        total_size = 0
+        for name in os.listdir(self.directory):
+            if name.startswith(TEMP_FILE_PREFIX):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, name))
+            total_size += stat.st_size
+
+        for __, size, name in sorted(files):
+            if total_size <= self.max_size:
+                break
+            _remove(os.path.join(self.directory, name))
+            total_size -= size
+
+    def _path(self, content_digest):
+        """
+        Returns the path of the file storing the content of the given digest.
+        """
+        return os.path.join(self.directory, content_digest)
+
+    def _create_temp_file(self):
+        """
+        Returns a new temporary file in the cache directory, or None if it
+        can't be created.
+        """
+        try:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+            return tempfile.NamedTemporaryFile(dir=self.directory, prefix=TEMP_FILE_PREFIX, delete=False)
+        except (IOError, OSError):
+            log.exception(u"Unable to create a file in the asset disk cache %s", self.directory)
+            return None
+
+
+def _remove(path):
+    """
+    Removes the given file, if it still exists.
+    """
+    try:
+        os.remove(path)
+    except OSError as exception:
+        if exception.errno != errno.ENOENT:
+            raise
+
+
+def get_asset_disk_cache():
+    """
+    Returns the AssetDiskCache configured by the CONTENTSERVER_DISK_CACHE
+    setting, or None if it's disabled.
+    """
+    config = getattr(settings, 'CONTENTSERVER_DISK_CACHE', None) or {}
+    if not config.get('DIRECTORY') or not config.get('MAX_SIZE'):
+        return None
+    return AssetDiskCache(config['DIRECTORY'], config['MAX_SIZE'])
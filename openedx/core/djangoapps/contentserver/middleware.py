@@ -4,24 +4,31 @@ Middleware to serve assets.
 
 import logging
 import datetime
+from functools import partial
+from uuid import uuid4
+
 log = logging.getLogger(__name__)
 try:
     import newrelic.agent
 except ImportError:
     newrelic = None  # pylint: disable=invalid-name
 from django.http import (
-    HttpResponse, HttpResponseNotModified, HttpResponseForbidden,
-    HttpResponseBadRequest, HttpResponseNotFound, HttpResponsePermanentRedirect)
+    FileResponse, HttpResponse, HttpResponseNotModified, HttpResponseForbidden,
+    HttpResponseBadRequest, HttpResponseNotFound, HttpResponsePermanentRedirect,
+    StreamingHttpResponse)
+from django.utils.http import parse_etags
 from six import text_type
 from student.models import CourseEnrollment
 
 from xmodule.assetstore.assetmgr import AssetManager
-from xmodule.contentstore.content import StaticContent, XASSET_LOCATION_TAG
+from xmodule.contentstore.content import StaticContent, StaticContentStream, XASSET_LOCATION_TAG
 from xmodule.modulestore import InvalidLocationError
 from opaque_keys import InvalidKeyError
 from opaque_keys.edx.locator import AssetLocator
 from openedx.core.djangoapps.header_control import force_header_for_response
 from .caching import get_cached_content, set_cached_content
+from .chunk_cache import get_asset_chunk_cache
+from .disk_cache import get_asset_disk_cache
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.exceptions import NotFoundError
 
@@ -32,6 +39,16 @@ from .models import CourseAssetCacheTtlConfig, CdnUserAgentsConfig
 
 HTTP_DATE_FORMAT = "%a, %d %b %Y %H:%M:%S GMT"
 
+# Size of the chunks in which streamed assets are read, the default GridFS chunk size.
+STREAM_CHUNK_SIZE = 255 * 1024
+
+# Assets smaller than this are held in memory and stored in the course_assets cache.
+# This is the default item size limit of memcached.
+MAX_CACHED_CONTENT_LENGTH = 1048576
+
+# Maximum number of ranges sent back in a multipart/byteranges response.
+MAX_BYTE_RANGES = 20
+
 
 class StaticContentServer(object):
     """
@@ -108,12 +125,24 @@ class StaticContentServer(object):
                 return HttpResponseForbidden('Unauthorized')
 
             # Figure out if the client sent us a conditional request, and let them know
-            # if this asset has changed since then.
+            # if this asset has changed since then.  If-None-Match takes precedence over
+            # If-Modified-Since.
             last_modified_at_str = content.last_modified_at.strftime(HTTP_DATE_FORMAT)
-            if 'HTTP_IF_MODIFIED_SINCE' in request.META:
+            if 'HTTP_IF_NONE_MATCH' in request.META:
+                if actual_digest and etag_matches(request.META['HTTP_IF_NONE_MATCH'], actual_digest):
+                    return self.not_modified_response(content)
+            elif 'HTTP_IF_MODIFIED_SINCE' in request.META:
                 if_modified_since = request.META['HTTP_IF_MODIFIED_SINCE']
                 if if_modified_since == last_modified_at_str:
-                    return HttpResponseNotModified()
+                    return self.not_modified_response(content)
+
+            # Large assets are served from the local disk cache when it has them.
+            disk_cache = get_asset_disk_cache()
+            cached_file = None
+            if disk_cache is not None and isinstance(content, StaticContentStream):
+                cached_file = disk_cache.open(actual_digest)
+                if newrelic:
+                    newrelic.agent.add_custom_parameter('contentserver.disk_cached', cached_file is not None)
 
             # *** File streaming within a byte range ***
             # If a Range is provided, parse Range attribute of the request
@@ -122,55 +151,103 @@ class StaticContentServer(object):
             # Response -> Content-Range attribute structure: "Content-Range: bytes first-last/totalLength"
             # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.35
             response = None
-            if request.META.get('HTTP_RANGE'):
-                # If we have a StaticContent, get a StaticContentStream.  Can't manipulate the bytes otherwise.
-                if isinstance(content, StaticContent):
-                    content = AssetManager.find(loc, as_stream=True)
-
-                header_value = request.META['HTTP_RANGE']
-                try:
-                    unit, ranges = parse_range_header(header_value, content.length)
-                except ValueError as exception:
-                    # If the header field is syntactically invalid it should be ignored.
-                    log.exception(
-                        u"%s in Range header: %s for content: %s", text_type(exception), header_value, unicode(loc)
-                    )
-                else:
-                    if unit != 'bytes':
-                        # Only accept ranges in bytes
-                        log.warning(u"Unknown unit in Range header: %s for content: %s", header_value, text_type(loc))
-                    elif len(ranges) > 1:
-                        # According to Http/1.1 spec content for multiple ranges should be sent as a multipart message.
-                        # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.16
-                        # But we send back the full content.
-                        log.warning(
-                            u"More than 1 ranges in Range header: %s for content: %s", header_value, text_type(loc)
+            content_type = content.content_type
+            # The cached file, if the ranges of the response are read from it.
+            range_file = None
+            try:
+                if request.META.get('HTTP_RANGE'):
+                    # Ranges of assets in the disk cache are read from the disk, ranges of other
+                    # streamed assets go through the chunk cache, and ranges of assets held in
+                    # memory are sliced from their data.
+                    if cached_file is not None:
+                        content = open_cached_content(content, cached_file)
+                        read_range = partial(content.stream_data_in_range, chunk_size=STREAM_CHUNK_SIZE)
+                        range_file = cached_file
+                    elif (
+                        isinstance(content, StaticContentStream) and actual_digest and
+                        get_asset_chunk_cache(STREAM_CHUNK_SIZE) is not None
+                    ):
+                        read_range = partial(get_asset_chunk_cache(STREAM_CHUNK_SIZE).stream_data_in_range, content)
+                    else:
+                        read_range = partial(content.stream_data_in_range, chunk_size=STREAM_CHUNK_SIZE)
+
+                    header_value = request.META['HTTP_RANGE']
+                    try:
+                        unit, ranges = parse_range_header(header_value, content.length)
+                    except ValueError as exception:
+                        # If the header field is syntactically invalid it should be ignored.
+                        log.exception(
+                            u"%s in Range header: %s for content: %s", text_type(exception), header_value, unicode(loc)
                         )
                     else:
-                        first, last = ranges[0]
-
-                        if 0 <= first <= last < content.length:
-                            # If the byte range is satisfiable
-                            response = HttpResponse(content.stream_data_in_range(first, last))
+                        # Unsatisfiable ranges are ignored, as long as one of the ranges is satisfiable.
+                        satisfiable_ranges = [
+                            (first, last) for first, last in ranges if 0 <= first <= last < content.length
+                        ]
+                        if unit != 'bytes':
+                            # Only accept ranges in bytes
+                            log.warning(
+                                u"Unknown unit in Range header: %s for content: %s", header_value, text_type(loc)
+                            )
+                        elif not satisfiable_ranges:
+                            log.warning(
+                                u"Cannot satisfy ranges in Range header: %s for content: %s",
+                                header_value, text_type(loc)
+                            )
+                            return HttpResponse(status=416)  # Requested Range Not Satisfiable
+                        elif len(satisfiable_ranges) == 1:
+                            first, last = satisfiable_ranges[0]
+                            response = StreamingHttpResponse(ClosingStream(read_range(first, last), range_file))
                             response['Content-Range'] = 'bytes {first}-{last}/{length}'.format(
                                 first=first, last=last, length=content.length
                             )
                             response['Content-Length'] = str(last - first + 1)
                             response.status_code = 206  # Partial Content
-
-                            if newrelic:
-                                newrelic.agent.add_custom_parameter('contentserver.ranged', True)
+                        elif (
+                            len(satisfiable_ranges) <= MAX_BYTE_RANGES and
+                            sum(last - first + 1 for first, last in satisfiable_ranges) <= content.length
+                        ):
+                            # According to Http/1.1 spec content for multiple ranges should be sent as a
+                            # multipart message.
+                            # https://tools.ietf.org/html/rfc7233#section-4.1
+                            boundary = uuid4().hex
+                            length, body = multipart_byteranges(content, satisfiable_ranges, boundary, read_range)
+                            response = StreamingHttpResponse(ClosingStream(body, range_file))
+                            response['Content-Length'] = str(length)
+                            response.status_code = 206  # Partial Content
+                            content_type = 'multipart/byteranges; boundary={}'.format(boundary)
                         else:
+                            # Too many ranges, or ranges overlapping too much, are likely to be abusive.
+                            # We send back the full content.
                             log.warning(
-                                u"Cannot satisfy ranges in Range header: %s for content: %s",
-                                header_value, text_type(loc)
+                                u"Too many ranges in Range header: %s for content: %s", header_value, text_type(loc)
                             )
-                            return HttpResponse(status=416)  # Requested Range Not Satisfiable
 
-            # If Range header is absent or syntactically invalid return a full content response.
-            if response is None:
-                response = HttpResponse(content.stream_data())
-                response['Content-Length'] = content.length
+                        if response is not None:
+                            # The response closes the cached file when it reads from it.
+                            cached_file = None
+                            if newrelic:
+                                newrelic.agent.add_custom_parameter('contentserver.ranged', True)
+
+                # If Range header is absent or syntactically invalid return a full content response.
+                # Assets which aren't held in memory are streamed, and stored in the disk cache
+                # along the way.
+                if response is None:
+                    if cached_file is not None:
+                        response = FileResponse(cached_file)
+                        cached_file = None
+                    elif isinstance(content, StaticContentStream):
+                        chunks = content.stream_data(chunk_size=STREAM_CHUNK_SIZE)
+                        if disk_cache is not None:
+                            chunks = disk_cache.cache_stream(actual_digest, chunks)
+                        response = StreamingHttpResponse(chunks)
+                    else:
+                        response = HttpResponse(content.stream_data())
+                    response['Content-Length'] = content.length
+            finally:
+                # Unless a response reads the cached file, it's closed here.
+                if cached_file is not None:
+                    cached_file.close()
 
             if newrelic:
                 newrelic.agent.add_custom_parameter('contentserver.content_len', content.length)
@@ -178,7 +255,7 @@ class StaticContentServer(object):
 
             # "Accept-Ranges: bytes" tells the user that only "bytes" ranges are allowed
             response['Accept-Ranges'] = 'bytes'
-            response['Content-Type'] = content.content_type
+            response['Content-Type'] = content_type
             response['X-Frame-Options'] = 'ALLOW'
 
             # Set any caching headers, and do any response cleanup needed.  Based on how much
@@ -215,12 +292,23 @@ class StaticContentServer(object):
             response['Cache-Control'] = "private, no-cache, no-store"
 
         response['Last-Modified'] = content.last_modified_at.strftime(HTTP_DATE_FORMAT)
+        if getattr(content, "content_digest", None):
+            response['ETag'] = quote_etag(content.content_digest)
 
         # Force the Vary header to only vary responses on Origin, so that XHR and browser requests get cached
         # separately and don't screw over one another. i.e. a browser request that doesn't send Origin, and
         # caches a version of the response without CORS headers, in turn breaking XHR requests.
         force_header_for_response(response, 'Vary', 'Origin')
 
+    def not_modified_response(self, content):
+        """
+        Returns a 304 Not Modified response for the given content, with the same
+        caching headers as the full response.
+        """
+        response = HttpResponseNotModified()
+        self.set_caching_headers(content, response)
+        return response
+
     @staticmethod
     def is_cdn_request(request):
         """
@@ -286,13 +374,110 @@ class StaticContentServer(object):
             # Now that we fetched it, let's go ahead and try to cache it. We cap this at 1MB
             # because it's the default for memcached and also we don't want to do too much
             # buffering in memory when we're serving an actual request.
-            if content.length is not None and content.length < 1048576:
+            if content.length is not None and content.length < MAX_CACHED_CONTENT_LENGTH:
                 content = content.copy_to_in_mem()
                 set_cached_content(content)
 
         return content
 
 
+def quote_etag(content_digest):
+    """
+    Returns the ETag header value of content with the given digest.
+    """
+    return '"{}"'.format(content_digest)
+
+
+def etag_matches(header_value, content_digest):
+    """
+    Returns whether the given If-None-Match header value matches content with
+    the given digest, using the weak comparison of RFC 7232.
+    """
+    etags = parse_etags(header_value)
+    if etags == ['*']:
+        return True
+    etag = quote_etag(content_digest)
+    return any(
+        (candidate[2:] if candidate.startswith('W/') else candidate) == etag
+        for candidate in etags
+    )
+
+
+class ClosingStream(object):
+    """
+    An iterator of chunks, which closes a file when the response streaming
+    them is closed.
+    """
+    def __init__(self, chunks, closable):
+        self.chunks = chunks
+        self.closable = closable
+
+    def __iter__(self):
+        return iter(self.chunks)
+
+    def close(self):
+        """
+        Closes the file, if any.
+        """
+        if self.closable is not None:
+            self.closable.close()
+
+
+def open_cached_content(content, cached_file):
+    """
+    Returns a StaticContentStream of the given content, reading its data from
+    the given file of the disk cache.
+    """
+    return StaticContentStream(
+        content.location, content.name, content.content_type, cached_file,
+        last_modified_at=content.last_modified_at, thumbnail_location=content.thumbnail_location,
+        import_path=content.import_path, length=content.length, locked=content.locked,
+        content_digest=content.content_digest,
+    )
+
+
+def multipart_byteranges(content, ranges, boundary, read_range):
+    """
+    Returns the length and a generator of the body of a multipart/byteranges
+    response with the given ranges of the given content.
+
+    read_range is called with the first and last byte of each range, and
+    returns an iterator of the data of the range.
+
+    See spec for details: https://tools.ietf.org/html/rfc7233#appendix-A
+    """
+    part_header_format = (
+        '--{boundary}\r\n'
+        'Content-Type: {content_type}\r\n'
+        'Content-Range: bytes {first}-{last}/{length}\r\n'
+        '\r\n'
+    )
+    part_headers = [
+        part_header_format.format(
+            boundary=boundary, content_type=content.content_type, first=first, last=last, length=content.length
+        ).encode('utf-8')
+        for first, last in ranges
+    ]
+    closing = '--{}--\r\n'.format(boundary)
+    length = sum(
+        len(part_header) + (last - first + 1) + 2
+        for part_header, (first, last) in zip(part_headers, ranges)
+    ) + len(closing)
+
+    def body():
+        """
+        Yields the parts of the body.
+        """
+        for part_header, (first, last) in zip(part_headers, ranges):
+            yield part_header
+            for chunk in read_range(first, last):
+                yield chunk
+            yield '\r\n'
+        yield closing
+
+    return length, body()
+
+
 def parse_range_header(header_value, content_length):
     """
     Returns the unit and a list of (start, end) tuples of ranges.
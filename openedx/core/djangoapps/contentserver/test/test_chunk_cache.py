@@ -0,0 +1,67 @@
+"""
+Tests for the asset chunk cache
+"""
+import unittest
+from StringIO import StringIO
+
+import ddt
+from mock import Mock
+
+from xmodule.contentstore.content import StaticContentStream
+
+from ..chunk_cache import AssetChunkCache
+
+DATA = ''.join(chr(ord('a') + index % 26) for index in range(100))
+
+
+@ddt.ddt
+class AssetChunkCacheTestCase(unittest.TestCase):
+    """
+    Tests for AssetChunkCache.
+    """
+
+    def setUp(self):
+        super(AssetChunkCacheTestCase, self).setUp()
+        self.cache = AssetChunkCache(max_size=30, chunk_size=10)
+
+    def _make_content(self, content_digest='digest'):
+        """
+        Returns a StaticContentStream of DATA, whose stream counts the reads.
+        """
+        stream = Mock(wraps=StringIO(DATA))
+        return StaticContentStream(
+            'loc', 'name', 'type', stream, length=len(DATA), content_digest=content_digest
+        )
+
+    @ddt.data((0, 99), (5, 5), (5, 24), (10, 19), (95, 99))
+    @ddt.unpack
+    def test_stream_data_in_range(self, first_byte, last_byte):
+        content = self._make_content()
+        data = ''.join(self.cache.stream_data_in_range(content, first_byte, last_byte))
+        self.assertEqual(data, DATA[first_byte:last_byte + 1])
+
+    def test_cached_chunks(self):
+        content = self._make_content()
+        ''.join(self.cache.stream_data_in_range(content, 5, 24))
+        self.assertEqual(content._stream.seek.call_count, 3)  # pylint: disable=protected-access
+
+        content = self._make_content()
+        self.assertEqual(''.join(self.cache.stream_data_in_range(content, 12, 16)), DATA[12:17])
+        self.assertFalse(content._stream.seek.called)  # pylint: disable=protected-access
+
+        # The cache is keyed by content digest.
+        content = self._make_content('other_digest')
+        ''.join(self.cache.stream_data_in_range(content, 12, 16))
+        self.assertTrue(content._stream.seek.called)  # pylint: disable=protected-access
+
+    def test_evict_least_recently_used(self):
+        content = self._make_content()
+        ''.join(self.cache.stream_data_in_range(content, 0, 29))
+        ''.join(self.cache.stream_data_in_range(content, 0, 9))
+        ''.join(self.cache.stream_data_in_range(content, 30, 39))
+
+        content = self._make_content()
+        ''.join(self.cache.stream_data_in_range(content, 0, 9))
+        self.assertFalse(content._stream.seek.called)  # pylint: disable=protected-access
+        ''.join(self.cache.stream_data_in_range(content, 10, 19))
+        self.assertTrue(content._stream.seek.called)  # pylint: disable=protected-access
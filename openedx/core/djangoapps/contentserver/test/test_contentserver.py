@@ -6,14 +6,18 @@ import copy
 import datetime
 import ddt
 import logging
+import os
+import shutil
 import unittest
+from tempfile import mkdtemp
 from uuid import uuid4
 
 from django.conf import settings
+from django.http import FileResponse
 from django.test import RequestFactory
 from django.test.client import Client
 from django.test.utils import override_settings
-from mock import patch
+from mock import Mock, patch
 
 from xmodule.contentstore.django import contentstore
 from xmodule.contentstore.content import StaticContent, VERSIONED_ASSETS_PREFIX
@@ -27,6 +31,7 @@ from xmodule.modulestore.exceptions import ItemNotFoundError
 from student.models import CourseEnrollment
 from student.tests.factories import UserFactory, AdminFactory
 
+from ..disk_cache import AssetDiskCache
 from ..middleware import parse_range_header, HTTP_DATE_FORMAT, StaticContentServer
 
 log = logging.getLogger(__name__)
@@ -242,13 +247,49 @@ class ContentStoreToyCourseTest(SharedModuleStoreTestCase):
 
     def test_range_request_multiple_ranges(self):
         """
-        Test that multiple ranges in request outputs the full content.
+        Test that multiple ranges in request outputs a multipart/byteranges response
+        with a part for each range.
         """
         first_byte = self.length_unlocked / 4
         last_byte = self.length_unlocked / 2
-        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes={first}-{last}, -100'.format(
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes={first}-{last}, -10'.format(
             first=first_byte, last=last_byte))
 
+        self.assertEqual(resp.status_code, 206)
+        self.assertNotIn('Content-Range', resp)
+        content_type, boundary = resp['Content-Type'].split('; boundary=')
+        self.assertEqual(content_type, 'multipart/byteranges')
+
+        body = ''.join(resp.streaming_content)
+        self.assertEqual(resp['Content-Length'], str(len(body)))
+        data = self.contentstore.find(self.unlocked_asset).data
+        parts = body.split('--{}'.format(boundary))
+        self.assertEqual(parts[0], '')
+        self.assertEqual(parts[-1], '--\r\n')
+        expected_ranges = [(first_byte, last_byte), (self.length_unlocked - 10, self.length_unlocked - 1)]
+        for part, (first, last) in zip(parts[1:-1], expected_ranges):
+            headers, part_data = part.split('\r\n\r\n', 1)
+            self.assertIn('Content-Range: bytes {}-{}/{}'.format(first, last, self.length_unlocked), headers)
+            self.assertEqual(part_data, data[first:last + 1] + '\r\n')
+
+    def test_range_request_multiple_ranges_unsatisfiable(self):
+        """
+        Test that the unsatisfiable ranges of multiple ranges are ignored, and that a
+        request with only unsatisfiable ranges outputs 416 Requested Range Not Satisfiable.
+        """
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=0-9, {}-'.format(self.length_unlocked))
+        self.assertEqual(resp.status_code, 206)
+        self.assertEqual(resp['Content-Range'], 'bytes 0-9/{}'.format(self.length_unlocked))
+
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes={0}-, {0}-'.format(self.length_unlocked))
+        self.assertEqual(resp.status_code, 416)
+
+    def test_range_request_too_many_ranges(self):
+        """
+        Test that ranges overlapping more than the content outputs the full content.
+        """
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=0-, 0-')
+
         self.assertEqual(resp.status_code, 200)
         self.assertNotIn('Content-Range', resp)
         self.assertEqual(resp['Content-Length'], str(self.length_unlocked))
@@ -285,6 +326,107 @@ class ContentStoreToyCourseTest(SharedModuleStoreTestCase):
             first=(self.length_unlocked), last=(self.length_unlocked)))
         self.assertEqual(resp.status_code, 416)
 
+    def test_etag_header_sent(self):
+        """
+        Tests that the ETag header of assets is their content digest.
+        """
+        resp = self.client.get(self.url_unlocked)
+        self.assertEqual(resp.status_code, 200)
+        digest = self.contentstore.find(self.unlocked_asset).content_digest
+        self.assertEqual(resp['ETag'], '"{}"'.format(digest))
+
+    @ddt.data(
+        ('{etag}', 304),
+        ('W/{etag}', 304),
+        ('"{fake}", {etag}', 304),
+        ('*', 304),
+        ('"{fake}"', 200),
+    )
+    @ddt.unpack
+    def test_if_none_match(self, header_template, expected_status_code):
+        """
+        Tests that conditional requests with an If-None-Match header matching the
+        ETag of the asset get a 304 Not Modified response.
+        """
+        etag = self.client.get(self.url_unlocked)['ETag']
+        resp = self.client.get(
+            self.url_unlocked,
+            HTTP_IF_NONE_MATCH=header_template.format(etag=etag, fake=FAKE_MD5_HASH),
+        )
+        self.assertEqual(resp.status_code, expected_status_code)
+        self.assertEqual(resp['ETag'], etag)
+
+    def test_if_none_match_precedence(self):
+        """
+        Tests that If-Modified-Since is ignored when If-None-Match is sent.
+        """
+        resp = self.client.get(self.url_unlocked)
+        resp = self.client.get(
+            self.url_unlocked,
+            HTTP_IF_NONE_MATCH='"{}"'.format(FAKE_MD5_HASH),
+            HTTP_IF_MODIFIED_SINCE=resp['Last-Modified'],
+        )
+        self.assertEqual(resp.status_code, 200)
+
+    @patch('openedx.core.djangoapps.contentserver.middleware.MAX_CACHED_CONTENT_LENGTH', 0)
+    @patch('openedx.core.djangoapps.contentserver.middleware.get_cached_content', Mock(return_value=None))
+    def test_streamed_asset_disk_cache(self):
+        """
+        Tests that assets too large for the course_assets cache are streamed, and
+        served from the disk cache once they were streamed.
+        """
+        cache_dir = mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        with override_settings(CONTENTSERVER_DISK_CACHE={'DIRECTORY': cache_dir, 'MAX_SIZE': 1024 * 1024}):
+            resp = self.client.get(self.url_unlocked)
+            self.assertTrue(resp.streaming)
+            self.assertNotIsInstance(resp, FileResponse)
+            data = ''.join(resp.streaming_content)
+            self.assertEqual(len(data), self.length_unlocked)
+            self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+            resp = self.client.get(self.url_unlocked)
+            self.assertIsInstance(resp, FileResponse)
+            self.assertEqual(resp['Content-Length'], str(self.length_unlocked))
+            self.assertEqual(''.join(resp.streaming_content), data)
+
+            resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=1-10')
+            self.assertEqual(resp.status_code, 206)
+            self.assertEqual(''.join(resp.streaming_content), data[1:11])
+
+    def test_disk_cached_file_closed(self):
+        """
+        Tests that files opened from the disk cache are closed, whether or not
+        the response reads them.
+        """
+        cache_dir = mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        with override_settings(CONTENTSERVER_DISK_CACHE={'DIRECTORY': cache_dir, 'MAX_SIZE': 1024 * 1024}):
+            ''.join(self.client.get(self.url_unlocked).streaming_content)
+
+            opened_files = []
+            original_open = AssetDiskCache.open
+
+            def open_cached_file(disk_cache, digest):
+                """
+                Opens the cached file, keeping track of it.
+                """
+                cached_file = original_open(disk_cache, digest)
+                opened_files.append(cached_file)
+                return cached_file
+
+            with patch.object(AssetDiskCache, 'open', open_cached_file):
+                resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes={}-'.format(self.length_unlocked))
+                self.assertEqual(resp.status_code, 416)
+                self.assertTrue(opened_files[-1].closed)
+
+                resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=1-10')
+                self.assertEqual(resp.status_code, 206)
+                self.assertFalse(opened_files[-1].closed)
+                ''.join(resp.streaming_content)
+                resp.close()
+                self.assertTrue(opened_files[-1].closed)
+
     def test_vary_header_sent(self):
         """
         Tests that we're properly setting the Vary header to ensure browser requests don't get
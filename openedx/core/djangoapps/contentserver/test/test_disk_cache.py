@@ -0,0 +1,66 @@
+"""
+Tests for the asset disk cache
+"""
+import os
+import shutil
+import unittest
+from tempfile import mkdtemp
+
+from mock import Mock, patch
+
+from ..disk_cache import AssetDiskCache
+
+DIGEST_1 = '1' * 32
+DIGEST_2 = '2' * 32
+
+
+class AssetDiskCacheTestCase(unittest.TestCase):
+    """
+    Tests for AssetDiskCache.
+    """
+
+    def setUp(self):
+        super(AssetDiskCacheTestCase, self).setUp()
+        self.directory = mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.cache = AssetDiskCache(self.directory, max_size=15)
+
+    def _cache(self, content_digest, chunks):
+        """
+        Streams the given chunks through the cache, and returns the streamed data.
+        """
+        return ''.join(self.cache.cache_stream(content_digest, iter(chunks)))
+
+    def test_cache_stream(self):
+        self.assertIsNone(self.cache.open(DIGEST_1))
+        self.assertEqual(self._cache(DIGEST_1, ['abc', 'def']), 'abcdef')
+        with self.cache.open(DIGEST_1) as cached_file:
+            self.assertEqual(cached_file.read(), 'abcdef')
+
+    def test_partial_stream_not_cached(self):
+        chunks = self.cache.cache_stream(DIGEST_1, iter(['abc', 'def']))
+        self.assertEqual(next(chunks), 'abc')
+        chunks.close()
+        self.assertIsNone(self.cache.open(DIGEST_1))
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_invalid_digest(self):
+        self.assertEqual(self._cache('../digest', ['abc']), 'abc')
+        self.assertIsNone(self.cache.open('../digest'))
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_evict_least_recently_used(self):
+        self._cache(DIGEST_1, ['a' * 10])
+        os.utime(os.path.join(self.directory, DIGEST_1), (0, 0))
+        self._cache(DIGEST_2, ['b' * 10])
+        self.assertIsNone(self.cache.open(DIGEST_1))
+        with self.cache.open(DIGEST_2) as cached_file:
+            self.assertEqual(cached_file.read(), 'b' * 10)
+
+    def test_file_closed_when_not_touched(self):
+        self._cache(DIGEST_1, ['abc'])
+        cached_file = Mock()
+        with patch('openedx.core.djangoapps.contentserver.disk_cache.open', create=True, return_value=cached_file):
+            with patch('openedx.core.djangoapps.contentserver.disk_cache.os.utime', side_effect=OSError):
+                self.assertIsNone(self.cache.open(DIGEST_1))
+        self.assertTrue(cached_file.close.called)
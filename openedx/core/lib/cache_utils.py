@@ -5,6 +5,8 @@ import collections
 import cPickle as pickle
 import functools
 import itertools
+import threading
+import time
 import zlib
 
 from django.utils.encoding import force_text
@@ -151,6 +153,116 @@ class process_cached(object):  # pylint: disable=invalid-name
         return functools.partial(self.__call__, obj)
 
 
+class ProcessLocalLRUCache(object):
+    """
+    A size-bounded, least-recently-used cache that lives for the life of
+    a process and is shared by all requests served by that process.
+
+    The size of each value is measured with the given size_func (1 per
+    value by default), so the cache can be bounded either by number of
+    entries or by bytes.  Entries optionally expire after timeout seconds.
+
+    Hit, miss and eviction counts are kept in the stats dict so callers
+    can report them as metrics.
+    """
+
+    def __init__(self, max_size, size_func=None, timeout=None):
+        """
+        Arguments:
+            max_size (int): Maximum total size of all cached values.
+            size_func (function: value->int): Function returning the
+                size of a value.  Defaults to 1 for each value.
+            timeout (int): Number of seconds after which an entry
+                expires.  If None, entries never expire.
+        """
+        self.max_size = max_size
+        self.size_func = size_func or (lambda value: 1)
+        self.timeout = timeout
+        self.size = 0
+        self.stats = collections.Counter()
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        """
+        Returns the value cached for the given key, marking it as most
+        recently used; returns default if not found or expired.
+        """
+        with self._lock:
+            try:
+                value, size, expires_at = self._entries.pop(key)
+            except KeyError:
+                self.stats['misses'] += 1
+                return default
+
+            if expires_at is not None and expires_at <= time.time():
+                self.size -= size
+                self.stats['misses'] += 1
+                return default
+
+            self._entries[key] = (value, size, expires_at)
+            self.stats['hits'] += 1
+            return value
+
+    def set(self, key, value):
+        """
+        Caches the given value for the given key, evicting the least
+        recently used entries as needed to stay within max_size.
+        Values larger than max_size are not cached.
+
+        Returns:
+            int: The number of entries evicted.
+        """
+        size = self.size_func(value)
+        expires_at = time.time() + self.timeout if self.timeout is not None else None
+        evicted = 0
+        with self._lock:
+            self._delete(key)
+            if size > self.max_size:
+                return evicted
+
+            while self._entries and self.size + size > self.max_size:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+                evicted += 1
+
+            self._entries[key] = (value, size, expires_at)
+            self.size += size
+            if evicted:
+                self.stats['evictions'] += evicted
+        return evicted
+
+    def delete(self, key):
+        """
+        Removes the entry for the given key, if any.
+        """
+        with self._lock:
+            self._delete(key)
+
+    def clear(self):
+        """
+        Removes all entries.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _delete(self, key):
+        """
+        Removes the entry for the given key, if any.  The caller must
+        hold the lock.
+        """
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+
 def zpickle(data):
     """Given any data structure, returns a zlib compressed pickled serialization."""
     return zlib.compress(pickle.dumps(data, pickle.HIGHEST_PROTOCOL))
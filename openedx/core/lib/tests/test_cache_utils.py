@@ -5,10 +5,10 @@ Tests for cache_utils.py
 from unittest import TestCase
 
 import ddt
-from mock import Mock
+from mock import Mock, patch
 
 from edx_django_utils.cache import RequestCache
-from openedx.core.lib.cache_utils import request_cached
+from openedx.core.lib.cache_utils import ProcessLocalLRUCache, request_cached
 
 
 @ddt.ddt
@@ -295,3 +295,65 @@ class TestRequestCachedDecorator(TestCase):
         result = wrapped(3)
         self.assertEqual(result, 2)
         self.assertEqual(to_be_wrapped.call_count, 2)
+
+
+class TestProcessLocalLRUCache(TestCase):
+    """
+    Test the ProcessLocalLRUCache class.
+    """
+    def test_hit_and_miss(self):
+        cache = ProcessLocalLRUCache(max_size=2)
+        self.assertIsNone(cache.get('a'))
+        cache.set('a', 1)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('b', 'default'), 'default')
+        self.assertEqual(cache.stats, {'hits': 1, 'misses': 2})
+
+    def test_evicts_least_recently_used(self):
+        cache = ProcessLocalLRUCache(max_size=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        self.assertEqual(cache.set('c', 3), 1)
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertIn('c', cache)
+        self.assertEqual(cache.stats['evictions'], 1)
+
+    def test_size_func(self):
+        cache = ProcessLocalLRUCache(max_size=10, size_func=len)
+        cache.set('a', 'x' * 6)
+        cache.set('b', 'x' * 4)
+        self.assertEqual(cache.size, 10)
+        self.assertEqual(cache.set('c', 'x' * 5), 1)
+        self.assertEqual(cache.size, 9)
+        self.assertEqual(len(cache), 2)
+
+        # Values larger than the whole cache are not cached.
+        self.assertEqual(cache.set('d', 'x' * 11), 0)
+        self.assertNotIn('d', cache)
+        self.assertEqual(cache.size, 9)
+
+    def test_replace_and_delete(self):
+        cache = ProcessLocalLRUCache(max_size=10, size_func=len)
+        cache.set('a', 'x' * 6)
+        cache.set('a', 'x' * 2)
+        self.assertEqual(cache.size, 2)
+        cache.delete('a')
+        cache.delete('not-there')
+        self.assertEqual(cache.size, 0)
+        self.assertNotIn('a', cache)
+
+    @patch('openedx.core.lib.cache_utils.time.time')
+    def test_timeout(self, mock_time):
+        mock_time.return_value = 100
+        cache = ProcessLocalLRUCache(max_size=2, timeout=10)
+        cache.set('a', 1)
+
+        mock_time.return_value = 109
+        self.assertEqual(cache.get('a'), 1)
+
+        mock_time.return_value = 110
+        self.assertIsNone(cache.get('a'))
+        self.assertNotIn('a', cache)
+        self.assertEqual(cache.size, 0)
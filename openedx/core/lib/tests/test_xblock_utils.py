@@ -4,6 +4,7 @@ Tests for xblock_utils.py
 from __future__ import absolute_import, unicode_literals
 
 import uuid
+from functools import partial
 
 import ddt
 from django.test.client import RequestFactory
@@ -11,6 +12,7 @@ from mock import patch
 from web_fragments.fragment import Fragment
 from six import text_type
 
+import static_replace
 from opaque_keys.edx.asides import AsideUsageKeyV1, AsideUsageKeyV2
 from openedx.core.lib.url_utils import quote_slashes
 from openedx.core.lib.xblock_builtin import get_css_dependencies, get_js_dependencies
@@ -20,6 +22,7 @@ from openedx.core.lib.xblock_utils import (
     replace_course_urls,
     replace_jump_to_id_urls,
     replace_static_urls,
+    replace_urls,
     request_token,
     sanitize_html_id,
     wrap_fragment,
@@ -27,6 +30,7 @@ from openedx.core.lib.xblock_utils import (
 )
 from xblock.core import XBlockAside
 from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.tests.django_utils import SharedModuleStoreTestCase
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 from xmodule.modulestore.tests.test_asides import AsideTestType
@@ -54,6 +58,9 @@ class TestXblockUtils(SharedModuleStoreTestCase):
             number='TS02',
             run='2015'
         )
+        ItemFactory.create(parent=cls.course_split, category='chapter')
+        cls.course_with_chapter = modulestore().get_course(cls.course_split.id)
+        cls.chapter = cls.course_with_chapter.get_children()[0]
 
     def create_fragment(self, content=None):
         """
@@ -177,6 +184,70 @@ class TestXblockUtils(SharedModuleStoreTestCase):
         self.assertIsInstance(test_replace, Fragment)
         self.assertEqual(test_replace.content, anchor_tag)
 
+    @ddt.data('course_mongo', 'course_split')
+    def test_replace_urls(self, course_id):
+        """
+        Verify that replace_urls replaces the urls as the other wrappers do one after the other.
+        """
+        course = getattr(self, course_id)
+        content = (
+            '<a href="/static/id"><img src="/static/xblock/resources/a.png"/></a>'
+            '<a href="/course/id"><a href="/jump_to_id/id">'
+        )
+        expected = content
+        for wrapper in [
+            partial(replace_static_urls, data_dir=None, course_id=course.id),
+            partial(replace_course_urls, course_id=course.id),
+            partial(replace_jump_to_id_urls, course_id=course.id, jump_to_id_base_url='/base_url/'),
+        ]:
+            expected = wrapper(block=course, view='baseview', frag=Fragment(expected), context=None).content
+
+        test_replace = replace_urls(
+            block=course,
+            view='baseview',
+            frag=self.create_fragment(content),
+            context=None,
+            course_id=course.id,
+            jump_to_id_base_url='/base_url/',
+        )
+        self.assertIsInstance(test_replace, Fragment)
+        self.assertEqual(test_replace.content, expected)
+        self.assertEqual(test_replace.resources[0].data, 'body {background-color:red;}')
+
+    def test_replace_urls_skips_rewritten_children(self):
+        """
+        Verify that the rewritten contents of the children of a block aren't scanned again.
+        """
+        chapter_replace = replace_urls(
+            block=self.chapter,
+            view='baseview',
+            frag=Fragment('<a href="/course/chapter">'),
+            context=None,
+            course_id=self.course_split.id,
+        )
+        self.assertEqual(chapter_replace.content, '<a href="/courses/course-v1:TestX+TS02+2015/chapter">')
+
+        with patch.object(
+            static_replace.UrlRewriter, 'rewrite', autospec=True, side_effect=static_replace.UrlRewriter.rewrite
+        ) as mock_rewrite:
+            test_replace = replace_urls(
+                block=self.course_with_chapter,
+                view='baseview',
+                frag=Fragment('<a href="/course/before"><div>{}</div><a href="/course/after">'.format(
+                    chapter_replace.content
+                )),
+                context=None,
+                course_id=self.course_split.id,
+            )
+        self.assertEqual(
+            test_replace.content,
+            '<a href="/courses/course-v1:TestX+TS02+2015/before">'
+            '<div><a href="/courses/course-v1:TestX+TS02+2015/chapter"></div>'
+            '<a href="/courses/course-v1:TestX+TS02+2015/after">'
+        )
+        self.assertEqual(mock_rewrite.call_count, 1)
+        self.assertNotIn(chapter_replace.content, mock_rewrite.call_args[0][1])
+
     def test_sanitize_html_id(self):
         """
         Verify that colons and dashes are replaced.
@@ -18,6 +18,7 @@ from django.urls import reverse
 from pytz import UTC
 from django.utils.html import escape
 from django.contrib.auth.models import User
+from edx_django_utils.cache import RequestCache
 from edxmako.shortcuts import render_to_string
 from six import text_type
 from web_fragments.fragment import Fragment
@@ -35,6 +36,13 @@ import webpack_loader.utils
 
 log = logging.getLogger(__name__)
 
+# The namespace of the request cache of the replace_urls wrapper.
+REPLACE_URLS_CACHE_NAMESPACE = 'xblock_utils.replace_urls'
+
+# Separates the parts of a fragment rewritten together by replace_urls.  No url
+# matched by UrlRewriter spans a newline.
+_REWRITE_SEPARATOR = u'\n\0\n'
+
 
 def wrap_fragment(fragment, new_content):
     """
@@ -268,6 +276,70 @@ def replace_static_urls(data_dir, block, view, frag, context, course_id=None, st
     ))
 
 
+def replace_urls(
+        block, view, frag, context,  # pylint: disable=unused-argument
+        course_id=None, data_dir=None, static_asset_path='', jump_to_id_base_url=None
+):
+    """
+    Replaces the /static/, /course/ and /jump_to_id/ urls of the fragment in a single pass, as the
+    replace_static_urls, replace_course_urls and replace_jump_to_id_urls wrappers do one after
+    the other.
+
+    The contents of the children of the block which were rewritten earlier in the request are
+    kept as they are, instead of being scanned again as part of the block's content.
+    """
+    request_cache = RequestCache(REPLACE_URLS_CACHE_NAMESPACE).data
+    rewriter_key = (course_id, data_dir, static_asset_path, jump_to_id_base_url)
+    if rewriter_key not in request_cache:
+        request_cache[rewriter_key] = (
+            static_replace.UrlRewriter(
+                course_id=course_id,
+                data_directory=data_dir,
+                static_asset_path=static_asset_path,
+                jump_to_id_base_url=jump_to_id_base_url,
+            ),
+            {},
+        )
+    rewriter, rewritten_contents = request_cache[rewriter_key]
+
+    if isinstance(frag.content, text_type) and getattr(block, 'has_children', False):
+        parts = _split_rewritten_contents(
+            frag.content,
+            [rewritten_contents[child] for child in block.children if rewritten_contents.get(child)],
+        )
+    else:
+        parts = [frag.content]
+    new_parts = parts[::2]
+    if len(new_parts) > 1 and not any(_REWRITE_SEPARATOR in part for part in new_parts):
+        new_parts = rewriter.rewrite(_REWRITE_SEPARATOR.join(new_parts)).split(_REWRITE_SEPARATOR)
+    else:
+        new_parts = [rewriter.rewrite(part) for part in new_parts]
+    parts[::2] = new_parts
+    content = parts[0] if len(parts) == 1 else u''.join(parts)
+
+    rewritten_contents[block.scope_ids.usage_id] = content
+    return wrap_fragment(frag, content)
+
+
+def _split_rewritten_contents(content, rewritten_contents):
+    """
+    Splits content around the first occurrence of each of the rewritten contents, in order.
+
+    Returns the list of the parts of the content, where the parts of odd index are the rewritten
+    contents found.
+    """
+    parts = []
+    start = 0
+    for rewritten_content in rewritten_contents:
+        index = content.find(rewritten_content, start)
+        if index < 0:
+            continue
+        parts.extend([content[start:index], rewritten_content])
+        start = index + len(rewritten_content)
+    parts.append(content[start:])
+    return parts
+
+
 def grade_histogram(module_id):
     '''
     Print out a histogram of grades on a given problem in staff member debug info.